@@ -574,6 +574,9 @@ def add_ratings_and_comments(num_ratings=200, num_comments=150, comment_likes_pr
         # Commit all changes
         try:
             db.session.commit()
+            # Likes were inserted directly, so rebuild the denormalized counters
+            from routes.utils.comment_counters import repair_comment_counters
+            repair_comment_counters()
             print("-" * 50)
             print("✅ Successfully added ratings and comments!")
             print(f"   Ratings: {ratings_added} added, {ratings_skipped} skipped (already existed)")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+One-off backfill of Image.content_hash for images stored before upload
+deduplication. Files are hashed in a process pool; hashes are written back
+with one executemany UPDATE per batch. Files whose bytes match another image
+of the same user that already has the hash are reported and left unhashed
+(the hash is unique per user).
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select, update
+
+from main import app
+from models import db, Image
+from routes.utils.content_hash import sha256_file
+
+
+def hash_one(item):
+    image_id, path = item
+    try:
+        return image_id, sha256_file(path)
+    except OSError:
+        return image_id, None
+
+
+def backfill(workers=None, batch_size=500):
+    """Hash every image file without a content hash. Returns (hashed, missing, duplicates)."""
+    rows = db.session.execute(
+        select(Image.id, Image.user_id, Image.filepath)
+        .where(Image.content_hash.is_(None), Image.filepath.isnot(None))
+        .order_by(Image.id)
+    ).all()
+    known = set(db.session.execute(
+        select(Image.user_id, Image.content_hash).where(Image.content_hash.isnot(None))
+    ).tuples())
+
+    owners = {row.id: row.user_id for row in rows}
+    items = [(row.id, row.filepath if os.path.isabs(row.filepath) else str(project_root / row.filepath))
+             for row in rows]
+    hashed = missing = 0
+    duplicates = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(items), batch_size):
+            batch = []
+            for image_id, digest in pool.map(hash_one, items[start:start + batch_size], chunksize=16):
+                if digest is None:
+                    missing += 1
+                elif (owners[image_id], digest) in known:
+                    duplicates.append(image_id)
+                else:
+                    known.add((owners[image_id], digest))
+                    batch.append({'id': image_id, 'content_hash': digest})
+            if batch:
+                # ORM bulk UPDATE by primary key: one executemany per batch
+                db.session.execute(update(Image), batch)
+                db.session.commit()
+                hashed += len(batch)
+            print(f"  {min(start + batch_size, len(items))}/{len(items)} files checked")
+
+    return hashed, missing, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute SHA-256 content hashes for existing images')
+    parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows updated per commit')
+    args = parser.parse_args()
+
+    with app.app_context():
+        hashed, missing, duplicates = backfill(args.workers, args.batch_size)
+    print(f"Hashed {hashed} image(s); {missing} file(s) missing")
+    if duplicates:
+        print(f"{len(duplicates)} image(s) duplicate an existing file and were left unhashed: {duplicates}")
+
+
+if __name__ == "__main__":
+    main()
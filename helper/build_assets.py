@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Fingerprint static files and write precompressed .br/.gz siblings plus
+static/asset-manifest.json. Run on deploy before starting the app; the app
+loads the manifest at startup.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from optimizations.asset_pipeline import brotli, build_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build hashed, precompressed static assets')
+    parser.add_argument('--static-dir', default=str(project_root / 'static'), help='Static folder to build')
+    parser.add_argument('--manifest', default=None, help='Manifest path (default: <static-dir>/asset-manifest.json)')
+    parser.add_argument('--workers', type=int, default=None, help='Compression processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("⚠️ Brotli is not installed; only .gz siblings will be written (pip install Brotli)")
+
+    result = build_assets(args.static_dir, args.manifest, args.workers)
+    print(f"✅ Fingerprinted {result['files']} file(s), precompressed {result['compressed']}")
+    if result['original_bytes']:
+        print(f"   {result['original_bytes']:,} bytes -> gzip {result['gzip_bytes']:,}"
+              + (f", brotli {result['br_bytes']:,}" if result['br_bytes'] else ""))
+
+
+if __name__ == "__main__":
+    main()
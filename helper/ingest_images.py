@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Bulk import a directory of images (default: images_to_upload/) into the image
+library. Hashing and WebP conversion run in a process pool and rows are
+inserted one batch at a time; rerunning after an interruption resumes from
+the manifest written next to the images.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from main import app
+from models import db, User, UserRole
+from routes.utils.image_ingest import ingest_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import images from a directory')
+    parser.add_argument('directory', nargs='?', default=str(project_root / 'images_to_upload'),
+                        help='Directory to import (searched recursively)')
+    parser.add_argument('--user', help='Username owning the images (default: first superuser/admin)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Images inserted per commit')
+    parser.add_argument('--manifest', default=None, help='Manifest path (default: <directory>/.ingest_manifest)')
+    parser.add_argument('--hidden', action='store_true', help='Import images as hidden')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.user:
+            user = User.query.filter_by(username=args.user).first()
+        else:
+            user = (User.query.filter(User.role.in_([UserRole.SUPERUSER, UserRole.ADMIN]))
+                    .order_by(User.id).first())
+        if user is None:
+            print("❌ No owner user found; pass --user")
+            sys.exit(1)
+
+        stats = ingest_directory(
+            args.directory,
+            user_id=user.id,
+            upload_dir='static/uploads',
+            root_dir=str(project_root),
+            manifest_path=args.manifest,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            is_visible=not args.hidden,
+            report=print,
+        )
+
+    print(f"✅ Imported {stats['imported']} of {stats['found']} file(s); {stats['skipped']} skipped")
+    for error in stats['errors']:
+        print(f"⚠️ {error}")
+
+
+if __name__ == "__main__":
+    main()
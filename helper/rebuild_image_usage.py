@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Rebuild the image_usage reverse index from news, albums, chapters and ads.
+Normally the index is maintained on save; run this once after the migration
+or after editing content directly in the database.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from main import app
+from routes.utils.image_usage import rebuild_image_usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the image usage index')
+    parser.add_argument('--batch-size', type=int, default=500, help='Owner rows read per batch')
+    args = parser.parse_args()
+
+    with app.app_context():
+        written = rebuild_image_usage(args.batch_size)
+    print(f"Indexed {written} image reference(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Cron-friendly repair job that recomputes the denormalized like, dislike and
+reply counters on comments from the underlying rows in one UPDATE.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from main import app
+from routes.utils.comment_counters import repair_comment_counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute comment like/dislike/reply counters')
+    parser.add_argument('--ids', type=int, nargs='*', help='Only repair these comment ids')
+    args = parser.parse_args()
+
+    with app.app_context():
+        updated = repair_comment_counters(args.ids)
+    print(f"Repaired counters on {updated} comment(s)")
+
+
+if __name__ == "__main__":
+    main()
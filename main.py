@@ -35,6 +35,8 @@ from optimizations import (
     create_frontend_optimizer,
     create_performance_monitor,
     get_asset_optimizer,
+    init_asset_pipeline,
+    init_compression,
     get_ssr_optimizer,
     monitor_ssr_render
 )
@@ -76,6 +78,8 @@ migrate = Migrate(app, db)
 init_cache(app)
 db_optimizer = create_database_optimizer(app)
 frontend_optimizer = create_frontend_optimizer(app)
+asset_pipeline = init_asset_pipeline(app)
+compression = init_compression(app)
 performance_monitor = create_performance_monitor(app)
 asset_optimizer = get_asset_optimizer()
 ssr_optimizer = get_ssr_optimizer()
@@ -367,7 +371,12 @@ def inject_brand_info():
 def inject_seo_data():
     """Inject SEO data with proper leveling - content SEO takes precedence over root SEO."""
     try:
-        from models import RootSEO, News, Album, AlbumChapter
+        from routes.utils.seo_materialize import content_seo_for_path
+        from routes.utils.seo_resolver import resolve_root_seo, wants_seo
+
+        # API and JSON responses never render SEO tags
+        if not wants_seo(request):
+            return {"seo_data": {}, "root_seo": None}
         
         # Initialize SEO data
         seo_data = {
@@ -390,127 +399,38 @@ def inject_seo_data():
             'schema_markup': None
         }
         
-        # Get root SEO as fallback
+        # Get root SEO as fallback (per-process snapshot, no query)
         path = request.path.strip('/')
-        page_identifier = 'home' if not path else path.split('/')[0]
-        root_seo = RootSEO.query.filter_by(
-            page_identifier=page_identifier,
-            is_active=True
-        ).first()
+        root_seo = resolve_root_seo(path)
         
         # Apply root SEO as base (fallback values)
         if root_seo:
             seo_data.update({
-                'meta_title': root_seo.meta_title,
-                'meta_description': root_seo.meta_description,
-                'meta_keywords': root_seo.meta_keywords,
-                'meta_author': root_seo.meta_author,
-                'meta_language': root_seo.meta_language or 'id',
-                'meta_robots': root_seo.meta_robots or 'index, follow',
-                'canonical_url': root_seo.canonical_url,
-                'og_title': root_seo.og_title,
-                'og_description': root_seo.og_description,
-                'og_image': root_seo.og_image,
-                'og_type': root_seo.og_type or 'website',
+                'meta_title': root_seo['meta_title'],
+                'meta_description': root_seo['meta_description'],
+                'meta_keywords': root_seo['meta_keywords'],
+                'meta_author': root_seo['meta_author'],
+                'meta_language': root_seo['meta_language'] or 'id',
+                'meta_robots': root_seo['meta_robots'] or 'index, follow',
+                'canonical_url': root_seo['canonical_url'],
+                'og_title': root_seo['og_title'],
+                'og_description': root_seo['og_description'],
+                'og_image': root_seo['og_image'],
+                'og_type': root_seo['og_type'] or 'website',
                 'og_url': request.url,
-                'twitter_card': root_seo.twitter_card or 'summary_large_image',
-                'twitter_title': root_seo.twitter_title,
-                'twitter_description': root_seo.twitter_description,
-                'twitter_image': root_seo.twitter_image,
-                'schema_markup': root_seo.schema_markup
+                'twitter_card': root_seo['twitter_card'] or 'summary_large_image',
+                'twitter_title': root_seo['twitter_title'],
+                'twitter_description': root_seo['twitter_description'],
+                'twitter_image': root_seo['twitter_image'],
+                'schema_markup': root_seo['schema_markup']
             })
         
-        # Check for content-specific SEO (higher priority)
-        content_seo = None
-        
-        # Check if this is a news/article page (URL pattern: /news/<id>/<title>)
-        if path.startswith('news/'):
-            # Extract news ID from URL
-            path_parts = path.split('/')
-            if len(path_parts) >= 2:
-                try:
-                    news_id = int(path_parts[1])
-                    news = News.query.filter_by(id=news_id, is_visible=True).first()
-                    if news:
-                        content_seo = news
-                        seo_data['og_type'] = 'article'
-                        seo_data['og_url'] = request.url
-                except ValueError:
-                    pass  # Invalid news ID
-        
-        # Check if this is an album page (URL pattern: /album/<id>/<title>)
-        elif path.startswith('album/'):
-            # Extract album ID from URL
-            path_parts = path.split('/')
-            if len(path_parts) >= 2:
-                try:
-                    album_id = int(path_parts[1])
-                    album = Album.query.filter_by(id=album_id, is_visible=True).first()
-                    if album:
-                        content_seo = album
-                        seo_data['og_type'] = 'book'
-                        seo_data['og_url'] = request.url
-                except ValueError:
-                    pass  # Invalid album ID
-        
-        # Check if this is a chapter page (URL pattern: /album/<album_id>/chapter/<chapter_id>/<title>)
-        elif path.startswith('album/') and 'chapter' in path:
-            # Extract album ID and chapter ID from URL
-            path_parts = path.split('/')
-            if len(path_parts) >= 4:
-                try:
-                    album_id = int(path_parts[1])
-                    chapter_id = int(path_parts[3])
-                    chapter = AlbumChapter.query.filter_by(
-                        id=chapter_id, 
-                        album_id=album_id
-                    ).first()
-                    if chapter and chapter.album and chapter.album.is_visible:
-                        content_seo = chapter
-                        seo_data['og_type'] = 'article'
-                        seo_data['og_url'] = request.url
-                except ValueError:
-                    pass  # Invalid album or chapter ID
-        
-        # Apply content-specific SEO (overrides root SEO)
-        if content_seo:
-            # Meta tags
-            if content_seo.meta_title:
-                seo_data['meta_title'] = content_seo.meta_title
-            if content_seo.meta_description:
-                seo_data['meta_description'] = content_seo.meta_description
-            if content_seo.meta_keywords:
-                seo_data['meta_keywords'] = content_seo.meta_keywords
-            if content_seo.meta_author:
-                seo_data['meta_author'] = content_seo.meta_author
-            if content_seo.meta_language:
-                seo_data['meta_language'] = content_seo.meta_language
-            if content_seo.meta_robots:
-                seo_data['meta_robots'] = content_seo.meta_robots
-            if content_seo.canonical_url:
-                seo_data['canonical_url'] = content_seo.canonical_url
-            
-            # Open Graph
-            if content_seo.og_title:
-                seo_data['og_title'] = content_seo.og_title
-            if content_seo.og_description:
-                seo_data['og_description'] = content_seo.og_description
-            if content_seo.og_image:
-                seo_data['og_image'] = content_seo.og_image
-            
-            # Twitter
-            if content_seo.twitter_card:
-                seo_data['twitter_card'] = content_seo.twitter_card
-            if content_seo.twitter_title:
-                seo_data['twitter_title'] = content_seo.twitter_title
-            if content_seo.twitter_description:
-                seo_data['twitter_description'] = content_seo.twitter_description
-            if content_seo.twitter_image:
-                seo_data['twitter_image'] = content_seo.twitter_image
-            
-            # Schema markup
-            if content_seo.schema_markup:
-                seo_data['schema_markup'] = content_seo.schema_markup
+        # Content-specific SEO (higher priority), precomputed on save
+        content_seo, og_type = content_seo_for_path(path)
+        if content_seo is not None:
+            seo_data.update(content_seo)
+            seo_data['og_type'] = og_type
+            seo_data['og_url'] = request.url
         
         return {"seo_data": seo_data, "root_seo": root_seo}
     except Exception as e:
@@ -705,6 +625,32 @@ with app.app_context():
     else:
         app.logger.info("🔄 Migration CLI detected, skipping database initialization")
 
+# ----------------------
+# 🤖 robots.txt (rendered here and again only when SEO settings change)
+# ----------------------
+if not _is_migration_cli():
+    with app.app_context():
+        try:
+            from routes.utils.robots_txt import publish_robots_txt
+            publish_robots_txt()
+        except Exception as e:
+            app.logger.error(f"❌ Failed to publish robots.txt: {e}")
+
+# ----------------------
+# 📊 Ad Stats Compactor (daily rollups + hourly row compaction)
+# ----------------------
+# Every worker process starts one; a file lock in the instance folder lets
+# only one of them run each pass.
+app.config["AD_STATS_COMPACTOR_INTERVAL"] = int(os.getenv("AD_STATS_COMPACTOR_INTERVAL", 300))
+app.config["AD_STATS_COMPACT_AFTER_DAYS"] = int(os.getenv("AD_STATS_COMPACT_AFTER_DAYS", 7))
+if not _is_migration_cli() and os.getenv("AD_STATS_COMPACTOR", "true").lower() == "true":
+    try:
+        from routes.utils.ad_stats_rollup import start_ad_stats_compactor
+        start_ad_stats_compactor(app)
+        app.logger.info("✅ Ad stats compactor started.")
+    except Exception as e:
+        app.logger.error(f"❌ Failed to start ad stats compactor: {e}")
+
 # ----------------------
 # 🩺 Health Check (no CORS needed because it's /health, not /api/health)
 # ----------------------
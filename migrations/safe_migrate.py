@@ -1020,6 +1020,10 @@ def safe_migrate():
                             is_deleted BOOLEAN DEFAULT 0 NOT NULL,
                             ip_address VARCHAR(45),
                             user_agent VARCHAR(500),
+                            like_count INTEGER DEFAULT 0 NOT NULL,
+                            dislike_count INTEGER DEFAULT 0 NOT NULL,
+                            reply_count INTEGER DEFAULT 0 NOT NULL,
+                            path VARCHAR(255),
                             created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
                             updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
                             FOREIGN KEY (user_id) REFERENCES user (id) ON DELETE CASCADE,
@@ -1043,6 +1047,11 @@ def safe_migrate():
                         to_add.append("ADD COLUMN user_agent VARCHAR(500)")
                     if 'updated_at' not in comment_cols:
                         to_add.append("ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP")
+                    counter_cols = [c for c in ('like_count', 'dislike_count', 'reply_count') if c not in comment_cols]
+                    for col in counter_cols:
+                        to_add.append(f"ADD COLUMN {col} INTEGER DEFAULT 0 NOT NULL")
+                    if 'path' not in comment_cols:
+                        to_add.append("ADD COLUMN path VARCHAR(255)")
                     for clause in to_add:
                         try:
                             db.session.execute(text(f"ALTER TABLE comment {clause}"))
@@ -1050,6 +1059,48 @@ def safe_migrate():
                             print(f"⚠️ Could not {clause}: {e}")
                     if to_add:
                         db.session.commit()
+                    if counter_cols:
+                        # Backfill denormalized counters in one set-based statement
+                        db.session.execute(text("""
+                            UPDATE comment SET
+                                like_count = (SELECT COUNT(*) FROM comment_like cl
+                                              WHERE cl.comment_id = comment.id AND cl.is_like = 1 AND cl.is_deleted = 0),
+                                dislike_count = (SELECT COUNT(*) FROM comment_like cl
+                                                 WHERE cl.comment_id = comment.id AND cl.is_like = 0 AND cl.is_deleted = 0),
+                                reply_count = (SELECT COUNT(*) FROM comment r
+                                               WHERE r.parent_id = comment.id AND r.is_approved = 1
+                                                 AND r.is_spam = 0 AND r.is_deleted = 0)
+                        """))
+                        db.session.commit()
+                        print("✅ Backfilled comment like/dislike/reply counters")
+                    # Backfill materialized paths (parents before children)
+                    rows = db.session.execute(text("SELECT id, parent_id, path FROM comment ORDER BY id")).fetchall()
+                    if any(row[2] is None for row in rows):
+                        parents = {row[0]: row[1] for row in rows}
+                        paths = {}
+
+                        def comment_path(comment_id, seen=()):
+                            if comment_id not in paths:
+                                parent_id = parents.get(comment_id)
+                                segment = str(comment_id).zfill(10)
+                                if parent_id in parents and parent_id not in seen:
+                                    segment = f"{comment_path(parent_id, seen + (comment_id,))}.{segment}"
+                                paths[comment_id] = segment
+                            return paths[comment_id]
+
+                        db.session.execute(
+                            text("UPDATE comment SET path = :path WHERE id = :id"),
+                            [{'id': row[0], 'path': comment_path(row[0])} for row in rows if row[2] is None]
+                        )
+                        db.session.commit()
+                        print("✅ Backfilled comment thread paths")
+                    db.session.execute(text(
+                        "CREATE INDEX IF NOT EXISTS idx_comment_thread_path ON comment (content_type, content_id, path)"
+                    ))
+                    db.session.execute(text(
+                        "CREATE INDEX IF NOT EXISTS idx_comment_moderation ON comment (is_approved, is_spam, is_deleted, created_at)"
+                    ))
+                    db.session.commit()
                 except Exception as e:
                     print(f"⚠️ Could not align comment table: {e}")
             
@@ -1955,6 +2006,18 @@ def safe_migrate():
                 
                 migrate_enhanced_ads_system(db.session)
                 print("✅ Enhanced ads system migration completed")
+
+                migrate_ad_stats_rollups(db.session)
+                print("✅ Ad stats rollup tables migration completed")
+
+                migrate_image_content_hash(db.session)
+                print("✅ Image content hash migration completed")
+
+                migrate_image_usage(db.session)
+                print("✅ Image usage index migration completed")
+
+                migrate_seo_source_hash(db.session)
+                print("✅ SEO source hash migration completed")
             except Exception as e:
                 print(f"⚠️ Could not migrate user profile system: {e}")
             
@@ -2186,6 +2249,138 @@ def migrate_enhanced_ads_system(db_session):
         print(f"❌ Error in enhanced ads system migration: {e}")
         db_session.rollback()
 
+def migrate_ad_stats_rollups(db_session):
+    """Create daily ad stats rollup tables (ad, campaign and placement per day)."""
+    from sqlalchemy import text
+    print("🔄 Creating ad stats rollup tables...")
+
+    try:
+        db_session.execute(text("""
+            CREATE TABLE IF NOT EXISTS ad_stats_daily (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE NOT NULL,
+                ad_id INTEGER NOT NULL,
+                campaign_id INTEGER,
+                impressions INTEGER DEFAULT 0 NOT NULL,
+                clicks INTEGER DEFAULT 0 NOT NULL,
+                viewable_impressions INTEGER DEFAULT 0 NOT NULL,
+                revenue NUMERIC(12, 4) DEFAULT 0 NOT NULL,
+                desktop_impressions INTEGER DEFAULT 0 NOT NULL,
+                mobile_impressions INTEGER DEFAULT 0 NOT NULL,
+                tablet_impressions INTEGER DEFAULT 0 NOT NULL,
+                refreshed_at DATETIME NOT NULL,
+                FOREIGN KEY (ad_id) REFERENCES ad (id) ON DELETE CASCADE,
+                FOREIGN KEY (campaign_id) REFERENCES ad_campaign (id) ON DELETE SET NULL,
+                CONSTRAINT uq_ad_stats_daily_ad_date UNIQUE (ad_id, date)
+            )
+        """))
+
+        db_session.execute(text("""
+            CREATE TABLE IF NOT EXISTS ad_campaign_stats_daily (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE NOT NULL,
+                campaign_id INTEGER NOT NULL,
+                impressions INTEGER DEFAULT 0 NOT NULL,
+                clicks INTEGER DEFAULT 0 NOT NULL,
+                viewable_impressions INTEGER DEFAULT 0 NOT NULL,
+                revenue NUMERIC(12, 4) DEFAULT 0 NOT NULL,
+                active_ads INTEGER DEFAULT 0 NOT NULL,
+                refreshed_at DATETIME NOT NULL,
+                FOREIGN KEY (campaign_id) REFERENCES ad_campaign (id) ON DELETE CASCADE,
+                CONSTRAINT uq_ad_campaign_stats_daily_campaign_date UNIQUE (campaign_id, date)
+            )
+        """))
+
+        db_session.execute(text("""
+            CREATE TABLE IF NOT EXISTS ad_placement_stats_daily (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE NOT NULL,
+                placement_id INTEGER NOT NULL,
+                impressions INTEGER DEFAULT 0 NOT NULL,
+                clicks INTEGER DEFAULT 0 NOT NULL,
+                viewable_impressions INTEGER DEFAULT 0 NOT NULL,
+                revenue NUMERIC(12, 4) DEFAULT 0 NOT NULL,
+                refreshed_at DATETIME NOT NULL,
+                FOREIGN KEY (placement_id) REFERENCES ad_placement (id) ON DELETE CASCADE,
+                CONSTRAINT uq_ad_placement_stats_daily_placement_date UNIQUE (placement_id, date)
+            )
+        """))
+
+        # Create indexes
+        db_session.execute(text("CREATE INDEX IF NOT EXISTS ix_ad_stats_daily_date ON ad_stats_daily (date)"))
+        db_session.execute(text("CREATE INDEX IF NOT EXISTS ix_ad_campaign_stats_daily_date ON ad_campaign_stats_daily (date)"))
+        db_session.execute(text("CREATE INDEX IF NOT EXISTS ix_ad_placement_stats_daily_date ON ad_placement_stats_daily (date)"))
+        db_session.execute(text("CREATE INDEX IF NOT EXISTS idx_ad_stats_date_hour ON ad_stats (date, hour)"))
+
+        db_session.commit()
+        print("✅ Ad stats rollup tables created successfully")
+
+    except Exception as e:
+        print(f"⚠️ Ad stats rollup tables might already exist or error occurred: {e}")
+        db_session.rollback()
+
+def migrate_image_content_hash(db_session):
+    """Add the SHA-256 content hash column and its per-user unique index to the image table."""
+    from sqlalchemy import text
+    print("🔄 Adding image content hash...")
+
+    try:
+        columns = [row[1] for row in db_session.execute(text("PRAGMA table_info(image)")).fetchall()]
+        if 'content_hash' not in columns:
+            db_session.execute(text("ALTER TABLE image ADD COLUMN content_hash VARCHAR(64)"))
+            print("✅ Added content_hash column to image table")
+        # Deduplication is per uploader; replaces the earlier library-wide index
+        db_session.execute(text("DROP INDEX IF EXISTS uq_image_content_hash"))
+        db_session.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_image_user_content_hash ON image (user_id, content_hash)"
+        ))
+        db_session.commit()
+        print("💡 Run python helper/backfill_image_hashes.py to hash existing files")
+    except Exception as e:
+        print(f"⚠️ Could not add image content hash: {e}")
+        db_session.rollback()
+
+def migrate_image_usage(db_session):
+    """Create the image_usage reverse index table."""
+    from sqlalchemy import text
+    print("🔄 Creating image usage index...")
+
+    try:
+        db_session.execute(text("""
+            CREATE TABLE IF NOT EXISTS image_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image_id INTEGER NOT NULL REFERENCES image (id) ON DELETE CASCADE,
+                owner_type VARCHAR(20) NOT NULL,
+                owner_id INTEGER NOT NULL,
+                field VARCHAR(50) NOT NULL,
+                CONSTRAINT uq_image_usage_ref UNIQUE (image_id, owner_type, owner_id, field)
+            )
+        """))
+        db_session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_image_usage_owner ON image_usage (owner_type, owner_id)"
+        ))
+        db_session.commit()
+        print("💡 Run python helper/rebuild_image_usage.py to index existing content")
+    except Exception as e:
+        print(f"⚠️ Could not create image usage index: {e}")
+        db_session.rollback()
+
+def migrate_seo_source_hash(db_session):
+    """Add the seo_source_hash column used by incremental SEO injection."""
+    from sqlalchemy import text
+    print("🔄 Adding SEO source hash columns...")
+
+    try:
+        for table in ('news', 'album', 'album_chapter'):
+            columns = [row[1] for row in db_session.execute(text(f"PRAGMA table_info({table})")).fetchall()]
+            if 'seo_source_hash' not in columns:
+                db_session.execute(text(f"ALTER TABLE {table} ADD COLUMN seo_source_hash VARCHAR(64)"))
+                print(f"✅ Added seo_source_hash column to {table} table")
+        db_session.commit()
+    except Exception as e:
+        print(f"⚠️ Could not add SEO source hash columns: {e}")
+        db_session.rollback()
+
 def main():
     """Main function to run comprehensive safe migration."""
     print("🛡️ Comprehensive Safe Database Migration Script")
@@ -2,7 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timezone, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import event, text
+from sqlalchemy import event, select, text
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import SQLAlchemyError
 from enum import Enum
 import os
@@ -797,6 +798,7 @@ class Image(db.Model):
     description = db.Column(db.String(500))
     filepath = db.Column(db.String(255), nullable=True, unique=True)  # For file uploads
     url = db.Column(db.String(255), nullable=True, unique=True)  # For direct links
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the uploaded bytes, unique per user
     is_visible = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=default_utcnow, nullable=False)
     updated_at = db.Column(
@@ -812,6 +814,10 @@ class Image(db.Model):
     )
     # Relationship defined via backref in User.images
 
+    __table_args__ = (
+        db.Index('uq_image_user_content_hash', 'user_id', 'content_hash', unique=True),
+    )
+
     def to_dict(self):
         """Converts the image object to a dictionary."""
         file_url = None
@@ -834,6 +840,7 @@ class Image(db.Model):
             "filepath": self.filepath,
             "file_url": file_url,
             "url": self.url,
+            "content_hash": self.content_hash,
             "is_visible": self.is_visible,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
@@ -850,6 +857,32 @@ class Image(db.Model):
             print(f"Error deleting file {self.filepath}: {e}")
 
 
+class ImageUsage(db.Model):
+    """Reverse index of where library images are referenced (maintained on save)."""
+    __tablename__ = "image_usage"
+
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(
+        db.Integer, db.ForeignKey("image.id", ondelete="CASCADE"), nullable=False
+    )
+    owner_type = db.Column(db.String(20), nullable=False)  # news, album, chapter, ad
+    owner_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String(50), nullable=False)  # Column holding the reference
+
+    __table_args__ = (
+        db.UniqueConstraint('image_id', 'owner_type', 'owner_id', 'field', name='uq_image_usage_ref'),
+        db.Index('idx_image_usage_owner', 'owner_type', 'owner_id'),
+    )
+
+    def to_dict(self):
+        return {
+            "image_id": self.image_id,
+            "owner_type": self.owner_type,
+            "owner_id": self.owner_id,
+            "field": self.field,
+        }
+
+
 class CategoryGroup(db.Model):
     __tablename__ = "category_group"
     id = db.Column(db.Integer, primary_key=True)
@@ -968,6 +1001,7 @@ class News(db.Model):
     seo_score = db.Column(db.Integer, nullable=True)           # Calculated SEO score (0-100)
     last_seo_audit = db.Column(db.DateTime, nullable=True)     # Last SEO audit timestamp
     is_seo_lock = db.Column(db.Boolean, default=False, nullable=False)  # Lock SEO fields from automatic updates
+    seo_source_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the inputs of the last SEO injection
 
     # Foreign Keys with explicit names
     category_id = db.Column(
@@ -1309,6 +1343,7 @@ class Album(db.Model):
     seo_score = db.Column(db.Integer, nullable=True)           # Calculated SEO score (0-100)
     last_seo_audit = db.Column(db.DateTime, nullable=True)     # Last SEO audit timestamp
     is_seo_lock = db.Column(db.Boolean, default=False, nullable=False)  # Lock SEO fields from automatic updates
+    seo_source_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the inputs of the last SEO injection
     
     # Content deletion request fields
     deletion_requested = db.Column(db.Boolean, default=False, nullable=False, index=True)
@@ -1712,6 +1747,7 @@ class AlbumChapter(db.Model):
     seo_score = db.Column(db.Integer, nullable=True)           # Calculated SEO score (0-100)
     last_seo_audit = db.Column(db.DateTime, nullable=True)     # Last SEO audit timestamp
     is_seo_lock = db.Column(db.Boolean, default=False, nullable=False)  # Lock SEO fields from automatic updates
+    seo_source_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the inputs of the last SEO injection
 
     # Foreign Keys
     album_id = db.Column(
@@ -2131,6 +2167,15 @@ class Comment(db.Model):
     content_type = db.Column(db.String(50), nullable=False, index=True)  # 'news' or 'album'
     content_id = db.Column(db.Integer, nullable=False, index=True)
     
+    # Denormalized counters, maintained by routes.utils.comment_counters
+    like_count = db.Column(db.Integer, default=0, nullable=False)
+    dislike_count = db.Column(db.Integer, default=0, nullable=False)
+    reply_count = db.Column(db.Integer, default=0, nullable=False)  # approved, non-spam, non-deleted replies
+    
+    # Materialized path: zero-padded ids from the thread root down to this comment,
+    # e.g. "0000000012.0000000040". Assigned after insert; sorts threads by creation order.
+    path = db.Column(db.String(255), nullable=True)
+    
     # Foreign Keys
     user_id = db.Column(
         db.Integer,
@@ -2149,9 +2194,21 @@ class Comment(db.Model):
     likes = db.relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
     reports = db.relationship("CommentReport", back_populates="comment", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        db.Index('idx_comment_thread_path', 'content_type', 'content_id', 'path'),
+        db.Index('idx_comment_moderation', 'is_approved', 'is_spam', 'is_deleted', 'created_at'),
+    )
+    
+    PATH_SEGMENT_WIDTH = 10
+    
     def __init__(self, **kwargs):
         super(Comment, self).__init__(**kwargs)
     
+    @classmethod
+    def path_segment(cls, comment_id):
+        """Fixed-width path segment for a comment id."""
+        return str(comment_id).zfill(cls.PATH_SEGMENT_WIDTH)
+    
     def validate(self):
         """Validate the comment before saving."""
         if not self.content or len(self.content.strip()) == 0:
@@ -2173,19 +2230,11 @@ class Comment(db.Model):
     
     def get_likes_count(self):
         """Get the number of likes for this comment."""
-        return CommentLike.query.filter_by(
-            comment_id=self.id, 
-            is_like=True, 
-            is_deleted=False
-        ).count()
+        return self.like_count or 0
     
     def get_dislikes_count(self):
         """Get the number of dislikes for this comment."""
-        return CommentLike.query.filter_by(
-            comment_id=self.id, 
-            is_like=False, 
-            is_deleted=False
-        ).count()
+        return self.dislike_count or 0
     
     def is_liked_by_user(self, user_id):
         """Check if a user has liked this comment."""
@@ -2207,18 +2256,22 @@ class Comment(db.Model):
         ).first()
         return dislike is not None
     
-    def to_dict(self):
-        """Converts the Comment object to a dictionary."""
+    def to_dict(self, author=None):
+        """Converts the Comment object to a dictionary.
+
+        Bulk loaders may pass the author they already fetched.
+        """
+        user = author if author is not None else self.user
         user_data = None
-        if self.user is not None:
+        if user is not None:
             try:
                 user_data = {
-                    "id": self.user.id,
-                    "username": self.user.username,
-                    "first_name": getattr(self.user, "first_name", None),
-                    "last_name": getattr(self.user, "last_name", None),
-                    "profile_picture": getattr(self.user, "profile_picture", None),
-                    "role": getattr(self.user.role, "value", None),
+                    "id": user.id,
+                    "username": user.username,
+                    "first_name": getattr(user, "first_name", None),
+                    "last_name": getattr(user, "last_name", None),
+                    "profile_picture": getattr(user, "profile_picture", None),
+                    "role": getattr(user.role, "value", None),
                 }
             except Exception:
                 user_data = {"id": self.user_id}
@@ -2236,9 +2289,9 @@ class Comment(db.Model):
             "user": user_data,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
-            "likes_count": self.get_likes_count(),
-            "dislikes_count": self.get_dislikes_count(),
-            "replies_count": len([r for r in self.replies if not r.is_deleted]),
+            "likes_count": self.like_count or 0,
+            "dislikes_count": self.dislike_count or 0,
+            "replies_count": self.reply_count or 0,
         }
     
     def __repr__(self):
@@ -2699,6 +2752,21 @@ def delete_image_file(mapper, connection, target):
     target.delete_file()
 
 
+@event.listens_for(Comment, "after_insert")
+def assign_comment_path(mapper, connection, target):
+    """Assigns the materialized path once the comment has an id."""
+    table = Comment.__table__
+    parent_path = None
+    if target.parent_id:
+        parent_path = connection.execute(
+            select(table.c.path).where(table.c.id == target.parent_id)
+        ).scalar()
+    segment = Comment.path_segment(target.id)
+    path = f"{parent_path}.{segment}" if parent_path else segment
+    connection.execute(table.update().where(table.c.id == target.id).values(path=path))
+    set_committed_value(target, "path", path)
+
+
 # Indexes (can be used with Flask-Migrate)
 # Note: Defining indexes here is informational.
 # Actual creation/management is handled by safe_migrate.py
@@ -3233,8 +3301,12 @@ class AdPlacement(db.Model):
         if self.rotation_type not in ['random', 'sequential', 'weighted']:
             raise ValueError("Rotation type must be 'random', 'sequential', or 'weighted'")
     
-    def should_display(self, user=None, device_type=None, location=None):
-        """Check if this placement should display based on targeting criteria."""
+    def should_display(self, user=None, device_type=None, location=None, has_premium=None):
+        """Check if this placement should display based on targeting criteria.
+
+        Pass has_premium (e.g. from the ad eligibility cache) to skip loading
+        the user's subscription state.
+        """
         if not self.is_active:
             return False
         
@@ -3243,10 +3315,12 @@ class AdPlacement(db.Model):
             return False
         
         # Check user type targeting
-        if self.user_type and user:
-            if self.user_type == 'premium' and not user.has_active_premium_subscription():
+        if self.user_type and (user or has_premium is not None):
+            if has_premium is None:
+                has_premium = user.has_active_premium_subscription()
+            if self.user_type == 'premium' and not has_premium:
                 return False
-            elif self.user_type == 'non_premium' and user.has_active_premium_subscription():
+            elif self.user_type == 'non_premium' and has_premium:
                 return False
         
         # Check device type targeting
@@ -3389,6 +3463,84 @@ class AdStats(db.Model):
     def __repr__(self):
         return f"<AdStats {self.ad_id} {self.date} {self.hour}>"
 
+
+class AdStatsDaily(db.Model):
+    """Daily rollup of AdStats per ad, maintained by the ad stats compactor."""
+    __tablename__ = "ad_stats_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    ad_id = db.Column(db.Integer, db.ForeignKey("ad.id", ondelete="CASCADE"), nullable=False)
+    campaign_id = db.Column(db.Integer, db.ForeignKey("ad_campaign.id", ondelete="SET NULL"), nullable=True)
+
+    impressions = db.Column(db.Integer, default=0, nullable=False)
+    clicks = db.Column(db.Integer, default=0, nullable=False)
+    viewable_impressions = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Numeric(12, 4), default=0, nullable=False)
+    desktop_impressions = db.Column(db.Integer, default=0, nullable=False)
+    mobile_impressions = db.Column(db.Integer, default=0, nullable=False)
+    tablet_impressions = db.Column(db.Integer, default=0, nullable=False)
+
+    refreshed_at = db.Column(db.DateTime, default=default_utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('ad_id', 'date', name='uq_ad_stats_daily_ad_date'),
+    )
+
+    def __repr__(self):
+        return f"<AdStatsDaily {self.ad_id} {self.date}>"
+
+
+class AdCampaignStatsDaily(db.Model):
+    """Daily rollup of AdStats per campaign, maintained by the ad stats compactor."""
+    __tablename__ = "ad_campaign_stats_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey("ad_campaign.id", ondelete="CASCADE"), nullable=False)
+
+    impressions = db.Column(db.Integer, default=0, nullable=False)
+    clicks = db.Column(db.Integer, default=0, nullable=False)
+    viewable_impressions = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Numeric(12, 4), default=0, nullable=False)
+    active_ads = db.Column(db.Integer, default=0, nullable=False)  # Ads with any activity that day
+
+    refreshed_at = db.Column(db.DateTime, default=default_utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'date', name='uq_ad_campaign_stats_daily_campaign_date'),
+    )
+
+    def __repr__(self):
+        return f"<AdCampaignStatsDaily {self.campaign_id} {self.date}>"
+
+
+class AdPlacementStatsDaily(db.Model):
+    """Daily rollup of AdStats per placement, maintained by the ad stats compactor.
+
+    Tracking events carry no placement, so an ad's stats are attributed to
+    every placement it is assigned to.
+    """
+    __tablename__ = "ad_placement_stats_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    placement_id = db.Column(db.Integer, db.ForeignKey("ad_placement.id", ondelete="CASCADE"), nullable=False)
+
+    impressions = db.Column(db.Integer, default=0, nullable=False)
+    clicks = db.Column(db.Integer, default=0, nullable=False)
+    viewable_impressions = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Numeric(12, 4), default=0, nullable=False)
+
+    refreshed_at = db.Column(db.DateTime, default=default_utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('placement_id', 'date', name='uq_ad_placement_stats_daily_placement_date'),
+    )
+
+    def __repr__(self):
+        return f"<AdPlacementStatsDaily {self.placement_id} {self.date}>"
+
 # Add missing indexes and optimizations at the end of the file
 
 # =============================================================================
@@ -3461,6 +3613,16 @@ def add_missing_indexes():
             ON comment (user_id, created_at DESC)
         """))
         
+        db.session.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_comment_thread_path 
+            ON comment (content_type, content_id, path)
+        """))
+        
+        db.session.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_comment_moderation 
+            ON comment (is_approved, is_spam, is_deleted, created_at)
+        """))
+        
         # Rating optimizations
         db.session.execute(text("""
             CREATE INDEX IF NOT EXISTS idx_rating_content_created 
@@ -3506,6 +3668,11 @@ def add_missing_indexes():
             CREATE INDEX IF NOT EXISTS idx_ad_stats_ad_date 
             ON ad_stats (ad_id, date DESC)
         """))
+
+        db.session.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_ad_stats_date_hour
+            ON ad_stats (date, hour)
+        """))
         
         # Brand identity optimizations
         db.session.execute(text("""
@@ -49,6 +49,17 @@ from .asset_optimization import (
     regenerate_hashes_action
 )
 
+from .asset_pipeline import (
+    AssetPipeline,
+    build_assets,
+    init_asset_pipeline
+)
+
+from .compression import (
+    CompressionMiddleware,
+    init_compression
+)
+
 from .query_caching import (
     QueryCache,
     cache_query_result,
@@ -68,6 +79,28 @@ from .ssr_optimization import (
     monitor_ssr_render
 )
 
+from .rate_limiter import (
+    RateLimiter,
+    RedisRateLimitBackend,
+    SQLiteRateLimitBackend,
+    get_rate_limiter,
+    rate_limited,
+    rate_limit
+)
+
+from .image_jobs import (
+    ImageJobQueue,
+    ImageJobStore,
+    get_image_job_queue,
+    process_image_file
+)
+
+from .image_variants import (
+    ensure_variant,
+    image_variant_url,
+    image_srcset
+)
+
 __version__ = "1.0.0"
 __author__ = "LilyOpenCMS Team"
 
@@ -110,6 +143,15 @@ __all__ = [
     'clear_asset_cache_action',
     'regenerate_hashes_action',
     
+    # Static asset pipeline
+    'AssetPipeline',
+    'build_assets',
+    'init_asset_pipeline',
+    
+    # Response compression
+    'CompressionMiddleware',
+    'init_compression',
+    
     # Query caching
     'QueryCache',
     'cache_query_result',
@@ -124,5 +166,24 @@ __all__ = [
     'get_ssr_stats',
     'clear_ssr_cache_action',
     'optimize_ssr_cache_action',
-    'monitor_ssr_render'
+    'monitor_ssr_render',
+    
+    # Rate limiting
+    'RateLimiter',
+    'RedisRateLimitBackend',
+    'SQLiteRateLimitBackend',
+    'get_rate_limiter',
+    'rate_limited',
+    'rate_limit',
+    
+    # Image processing jobs
+    'ImageJobQueue',
+    'ImageJobStore',
+    'get_image_job_queue',
+    'process_image_file',
+    
+    # Responsive image variants
+    'ensure_variant',
+    'image_variant_url',
+    'image_srcset'
 ] 
\ No newline at end of file
@@ -1,6 +1,5 @@
 import os
 import hashlib
-import gzip
 import mimetypes
 from pathlib import Path
 from typing import Dict, Any, List
@@ -120,96 +119,23 @@ class AssetOptimizer:
             return "00000000"
     
     def compress_assets(self) -> Dict[str, Any]:
-        """Compress assets for better performance"""
+        """Fingerprint static files and write precompressed .br/.gz siblings (see asset_pipeline)"""
         try:
             static_path = Path(self.static_folder)
             if not static_path.exists():
                 return {'success': False, 'message': 'Static folder not found'}
-            
-            compressed_count = 0
-            total_size_saved = 0
-            processed_files = []
-            
-            # Process CSS files
-            for file_path in static_path.rglob('*.css'):
-                if not self._is_compressed(file_path):
-                    try:
-                        # Read original file
-                        with open(file_path, 'rb') as f:
-                            content = f.read()
-                        
-                        # Minify CSS (basic minification)
-                        minified_content = self._minify_css(content.decode('utf-8'))
-                        
-                        # Compress content
-                        compressed_content = gzip.compress(minified_content.encode('utf-8'), compresslevel=9)
-                        
-                        # Write compressed file
-                        compressed_path = file_path.with_suffix('.css.gz')
-                        with open(compressed_path, 'wb') as f:
-                            f.write(compressed_content)
-                        
-                        # Calculate size saved
-                        original_size = len(content)
-                        compressed_size = len(compressed_content)
-                        size_saved = original_size - compressed_size
-                        
-                        if size_saved > 0:
-                            compressed_count += 1
-                            total_size_saved += size_saved
-                            processed_files.append({
-                                'file': str(file_path.name),
-                                'original_size': original_size,
-                                'compressed_size': compressed_size,
-                                'savings_percent': round((size_saved / original_size) * 100, 2)
-                            })
-                            
-                    except Exception as e:
-                        logger.error(f"Error compressing {file_path}: {e}")
-            
-            # Process JS files
-            for file_path in static_path.rglob('*.js'):
-                if not self._is_compressed(file_path):
-                    try:
-                        # Read original file
-                        with open(file_path, 'rb') as f:
-                            content = f.read()
-                        
-                        # Minify JS (basic minification)
-                        minified_content = self._minify_js(content.decode('utf-8'))
-                        
-                        # Compress content
-                        compressed_content = gzip.compress(minified_content.encode('utf-8'), compresslevel=9)
-                        
-                        # Write compressed file
-                        compressed_path = file_path.with_suffix('.js.gz')
-                        with open(compressed_path, 'wb') as f:
-                            f.write(compressed_content)
-                        
-                        # Calculate size saved
-                        original_size = len(content)
-                        compressed_size = len(compressed_content)
-                        size_saved = original_size - compressed_size
-                        
-                        if size_saved > 0:
-                            compressed_count += 1
-                            total_size_saved += size_saved
-                            processed_files.append({
-                                'file': str(file_path.name),
-                                'original_size': original_size,
-                                'compressed_size': compressed_size,
-                                'savings_percent': round((size_saved / original_size) * 100, 2)
-                            })
-                            
-                    except Exception as e:
-                        logger.error(f"Error compressing {file_path}: {e}")
-            
+
+            from .asset_pipeline import build_assets
+            result = build_assets(str(static_path))
+            total_size_saved = result['original_bytes'] - result['gzip_bytes']
+
             return {
                 'success': True,
-                'compressed_count': compressed_count,
+                'compressed_count': result['compressed'],
                 'total_size_saved_mb': round(total_size_saved / (1024 * 1024), 2),
-                'message': f'Successfully compressed {compressed_count} files',
-                'processed_files': processed_files
+                'message': f"Successfully compressed {result['compressed']} files "
+                           f"({result['files']} fingerprinted); restart the app to load the new manifest",
+                'processed_files': []
             }
             
         except Exception as e:
@@ -260,12 +186,13 @@ class AssetOptimizer:
             cleared_count = 0
             
             # Remove compressed files
-            for file_path in static_path.rglob('*.gz'):
-                try:
-                    file_path.unlink()
-                    cleared_count += 1
-                except Exception as e:
-                    logger.error(f"Error removing {file_path}: {e}")
+            for pattern in ('*.gz', '*.br'):
+                for file_path in static_path.rglob(pattern):
+                    try:
+                        file_path.unlink()
+                        cleared_count += 1
+                    except Exception as e:
+                        logger.error(f"Error removing {file_path}: {e}")
             
             # Clear hash cache
             self.asset_hashes.clear()
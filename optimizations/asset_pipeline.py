@@ -0,0 +1,244 @@
+"""
+Static Asset Pipeline
+Build-time fingerprinting and precompression of static files.
+
+build_assets() hashes every file under static/, writes .br and .gz siblings
+for compressible types in a process pool, and records everything in a JSON
+manifest (static/asset-manifest.json):
+
+    {"version": 1, "files": {"css/base_css.css": {
+        "hashed": "css/base_css.1a2b3c4d5e.css", "size": 1234,
+        "encodings": {"br": 301, "gzip": 377}}}}
+
+At runtime init_asset_pipeline(app) loads the manifest once. url_for('static')
+then emits the hashed name, and the static endpoint maps hashed names back to
+their source, serves the best precompressed sibling for the request's
+Accept-Encoding, and marks fingerprinted responses immutable. Without a
+manifest everything behaves as before.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip siblings are still produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'asset-manifest.json'
+MANIFEST_VERSION = 1
+HASH_LENGTH = 10
+# User content and generated images are not build assets
+EXCLUDED_DIRS = {'uploads', 'variants'}
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.ttf', '.otf', '.eot',
+}
+COMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def hashed_name(rel_path: str, digest: str) -> str:
+    """css/app.css -> css/app.<hash>.css"""
+    root, ext = os.path.splitext(rel_path)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _process_asset(item) -> tuple:
+    """Hash one file and (re)write its compressed siblings. Runs in a worker process."""
+    static_dir, rel_path, previous = item
+    path = os.path.join(static_dir, rel_path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    entry = {'hashed': hashed_name(rel_path, digest), 'hash': digest, 'size': len(data), 'encodings': {}}
+
+    if os.path.splitext(rel_path)[1].lower() not in COMPRESSIBLE_EXTENSIONS or len(data) < MIN_COMPRESS_SIZE:
+        return rel_path, entry
+
+    # Unchanged since the last build and the siblings are still there
+    if previous and previous.get('hash') == digest and all(
+        os.path.exists(path + COMPRESSED_SUFFIXES[enc]) for enc in previous.get('encodings', {})
+    ):
+        entry['encodings'] = previous['encodings']
+        return rel_path, entry
+
+    encoders = {'gzip': lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['br'] = lambda raw: brotli.compress(raw, quality=11)
+    for encoding, encode in encoders.items():
+        sibling = path + COMPRESSED_SUFFIXES[encoding]
+        compressed = encode(data)
+        # Only keep siblings that save something worthwhile
+        if len(compressed) < len(data) * 0.9:
+            _write_atomic(sibling, compressed)
+            entry['encodings'][encoding] = len(compressed)
+        elif os.path.exists(sibling):
+            os.remove(sibling)
+    return rel_path, entry
+
+
+def scan_static(static_dir: str):
+    """Relative paths of source assets (compressed siblings and the manifest excluded)."""
+    found = []
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir)
+        if rel_root == '.':
+            dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS)
+        else:
+            dirs.sort()
+        for name in sorted(files):
+            if name == MANIFEST_NAME or name.endswith(('.br', '.gz', '.tmp')):
+                continue
+            found.append(os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, '/'))
+    return found
+
+
+def load_manifest(path: str) -> Dict:
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def build_assets(static_dir: str, manifest_path: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Fingerprint and precompress every static asset and write the manifest.
+
+    Returns:
+        dict: {'files': count, 'compressed': count of files with siblings,
+               'original_bytes': int, 'br_bytes': int, 'gzip_bytes': int}
+    """
+    manifest_path = manifest_path or os.path.join(static_dir, MANIFEST_NAME)
+    previous = load_manifest(manifest_path)
+    items = [(static_dir, rel_path, previous.get(rel_path)) for rel_path in scan_static(static_dir)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        files = dict(pool.map(_process_asset, items, chunksize=8))
+
+    _write_atomic(manifest_path, json.dumps(
+        {'version': MANIFEST_VERSION, 'files': files}, indent=1, sort_keys=True
+    ).encode('utf-8'))
+
+    compressed = [entry for entry in files.values() if entry['encodings']]
+    return {
+        'files': len(files),
+        'compressed': len(compressed),
+        'original_bytes': sum(entry['size'] for entry in compressed),
+        'br_bytes': sum(entry['encodings'].get('br', 0) for entry in compressed),
+        'gzip_bytes': sum(entry['encodings'].get('gzip', 0) for entry in compressed),
+    }
+
+
+def negotiate_encoding(accept_encoding: str, available) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in ('br', 'gzip'):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return None
+
+
+class AssetPipeline:
+    """Manifest-backed static URL rewriting and precompressed static serving."""
+
+    def __init__(self, app=None):
+        self.files = {}
+        self.by_hashed = {}
+        self.static_folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        manifest_path = app.config.get('ASSET_MANIFEST_PATH') or os.path.join(app.static_folder, MANIFEST_NAME)
+        self.load(manifest_path)
+
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.send_static
+        app.extensions['asset_pipeline'] = self
+
+    def load(self, manifest_path: str) -> None:
+        self.files = load_manifest(manifest_path)
+        self.by_hashed = {entry['hashed']: rel_path for rel_path, entry in self.files.items()}
+        if self.files:
+            logger.info(f"Loaded asset manifest with {len(self.files)} files")
+
+    def url_path(self, filename: str) -> str:
+        """Hashed name for a static filename, or the filename itself when not built."""
+        entry = self.files.get(filename.lstrip('/'))
+        return entry['hashed'] if entry else filename
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.url_path(values['filename'])
+
+    def send_static(self, filename):
+        source = self.by_hashed.get(filename)
+        immutable = source is not None
+        source = source or filename
+        entry = self.files.get(source)
+
+        encoding = None
+        if entry and entry['encodings']:
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), entry['encodings'])
+            if encoding and not os.path.exists(os.path.join(self.static_folder, source + COMPRESSED_SUFFIXES[encoding])):
+                encoding = None
+
+        if encoding:
+            mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+            response = send_from_directory(self.static_folder, source + COMPRESSED_SUFFIXES[encoding], mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(self.static_folder, source)
+
+        if entry and entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            response.set_etag(f"{entry['hash'][:16]}-{encoding or 'identity'}")
+            response.make_conditional(request)
+        return response
+
+
+def init_asset_pipeline(app) -> AssetPipeline:
+    """Load the asset manifest and hook static URL generation and serving."""
+    return AssetPipeline(app)
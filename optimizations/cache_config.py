@@ -134,6 +134,15 @@ def init_cache(app):
     app.config.update(cache_config)
     cache.init_app(app)
 
+def get_redis_client():
+    """Return the raw Redis client behind the cache, or None for non-Redis backends"""
+    try:
+        backend = cache.cache
+    except Exception:
+        return None
+    # cachelib >= 0.3 exposes _write_client; older Flask-Caching used _client
+    return getattr(backend, '_write_client', None) or getattr(backend, '_client', None)
+
 def generate_cache_key(prefix, *args, **kwargs):
     """Generate a unique cache key based on function arguments"""
     # Convert args and kwargs to a string representation
@@ -0,0 +1,206 @@
+"""
+Response Compression
+WSGI middleware that brotli/gzip-compresses dynamic responses.
+
+Configured from the COMPRESS_* app settings:
+
+- COMPRESS_MIMETYPES: content types worth compressing (HTML, CSS, JSON, ...)
+- COMPRESS_LEVEL: gzip level (brotli uses COMPRESS_BR_LEVEL, default 5)
+- COMPRESS_MIN_SIZE: bodies smaller than this are sent as-is
+- COMPRESS_CACHE_SIZE: compressed bodies kept for responses with an ETag
+
+Responses that are already encoded, streamed (no Content-Length), partial,
+marked no-transform, or not in COMPRESS_MIMETYPES pass through untouched.
+Compressed responses get an encoding-specific ETag ("abc" -> "abc~gzip");
+the suffix is stripped from If-None-Match before the app sees it, so the
+app's own conditional handling still answers 304. The "~" marker keeps tags
+the app minted itself (e.g. the asset pipeline's "<hash>-gzip") untouched.
+"""
+
+import re
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from .asset_pipeline import brotli, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIMETYPES = ('text/html', 'text/css', 'text/xml', 'application/json', 'application/javascript')
+ETAG_MARKER = '~'  # never used in the app's own ETags
+ETAG_SUFFIX_RE = re.compile(ETAG_MARKER + r'(br|gzip)"')
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by (path, ETag, encoding), bounded by entries and bytes."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body: bytes) -> None:
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+class CompressionMiddleware:
+    """Compress eligible responses according to the request's Accept-Encoding."""
+
+    def __init__(self, wsgi_app, mimetypes: Iterable[str] = DEFAULT_MIMETYPES, level: int = 6,
+                 min_size: int = 500, br_level: int = 5, cache_size: int = 256):
+        self.wsgi_app = wsgi_app
+        self.mimetypes = {m.lower() for m in mimetypes}
+        self.level = level
+        self.min_size = min_size
+        self.br_level = br_level
+        self.cache = CompressedBodyCache(cache_size)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.br_level)
+        return gzip.compress(body, compresslevel=self.level, mtime=0)
+
+    def _eligible(self, status: str, headers) -> bool:
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code >= 300 or code in (204, 206):
+            return False
+        values = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in values or 'content-length' not in values:
+            return False
+        if 'no-transform' in values.get('cache-control', '').lower():
+            return False
+        mimetype = values.get('content-type', '').split(';', 1)[0].strip().lower()
+        return mimetype in self.mimetypes and int(values['content-length']) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or environ.get('HTTP_RANGE'):
+            return self.wsgi_app(environ, start_response)
+
+        encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        # The client's cached copy was compressed by us: let the app compare its own ETag
+        cached_encoding = None
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            match = ETAG_SUFFIX_RE.search(if_none_match)
+            cached_encoding = match.group(1) if match else None
+            environ['HTTP_IF_NONE_MATCH'] = ETAG_SUFFIX_RE.sub('"', if_none_match)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            if exc_info is not None or captured.get('passthrough'):
+                return start_response(status, headers, exc_info)
+            captured.update(status=status, headers=headers)
+            return self._write_passthrough(captured, start_response)
+
+        app_iter = self.wsgi_app(environ, capture)
+        if 'status' not in captured or captured.get('started'):
+            # Lazy start_response (called while iterating) or write(): stream unchanged
+            captured['passthrough'] = True
+            return app_iter
+
+        status, headers = captured['status'], captured['headers']
+        if not self._eligible(status, headers):
+            # A 304 for a compressed representation repeats that representation's ETag
+            if cached_encoding and status.startswith('304'):
+                headers = self._tag_headers(headers, cached_encoding, None)
+            start_response(status, headers)
+            return app_iter
+
+        headers = [(name, value) for name, value in headers if name.lower() != 'vary'] + [
+            ('Vary', self._vary(headers))
+        ]
+        if encoding is None:
+            start_response(status, headers)
+            return app_iter
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        etag = next((value for name, value in headers if name.lower() == 'etag'), None)
+        key = (environ.get('PATH_INFO', ''), environ.get('QUERY_STRING', ''), etag, encoding)
+        compressed = self.cache.get(key) if etag else None
+        if compressed is None:
+            compressed = self.compress(body, encoding)
+            if etag:
+                self.cache.set(key, compressed)
+
+        start_response(status, self._tag_headers(headers, encoding, len(compressed)))
+        return [compressed]
+
+    @staticmethod
+    def _write_passthrough(captured, start_response):
+        # Apps that use the legacy write() callable are streamed unchanged
+        def write(data):
+            if not captured.get('started'):
+                captured['started'] = True
+                captured['write'] = start_response(captured['status'], captured['headers'])
+            captured['write'](data)
+        return write
+
+    @staticmethod
+    def _vary(headers) -> str:
+        existing = [v.strip() for name, value in headers if name.lower() == 'vary' for v in value.split(',')]
+        if not any(v.lower() == 'accept-encoding' for v in existing):
+            existing.append('Accept-Encoding')
+        return ', '.join(v for v in existing if v)
+
+    @staticmethod
+    def _tag_headers(headers, encoding, length):
+        tagged = []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length' and length is not None:
+                value = str(length)
+            elif lower == 'etag' and value.endswith('"'):
+                value = f'{value[:-1]}{ETAG_MARKER}{encoding}"'
+            tagged.append((name, value))
+        if length is not None:
+            tagged.append(('Content-Encoding', encoding))
+        return tagged
+
+
+def init_compression(app) -> CompressionMiddleware:
+    """Wrap app.wsgi_app with CompressionMiddleware configured from COMPRESS_* settings."""
+    middleware = CompressionMiddleware(
+        app.wsgi_app,
+        mimetypes=app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES),
+        level=app.config.get('COMPRESS_LEVEL', 6),
+        min_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+        br_level=app.config.get('COMPRESS_BR_LEVEL', 5),
+        cache_size=app.config.get('COMPRESS_CACHE_SIZE', 256),
+    )
+    app.wsgi_app = middleware
+    app.extensions['compression'] = middleware
+    if brotli is None:
+        logger.info("Brotli not installed; responses are compressed with gzip only")
+    return middleware
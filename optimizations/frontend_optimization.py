@@ -9,6 +9,8 @@ from flask import current_app, url_for, request
 from datetime import datetime
 import hashlib
 
+from .image_variants import image_srcset, image_variant_url
+
 class FrontendOptimizer:
     """Frontend optimization utilities"""
     
@@ -29,12 +31,19 @@ class FrontendOptimizer:
         # Register template globals
         app.jinja_env.globals['get_asset_url'] = self.get_asset_url
         app.jinja_env.globals['is_production'] = self.is_production
+        app.jinja_env.globals['image_variant_url'] = image_variant_url
+        app.jinja_env.globals['image_srcset'] = image_srcset
     
     def asset_version(self, filename):
         """Add version hash to asset URLs for cache busting"""
         if not filename:
             return filename
         
+        # Built assets already carry their content hash in the name
+        pipeline = self.app.extensions.get('asset_pipeline')
+        if pipeline is not None and filename.lstrip('/') in pipeline.files:
+            return pipeline.url_path(filename)
+
         # Get file path
         static_folder = self.app.static_folder
         file_path = os.path.join(static_folder, filename.lstrip('/'))
@@ -137,13 +146,17 @@ def create_frontend_optimizer(app):
 
 # Utility functions for template usage
 def get_optimized_image_url(image_path, size=None):
-    """Get optimized image URL with size parameter"""
+    """Get optimized image URL with size parameter (an Image record or id gets a generated variant)"""
+    if size and not isinstance(image_path, str):
+        return image_variant_url(image_path, size)
     if size:
         return f"{image_path}?w={size}"
     return image_path
 
-def generate_image_srcset(image_path, sizes=[300, 600, 900, 1200]):
-    """Generate srcset for responsive images"""
+def generate_image_srcset(image_path, sizes=[320, 640, 960, 1280]):
+    """Generate srcset for responsive images (an Image record or id gets generated variants)"""
+    if not isinstance(image_path, str):
+        return image_srcset(image_path, widths=sizes)
     srcset_parts = []
     for size in sizes:
         srcset_parts.append(f"{image_path}?w={size} {size}w")
@@ -0,0 +1,307 @@
+"""
+Image Processing Jobs
+Background WebP conversion and thumbnail generation for uploaded images.
+
+Uploads hand the raw file to a job and return immediately. Jobs are rows in a
+local SQLite file shared by every worker on the host; a multiprocessing pool
+does the PIL work (decode, resize, WebP, thumbnails) outside the web process
+and reports progress back through the same table. The job owns the raw file:
+it is deleted once the WebP rendition exists, or kept for a retry if the
+process dies mid-job (queued and stale jobs are resubmitted on startup).
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+import logging
+import multiprocessing
+from typing import Callable, Dict, Optional
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+STANDARD_WIDTH = 1280
+THUMB_SIZES = {
+    "portrait": (400, 600),   # 2:3
+    "square": (400, 400),     # 1:1
+    "landscape": (600, 400),  # 3:2
+}
+STALE_SECONDS = 300
+
+STATUS_QUEUED = 'queued'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def process_image_file(file_path: str, progress: Optional[Callable[[int], None]] = None,
+                       output_base: Optional[str] = None) -> Dict:
+    """
+    Standardize an image to WebP (1280px wide, aspect preserved) and create
+    portrait/square/landscape thumbnails next to it. Deletes the original.
+
+    Args:
+        file_path: Raw uploaded file
+        progress: Optional callback receiving a 0-100 percentage
+        output_base: Write <output_base>.webp and its thumbnails instead, keeping the original
+
+    Returns:
+        dict: {'webp': path, 'thumbnails': {style: path}}
+    """
+    from PIL import Image as PILImage, ImageOps
+
+    report = progress or (lambda value: None)
+    base_dir = os.path.dirname(output_base or file_path)
+    base_name = os.path.basename(output_base) if output_base else os.path.splitext(os.path.basename(file_path))[0]
+    webp_path = os.path.join(base_dir, f"{base_name}.webp")
+
+    with PILImage.open(file_path) as source:
+        img = source.convert("RGB")
+    report(10)
+
+    w_percent = STANDARD_WIDTH / float(img.size[0])
+    new_height = int(float(img.size[1]) * float(w_percent))
+    resized_img = img.resize((STANDARD_WIDTH, new_height), PILImage.Resampling.LANCZOS)
+    resized_img.save(webp_path, "WEBP", quality=85, method=6)
+    report(40)
+
+    thumbnails = {}
+    for step, (style, size) in enumerate(THUMB_SIZES.items(), start=1):
+        thumb = ImageOps.fit(img, size, PILImage.Resampling.LANCZOS, centering=(0.5, 0.5))
+        thumb_path = os.path.join(base_dir, f"{base_name}_thumb_{style}.webp")
+        thumb.save(thumb_path, "WEBP", quality=75, method=6)
+        thumbnails[style] = thumb_path
+        report(40 + step * 50 // len(THUMB_SIZES))
+
+    if output_base is None and not file_path.endswith(".webp"):
+        os.remove(file_path)
+
+    return {'webp': webp_path, 'thumbnails': thumbnails}
+
+
+class ImageJobStore:
+    """Job rows in a local SQLite file; safe to open from any process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS image_job (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                source_path TEXT NOT NULL,
+                image_id INTEGER,
+                user_id INTEGER,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._connect().execute("CREATE INDEX IF NOT EXISTS idx_image_job_status ON image_job (status, updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create(self, source_path: str, image_id: Optional[int] = None, user_id: Optional[int] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO image_job (id, status, progress, source_path, image_id, user_id, created_at, updated_at) "
+            "VALUES (?, ?, 0, ?, ?, ?, ?, ?)",
+            (job_id, STATUS_QUEUED, source_path, image_id, user_id, now, now),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM image_job WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def claim(self, job_id: str) -> bool:
+        """Move a job to processing; False if another worker already has it."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE image_job SET status = ?, updated_at = ? "
+            "WHERE id = ? AND (status = ? OR (status = ? AND updated_at < ?))",
+            (STATUS_PROCESSING, now, job_id, STATUS_QUEUED, STATUS_PROCESSING, now - STALE_SECONDS),
+        )
+        return cursor.rowcount == 1
+
+    def set_progress(self, job_id: str, progress: int) -> None:
+        self._connect().execute(
+            "UPDATE image_job SET progress = ?, updated_at = ? WHERE id = ?",
+            (int(progress), time.time(), job_id),
+        )
+
+    def finish(self, job_id: str, result: Dict) -> None:
+        self._connect().execute(
+            "UPDATE image_job SET status = ?, progress = 100, result = ?, updated_at = ? WHERE id = ?",
+            (STATUS_DONE, json.dumps(result), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._connect().execute(
+            "UPDATE image_job SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (STATUS_FAILED, error[:500], time.time(), job_id),
+        )
+
+    def resumable(self) -> list:
+        """Ids of jobs that are queued, or processing but not updated for STALE_SECONDS."""
+        rows = self._connect().execute(
+            "SELECT id FROM image_job WHERE status = ? OR (status = ? AND updated_at < ?) ORDER BY created_at",
+            (STATUS_QUEUED, STATUS_PROCESSING, time.time() - STALE_SECONDS),
+        ).fetchall()
+        return [row['id'] for row in rows]
+
+    def prune(self, older_than_seconds: int = 7 * 24 * 3600) -> int:
+        """Delete finished and failed jobs older than the given age."""
+        cursor = self._connect().execute(
+            "DELETE FROM image_job WHERE status IN (?, ?) AND updated_at < ?",
+            (STATUS_DONE, STATUS_FAILED, time.time() - older_than_seconds),
+        )
+        return cursor.rowcount
+
+
+def run_image_job(store_path: str, job_id: str) -> tuple:
+    """Pool entry point: claim a job, process its file and record the outcome."""
+    store = ImageJobStore(store_path)
+    if not store.claim(job_id):
+        return job_id, None
+    job = store.get(job_id)
+    try:
+        result = process_image_file(job['source_path'], progress=lambda value: store.set_progress(job_id, value))
+    except Exception as e:
+        store.fail(job_id, f"Processing error: {e}")
+        return job_id, STATUS_FAILED
+    store.finish(job_id, result)
+    return job_id, STATUS_DONE
+
+
+class ImageJobQueue:
+    """Submits image jobs to a process pool (or runs them inline when workers=0)."""
+
+    def __init__(self, store_path: str, workers: int = 2, app=None):
+        self.store = ImageJobStore(store_path)
+        self.workers = workers
+        self.app = app
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+                    self._pool = context.Pool(processes=self.workers, maxtasksperchild=50)
+        return self._pool
+
+    def submit(self, source_path: str, image_id: Optional[int] = None, user_id: Optional[int] = None) -> str:
+        """Queue a raw file for processing and return the job id."""
+        job_id = self.store.create(source_path, image_id=image_id, user_id=user_id)
+        self._dispatch(job_id)
+        return job_id
+
+    def resume(self) -> int:
+        """Resubmit jobs left behind by a previous process."""
+        job_ids = self.store.resumable()
+        for job_id in job_ids:
+            self._dispatch(job_id)
+        return len(job_ids)
+
+    def _dispatch(self, job_id: str) -> None:
+        if self.workers <= 0:
+            self._on_complete(run_image_job(self.store.path, job_id))
+            return
+        self.pool.apply_async(
+            run_image_job, (self.store.path, job_id),
+            callback=self._on_complete,
+            error_callback=lambda e: logger.error(f"Image job {job_id} crashed: {e}"),
+        )
+
+    def _on_complete(self, outcome: tuple) -> None:
+        """Drop the placeholder Image row of a failed job (runs in the web process)."""
+        job_id, status = outcome
+        if status != STATUS_FAILED or self.app is None:
+            return
+        job = self.store.get(job_id)
+        if not job or not job['image_id']:
+            return
+        try:
+            from models import db, Image
+            with self.app.app_context():
+                image = db.session.get(Image, job['image_id'])
+                if image is not None:
+                    db.session.delete(image)
+                    db.session.commit()
+        except Exception as e:
+            logger.error(f"Could not remove image {job['image_id']} for failed job {job_id}: {e}")
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+# Global image job queue
+_image_job_queue = None
+_image_job_queue_lock = threading.Lock()
+
+
+def _default_store_path() -> str:
+    instance_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+    if os.access(instance_dir, os.W_OK):
+        return os.path.join(instance_dir, 'image_jobs.db')
+    return os.path.join(tempfile.gettempdir(), 'lilycms_image_jobs.db')
+
+
+def get_image_job_queue() -> ImageJobQueue:
+    """Get the process-wide image job queue, configured from the current app on first use."""
+    global _image_job_queue
+    if _image_job_queue is None:
+        with _image_job_queue_lock:
+            if _image_job_queue is None:
+                workers, store_path, app = 2, None, None
+                if has_app_context():
+                    workers = current_app.config.get('IMAGE_JOB_WORKERS', workers)
+                    store_path = current_app.config.get('IMAGE_JOB_DB_PATH')
+                    app = current_app._get_current_object()
+                workers = int(os.getenv('IMAGE_JOB_WORKERS', workers))
+                store_path = os.getenv('IMAGE_JOB_DB_PATH', store_path) or _default_store_path()
+                queue = ImageJobQueue(store_path, workers=workers, app=app)
+                resumed = queue.resume()
+                if resumed:
+                    logger.info(f"Resumed {resumed} pending image job(s)")
+                _image_job_queue = queue
+    return _image_job_queue
+
+
+def reset_image_job_queue() -> None:
+    """Shut down the global queue's pool so the next call re-reads configuration."""
+    global _image_job_queue
+    with _image_job_queue_lock:
+        if _image_job_queue is not None:
+            _image_job_queue.close()
+        _image_job_queue = None
@@ -0,0 +1,163 @@
+"""
+Responsive Image Variants
+Resized WebP/AVIF/JPEG renditions generated on first request.
+
+Variants are stored under a path derived from the SHA-256 of the source
+file (variants/<hh>/<hash>/<width>.<fmt>), so a replaced source never serves
+stale renditions and identical sources share them. Generation for a given
+variant is serialized with a file lock, which lets concurrent requests from
+any worker wait for the first one instead of decoding the same image again.
+JPEG sources are decoded with PIL draft() at the smallest DCT scale that
+still covers the requested width.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to a process lock
+    fcntl = None
+
+from flask import current_app, has_app_context, url_for
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 480, 640, 800, 960, 1280, 1600, 1920)
+SRCSET_WIDTHS = (320, 640, 960, 1280)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'avif': ('AVIF', 'image/avif', {'quality': 55}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'progressive': True, 'optimize': True}),
+}
+HASH_MEMO_MAX_ENTRIES = 4096
+
+_hash_memo = OrderedDict()
+_hash_memo_lock = threading.Lock()
+_process_lock = threading.Lock()
+
+
+def variant_root() -> str:
+    """Directory holding generated variants (IMAGE_VARIANT_DIR, default static/variants)."""
+    if has_app_context() and current_app.config.get('IMAGE_VARIANT_DIR'):
+        return current_app.config['IMAGE_VARIANT_DIR']
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv('IMAGE_VARIANT_DIR', os.path.join(project_root, 'static', 'variants'))
+
+
+def source_hash(path: str) -> str:
+    """SHA-256 of a file, memoized by (path, mtime, size)."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _hash_memo_lock:
+        digest = _hash_memo.get(key)
+        if digest is not None:
+            _hash_memo.move_to_end(key)
+            return digest
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _hash_memo_lock:
+        _hash_memo[key] = digest
+        if len(_hash_memo) > HASH_MEMO_MAX_ENTRIES:
+            _hash_memo.popitem(last=False)
+    return digest
+
+
+def variant_path(digest: str, width: int, fmt: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or variant_root(), digest[:2], digest, f'{width}.{fmt}')
+
+
+def render_variant(source: str, target: str, width: int, fmt: str) -> None:
+    """Decode, downscale and encode one variant, writing it atomically."""
+    from PIL import Image as PILImage
+
+    pil_format, _, options = VARIANT_FORMATS[fmt]
+    with PILImage.open(source) as img:
+        if img.format == 'JPEG' and img.width > width:
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the target
+            img.draft('RGB', (width, max(1, img.height * width // img.width)))
+        img = img.convert('RGBA' if fmt != 'jpg' and img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), PILImage.Resampling.LANCZOS)
+
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f'.{fmt}.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                img.save(out, pil_format, **options)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def ensure_variant(source: str, width: int, fmt: str, root: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Return the variant file for a source image, generating it if needed.
+
+    Args:
+        source: Path of the original image
+        width: One of VARIANT_WIDTHS
+        fmt: One of VARIANT_FORMATS
+
+    Returns:
+        tuple: (variant path, source content hash)
+    """
+    if width not in VARIANT_WIDTHS:
+        raise ValueError(f'Unsupported width: {width}')
+    if fmt not in VARIANT_FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+    digest = source_hash(source)
+    target = variant_path(digest, width, fmt, root)
+    if os.path.exists(target):
+        return target, digest
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(f'{target}.lock', 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            _process_lock.acquire()
+        try:
+            # Another request may have produced it while we waited for the lock
+            if not os.path.exists(target):
+                render_variant(source, target, width, fmt)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                _process_lock.release()
+    return target, digest
+
+
+def image_variant_url(image, width: int, fmt: str = 'webp') -> str:
+    """
+    URL of a resized variant for an Image record (or image id).
+
+    Passing the record adds a version parameter from updated_at, so the
+    immutable responses are re-fetched after the image file is replaced.
+    """
+    image_id = getattr(image, 'id', image)
+    params = {}
+    updated_at = getattr(image, 'updated_at', None)
+    if updated_at is not None:
+        params['v'] = f'{int(updated_at.timestamp()):x}'
+    return url_for('main.image_variant', image_id=image_id, width=width, fmt=fmt, **params)
+
+
+def image_srcset(image, fmt: str = 'webp', widths=SRCSET_WIDTHS) -> str:
+    """srcset attribute value listing variant URLs for an Image record (or id)."""
+    return ', '.join(f'{image_variant_url(image, width, fmt)} {width}w' for width in widths)
@@ -0,0 +1,341 @@
+"""
+Rate Limiting Module
+Sliding-window rate limiting and event dedupe shared by all workers, backed by Redis or a local SQLite file
+"""
+
+import os
+import math
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+import logging
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import request, jsonify, current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'lilycms_rl:'
+
+# Sliding window log kept in a sorted set. Trimming, counting and recording run
+# atomically in a single round-trip; rejected hits are not recorded, so a key
+# never holds more than `limit` members.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local window_ms = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local member = ARGV[3]
+local t = redis.call('TIME')
+local now_ms = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', key, 0, now_ms - window_ms)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', key, now_ms, member)
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', key, window_ms)
+return {allowed, count}
+"""
+
+
+class RedisRateLimitBackend:
+    """Sliding-window limiter on Redis (one EVALSHA per hit)"""
+
+    name = 'redis'
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, key: str, limit: int, window_seconds: int) -> Tuple[bool, int]:
+        allowed, count = self._script(
+            keys=[KEY_PREFIX + key],
+            args=[int(window_seconds * 1000), int(limit), uuid.uuid4().hex],
+        )
+        return bool(int(allowed)), int(count)
+
+    def count(self, key: str, limit: int, window_seconds: int) -> int:
+        seconds, microseconds = self.client.time()
+        now_ms = int(seconds) * 1000 + int(microseconds) // 1000
+        return int(self.client.zcount(KEY_PREFIX + key, f'({now_ms - int(window_seconds * 1000)}', '+inf'))
+
+    def seen(self, key: str, ttl_seconds: int) -> bool:
+        created = self.client.set(KEY_PREFIX + key, '1', ex=int(ttl_seconds), nx=True)
+        return not created
+
+    def reset(self, key: str) -> None:
+        self.client.delete(KEY_PREFIX + key)
+
+
+class SQLiteRateLimitBackend:
+    """Token bucket in a local SQLite file shared by every worker on the host.
+
+    Each bucket holds `limit` tokens and refills at `limit / window_seconds`
+    tokens per second, which matches the sliding window's long-run rate.
+    Rows for buckets that are full again (or dedupe markers that expired) carry
+    no information and are pruned periodically; `max_keys` caps the table size
+    so a flood of distinct client IPs cannot grow it without bound.
+    """
+
+    name = 'sqlite'
+
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, max_keys: int = 100000, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_keys = max_keys
+        self.clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_bucket (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dedupe_marker (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_bucket_expires ON rate_bucket (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dedupe_marker_expires ON dedupe_marker (expires_at)")
+
+    def hit(self, key: str, limit: int, window_seconds: int) -> Tuple[bool, int]:
+        now = self.clock()
+        capacity = float(limit)
+        refill_rate = capacity / float(window_seconds)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, row[0] + max(0.0, now - row[1]) * refill_rate)
+
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            # The bucket is full again (and the row redundant) once the deficit refills
+            expires_at = now + (capacity - tokens) / refill_rate
+            conn.execute(
+                """
+                INSERT INTO rate_bucket (key, tokens, updated_at, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    tokens = excluded.tokens,
+                    updated_at = excluded.updated_at,
+                    expires_at = excluded.expires_at
+                """,
+                (key, tokens, now, expires_at),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._maybe_prune()
+        if not allowed:
+            return False, int(limit)
+        return True, int(math.ceil(capacity - tokens - 1e-9))
+
+    def count(self, key: str, limit: int, window_seconds: int) -> int:
+        row = self._connect().execute(
+            "SELECT tokens, updated_at FROM rate_bucket WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return 0
+        capacity = float(limit)
+        tokens = min(capacity, row[0] + max(0.0, self.clock() - row[1]) * capacity / float(window_seconds))
+        return int(math.ceil(capacity - tokens - 1e-9))
+
+    def seen(self, key: str, ttl_seconds: int) -> bool:
+        now = self.clock()
+        conn = self._connect()
+        # Insert the marker, or revive it only if the previous one expired;
+        # zero affected rows means a live marker already exists.
+        cursor = conn.execute(
+            """
+            INSERT INTO dedupe_marker (key, expires_at) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at
+            WHERE dedupe_marker.expires_at <= ?
+            """,
+            (key, now + ttl_seconds, now),
+        )
+        self._maybe_prune()
+        return cursor.rowcount == 0
+
+    def reset(self, key: str) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_bucket WHERE key = ?", (key,))
+        conn.execute("DELETE FROM dedupe_marker WHERE key = ?", (key,))
+
+    def _maybe_prune(self) -> None:
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY:
+            return
+        try:
+            self.prune()
+        except Exception as e:
+            logger.debug(f"Rate limit prune failed: {e}")
+
+    def prune(self) -> None:
+        """Drop redundant rows and enforce the max_keys cap."""
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_bucket WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM dedupe_marker WHERE expires_at <= ?", (now,))
+        for table in ('rate_bucket', 'dedupe_marker'):
+            overflow = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_keys
+            if overflow > 0:
+                # Evict the entries closest to expiry first
+                conn.execute(
+                    f"DELETE FROM {table} WHERE key IN "
+                    f"(SELECT key FROM {table} ORDER BY expires_at LIMIT ?)",
+                    (overflow,),
+                )
+
+
+class RateLimiter:
+    """Backend-agnostic facade; fails open if the backend errors"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def backend_name(self) -> str:
+        return getattr(self.backend, 'name', type(self.backend).__name__)
+
+    def hit(self, key: str, limit: int, window_seconds: int) -> Tuple[bool, int]:
+        """Record a hit for key; return (allowed, hits in the current window)."""
+        try:
+            return self.backend.hit(key, limit, window_seconds)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed for {key} ({self.backend_name}): {e}")
+            return True, 0
+
+    def count(self, key: str, limit: int, window_seconds: int) -> int:
+        """Hits for key in the current window, without recording one."""
+        try:
+            return self.backend.count(key, limit, window_seconds)
+        except Exception as e:
+            logger.warning(f"Rate limit count failed for {key} ({self.backend_name}): {e}")
+            return 0
+
+    def is_limited(self, key: str, limit: int, window_seconds: int) -> bool:
+        allowed, _ = self.hit(key, limit, window_seconds)
+        return not allowed
+
+    def is_duplicate(self, key: str, ttl_seconds: int) -> bool:
+        """Return True if key was already seen within ttl_seconds, else record it."""
+        try:
+            return self.backend.seen(key, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Dedupe check failed for {key} ({self.backend_name}): {e}")
+            return False
+
+    def reset(self, key: str) -> None:
+        try:
+            self.backend.reset(key)
+        except Exception as e:
+            logger.debug(f"Rate limit reset failed for {key}: {e}")
+
+
+# Global rate limiter instance
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def _default_sqlite_path() -> str:
+    instance_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+    if os.access(instance_dir, os.W_OK):
+        return os.path.join(instance_dir, 'rate_limits.db')
+    return os.path.join(tempfile.gettempdir(), 'lilycms_rate_limits.db')
+
+
+def create_rate_limiter(backend: str = 'auto', sqlite_path: Optional[str] = None) -> RateLimiter:
+    """Build a limiter. 'auto' prefers the cache's Redis and falls back to SQLite."""
+    if backend in ('auto', 'redis'):
+        from .cache_config import get_redis_client
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return RateLimiter(RedisRateLimitBackend(client))
+            except Exception as e:
+                logger.warning(f"Redis rate limit backend unavailable, using SQLite: {e}")
+        elif backend == 'redis':
+            logger.warning("RATE_LIMIT_BACKEND=redis but cache is not Redis-backed, using SQLite")
+
+    return RateLimiter(SQLiteRateLimitBackend(sqlite_path or _default_sqlite_path()))
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter, configured from the current app on first use."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                backend, sqlite_path = 'auto', None
+                if has_app_context():
+                    backend = current_app.config.get('RATE_LIMIT_BACKEND', backend)
+                    sqlite_path = current_app.config.get('RATE_LIMIT_SQLITE_PATH')
+                backend = os.getenv('RATE_LIMIT_BACKEND', backend)
+                sqlite_path = os.getenv('RATE_LIMIT_SQLITE_PATH', sqlite_path)
+                _rate_limiter = create_rate_limiter(backend, sqlite_path)
+                logger.info(f"Rate limiter using {_rate_limiter.backend_name} backend")
+    return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """Forget the global limiter so the next call re-reads configuration."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+def client_ip() -> str:
+    forwarded = request.headers.get('X-Forwarded-For', '').split(',')[0].strip()
+    return forwarded or request.remote_addr or 'unknown'
+
+
+def rate_limited(prefix: str, limit: int, window_seconds: int, identity: Optional[str] = None) -> bool:
+    """Record a hit for the caller (client IP unless identity is given) and report if over limit."""
+    return get_rate_limiter().is_limited(f"{prefix}:{identity or client_ip()}", limit, window_seconds)
+
+
+def rate_limit(prefix: str, limit: int, window_seconds: int, identity: Optional[Callable[[], str]] = None):
+    """Decorator returning 429 JSON once the caller exceeds limit hits per window"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if rate_limited(prefix, limit, window_seconds, identity() if identity else None):
+                return jsonify({'success': False, 'error': 'rate_limited'}), 429
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -34,6 +34,7 @@ from models import (
     db,
     User,
     Image,
+    ImageUsage,
     YouTubeVideo,
     News,
     Album,
@@ -5,7 +5,7 @@ Handles CRUD operations for ads, campaigns, placements, and analytics
 
 from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import func, and_, desc
+from sqlalchemy import func, and_, desc, case
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import json
@@ -18,6 +18,10 @@ from itsdangerous import URLSafeSerializer, BadSignature
 from urllib.parse import urlencode
 from routes.common_imports import *
 from optimizations.cache_config import safe_cache_get, safe_cache_set, cache
+from optimizations.rate_limiter import get_rate_limiter, rate_limited, client_ip as _client_ip
+from routes.utils.ad_eligibility import get_ad_eligibility
+from routes.utils.ad_stats_rollup import DIMENSIONS, aggregate_stats, stats_totals, run_compaction
+from routes.utils.ad_layout import recommend_layout
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -30,47 +34,8 @@ ads_bp = Blueprint('ads', __name__, url_prefix='/ads')
 # INTERNAL UTILITIES (RATE LIMITING, DEDUP, VALIDATION)
 # =============================================================================
 
-def _client_ip() -> str:
-    forwarded = request.headers.get('X-Forwarded-For', '').split(',')[0].strip()
-    return forwarded or request.remote_addr or 'unknown'
-
-
-def _rate_limit_key(prefix: str) -> str:
-    return f"rate:{prefix}:{_client_ip()}"
-
-
-def _increment_window_counter(key: str, window_seconds: int) -> int:
-    try:
-        redis_client = getattr(cache.cache, '_client', None)
-        if not redis_client:
-            return 0
-        pipe = redis_client.pipeline()
-        pipe.incr(key)
-        pipe.expire(key, window_seconds)
-        count, _ = pipe.execute()
-        return int(count)
-    except Exception as e:
-        current_app.logger.debug(f"Rate limit increment failed for {key}: {e}")
-        return 0
-
-
-def rate_limited(prefix: str, limit: int, window_seconds: int) -> bool:
-    key = _rate_limit_key(prefix)
-    count = _increment_window_counter(key, window_seconds)
-    return count > limit
-
-
 def _dedupe_event(key: str, ttl_seconds: int) -> bool:
-    try:
-        redis_client = getattr(cache.cache, '_client', None)
-        if not redis_client:
-            return False
-        # SETNX-like behavior using set with NX
-        created = redis_client.set(key, '1', ex=ttl_seconds, nx=True)
-        return created is False
-    except Exception as e:
-        current_app.logger.debug(f"Dedupe set failed for {key}: {e}")
-        return False
+    return get_rate_limiter().is_duplicate(key, ttl_seconds)
 
 
 def _validate_serve_payload(data: dict) -> tuple[bool, str]:
@@ -617,14 +582,12 @@ def serve_ads():
         user_has_premium = data.get('user_has_premium', False)
         user_should_show_ads = data.get('user_should_show_ads', True)
         
-        # Get user if provided
-        user = None
-        if user_id:
-            user = User.query.get(user_id)
-            # Override premium status with actual user data if available
-            if user:
-                user_has_premium = user.has_active_premium_subscription()
-                user_should_show_ads = user.should_show_ads()
+        # Override premium status with the cached eligibility record if a user is given
+        eligibility = get_ad_eligibility(user_id) if user_id else None
+        if eligibility:
+            user_has_premium = eligibility.has_premium
+            user_should_show_ads = eligibility.show_ads
+        targeting_premium = eligibility.has_premium if eligibility else None
         
         # Premium user with ads disabled - don't serve ads
         if user_has_premium and not user_should_show_ads:
@@ -677,7 +640,7 @@ def serve_ads():
             if hasattr(placement, 'non_premium_only') and placement.non_premium_only and user_has_premium:
                 continue
                 
-            if placement.should_display(user, device_type, location):
+            if placement.should_display(None, device_type, location, has_premium=targeting_premium):
                 valid_placements.append(placement)
         
         # Get ads for valid placements (with rotation)
@@ -769,6 +732,107 @@ def serve_ads():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _serve_placements_batch(data, placements):
+    """
+    Pick and render ads for a list of placement requests.
+
+    Shared by the batch and layout+ads endpoints. Returns a tuple of
+    (ads_by_placement, reason) where reason is set when nothing was served
+    on purpose.
+    """
+    user_id = data.get('user_id')
+    user_has_premium = data.get('user_has_premium', False)
+    user_should_show_ads = data.get('user_should_show_ads', True)
+    device_type = data.get('device_type', 'desktop')
+    card_style = data.get('card_style', '')
+    eligibility = get_ad_eligibility(user_id) if user_id else None
+    if eligibility:
+        user_has_premium = eligibility.has_premium
+        user_should_show_ads = eligibility.show_ads
+    targeting_premium = eligibility.has_premium if eligibility else None
+
+    if user_has_premium and not user_should_show_ads:
+        return {}, 'premium_user_ads_disabled'
+
+    ads_by_placement = {}
+
+    for p in placements:
+        ok, msg = _validate_serve_payload(p)
+        if not ok:
+            ads_by_placement[p.get('key') or 'unknown'] = []
+            continue
+        page_type = p.get('page_type')
+        page_specific = p.get('page_specific')
+        section = p.get('section')
+        position = p.get('position')
+        position_value = p.get('position_value')
+        max_ads = int(p.get('max_ads', 1))
+
+        query = AdPlacement.query.filter(
+            AdPlacement.is_active == True,
+            AdPlacement.page_type == page_type,
+            AdPlacement.section == section,
+            AdPlacement.position == position
+        )
+        if position_value is not None:
+            query = query.filter(AdPlacement.position_value == position_value)
+        if page_specific:
+            query = query.filter((AdPlacement.page_specific == page_specific) | (AdPlacement.page_specific.is_(None)))
+        else:
+            query = query.filter(AdPlacement.page_specific.is_(None))
+
+        valid = []
+        for placement in query.all():
+            if hasattr(placement, 'premium_only') and placement.premium_only and not user_has_premium:
+                continue
+            if hasattr(placement, 'non_premium_only') and placement.non_premium_only and user_has_premium:
+                continue
+            if placement.should_display(None, device_type, None, has_premium=targeting_premium):
+                valid.append(placement)
+
+        import random
+        random.shuffle(valid)
+        served = []
+        count = 0
+        for placement in valid:
+            if count >= max_ads:
+                break
+            ad = placement.ad
+            if ad and ad.is_active_now():
+                # Check ad type access control (same logic as single serve)
+                is_same_origin = _same_origin_ok()
+                has_api_key = request.headers.get('X-API-Key') or data.get('api_key')
+                
+                if ad.ad_type == 'internal' and not is_same_origin:
+                    # Skip internal ads for external API calls
+                    continue
+                elif ad.ad_type == 'external' and is_same_origin and not has_api_key:
+                    # Skip external ads for same origin unless API key is provided
+                    continue
+                
+                page_context = {
+                    'card_style': card_style,
+                    'page_type': page_type,
+                    'section': section,
+                    'user_has_premium': user_has_premium,
+                    'user_should_show_ads': user_should_show_ads,
+                    'ad_type': ad.ad_type
+                }
+                served.append({
+                    'ad_id': ad.id,
+                    'html': ad.get_rendered_html(page_context),
+                    'placement_id': placement.id,
+                    'position': placement.position,
+                    'position_value': placement.position_value,
+                    'ad_type': ad.ad_type
+                })
+                count += 1
+
+        ads_by_placement[p.get('key') or f"{section}_{position}_{position_value}"] = served
+
+    return ads_by_placement, None
+
+
 @ads_bp.route('/api/serve/batch', methods=['POST'])
 def serve_ads_batch():
     """Batch-serve ads for multiple placements in one request."""
@@ -791,96 +855,9 @@ def serve_ads_batch():
         if not isinstance(placements, list) or not placements:
             return jsonify({'success': False, 'error': 'placements array required'}), 400
 
-        user_id = data.get('user_id')
-        user_has_premium = data.get('user_has_premium', False)
-        user_should_show_ads = data.get('user_should_show_ads', True)
-        device_type = data.get('device_type', 'desktop')
-        card_style = data.get('card_style', '')
-        user = None
-        if user_id:
-            user = User.query.get(user_id)
-            if user:
-                user_has_premium = user.has_active_premium_subscription()
-                user_should_show_ads = user.should_show_ads()
-
-        if user_has_premium and not user_should_show_ads:
-            return jsonify({'success': True, 'adsByPlacement': {}, 'reason': 'premium_user_ads_disabled'})
-
-        ads_by_placement = {}
-
-        for p in placements:
-            ok, msg = _validate_serve_payload(p)
-            if not ok:
-                ads_by_placement[p.get('key') or 'unknown'] = []
-                continue
-            page_type = p.get('page_type')
-            page_specific = p.get('page_specific')
-            section = p.get('section')
-            position = p.get('position')
-            position_value = p.get('position_value')
-            max_ads = int(p.get('max_ads', 1))
-
-            query = AdPlacement.query.filter(
-                AdPlacement.is_active == True,
-                AdPlacement.page_type == page_type,
-                AdPlacement.section == section,
-                AdPlacement.position == position
-            )
-            if position_value is not None:
-                query = query.filter(AdPlacement.position_value == position_value)
-            if page_specific:
-                query = query.filter((AdPlacement.page_specific == page_specific) | (AdPlacement.page_specific.is_(None)))
-            else:
-                query = query.filter(AdPlacement.page_specific.is_(None))
-
-            valid = []
-            for placement in query.all():
-                if hasattr(placement, 'premium_only') and placement.premium_only and not user_has_premium:
-                    continue
-                if hasattr(placement, 'non_premium_only') and placement.non_premium_only and user_has_premium:
-                    continue
-                if placement.should_display(user, device_type, None):
-                    valid.append(placement)
-
-            import random
-            random.shuffle(valid)
-            served = []
-            count = 0
-            for placement in valid:
-                if count >= max_ads:
-                    break
-                ad = placement.ad
-                if ad and ad.is_active_now():
-                    # Check ad type access control (same logic as single serve)
-                    is_same_origin = _same_origin_ok()
-                    has_api_key = request.headers.get('X-API-Key') or data.get('api_key')
-                    
-                    if ad.ad_type == 'internal' and not is_same_origin:
-                        # Skip internal ads for external API calls
-                        continue
-                    elif ad.ad_type == 'external' and is_same_origin and not has_api_key:
-                        # Skip external ads for same origin unless API key is provided
-                        continue
-                    
-                    page_context = {
-                        'card_style': card_style,
-                        'page_type': page_type,
-                        'section': section,
-                        'user_has_premium': user_has_premium,
-                        'user_should_show_ads': user_should_show_ads,
-                        'ad_type': ad.ad_type
-                    }
-                    served.append({
-                        'ad_id': ad.id,
-                        'html': ad.get_rendered_html(page_context),
-                        'placement_id': placement.id,
-                        'position': placement.position,
-                        'position_value': placement.position_value,
-                        'ad_type': ad.ad_type
-                    })
-                    count += 1
-
-            ads_by_placement[p.get('key') or f"{section}_{position}_{position_value}"] = served
+        ads_by_placement, reason = _serve_placements_batch(data, placements)
+        if reason:
+            return jsonify({'success': True, 'adsByPlacement': {}, 'reason': reason})
 
         return jsonify({'success': True, 'adsByPlacement': ads_by_placement})
     except Exception as e:
@@ -1055,55 +1032,10 @@ def recommend_layout_positions():
         if not page_type:
             return jsonify({ 'success': False, 'error': 'page_type required' }), 400
         sections = data.get('sections') or []
+        if not isinstance(sections, list):
+            return jsonify({ 'success': False, 'error': 'sections must be a list' }), 400
 
-        # Normalize sections map
-        key_to_section = {}
-        for s in sections:
-            key = str(s.get('key') or 'default')
-            key_to_section[key] = {
-                'selector': s.get('selector') or '',
-                'item_count': int(s.get('item_count') or 0)
-            }
-
-        # Backend rules per page type
-        rules = {}
-        if page_type == 'home':
-            rules = {
-                'latest-articles': { 'after': [3, 6] },
-                'popular-news': { 'after': [2, 4] },
-            }
-        elif page_type == 'news':
-            rules = { 'news-grid': { 'after': [3, 7] } }
-        elif page_type == 'album':
-            rules = { 'albums-grid': { 'after': [4, 9] } }
-        elif page_type == 'gallery':
-            rules = { 'image-grid': { 'after': [2, 5] } }
-        elif page_type == 'videos':
-            rules = { 'videos-grid': { 'after': [2, 5] } }
-
-        # Build recommendations filtered by current item_count
-        recommendations = {}
-        for key, rule in rules.items():
-            sec = key_to_section.get(key)
-            if not sec:
-                # If client didn't provide, try to fall back to a known selector
-                fallback_selector = {
-                    'latest-articles': '[data-group="latest-articles"] article',
-                    'popular-news': '[data-group="popular-news"] article',
-                    'news-grid': '#news-grid > *',
-                    'albums-grid': '#albums-grid > *',
-                    'videos-grid': '#videos-grid > *',
-                    'image-grid': '#image-grid-container > *, #latest-image-grid-container > *',
-                }.get(key, '')
-                sec = { 'selector': fallback_selector, 'item_count': 0 }
-            after = [n for n in rule.get('after', []) if n <= max(0, int(sec.get('item_count') or 0))]
-            # Always keep the smallest one even if zero count (to allow reservation)
-            if not after and rule.get('after'):
-                after = [min(rule['after'])]
-            recommendations[key] = {
-                'selector': sec.get('selector') or '',
-                'after': after
-            }
+        recommendations = recommend_layout(page_type, sections)
 
         return jsonify({ 'success': True, 'recommendations': recommendations })
     except Exception as e:
@@ -1111,6 +1043,86 @@ def recommend_layout_positions():
         return jsonify({ 'success': False, 'error': str(e) }), 500
 
 
+@ads_bp.route('/api/layout/serve', methods=['POST'])
+def serve_layout_with_ads():
+    """Layout recommendations and the ads to fill them in one round-trip.
+
+    Expects JSON payload like:
+    {
+      "page_type": "home",
+      "page_specific": null,
+      "sections": [ ...same as /api/layout/recommend... ],
+      "placements": [
+         {"key": "content_top", "section": "content", "position": "top", "max_ads": 1},
+         {"key": "latest-articles", "qualifier": "latest-articles", "section": "content",
+          "position": "after_n_items", "max_ads": 1}
+      ],
+      "user_id": 1, "device_type": "desktop", "card_style": ""
+    }
+    Placements with position "after_n_items" are expanded once per
+    recommended position of the section named by their qualifier, replacing
+    any position_value; their keys are sent without a value and come back as
+    "<key>_<n>".
+
+    Returns: { success, recommendations, placements: [...], adsByPlacement: {...} }
+    """
+    try:
+        try:
+            from models import BrandIdentity
+            brand = BrandIdentity.query.first()
+            if brand and (not getattr(brand, 'enable_ads', True) or not getattr(brand, 'enable_campaigns', True)):
+                return jsonify({'success': True, 'recommendations': {}, 'placements': [],
+                                'adsByPlacement': {}, 'reason': 'ads_globally_disabled'})
+        except Exception:
+            pass
+        if not request.is_json:
+            return jsonify({'success': False, 'error': 'JSON required'}), 400
+        if not _same_origin_ok():
+            return jsonify({'success': False, 'error': 'Invalid origin'}), 400
+
+        data = request.get_json() or {}
+        page_type = (data.get('page_type') or '').strip()
+        if not page_type:
+            return jsonify({'success': False, 'error': 'page_type required'}), 400
+        sections = data.get('sections') or []
+        placements = data.get('placements') or []
+        if not isinstance(sections, list) or not isinstance(placements, list):
+            return jsonify({'success': False, 'error': 'sections and placements must be lists'}), 400
+
+        recommendations = recommend_layout(page_type, sections)
+
+        expanded = []
+        for p in placements:
+            if not isinstance(p, dict):
+                continue
+            base = dict(p, page_type=page_type, page_specific=data.get('page_specific'))
+            key = base.get('key') or f"{base.get('section')}_{base.get('position')}"
+            rec = recommendations.get(base.get('qualifier') or '')
+            if base.get('position') == 'after_n_items':
+                if rec and rec['after']:
+                    for n in rec['after']:
+                        expanded.append(dict(base, key=f"{key}_{n}", position_value=n))
+                    continue
+                if base.get('position_value') is not None:
+                    key = f"{key}_{base['position_value']}"
+            expanded.append(dict(base, key=key))
+
+        ads_by_placement, reason = _serve_placements_batch(data, expanded) if expanded else ({}, None)
+
+        result = {
+            'success': True,
+            'recommendations': recommendations,
+            'placements': expanded,
+            'adsByPlacement': ads_by_placement,
+        }
+        if reason:
+            result['reason'] = reason
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error serving layout with ads: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @ads_bp.route('/api/track-impression', methods=['POST'])
 def record_ad_impression():
     """Record an ad impression."""
@@ -1146,7 +1158,8 @@ def record_ad_impression():
         hour = datetime.utcnow().hour
         stats = AdStats.query.filter_by(ad_id=ad.id, date=today, hour=hour).first()
         if not stats:
-            stats = AdStats(ad_id=ad.id, date=today, hour=hour, impressions=0, clicks=0)
+            stats = AdStats(ad_id=ad.id, date=today, hour=hour, impressions=0, clicks=0, viewable_impressions=0,
+                            desktop_impressions=0, mobile_impressions=0, tablet_impressions=0)
             db.session.add(stats)
         stats.impressions += 1
         if is_viewable:
@@ -1224,6 +1237,15 @@ def record_ad_click():
 # ANALYTICS
 # =============================================================================
 
+def _count_with_active(model):
+    """Return (total, active) row counts for a model with an is_active flag in one query."""
+    total, active = db.session.query(
+        func.count(model.id),
+        func.coalesce(func.sum(case((model.is_active.is_(True), 1), else_=0)), 0)
+    ).one()
+    return total, active
+
+
 @ads_bp.route('/analytics')
 @login_required
 def analytics_dashboard():
@@ -1233,22 +1255,13 @@ def analytics_dashboard():
         return redirect(url_for('main.index'))
     
     # Get summary stats
-    total_ads = Ad.query.count()
-    active_ads = Ad.query.filter_by(is_active=True).count()
-    total_campaigns = AdCampaign.query.count()
-    active_campaigns = AdCampaign.query.filter_by(is_active=True).count()
+    total_ads, active_ads = _count_with_active(Ad)
+    total_campaigns, active_campaigns = _count_with_active(AdCampaign)
     
-    # Get recent stats
-    today = datetime.now().date()
+    # Get recent stats from the daily rollups
+    today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
-    
-    recent_stats = db.session.query(
-        func.sum(AdStats.impressions).label('total_impressions'),
-        func.sum(AdStats.clicks).label('total_clicks'),
-        func.sum(AdStats.revenue).label('total_revenue')
-    ).filter(
-        AdStats.date >= week_ago
-    ).first()
+    recent_stats = stats_totals(start_date=week_ago)
     
     # Get top performing ads
     top_ads = db.session.query(
@@ -1282,29 +1295,31 @@ def get_analytics_stats():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = db.session.query(AdStats)
+        group_by = request.args.get('group_by', 'date')
+        if group_by not in DIMENSIONS:
+            return jsonify({'success': False, 'error': f"group_by must be one of {', '.join(DIMENSIONS)}"}), 400
         
-        if start_date:
-            query = query.filter(AdStats.date >= datetime.fromisoformat(start_date).date())
-        if end_date:
-            query = query.filter(AdStats.date <= datetime.fromisoformat(end_date).date())
+        rows = aggregate_stats(
+            group_by,
+            start_date=datetime.fromisoformat(start_date).date() if start_date else None,
+            end_date=datetime.fromisoformat(end_date).date() if end_date else None,
+        )
         
-        stats = query.all()
+        if group_by != 'date':
+            return jsonify({
+                'success': True,
+                'group_by': group_by,
+                'stats': rows
+            })
         
-        # Aggregate data
-        aggregated = {}
-        for stat in stats:
-            date_str = stat.date.isoformat()
-            if date_str not in aggregated:
-                aggregated[date_str] = {
-                    'impressions': 0,
-                    'clicks': 0,
-                    'revenue': 0.0
-                }
-            
-            aggregated[date_str]['impressions'] += stat.impressions
-            aggregated[date_str]['clicks'] += stat.clicks
-            aggregated[date_str]['revenue'] += float(stat.revenue or 0)
+        aggregated = {
+            row['date']: {
+                'impressions': row['impressions'],
+                'clicks': row['clicks'],
+                'revenue': row['revenue']
+            }
+            for row in rows
+        }
         
         return jsonify({
             'success': True,
@@ -1316,6 +1331,22 @@ def get_analytics_stats():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@ads_bp.route('/api/analytics/compact', methods=['POST'])
+@login_required
+def compact_analytics_stats():
+    """Refresh the daily stats rollups and compact old hourly rows now."""
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPERUSER]:
+        return jsonify({'error': 'Permission denied'}), 403
+
+    try:
+        days = int(current_app.config.get('AD_STATS_COMPACT_AFTER_DAYS', 7))
+        result = run_compaction(compact_after_days=days)
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        logger.error(f"Error compacting analytics stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # =============================================================================
 # ADMIN DASHBOARD
 # =============================================================================
@@ -1329,12 +1360,9 @@ def admin_dashboard():
         return redirect(url_for('main.index'))
     
     # Get summary stats
-    total_ads = Ad.query.count()
-    active_ads = Ad.query.filter_by(is_active=True).count()
-    total_campaigns = AdCampaign.query.count()
-    active_campaigns = AdCampaign.query.filter_by(is_active=True).count()
-    total_placements = AdPlacement.query.count()
-    active_placements = AdPlacement.query.filter_by(is_active=True).count()
+    total_ads, active_ads = _count_with_active(Ad)
+    total_campaigns, active_campaigns = _count_with_active(AdCampaign)
+    total_placements, active_placements = _count_with_active(AdPlacement)
     
     # Count ads with images
     total_images = Ad.query.filter(
@@ -1349,8 +1377,10 @@ def admin_dashboard():
     recent_campaigns = AdCampaign.query.order_by(desc(AdCampaign.created_at)).limit(5).all()
     
     # Get performance stats
-    total_impressions = db.session.query(func.sum(Ad.impressions)).scalar() or 0
-    total_clicks = db.session.query(func.sum(Ad.clicks)).scalar() or 0
+    total_impressions, total_clicks = db.session.query(
+        func.coalesce(func.sum(Ad.impressions), 0),
+        func.coalesce(func.sum(Ad.clicks), 0)
+    ).one()
     overall_ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
     
     return render_template('admin/ads/dashboard.html',
@@ -1,8 +1,16 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from models import db, Comment, CommentLike, CommentReport, News, Album, User, UserRole
-from datetime import datetime, timezone, timedelta
-import re
+from datetime import datetime, timezone
+from optimizations.rate_limiter import rate_limit, client_ip
+from routes.utils.comment_loader import load_comment_tree, page_top_level
+from routes.utils.comment_counters import apply_reaction_change, is_visible, track_reply_visibility
+from routes.utils.spam_scoring import get_spam_scorer
+from routes.utils.comment_moderation import (
+    BULK_ACTIONS, bulk_moderate, invalidate_comment_threads, moderation_query, page_queue,
+    thread_page_key, THREAD_PAGE_TIMEOUT,
+)
+from optimizations.cache_config import safe_cache_get, safe_cache_set
 
 comments_bp = Blueprint('comments', __name__)
 
@@ -24,9 +32,17 @@ def get_comments(content_type, content_id):
         if not content:
             return jsonify({'error': 'Content not found'}), 404
         
-        # Get comments with pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        # Cursor pagination over top-level comments (newest first)
+        cursor = request.args.get('cursor') or None
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+        
+        # Anonymous pages are shared; moderation and writes invalidate them per thread
+        page_key = None
+        if not current_user.is_authenticated:
+            page_key = thread_page_key(content_type, content_id, per_page, cursor)
+            cached_page = safe_cache_get(page_key)
+            if cached_page is not None:
+                return jsonify(cached_page)
         
         # Get approved, non-deleted comments
         comments_query = Comment.query.filter_by(
@@ -35,50 +51,29 @@ def get_comments(content_type, content_id):
             is_approved=True,
             is_deleted=False,
             parent_id=None  # Only top-level comments
-        ).order_by(Comment.created_at.desc())
-        
-        comments_pagination = comments_query.paginate(
-            page=page, per_page=per_page, error_out=False
         )
         
-        comments_data = []
-        for comment in comments_pagination.items:
-            comment_dict = comment.to_dict()
-            
-            # Add user's like/dislike status if user is logged in
-            if current_user.is_authenticated:
-                comment_dict['user_liked'] = comment.is_liked_by_user(current_user.id)
-                comment_dict['user_disliked'] = comment.is_disliked_by_user(current_user.id)
-            
-            # Get replies for this comment
-            replies = Comment.query.filter_by(
-                parent_id=comment.id,
-                is_approved=True,
-                is_deleted=False
-            ).order_by(Comment.created_at.asc()).all()
-            
-            replies_data = []
-            for reply in replies:
-                reply_dict = reply.to_dict()
-                if current_user.is_authenticated:
-                    reply_dict['user_liked'] = reply.is_liked_by_user(current_user.id)
-                    reply_dict['user_disliked'] = reply.is_disliked_by_user(current_user.id)
-                replies_data.append(reply_dict)
-            
-            comment_dict['replies'] = replies_data
-            comments_data.append(comment_dict)
+        try:
+            top_level, next_cursor = page_top_level(comments_query, cursor, per_page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
+        viewer_id = current_user.id if current_user.is_authenticated else None
+        comments_data = load_comment_tree(top_level, viewer_id=viewer_id)
+        
+        payload = {
             'comments': comments_data,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total': comments_pagination.total,
-                'pages': comments_pagination.pages,
-                'has_next': comments_pagination.has_next,
-                'has_prev': comments_pagination.has_prev
+                'cursor': cursor,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None,
+                'total': comments_query.count()
             }
-        })
+        }
+        if page_key:
+            safe_cache_set(page_key, payload, timeout=THREAD_PAGE_TIMEOUT)
+        return jsonify(payload)
         
     except Exception as e:
         current_app.logger.exception("Error getting comments")
@@ -87,6 +82,7 @@ def get_comments(content_type, content_id):
 
 @comments_bp.route('/api/comments', methods=['POST'])
 @login_required
+@rate_limit('comments_post', limit=5, window_seconds=60, identity=lambda: f"user:{current_user.id}")
 def create_comment():
     """Create a new comment."""
     try:
@@ -123,8 +119,10 @@ def create_comment():
         if current_user.is_suspended:
             return jsonify({'error': 'Your account is suspended'}), 403
         
-        # Check for spam (simple implementation)
-        if is_spam_comment(content, current_user.id):
+        # Score for spam (no database queries)
+        scorer = get_spam_scorer()
+        ip = client_ip()
+        if scorer.score(content, current_user.id, ip).is_spam:
             return jsonify({'error': 'Comment detected as spam'}), 400
         
         # Create comment
@@ -148,7 +146,11 @@ def create_comment():
             comment.is_approved = False  # Requires moderation
         
         db.session.add(comment)
+        db.session.flush()
+        track_reply_visibility(comment, was_visible=False)
         db.session.commit()
+        scorer.record(current_user.id, ip)
+        invalidate_comment_threads([(content_type, content_id)])
         
         # Record user activity (with safety check)
         try:
@@ -201,6 +203,7 @@ def update_comment(comment_id):
             return jsonify({'error': 'Comment content cannot exceed 5000 characters'}), 400
         
         # Update comment
+        was_visible = is_visible(comment)
         comment.content = content
         comment.updated_at = datetime.now(timezone.utc)
         
@@ -208,7 +211,9 @@ def update_comment(comment_id):
         if current_user.role not in [UserRole.ADMIN, UserRole.SUPERUSER]:
             comment.is_approved = False  # Requires re-approval
         
+        track_reply_visibility(comment, was_visible)
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         # Record user activity (with safety check)
         try:
@@ -246,10 +251,13 @@ def delete_comment(comment_id):
             return jsonify({'error': 'Permission denied'}), 403
         
         # Soft delete
+        was_visible = is_visible(comment)
         comment.is_deleted = True
         comment.updated_at = datetime.now(timezone.utc)
+        track_reply_visibility(comment, was_visible)
         
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         # Record user activity (with safety check)
         try:
@@ -293,8 +301,17 @@ def like_comment(comment_id):
             user_id=current_user.id
         ).first()
         
+        before = None
+        if existing_like and not existing_like.is_deleted:
+            before = existing_like.is_like
+        
         if existing_like:
-            if existing_like.is_like == is_like:
+            if existing_like.is_deleted:
+                # Restore a previously removed like/dislike
+                existing_like.is_like = is_like
+                existing_like.is_deleted = False
+                action = 'added'
+            elif existing_like.is_like == is_like:
                 # Remove like/dislike
                 existing_like.is_deleted = True
                 action = 'removed'
@@ -313,14 +330,17 @@ def like_comment(comment_id):
             db.session.add(existing_like)
             action = 'added'
         
+        after = None if existing_like.is_deleted else existing_like.is_like
+        apply_reaction_change(comment_id, before, after)
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         return jsonify({
             'message': f'{action.title()} {"like" if is_like else "dislike"} successfully',
             'likes_count': comment.get_likes_count(),
             'dislikes_count': comment.get_dislikes_count(),
-            'user_liked': comment.is_liked_by_user(current_user.id),
-            'user_disliked': comment.is_disliked_by_user(current_user.id)
+            'user_liked': after is True,
+            'user_disliked': after is False
         })
         
     except Exception as e:
@@ -390,43 +410,56 @@ def admin_comments():
         return redirect(url_for('main.index'))
     
     # Get comments with filters
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor') or None
     status = request.args.get('status', 'all')  # all, pending, approved, rejected, spam
     content_type = request.args.get('content_type', '')
     
-    query = Comment.query
-    
-    # Apply filters
-    if status == 'all':
-        query = query.filter_by(is_deleted=False)
-    elif status == 'pending':
-        query = query.filter_by(is_approved=False, is_spam=False, is_deleted=False)
-    elif status == 'approved':
-        query = query.filter_by(is_approved=True, is_deleted=False)
-    elif status == 'rejected':
-        query = query.filter_by(is_approved=False, is_deleted=False)
-    elif status == 'spam':
-        query = query.filter_by(is_spam=True, is_deleted=False)
-    
-    if content_type:
-        query = query.filter_by(content_type=content_type)
-    
-    # Order by creation date
-    query = query.order_by(Comment.created_at.desc())
-    
-    # Pagination
-    comments = query.paginate(
-        page=page, per_page=20, error_out=False
-    )
+    # Keyset pagination over the moderation index (newest first)
+    query = moderation_query(status, content_type)
+    try:
+        comments, next_cursor = page_queue(query, cursor)
+    except ValueError:
+        flash('Invalid page cursor', 'error')
+        return redirect(url_for('comments.admin_comments', status=status, content_type=content_type))
     
     return render_template(
         'admin/settings/comment_moderation.html',
         comments=comments,
+        total=query.count(),
+        cursor=cursor,
+        next_cursor=next_cursor,
         status=status,
         content_type=content_type
     )
 
 
+@comments_bp.route('/admin/comments/bulk', methods=['POST'])
+@login_required
+def bulk_moderate_comments():
+    """Approve, reject, mark as spam or delete many comments at once."""
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPERUSER]:
+        return jsonify({'error': 'Permission denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    ids = data.get('ids')
+    
+    if action not in BULK_ACTIONS:
+        return jsonify({'error': f"Action must be one of: {', '.join(BULK_ACTIONS)}"}), 400
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'ids must be a non-empty list'}), 400
+    
+    try:
+        result = bulk_moderate(action, ids)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error in bulk comment moderation: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    return jsonify({'message': f'{result["updated"]} comment(s) updated', **result})
+
+
 @comments_bp.route('/admin/comments/<int:comment_id>/approve', methods=['POST'])
 @login_required
 def approve_comment(comment_id):
@@ -436,11 +469,14 @@ def approve_comment(comment_id):
     
     try:
         comment = Comment.query.get_or_404(comment_id)
+        was_visible = is_visible(comment)
         comment.is_approved = True
         comment.is_spam = False
         comment.updated_at = datetime.now(timezone.utc)
+        track_reply_visibility(comment, was_visible)
         
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         return jsonify({'message': 'Comment approved successfully'})
         
@@ -459,11 +495,14 @@ def reject_comment(comment_id):
     
     try:
         comment = Comment.query.get_or_404(comment_id)
+        was_visible = is_visible(comment)
         comment.is_approved = False
         comment.is_spam = False
         comment.updated_at = datetime.now(timezone.utc)
+        track_reply_visibility(comment, was_visible)
         
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         return jsonify({'message': 'Comment rejected successfully'})
         
@@ -482,11 +521,14 @@ def mark_comment_spam(comment_id):
     
     try:
         comment = Comment.query.get_or_404(comment_id)
+        was_visible = is_visible(comment)
         comment.is_spam = True
         comment.is_approved = False
         comment.updated_at = datetime.now(timezone.utc)
+        track_reply_visibility(comment, was_visible)
         
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         return jsonify({'message': 'Comment marked as spam successfully'})
         
@@ -505,10 +547,13 @@ def admin_delete_comment(comment_id):
     
     try:
         comment = Comment.query.get_or_404(comment_id)
+        was_visible = is_visible(comment)
         comment.is_deleted = True
         comment.updated_at = datetime.now(timezone.utc)
+        track_reply_visibility(comment, was_visible)
         
         db.session.commit()
+        invalidate_comment_threads([(comment.content_type, comment.content_id)])
         
         return jsonify({'message': 'Comment deleted successfully'})
         
@@ -516,36 +561,3 @@ def admin_delete_comment(comment_id):
         db.session.rollback()
         current_app.logger.error(f"Error deleting comment: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
-
-
-# Helper functions
-def is_spam_comment(content, user_id):
-    """Simple spam detection for comments."""
-    # Check for excessive links
-    link_count = len(re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', content))
-    if link_count > 3:
-        return True
-    
-    # Check for excessive caps
-    if len(content) > 10:
-        caps_ratio = sum(1 for c in content if c.isupper()) / len(content)
-        if caps_ratio > 0.7:
-            return True
-    
-    # Check for repetitive characters
-    if len(content) > 5:
-        for char in content:
-            if content.count(char) > len(content) * 0.5:
-                return True
-    
-    # Check user's recent comment history
-    recent_comments = Comment.query.filter_by(
-        user_id=user_id
-    ).filter(
-        Comment.created_at >= datetime.now(timezone.utc) - timedelta(hours=1)
-    ).count()
-    
-    if recent_comments > 10:
-        return True
-    
-    return False 
\ No newline at end of file
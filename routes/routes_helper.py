@@ -1,66 +1,11 @@
 from routes import main_blueprint
 from .common_imports import *
 from routes.routes_public import safe_title
+from optimizations.image_jobs import process_image_file
+from routes.utils.content_hash import save_stream_with_hash, sha256_file
+from routes.utils.sitemap_stream import SECTION_NAMES, calculate_days_old, iter_sitemap_index
+from routes.utils.sitemap_cache import get_sitemap_cache, index_etag, index_shards
 
-def calculate_days_old(date):
-    """Calculate days old with proper timezone handling."""
-    if date:
-        # Ensure both dates are timezone-aware
-        if date.tzinfo is None:
-            date = date.replace(tzinfo=timezone.utc)
-        return (datetime.now(timezone.utc) - date).days
-    return 365
-
-def update_robots_txt():
-    """Update robots.txt with correct website URL from SEO settings."""
-    try:
-        from sqlalchemy import text
-        result = db.session.execute(text('SELECT website_url FROM seo_injection_settings LIMIT 1'))
-        row = result.fetchone()
-        website_url = row[0] if row and row[0] else "https://hystory.id"
-        
-        # Remove trailing slash if present
-        website_url = website_url.rstrip('/')
-        
-        robots_content = f"""User-agent: *
-Allow: /
-
-# Disallow admin and private areas
-Disallow: /settings/
-Disallow: /api/
-Disallow: /admin/
-Disallow: /login
-Disallow: /register
-Disallow: /logout
-
-# Allow important public content
-Allow: /news/
-Allow: /videos/
-Allow: /gallery/
-Allow: /about/
-Allow: /utama/
-Allow: /hypes/
-Allow: /premium/
-
-# Crawl delay (optional - be respectful to server)
-Crawl-delay: 1
-
-# Sitemap locations
-Sitemap: {website_url}/sitemap.xml
-Sitemap: {website_url}/sitemap-news.xml
-Sitemap: {website_url}/sitemap-index.xml
-"""
-        
-        # Write to robots.txt
-        with open('robots.txt', 'w', encoding='utf-8') as f:
-            f.write(robots_content)
-        
-        current_app.logger.info(f"Updated robots.txt with website URL: {website_url}")
-        return True
-        
-    except Exception as e:
-        current_app.logger.error(f"Failed to update robots.txt: {e}")
-        return False
 
 def sanitize_filename(filename):
     """Replaces spaces and invalid characters with underscores."""
@@ -72,8 +17,8 @@ def sanitize_filename(filename):
     filename = re.sub(r'_+', '_', filename)
     return filename
 
-def save_file(file, name=None):
-    """Securely saves an uploaded file with a short unique name."""
+def _upload_destination(file, name=None):
+    """Short unique filename and path under static/uploads for an upload."""
     if name:
         filename = secure_filename(name)
     else:
@@ -85,11 +30,20 @@ def save_file(file, name=None):
     # Use shorter unique id: 6-digit microsecond timestamp
     timestamp = datetime.now().strftime('%H%M%S%f')[:9] # Use microseconds for better uniqueness
     unique_filename = f"{timestamp}_{filename}"
-    file_path = os.path.join("static/uploads", unique_filename)
+    return unique_filename, os.path.join("static/uploads", unique_filename)
 
+def save_file(file, name=None):
+    """Securely saves an uploaded file with a short unique name."""
+    unique_filename, file_path = _upload_destination(file, name)
     file.save(file_path)
     return unique_filename, file_path
 
+def save_file_hashed(file, name=None):
+    """Like save_file, but also returns the SHA-256 of the bytes, computed while streaming to disk."""
+    unique_filename, file_path = _upload_destination(file, name)
+    digest = save_stream_with_hash(file.stream, file_path)
+    return unique_filename, file_path, digest
+
 
 
 def download_image(image_url):
@@ -157,39 +111,7 @@ def parse_iso8601_duration(duration):
 def process_single_image(file_path):
     """Standardizes an image to WebP (fixed width 1280px, preserve aspect ratio), creates 3 types of thumbnails, deletes original."""
     try:
-        img = PILImage.open(file_path).convert("RGB")
-        base_dir = os.path.dirname(file_path)
-        base_name, _ = os.path.splitext(os.path.basename(file_path))
-        webp_path = os.path.join(base_dir, f"{base_name}.webp")
-
-        # 📏 Standard Width
-        STANDARD_WIDTH = 1280
-
-        # Resize keeping aspect ratio
-        w_percent = STANDARD_WIDTH / float(img.size[0])
-        new_height = int(float(img.size[1]) * float(w_percent))
-        resized_img = img.resize((STANDARD_WIDTH, new_height), PILImage.Resampling.LANCZOS)
-
-        # Save standardized WebP
-        resized_img.save(webp_path, "WEBP", quality=85, method=6)
-
-        # 📸 Create Thumbnails
-        THUMB_SIZES = {
-            "portrait": (400, 600),   # 2:3
-            "square": (400, 400),     # 1:1
-            "landscape": (600, 400),  # 3:2
-        }
-
-        for style, size in THUMB_SIZES.items():
-            thumb = img.copy()
-            thumb = ImageOps.fit(img, size, PILImage.Resampling.LANCZOS, centering=(0.5, 0.5))
-            thumb_path = os.path.join(base_dir, f"{base_name}_thumb_{style}.webp")
-            thumb.save(thumb_path, "WEBP", quality=75, method=6)
-
-        # ✅ Delete the original file
-        if not file_path.endswith(".webp"):
-            os.remove(file_path)
-
+        process_image_file(file_path)
         return "ok"
 
     except Exception as e:
@@ -311,718 +233,75 @@ def download_docx_contoh():
     )
 
 
-# Helper function (keep as before)
-def add_url_to_sitemap(urlset, loc, lastmod=None, changefreq=None, priority=None):
-    """Adds a <url> element to the <urlset> ElementTree object."""
-    url_element = ET.SubElement(urlset, "url")
-    ET.SubElement(url_element, "loc").text = loc
-
-    if lastmod:
-        if isinstance(lastmod, datetime):
-            if lastmod.tzinfo is None:
-                # Assume UTC if timezone info is missing from DB datetime
-                lastmod = lastmod.replace(tzinfo=timezone.utc)
-            # Format to YYYY-MM-DD (widely accepted by crawlers)
-            formatted_lastmod = lastmod.strftime("%Y-%m-%d")
-            ET.SubElement(url_element, "lastmod").text = formatted_lastmod
-        elif isinstance(lastmod, str):  # Allow pre-formatted strings
-            ET.SubElement(url_element, "lastmod").text = lastmod
-
-    if changefreq:
-        ET.SubElement(url_element, "changefreq").text = changefreq
-    if priority:
-        ET.SubElement(url_element, "priority").text = str(
-            priority
-        )  # Priority must be a string
-
-
-def generate_news_sitemap():
-    """Generates a news-specific sitemap for better SEO."""
+def _refresh_sitemaps(sections):
+    """Rebuild changed shards of stale sections; keep serving the last build if the database fails."""
+    cache = get_sitemap_cache()
     try:
-        urlset = ET.Element(
-            "urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        cache.refresh(sections)
+    except SQLAlchemyError as db_err:
+        current_app.logger.error(
+            f"Sitemap refresh failed due to database error: {db_err}", exc_info=True
         )
+    return cache
 
-        # Get all visible news articles with SEO data
-        news_items = (
-            db.session.query(
-                News.id, 
-                News.updated_at, 
-                News.seo_slug,
-                News.meta_robots,
-                News.is_news,
-                News.is_premium,
-                News.is_main_news,
-                News.read_count,
-                News.date,
-                News.title,
-                News.category_id
-            )
-            .filter(News.is_visible == True)
-            .order_by(News.updated_at.desc())
-            .all()
-        )
-        
-        for news_data in news_items:
-            news_id, updated_at, seo_slug, meta_robots, is_news, is_premium, is_main_news, read_count, date, title, category_id = news_data
-            
-            # Skip if explicitly marked as noindex
-            if meta_robots and "noindex" in meta_robots.lower():
-                continue
-                
-            try:
-                # Use SEO slug if available, otherwise use ID
-                if seo_slug:
-                    loc = url_for("main.news_detail", news_id=news_id, news_title=seo_slug, _external=True)
-                else:
-                    loc = url_for("main.news_detail", news_id=news_id, _external=True)
-                
-                # Determine priority based on content importance
-                if is_main_news:
-                    priority = 0.9
-                elif is_premium:
-                    priority = 0.8
-                elif read_count and read_count > 100:
-                    priority = 0.8
-                else:
-                    priority = 0.7
-                
-                # Determine change frequency
-                if is_main_news:
-                    changefreq = "daily"
-                elif is_premium:
-                    changefreq = "weekly"
-                else:
-                    days_old = calculate_days_old(date)
-                    if days_old < 7:
-                        changefreq = "daily"
-                    elif days_old < 30:
-                        changefreq = "weekly"
-                    elif days_old < 90:
-                        changefreq = "monthly"
-                    else:
-                        changefreq = "yearly"
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"News sitemap: Could not generate URL for news ID {news_id}: {e}"
-                )
-
-        sitemap_xml_string = ET.tostring(urlset, encoding="unicode", method="xml")
-        final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sitemap_xml_string
-
-        return Response(final_xml, mimetype="application/xml")
-
-    except Exception as err:
-        current_app.logger.error(
-            f"News sitemap generation failed: {err}", exc_info=True
+
+def _sitemap_index_response(sections=None):
+    """Sitemap index over the cached shards of the given sections (all when None)."""
+    cache = _refresh_sitemaps(sections)
+    if not cache.is_built(sections):
+        return Response(
+            "Error generating sitemap: Database unavailable",
+            status=500,
+            mimetype="text/plain",
         )
-        return Response("Error generating news sitemap", status=500, mimetype="text/plain")
+    entries = cache.shards(sections)
+    response = Response("".join(iter_sitemap_index(index_shards(entries))), mimetype="application/xml")
+    response.set_etag(index_etag(entries))
+    if entries:
+        response.last_modified = max(entry["modified"] for entry in entries)
+    return response.make_conditional(request)
+
+
+@main_blueprint.route("/sitemap-<section>-<int:number>.xml")
+def sitemap_shard(section, number):
+    """Serves one numbered sitemap shard (at most 50,000 URLs) from the shard cache."""
+    if section not in SECTION_NAMES:
+        abort(404)
+    cache = _refresh_sitemaps([section])
+    entry = cache.shard(section, number)
+    if entry is None:
+        abort(404)
+    return send_file(
+        cache.shard_path(section, number),
+        mimetype="application/xml",
+        etag=entry["etag"],
+        last_modified=entry["modified"],
+        conditional=True,
+    )
 
 
 @main_blueprint.route("/sitemap-news.xml")
 def sitemap_news():
-    """Generates a news-specific sitemap for better SEO."""
-    return generate_news_sitemap()
-
-
-def generate_albums_sitemap():
-    """Generates an albums-specific sitemap for better SEO."""
-    try:
-        urlset = ET.Element(
-            "urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
-        )
-
-        # Get all visible albums with SEO data
-        albums = (
-            db.session.query(
-                Album.id, 
-                Album.updated_at, 
-                Album.title,
-                Album.is_visible,
-                Album.is_archived,
-                Album.total_reads,
-                Album.created_at,
-                Album.is_completed,
-                Album.is_hiatus,
-                Album.is_premium
-            )
-            .filter(Album.is_visible == True, Album.is_archived == False)
-            .order_by(Album.updated_at.desc())
-            .all()
-        )
-        
-        for album_data in albums:
-            album_id, updated_at, title, is_visible, is_archived, total_reads, created_at, is_completed, is_hiatus, is_premium = album_data
-            
-            try:
-                # Generate SEO-friendly URL
-                safe_album_title = safe_title(title) if title else f"album-{album_id}"
-                loc = url_for("main.album_detail", album_id=album_id, album_title=safe_album_title, _external=True)
-                
-                # Determine priority based on album importance
-                if is_premium:
-                    priority = 0.9  # Premium albums get highest priority
-                elif total_reads and total_reads > 1000:
-                    priority = 0.8  # Popular albums get high priority
-                elif is_completed:
-                    priority = 0.8  # Completed albums get high priority
-                else:
-                    priority = 0.7  # Regular albums
-                
-                # Determine change frequency based on album status and popularity
-                if is_hiatus:
-                    changefreq = "monthly"  # Hiatus albums change less frequently
-                elif is_completed:
-                    changefreq = "monthly"  # Completed albums change less frequently
-                elif is_premium:
-                    changefreq = "weekly"  # Premium albums get regular updates
-                elif total_reads and total_reads > 500:
-                    changefreq = "weekly"  # Popular albums get regular updates
-                else:
-                    changefreq = "monthly"  # Regular albums
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Albums sitemap: Could not generate URL for album ID {album_id}: {e}"
-                )
-
-        # Get all visible album chapters
-        chapters = (
-            db.session.query(
-                AlbumChapter.id,
-                AlbumChapter.album_id,
-                AlbumChapter.chapter_title,
-                AlbumChapter.updated_at,
-                Album.title.label('album_title'),
-                Album.is_visible,
-                Album.is_archived,
-                Album.is_premium
-            )
-            .join(Album, AlbumChapter.album_id == Album.id)
-            .filter(Album.is_visible == True, Album.is_archived == False)
-            .order_by(AlbumChapter.updated_at.desc())
-            .all()
-        )
-        
-        for chapter_data in chapters:
-            chapter_id, album_id, chapter_title, updated_at, album_title, is_visible, is_archived, is_premium = chapter_data
-            
-            try:
-                # Generate SEO-friendly URLs for both album and chapter titles
-                safe_album_title = safe_title(album_title) if album_title else f"album-{album_id}"
-                safe_chapter_title = safe_title(chapter_title) if chapter_title else f"chapter-{chapter_id}"
-                
-                loc = url_for(
-                    "main.chapter_reader", 
-                    album_id=album_id, 
-                    chapter_id=chapter_id, 
-                    chapter_title=safe_chapter_title, 
-                    _external=True
-                )
-                
-                # Determine priority based on album importance
-                if is_premium:
-                    priority = 0.8  # Premium album chapters get high priority
-                else:
-                    priority = 0.7  # Regular chapters
-                
-                # Chapters typically get updated when new content is added
-                changefreq = "weekly" if is_premium else "monthly"
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Albums sitemap: Could not generate URL for chapter ID {chapter_id}: {e}"
-                )
-
-        sitemap_xml_string = ET.tostring(urlset, encoding="unicode", method="xml")
-        final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sitemap_xml_string
-
-        return Response(final_xml, mimetype="application/xml")
-
-    except Exception as err:
-        current_app.logger.error(
-            f"Albums sitemap generation failed: {err}", exc_info=True
-        )
-        return Response(f"Error generating albums sitemap: {str(err)}", status=500, mimetype="text/plain")
+    """Sitemap index over the news shards."""
+    return _sitemap_index_response(["news"])
 
 
 @main_blueprint.route("/sitemap-albums.xml")
 def sitemap_albums():
-    """Generates an albums-specific sitemap for better SEO."""
-    return generate_albums_sitemap()
+    """Sitemap index over the album and chapter shards."""
+    return _sitemap_index_response(["albums", "chapters"])
 
 
 @main_blueprint.route("/sitemap-index.xml")
 def sitemap_index():
-    """Generates a sitemap index for large sites with multiple sitemaps."""
-    try:
-        # Create the root <sitemapindex> element with namespace
-        sitemapindex = ET.Element(
-            "sitemapindex", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
-        )
-
-        # Main sitemap
-        sitemap_element = ET.SubElement(sitemapindex, "sitemap")
-        ET.SubElement(sitemap_element, "loc").text = url_for("main.sitemap", _external=True)
-        ET.SubElement(sitemap_element, "lastmod").text = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-        # News-specific sitemap
-        sitemap_element = ET.SubElement(sitemapindex, "sitemap")
-        ET.SubElement(sitemap_element, "loc").text = url_for("main.sitemap_news", _external=True)
-        ET.SubElement(sitemap_element, "lastmod").text = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-        # Albums-specific sitemap
-        sitemap_element = ET.SubElement(sitemapindex, "sitemap")
-        ET.SubElement(sitemap_element, "loc").text = url_for("main.sitemap_albums", _external=True)
-        ET.SubElement(sitemap_element, "lastmod").text = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-        # Convert to XML string
-        sitemap_xml_string = ET.tostring(sitemapindex, encoding="unicode", method="xml")
-        final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sitemap_xml_string
-
-        return Response(final_xml, mimetype="application/xml")
-
-    except Exception as err:
-        current_app.logger.error(
-            f"Sitemap index generation failed: {err}", exc_info=True
-        )
-        return Response("Error generating sitemap index", status=500, mimetype="text/plain")
+    """Sitemap index listing every shard of every section."""
+    return _sitemap_index_response()
 
 
 @main_blueprint.route("/sitemap.xml")
 def sitemap():
-    """Generates a comprehensive sitemap.xml dynamically with SEO optimization."""
-    try:
-        # Update robots.txt with correct website URL
-        update_robots_txt()
-        # Create the root <urlset> element with namespace
-        urlset = ET.Element(
-            "urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
-        )
-
-        # 1. Static Pages (Publicly accessible HTML pages)
-        static_endpoints = [
-            ("main.home", "daily", 1.0),  # Homepage - highest priority
-            ("main.news", "daily", 0.9),  # Main news listing page
-            ("main.videos", "weekly", 0.8),  # Main video listing page
-            ("main.gallery", "weekly", 0.7),  # Main gallery listing page
-            ("main.utama", "daily", 0.8),  # Utama page
-            ("main.about", "monthly", 0.5),  # About page
-            ("main.hypes", "weekly", 0.6),  # Hypes page
-            ("main.premium", "weekly", 0.6),  # Premium page
-        ]
-
-        for endpoint, changefreq, priority in static_endpoints:
-            try:
-                loc = url_for(endpoint, _external=True)
-                add_url_to_sitemap(
-                    urlset, loc, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for static endpoint '{endpoint}': {e}"
-                )
-
-        # 2. News Detail Pages with SEO optimization
-        news_items = (
-            db.session.query(
-                News.id, 
-                News.updated_at, 
-                News.seo_slug,
-                News.meta_robots,
-                News.is_news,
-                News.is_premium,
-                News.is_main_news,
-                News.read_count,
-                News.date
-            )
-            .filter(News.is_visible == True)
-            .order_by(News.updated_at.desc())
-            .all()
-        )
-        
-        for news_data in news_items:
-            news_id, updated_at, seo_slug, meta_robots, is_news, is_premium, is_main_news, read_count, date = news_data
-            
-            # Skip if explicitly marked as noindex
-            if meta_robots and "noindex" in meta_robots.lower():
-                continue
-                
-            try:
-                # Use SEO slug if available, otherwise use ID
-                if seo_slug:
-                    loc = url_for("main.news_detail", news_id=news_id, news_title=seo_slug, _external=True)
-                else:
-                    loc = url_for("main.news_detail", news_id=news_id, _external=True)
-                
-                # Determine priority based on content importance
-                if is_main_news:
-                    priority = 0.9  # Main news gets higher priority
-                elif is_premium:
-                    priority = 0.8  # Premium content gets higher priority
-                elif read_count and read_count > 100:
-                    priority = 0.8  # Popular content gets higher priority
-                else:
-                    priority = 0.7  # Regular content
-                
-                # Determine change frequency based on content type and age
-                if is_main_news:
-                    changefreq = "daily"
-                elif is_premium:
-                    changefreq = "weekly"
-                else:
-                    # Determine based on how recent the content is
-                    days_old = calculate_days_old(date)
-                    if days_old < 7:
-                        changefreq = "daily"
-                    elif days_old < 30:
-                        changefreq = "weekly"
-                    elif days_old < 90:
-                        changefreq = "monthly"
-                    else:
-                        changefreq = "yearly"
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for news ID {news_id}: {e}"
-                )
-
-        # 3. Album Detail Pages with SEO optimization
-        albums = (
-            db.session.query(
-                Album.id, 
-                Album.updated_at, 
-                Album.title,
-                Album.is_visible,
-                Album.is_archived,
-                Album.total_reads,
-                Album.created_at,
-                Album.is_completed,
-                Album.is_hiatus,
-                Album.is_premium
-            )
-            .filter(Album.is_visible == True, Album.is_archived == False)
-            .order_by(Album.updated_at.desc())
-            .all()
-        )
-        
-        for album_data in albums:
-            album_id, updated_at, title, is_visible, is_archived, total_reads, created_at, is_completed, is_hiatus, is_premium = album_data
-            
-            try:
-                # Generate SEO-friendly URL
-                safe_album_title = safe_title(title) if title else f"album-{album_id}"
-                loc = url_for("main.album_detail", album_id=album_id, album_title=safe_album_title, _external=True)
-                
-                # Determine priority based on album importance
-                if is_premium:
-                    priority = 0.9  # Premium albums get highest priority
-                elif total_reads and total_reads > 1000:
-                    priority = 0.8  # Popular albums get high priority
-                elif is_completed:
-                    priority = 0.8  # Completed albums get high priority
-                else:
-                    priority = 0.7  # Regular albums
-                
-                # Determine change frequency based on album status and popularity
-                if is_hiatus:
-                    changefreq = "monthly"  # Hiatus albums change less frequently
-                elif is_completed:
-                    changefreq = "monthly"  # Completed albums change less frequently
-                elif is_premium:
-                    changefreq = "weekly"  # Premium albums get regular updates
-                elif total_reads and total_reads > 500:
-                    changefreq = "weekly"  # Popular albums get regular updates
-                else:
-                    changefreq = "monthly"  # Regular albums
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for album ID {album_id}: {e}"
-                )
-
-        # 4. Album Chapter Pages with SEO optimization
-        chapters = (
-            db.session.query(
-                AlbumChapter.id,
-                AlbumChapter.album_id,
-                AlbumChapter.chapter_title,
-                AlbumChapter.updated_at,
-                Album.title.label('album_title'),
-                Album.is_visible,
-                Album.is_archived,
-                Album.is_premium
-            )
-            .join(Album, AlbumChapter.album_id == Album.id)
-            .filter(Album.is_visible == True, Album.is_archived == False)
-            .order_by(AlbumChapter.updated_at.desc())
-            .all()
-        )
-        
-        for chapter_data in chapters:
-            chapter_id, album_id, chapter_title, updated_at, album_title, is_visible, is_archived, is_premium = chapter_data
-            
-            try:
-                # Generate SEO-friendly URLs for both album and chapter titles
-                safe_album_title = safe_title(album_title) if album_title else f"album-{album_id}"
-                safe_chapter_title = safe_title(chapter_title) if chapter_title else f"chapter-{chapter_id}"
-                
-                loc = url_for(
-                    "main.chapter_reader", 
-                    album_id=album_id, 
-                    chapter_id=chapter_id, 
-                    chapter_title=safe_chapter_title, 
-                    _external=True
-                )
-                
-                # Determine priority based on album importance
-                if is_premium:
-                    priority = 0.8  # Premium album chapters get high priority
-                else:
-                    priority = 0.7  # Regular chapters
-                
-                # Chapters typically get updated when new content is added
-                changefreq = "weekly" if is_premium else "monthly"
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for chapter ID {chapter_id}: {e}"
-                )
-        
-        for news_data in news_items:
-            news_id, updated_at, seo_slug, meta_robots, is_news, is_premium, is_main_news, read_count, date = news_data
-            
-            # Skip if explicitly marked as noindex
-            if meta_robots and "noindex" in meta_robots.lower():
-                continue
-                
-            try:
-                # Use SEO slug if available, otherwise use ID
-                if seo_slug:
-                    loc = url_for("main.news_detail", news_id=news_id, news_title=seo_slug, _external=True)
-                else:
-                    loc = url_for("main.news_detail", news_id=news_id, _external=True)
-                
-                # Determine priority based on content importance
-                if is_main_news:
-                    priority = 0.9  # Main news gets higher priority
-                elif is_premium:
-                    priority = 0.8  # Premium content gets higher priority
-                elif read_count and read_count > 100:
-                    priority = 0.8  # Popular content gets higher priority
-                else:
-                    priority = 0.7  # Regular content
-                
-                # Determine change frequency based on content type and age
-                if is_main_news:
-                    changefreq = "daily"
-                elif is_premium:
-                    changefreq = "weekly"
-                else:
-                    # Determine based on how recent the content is
-                    days_old = (datetime.now(timezone.utc) - date).days if date else 365
-                    if days_old < 7:
-                        changefreq = "daily"
-                    elif days_old < 30:
-                        changefreq = "weekly"
-                    elif days_old < 90:
-                        changefreq = "monthly"
-                    else:
-                        changefreq = "yearly"
-                
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq=changefreq, priority=priority
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for news ID {news_id}: {e}"
-                )
-
-        # 5. YouTube Videos
-        videos = (
-            db.session.query(YouTubeVideo.id, YouTubeVideo.updated_at, YouTubeVideo.youtube_id)
-            .filter(YouTubeVideo.is_visible == True)
-            .order_by(YouTubeVideo.updated_at.desc())
-            .all()
-        )
-        
-        for video_id, updated_at, youtube_id in videos:
-            try:
-                # Note: This assumes you have a video detail route
-                # If not, you might want to link directly to YouTube or create a detail page
-                loc = url_for("main.videos", _external=True) + f"#video-{youtube_id}"
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq="weekly", priority=0.6
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for video ID {video_id}: {e}"
-                )
-
-        # 6. Images/Gallery Items
-        images = (
-            db.session.query(Image.id, Image.updated_at, Image.filename)
-            .filter(Image.is_visible == True)
-            .order_by(Image.updated_at.desc())
-            .all()
-        )
-        
-        for image_id, updated_at, filename in images:
-            try:
-                # Link to gallery page with image focus
-                loc = url_for("main.gallery", _external=True) + f"#image-{image_id}"
-                add_url_to_sitemap(
-                    urlset, loc, lastmod=updated_at, changefreq="monthly", priority=0.5
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for image ID {image_id}: {e}"
-                )
-
-        # 7. Category Pages with SEO optimization
-        categories = Category.query.order_by(Category.name).all()
-        for cat in categories:
-            try:
-                loc = url_for("main.news", category=cat.name, _external=True)
-                # Categories get high priority as they're important for SEO
-                add_url_to_sitemap(
-                    urlset, loc, changefreq="daily", priority=0.8
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for category '{cat.name}': {e}"
-                )
-
-        # 8. Tag Pages with SEO optimization
-        tag_strings_tuples = (
-            db.session.query(News.tagar)
-            .filter(
-                and_(News.is_visible == True, News.tagar.isnot(None), News.tagar != "")
-            )
-            .distinct()
-            .all()
-        )
-        all_tags = set()
-        for tag_string_tuple in tag_strings_tuples:
-            tag_string = tag_string_tuple[0] if tag_string_tuple[0] else ""
-            tags_in_string = [
-                tag.strip() for tag in tag_string.split(",") if tag.strip()
-            ]
-            all_tags.update(tags_in_string)
-
-        for tag_name in sorted(list(all_tags)):
-            try:
-                loc = url_for("main.news", tag=tag_name, _external=True)
-                # Tags get good priority but slightly lower than categories
-                add_url_to_sitemap(
-                    urlset, loc, changefreq="daily", priority=0.7
-                )
-            except Exception as e:
-                current_app.logger.warning(
-                    f"Sitemap: Could not generate URL for tag '{tag_name}': {e}"
-                )
-
-        # 9. Pagination pages for main content types (optional, for large sites)
-        # News pagination
-        total_news = News.query.filter_by(is_visible=True).count()
-        if total_news > 20:  # Only add pagination if there are many articles
-            total_pages = (total_news + 19) // 20  # Assuming 20 per page
-            for page in range(2, min(total_pages + 1, 11)):  # Limit to first 10 pages
-                try:
-                    loc = url_for("main.news", page=page, _external=True)
-                    add_url_to_sitemap(
-                        urlset, loc, changefreq="daily", priority=0.6
-                    )
-                except Exception as e:
-                    current_app.logger.warning(
-                        f"Sitemap: Could not generate URL for news page {page}: {e}"
-                    )
-
-        # Album pagination
-        total_albums = Album.query.filter_by(is_visible=True, is_archived=False).count()
-        if total_albums > 12:  # Only add pagination if there are many albums
-            total_pages = (total_albums + 11) // 12  # Assuming 12 per page
-            for page in range(2, min(total_pages + 1, 11)):  # Limit to first 10 pages
-                try:
-                    loc = url_for("main.albums_list", page=page, _external=True)
-                    add_url_to_sitemap(
-                        urlset, loc, changefreq="weekly", priority=0.6
-                    )
-                except Exception as e:
-                    current_app.logger.warning(
-                        f"Sitemap: Could not generate URL for albums page {page}: {e}"
-                    )
-
-        # Video pagination
-        total_videos = YouTubeVideo.query.filter_by(is_visible=True).count()
-        if total_videos > 6:  # Only add pagination if there are many videos
-            total_pages = (total_videos + 5) // 6  # Assuming 6 per page
-            for page in range(2, min(total_pages + 1, 6)):  # Limit to first 5 pages
-                try:
-                    loc = url_for("main.videos", page=page, _external=True)
-                    add_url_to_sitemap(
-                        urlset, loc, changefreq="weekly", priority=0.5
-                    )
-                except Exception as e:
-                    current_app.logger.warning(
-                        f"Sitemap: Could not generate URL for videos page {page}: {e}"
-                    )
-
-        # Gallery pagination
-        total_images = Image.query.filter_by(is_visible=True).count()
-        if total_images > 15:  # Only add pagination if there are many images
-            total_pages = (total_images + 14) // 15  # Assuming 15 per page
-            for page in range(2, min(total_pages + 1, 6)):  # Limit to first 5 pages
-                try:
-                    loc = url_for("main.gallery", page=page, _external=True)
-                    add_url_to_sitemap(
-                        urlset, loc, changefreq="monthly", priority=0.4
-                    )
-                except Exception as e:
-                    current_app.logger.warning(
-                        f"Sitemap: Could not generate URL for gallery page {page}: {e}"
-                    )
-
-        # Convert the ElementTree to an XML string
-        sitemap_xml_string = ET.tostring(urlset, encoding="unicode", method="xml")
-        # Add the XML declaration manually as ET doesn't always include it nicely
-        final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sitemap_xml_string
-
-        return Response(final_xml, mimetype="application/xml")
-
-    except SQLAlchemyError as db_err:
-        current_app.logger.error(
-            f"Sitemap generation failed due to database error: {db_err}", exc_info=True
-        )
-        return Response(
-            "Error generating sitemap: Database unavailable",
-            status=500,
-            mimetype="text/plain",
-        )
-    except Exception as err:
-        current_app.logger.error(
-            f"Sitemap generation failed due to unexpected error: {err}", exc_info=True
-        )
-        return Response("Error generating sitemap", status=500, mimetype="text/plain")
+    """Site sitemap: an index of the numbered shards, so no single file exceeds the protocol limit."""
+    return _sitemap_index_response()
 
 
 @main_blueprint.app_errorhandler(404)
@@ -1,7 +1,11 @@
 from routes import main_blueprint
 from .common_imports import *
 from .routes_helper import *
+from optimizations.image_jobs import get_image_job_queue
+from optimizations.image_variants import VARIANT_FORMATS, VARIANT_WIDTHS, ensure_variant
+from routes.utils.image_usage import images_in_use, usage_for_image
 import re
+from sqlalchemy.exc import IntegrityError
 
 def safe_title(title):
     filtered_title = re.sub(r'\s+', '_', title)
@@ -109,10 +113,11 @@ def get_images():
         query = query.filter(or_(Image.description == None, Image.description == ''))
 
     # Apply usage filter
+    in_use = db.session.query(ImageUsage.id).filter(ImageUsage.image_id == Image.id).exists()
     if usage_filter == "used":
-        query = query.filter(Image.news.any())
+        query = query.filter(in_use)
     elif usage_filter == "unused":
-        query = query.filter(~Image.news.any())
+        query = query.filter(~in_use)
 
     # Apply ordering and pagination
     images_pagination = query.order_by(Image.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
@@ -142,6 +147,46 @@ def get_image(image_id):
     return jsonify(image.to_dict())
 
 
+# 🖼️ Responsive Image Variant (generated on first request)
+@main_blueprint.route("/img/<int:image_id>/<int:width>.<fmt>", methods=["GET"])
+def image_variant(image_id, width, fmt):
+    if width not in VARIANT_WIDTHS or fmt not in VARIANT_FORMATS:
+        abort(404)
+
+    row = db.session.query(Image.filepath, Image.url).filter(Image.id == image_id).first()
+    if row is None:
+        abort(404)
+    if not row.filepath:
+        # Externally hosted images are not resized
+        if row.url:
+            return redirect(row.url)
+        abort(404)
+    source = row.filepath if os.path.isabs(row.filepath) else os.path.join(current_app.root_path, row.filepath)
+    if not os.path.exists(source):
+        abort(404)
+
+    try:
+        path, digest = ensure_variant(source, width, fmt)
+    except Exception as e:
+        current_app.logger.error(f"Image variant {image_id}/{width}.{fmt} failed: {e}")
+        abort(500)
+
+    response = send_file(path, mimetype=VARIANT_FORMATS[fmt][1], etag=f"{digest[:32]}-{width}-{fmt}",
+                         max_age=31536000, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _duplicate_upload_response(image):
+    return jsonify({
+        "message": "Image already exists",
+        "id": image.id,
+        "duplicate": True,
+        "image": image.to_dict(),
+    }), 200
+
+
 # 🛠️ Upload an Image (API)
 @main_blueprint.route("/api/images", methods=["POST"])
 @login_required
@@ -159,9 +204,9 @@ def upload_image():
     if file and image_url:
         return jsonify({"error": "Cannot provide both a file and a URL"}), 400
 
-    # Process File Upload
+    # Process File Upload (hashed while streaming to disk)
     if file:
-        filename, file_path = save_file(file, name)
+        filename, file_path, content_hash = save_file_hashed(file, name)
 
     # Process URL Upload
     else:
@@ -169,13 +214,16 @@ def upload_image():
             filename, file_path = download_image(image_url)
         except Exception as e:
             return jsonify({"error": str(e)}), 400
+        content_hash = sha256_file(file_path)
 
-    # Now AUTO convert to WebP and create thumbnails
-    result = process_single_image(file_path)
-    if result != "ok":
-        return jsonify({"error": result}), 500
+    # The uploader sent identical bytes before: reuse their record, skip processing
+    existing = Image.query.filter_by(user_id=current_user.id, content_hash=content_hash).first()
+    if existing:
+        os.remove(file_path)
+        return _duplicate_upload_response(existing)
 
-    # Update filename to webp version
+    # WebP conversion and thumbnails run in the background image job pool;
+    # the record points at the WebP path the job will produce
     base_name, _ = os.path.splitext(filename)
     new_filename = f"{base_name}.webp"
     new_filepath = os.path.join(os.path.dirname(file_path), new_filename)
@@ -195,14 +243,62 @@ def upload_image():
     image = Image(
         filename=new_filename,
         filepath=new_filepath,
+        content_hash=content_hash,
         description=description,
         is_visible=default_visible,
         user_id=current_user.id,
     )
     db.session.add(image)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent upload of the same bytes by this user won the unique index
+        db.session.rollback()
+        os.remove(file_path)
+        existing = Image.query.filter_by(user_id=current_user.id, content_hash=content_hash).first()
+        if existing is None:
+            raise
+        return _duplicate_upload_response(existing)
 
-    return jsonify({"message": "Image uploaded successfully", "id": image.id}), 201
+    job_id = get_image_job_queue().submit(os.path.abspath(file_path), image_id=image.id, user_id=current_user.id)
+
+    return jsonify({
+        "message": "Image upload accepted for processing",
+        "id": image.id,
+        "job_id": job_id,
+        "status_url": url_for("main.get_image_job", job_id=job_id),
+    }), 202
+
+
+# 🛠️ Image Processing Job Status (API)
+@main_blueprint.route("/api/images/jobs/<job_id>", methods=["GET"])
+@login_required
+def get_image_job(job_id):
+    job = get_image_job_queue().store.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if job["user_id"] != current_user.id and not current_user.is_owner() and current_user.role != UserRole.ADMIN:
+        abort(403)
+
+    def static_url(path):
+        static_path = path.split("static/", 1)[1] if "static/" in path else path
+        return url_for("static", filename=static_path)
+
+    variants = None
+    if job["result"]:
+        variants = {"webp": static_url(job["result"]["webp"])}
+        variants.update({
+            f"thumb_{style}": static_url(path) for style, path in job["result"]["thumbnails"].items()
+        })
+
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "image_id": job["image_id"],
+        "error": job["error"],
+        "variants": variants,
+    })
 
 
 # 🛠️ Update an Image (API)
@@ -251,6 +347,7 @@ def update_image(image_id):
 
     image.filename = new_filename
     image.filepath = new_filepath
+    image.content_hash = None  # No longer the uploaded bytes; rehash with helper/backfill_image_hashes.py
 
     # 🔄 Update thumbnail path
     thumbnail_filename = f"{base_name}_thumb.webp"
@@ -303,6 +400,12 @@ def delete_image(image_id):
         abort(403)
 
     image = Image.query.get_or_404(image_id)
+    force = request.args.get("force", "").lower() in ("1", "true", "yes")
+    if not force:
+        usage = usage_for_image(image_id)
+        if usage:
+            return jsonify({"error": "Image is still in use", "usage": usage}), 409
+
     delete_existing_file(image.filepath)
     try:
         base_path, _ = os.path.splitext(image.filepath)
@@ -329,14 +432,18 @@ def bulk_delete_images():
     ids = data.get("ids", [])
     if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
         return jsonify({"error": "Invalid or missing 'ids'"}), 400
+    # Images still referenced somewhere are kept unless the caller forces it
+    in_use = set() if data.get("force") is True else images_in_use(ids)
     images_to_delete = Image.query.filter(Image.id.in_(ids)).all()
     deleted_count = 0
     for image in images_to_delete:
+        if image.id in in_use:
+            continue
         if image.user_id == current_user.id or current_user.role in [UserRole.ADMIN, UserRole.SUPERUSER]:
             db.session.delete(image)
             deleted_count += 1
     db.session.commit()
-    return jsonify({"deleted": deleted_count}), 200
+    return jsonify({"deleted": deleted_count, "skipped_in_use": sorted(in_use)}), 200
 
 @main_blueprint.route("/api/images/bulk-visibility", methods=["POST"])
 @login_required
@@ -360,12 +467,14 @@ def bulk_update_images_visibility():
 @main_blueprint.route("/api/images/<int:image_id>/usage", methods=["GET"])
 @login_required
 def get_image_usage(image_id):
-    image = Image.query.get_or_404(image_id)
-    news_list = []
-    for news in image.news:
-        news_list.append({
-            "id": news.id,
-            "title": news.title,
-            "url": url_for("main.news_detail", news_id=news.id, news_title=safe_title(news.title), _external=True)
-        })
-    return jsonify({"news": news_list})
\ No newline at end of file
+    Image.query.get_or_404(image_id)
+    usage = usage_for_image(image_id)
+    news_list = [
+        {
+            "id": ref["owner_id"],
+            "title": ref["title"],
+            "url": url_for("main.news_detail", news_id=ref["owner_id"], news_title=safe_title(ref["title"] or ""), _external=True)
+        }
+        for ref in usage if ref["owner_type"] == "news"
+    ]
+    return jsonify({"news": news_list, "usage": usage})
\ No newline at end of file
@@ -3,6 +3,7 @@ from models import Album, AlbumChapter, News, Category, CategoryGroup, Image, Us
 from optimizations import cache_with_args, cache_query_result, CACHE_TIMEOUTS
 from optimizations import optimize_news_query, optimize_image_query, monitor_ssr_render
 from optimizations.cache_config import safe_cache_get, safe_cache_set
+from routes.utils.robots_txt import published_robots_txt
 import time
 import markdown
 import re
@@ -1843,9 +1844,16 @@ def search_news_api():
 
 @main_blueprint.route("/robots.txt")
 def robots_txt():
-    """Serve robots.txt file."""
-    from flask import send_from_directory
-    return send_from_directory('.', 'robots.txt')
+    """Serve robots.txt as published at the last SEO settings change, without touching the database."""
+    record = published_robots_txt()
+    if record['path'] and os.path.exists(record['path']):
+        return send_file(record['path'], mimetype="text/plain", etag=record['etag'],
+                         last_modified=record['modified'], conditional=True)
+    # Read-only filesystem: the in-memory copy
+    response = Response(record['text'], mimetype="text/plain")
+    response.set_etag(record['etag'])
+    response.last_modified = record['modified']
+    return response.make_conditional(request)
 
 @main_blueprint.route("/api/settings/ads-injection", methods=["POST"])
 def update_ads_preferences():
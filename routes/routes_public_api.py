@@ -11,11 +11,13 @@ from models import (
     Category, Comment, Rating, UserLibrary, ReadingHistory
 )
 from sqlalchemy import func, desc, and_, or_
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 import json
 
 # Import functions from routes_public.py
 from .routes_public import search_albums, search_news_api, get_categories, get_tags, optimize_news_query
+from .utils.comment_loader import page_top_level
 
 # =============================================================================
 # NEWS API ENDPOINTS
@@ -854,9 +856,9 @@ def get_comments_simple(content_type, content_id):
         if content_type not in ['news', 'album', 'chapter']:
             return jsonify({"error": "Invalid content type. Must be 'news', 'album', or 'chapter'"}), 400
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        # Get pagination parameters (opaque cursor from the previous page's next_cursor)
+        cursor = request.args.get('cursor') or None
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
         
         # Build query based on content type
         if content_type == 'news':
@@ -908,13 +910,16 @@ def get_comments_simple(content_type, content_id):
         # Get top-level comments only (no parent_id)
         comments_query = comments_query.filter_by(parent_id=None)
         
-        # Paginate
-        pagination = comments_query.order_by(Comment.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Paginate with a keyset cursor over the thread path
+        try:
+            top_level, next_cursor = page_top_level(
+                comments_query.options(selectinload(Comment.user)), cursor, per_page
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         comments_data = []
-        for comment in pagination.items:
+        for comment in top_level:
             # Get user info
             user_data = None
             if comment.user:
@@ -924,36 +929,26 @@ def get_comments_simple(content_type, content_id):
                     "display_name": getattr(comment.user, 'get_full_name', lambda: comment.user.username)()
                 }
             
-            # Count replies
-            replies_count = Comment.query.filter_by(
-                parent_id=comment.id
-            ).filter(
-                Comment.is_approved == True,
-                Comment.is_spam == False,
-                Comment.is_deleted == False
-            ).count()
-            
             comment_data = {
                 "id": comment.id,
                 "content": comment.content,
                 "created_at": comment.created_at.isoformat() if comment.created_at else None,
                 "updated_at": comment.updated_at.isoformat() if comment.updated_at else None,
                 "user": user_data,
-                "replies_count": replies_count,
-                "likes": comment.get_likes_count(),
-                "dislikes": comment.get_dislikes_count()
+                "replies_count": comment.reply_count or 0,
+                "likes": comment.like_count or 0,
+                "dislikes": comment.dislike_count or 0
             }
             
             comments_data.append(comment_data)
         
         # Prepare pagination info
         pagination_info = {
-            "page": page,
             "per_page": per_page,
-            "total": pagination.total,
-            "pages": pagination.pages,
-            "has_next": pagination.has_next,
-            "has_prev": pagination.has_prev
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+            "total": comments_query.count()
         }
         
         return jsonify({
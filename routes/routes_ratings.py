@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from models import db, Rating, News, Album, User, UserRole
 from datetime import datetime, timezone
 from sqlalchemy import func
+from optimizations.rate_limiter import rate_limit
 
 ratings_bp = Blueprint('ratings', __name__)
 
@@ -148,6 +149,7 @@ def get_weighted_album_ratings(album_id):
 
 @ratings_bp.route('/api/ratings', methods=['POST'])
 @login_required
+@rate_limit('ratings_post', limit=20, window_seconds=60, identity=lambda: f"user:{current_user.id}")
 def create_rating():
     """Create or update a rating."""
     data = request.get_json()
@@ -2,6 +2,10 @@ from routes import main_blueprint
 from .common_imports import *
 from sqlalchemy import func, and_, or_, desc, asc
 from datetime import datetime, timezone
+from routes.utils import seo_materialize  # noqa: F401 - registers the save-time SEO listeners
+from routes.utils import seo_resolver  # noqa: F401 - RootSEO saves bump the resolver version
+from routes.utils.seo_stats import get_seo_stats
+from seo_injector import seo_injection_job
 
 # SEO Management Routes for Comprehensive SEO Management
 
@@ -395,11 +399,7 @@ def inject_album_seo(album_id):
         album = Album.query.get_or_404(album_id)
         
         # Import the album SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from inject_album_seo import (
+        from seo_injector.inject_album_seo import (
             clear_existing_seo, generate_seo_slug, generate_meta_description,
             generate_meta_keywords, generate_open_graph_data, generate_schema_markup,
             calculate_seo_score
@@ -948,7 +948,7 @@ def create_root_seo():
 @main_blueprint.route("/api/seo/inject", methods=["POST"])
 @login_required
 def run_seo_injection():
-    """POST: Run SEO injection for specified content type."""
+    """POST: Start a background SEO injection for the specified content type."""
     if not current_user.verified:
         return jsonify({"error": "Account not verified"}), 403
 
@@ -961,29 +961,66 @@ def run_seo_injection():
         return jsonify({"error": f"Invalid injection type. Must be one of: {valid_types}"}), 400
 
     try:
-        # Import the SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from seo_injector import run_seo_injection as run_injection
+        workers = seo_injection_job.pool_size(data.get('workers'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"workers must be a number or 'auto': {e}"}), 400
+    if workers > 1 and current_user.role not in [UserRole.ADMIN, UserRole.SUPERUSER]:
+        return jsonify({"error": "Only admins can run a parallel SEO injection"}), 403
+
+    try:
+        content_types = seo_injection_job.CONTENT_TYPES if injection_type == 'all' else [injection_type]
+        job, started = seo_injection_job.start_seo_injection_job(
+            current_app._get_current_object(), content_types, force=bool(data.get('force')), workers=workers
+        )
         
-        # Run the injection
-        result = run_injection(injection_type)
+        if not started:
+            return jsonify({
+                "error": "An SEO injection is already running",
+                "job": job
+            }), 409
         
         return jsonify({
-            "message": "SEO injection completed",
+            "message": "SEO injection started",
             "type": injection_type,
-            "result": result
-        })
+            "job": job
+        }), 202
         
     except Exception as e:
-        current_app.logger.error(f"Error running SEO injection: {e}")
+        current_app.logger.error(f"Error starting SEO injection: {e}")
         return jsonify({
-            "error": "Failed to run SEO injection",
+            "error": "Failed to start SEO injection",
             "details": str(e)
         }), 500
 
+@main_blueprint.route("/api/seo/inject/progress", methods=["GET"])
+@login_required
+def get_seo_injection_progress():
+    """GET: Progress of the current or most recent background SEO injection."""
+    if not current_user.verified:
+        return jsonify({"error": "Account not verified"}), 403
+
+    job = seo_injection_job.get_job_state()
+    return jsonify({
+        "job": job,
+        "running": seo_injection_job.is_job_active(job)
+    })
+
+@main_blueprint.route("/api/seo/inject/cancel", methods=["POST"])
+@login_required
+def cancel_seo_injection():
+    """POST: Stop the running background SEO injection after its current chunk."""
+    if not current_user.verified:
+        return jsonify({"error": "Account not verified"}), 403
+
+    job = seo_injection_job.cancel_seo_injection_job()
+    if job is None:
+        return jsonify({"error": "No SEO injection is running"}), 404
+    
+    return jsonify({
+        "message": "SEO injection cancellation requested",
+        "job": job
+    })
+
 @main_blueprint.route("/api/seo/stats", methods=["GET"])
 @login_required
 def get_seo_statistics():
@@ -993,11 +1030,7 @@ def get_seo_statistics():
 
     try:
         # Import the SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from seo_injector import get_seo_statistics as get_stats
+        from seo_injector.seo_injector import get_seo_statistics as get_stats
         
         # Get the statistics
         result = get_stats()
@@ -1022,39 +1055,11 @@ def get_seo_injection_status():
         return jsonify({"error": "Account not verified"}), 403
 
     try:
-        # Import the SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from seo_injector import get_seo_statistics as get_stats
+        stats = get_seo_stats()
         
-        # Get current statistics
-        stats_result = get_stats()
-        
-        # Calculate overall SEO health
-        total_items = 0
-        items_with_seo = 0
-        
-        if stats_result['status'] == 'success':
-            stats_text = stats_result['stats']
-            
-            # Parse the stats text to get counts
-            for content_type, stats in stats_text.items():
-                lines = stats.split('\n')
-                for line in lines:
-                    if 'Total' in line and ':' in line:
-                        try:
-                            count = int(line.split(':')[1].strip().split()[0])
-                            total_items += count
-                        except:
-                            pass
-                    elif 'With meta description:' in line:
-                        try:
-                            count = int(line.split(':')[1].strip().split()[0])
-                            items_with_seo += count
-                        except:
-                            pass
+        # Overall SEO health: items with a meta description
+        total_items = sum(counts['total'] for counts in stats.values())
+        items_with_seo = sum(counts['with_meta_description'] for counts in stats.values())
         
         seo_health_percentage = (items_with_seo / total_items * 100) if total_items > 0 else 0
         
@@ -1063,7 +1068,7 @@ def get_seo_injection_status():
             "total_items": total_items,
             "items_with_seo": items_with_seo,
             "seo_health_percentage": round(seo_health_percentage, 1),
-            "stats": stats_result
+            "stats": stats
         })
         
     except Exception as e:
@@ -1181,7 +1186,8 @@ def save_root_seo_settings():
         # Get existing settings if any
         if brand_info.seo_settings:
             if isinstance(brand_info.seo_settings, dict):
-                current_settings = brand_info.seo_settings
+                # Copy: updating the loaded dict in place is not detected as a change
+                current_settings = dict(brand_info.seo_settings)
             else:
                 try:
                     current_settings = json.loads(brand_info.seo_settings) if isinstance(brand_info.seo_settings, str) else {}
@@ -1236,11 +1242,7 @@ def inject_chapter_seo(chapter_id):
         chapter = AlbumChapter.query.get_or_404(chapter_id)
         
         # Import the chapter SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from inject_chapter_seo import (
+        from seo_injector.inject_chapter_seo import (
             clear_existing_seo, generate_seo_slug, generate_meta_description,
             generate_meta_keywords, generate_open_graph_data, generate_schema_markup,
             calculate_seo_score
@@ -1330,11 +1332,7 @@ def inject_article_seo(article_id):
         article = News.query.get_or_404(article_id)
         
         # Import the news SEO injector
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'seo_injector'))
-        
-        from inject_news_seo import (
+        from seo_injector.inject_news_seo import (
             clear_existing_seo, generate_seo_slug, generate_meta_description,
             generate_meta_keywords, generate_open_graph_data, generate_schema_markup,
             calculate_seo_score
@@ -1414,50 +1412,21 @@ def get_seo_stats_overview():
         return jsonify({"error": "Account not verified"}), 403
 
     try:
-        # Get counts from database
-        total_articles = News.query.count()
-        total_albums = Album.query.count()
-        total_chapters = AlbumChapter.query.count()
-        total_root_pages = RootSEO.query.count()
-        
-        # Calculate average SEO scores
-        articles_with_seo = News.query.filter(News.seo_score.isnot(None)).all()
-        albums_with_seo = Album.query.filter(Album.seo_score.isnot(None)).all()
-        chapters_with_seo = AlbumChapter.query.filter(AlbumChapter.seo_score.isnot(None)).all()
-        root_with_seo = RootSEO.query.all()  # RootSEO doesn't have seo_score column, use calculate_seo_score() method
-        
-        avg_article_score = sum(a.seo_score for a in articles_with_seo) / len(articles_with_seo) if articles_with_seo else 0
-        avg_album_score = sum(a.seo_score for a in albums_with_seo) / len(albums_with_seo) if albums_with_seo else 0
-        avg_chapter_score = sum(c.seo_score for c in chapters_with_seo) / len(chapters_with_seo) if chapters_with_seo else 0
-        avg_root_score = sum(r.calculate_seo_score() for r in root_with_seo) / len(root_with_seo) if root_with_seo else 0
-        
-        # Calculate completion rates
-        complete_articles = len([a for a in articles_with_seo if a.seo_score >= 80])
-        complete_albums = len([a for a in albums_with_seo if a.seo_score >= 80])
-        complete_chapters = len([c for c in chapters_with_seo if c.seo_score >= 80])
-        complete_root = len([r for r in root_with_seo if r.calculate_seo_score() >= 80])
-        
+        stats = get_seo_stats()
+
+        def average(counts):
+            return counts['score_sum'] / counts['scored'] if counts['scored'] else 0
+
+        def completion(counts):
+            complete = counts['excellent'] + counts['good']
+            return round(complete / counts['total'] * 100, 1) if counts['total'] else 0
+
         return jsonify({
             "success": True,
             "data": {
-                "total_content": {
-                    "articles": total_articles,
-                    "albums": total_albums,
-                    "chapters": total_chapters,
-                    "root_pages": total_root_pages
-                },
-                "average_scores": {
-                    "articles": round(avg_article_score, 1),
-                    "albums": round(avg_album_score, 1),
-                    "chapters": round(avg_chapter_score, 1),
-                    "root_pages": round(avg_root_score, 1)
-                },
-                "completion_rates": {
-                    "articles": round((complete_articles / total_articles * 100) if total_articles > 0 else 0, 1),
-                    "albums": round((complete_albums / total_albums * 100) if total_albums > 0 else 0, 1),
-                    "chapters": round((complete_chapters / total_chapters * 100) if total_chapters > 0 else 0, 1),
-                    "root_pages": round((complete_root / total_root_pages * 100) if total_root_pages > 0 else 0, 1)
-                }
+                "total_content": {key: counts['total'] for key, counts in stats.items()},
+                "average_scores": {key: round(average(counts), 1) for key, counts in stats.items()},
+                "completion_rates": {key: completion(counts) for key, counts in stats.items()}
             }
         })
         
@@ -1478,33 +1447,13 @@ def get_seo_score_distribution():
         return jsonify({"error": "Account not verified"}), 403
 
     try:
-        # Get all content with SEO scores
-        articles = News.query.filter(News.seo_score.isnot(None)).all()
-        albums = Album.query.filter(Album.seo_score.isnot(None)).all()
-        chapters = AlbumChapter.query.filter(AlbumChapter.seo_score.isnot(None)).all()
-        root_pages = RootSEO.query.all()  # RootSEO doesn't have seo_score column, use calculate_seo_score() method
-        
-        # Calculate distribution
-        def get_distribution(items, use_calculate_method=False):
-            if use_calculate_method:
-                excellent = len([i for i in items if i.calculate_seo_score() >= 90])
-                good = len([i for i in items if 80 <= i.calculate_seo_score() < 90])
-                fair = len([i for i in items if 60 <= i.calculate_seo_score() < 80])
-                poor = len([i for i in items if i.calculate_seo_score() < 60])
-            else:
-                excellent = len([i for i in items if i.seo_score >= 90])
-                good = len([i for i in items if 80 <= i.seo_score < 90])
-                fair = len([i for i in items if 60 <= i.seo_score < 80])
-                poor = len([i for i in items if i.seo_score < 60])
-            return [excellent, good, fair, poor]
+        stats = get_seo_stats()
         
         return jsonify({
             "success": True,
             "data": {
-                "articles": get_distribution(articles),
-                "albums": get_distribution(albums),
-                "chapters": get_distribution(chapters),
-                "root_pages": get_distribution(root_pages, use_calculate_method=True)
+                key: [counts['excellent'], counts['good'], counts['fair'], counts['poor']]
+                for key, counts in stats.items()
             }
         })
         
@@ -1569,30 +1518,13 @@ def get_seo_status_breakdown():
         return jsonify({"error": "Account not verified"}), 403
 
     try:
-        # Get status breakdown
-        articles = News.query.all()
-        albums = Album.query.all()
-        chapters = AlbumChapter.query.all()
-        root_pages = RootSEO.query.all()
-        
-        def get_status_breakdown(items, use_calculate_method=False):
-            if use_calculate_method:
-                complete = len([i for i in items if i.calculate_seo_score() >= 80])
-                incomplete = len([i for i in items if 40 <= i.calculate_seo_score() < 80])
-                missing = len([i for i in items if i.calculate_seo_score() < 40])
-            else:
-                complete = len([i for i in items if hasattr(i, 'seo_score') and i.seo_score and i.seo_score >= 80])
-                incomplete = len([i for i in items if hasattr(i, 'seo_score') and i.seo_score and 40 <= i.seo_score < 80])
-                missing = len([i for i in items if not hasattr(i, 'seo_score') or not i.seo_score or i.seo_score < 40])
-            return [complete, incomplete, missing]
+        stats = get_seo_stats()
         
         return jsonify({
             "success": True,
             "data": {
-                "articles": get_status_breakdown(articles),
-                "albums": get_status_breakdown(albums),
-                "chapters": get_status_breakdown(chapters),
-                "root_pages": get_status_breakdown(root_pages, use_calculate_method=True)
+                key: [counts['excellent'] + counts['good'], counts['incomplete'], counts['missing']]
+                for key, counts in stats.items()
             }
         })
         
@@ -1686,11 +1618,12 @@ def get_seo_recommendations():
 
     try:
         recommendations = []
+        stats = get_seo_stats()
         
         # Check for content without SEO scores
-        articles_without_seo = News.query.filter(News.seo_score.is_(None)).count()
-        albums_without_seo = Album.query.filter(Album.seo_score.is_(None)).count()
-        chapters_without_seo = AlbumChapter.query.filter(AlbumChapter.seo_score.is_(None)).count()
+        articles_without_seo = stats['articles']['total'] - stats['articles']['scored']
+        albums_without_seo = stats['albums']['total'] - stats['albums']['scored']
+        chapters_without_seo = stats['chapters']['total'] - stats['chapters']['scored']
         
         if articles_without_seo > 0:
             recommendations.append({
@@ -1717,8 +1650,8 @@ def get_seo_recommendations():
             })
         
         # Check for low-scoring content
-        low_scoring_articles = News.query.filter(News.seo_score < 60).count()
-        low_scoring_albums = Album.query.filter(Album.seo_score < 60).count()
+        low_scoring_articles = stats['articles']['poor']
+        low_scoring_albums = stats['albums']['poor']
         
         if low_scoring_articles > 0:
             recommendations.append({
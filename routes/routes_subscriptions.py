@@ -4,6 +4,7 @@ from models import UserRole
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 import os
+from routes.utils.ad_eligibility import invalidate_ad_eligibility
 
 # Subscription plans configuration
 SUBSCRIPTION_PLANS = {
@@ -72,6 +73,7 @@ def create_subscription():
         
         db.session.add(subscription)
         db.session.commit()
+        invalidate_ad_eligibility(current_user.id)
         
         current_app.logger.info(
             f"Subscription created for user {current_user.username}: {plan_type} plan"
@@ -106,6 +108,7 @@ def cancel_subscription():
         # current_user.premium_expires_at = None
         
         db.session.commit()
+        invalidate_ad_eligibility(current_user.id)
         
         current_app.logger.info(
             f"Subscription cancelled for user {current_user.username}"
@@ -140,16 +143,18 @@ def update_ad_preferences():
     """Update user's ad preferences."""
     data = request.get_json() or {}
     
-    if not current_user.ad_preferences:
-        current_user.ad_preferences = {}
+    # Copy so the JSON column is marked dirty (in-place edits are not detected)
+    ad_preferences = dict(current_user.ad_preferences or {})
     
     # Update ad preferences
     for key, value in data.items():
         if key in ['show_ads', 'ad_frequency']:
-            current_user.ad_preferences[key] = value
+            ad_preferences[key] = value
+    current_user.ad_preferences = ad_preferences
     
     try:
         db.session.commit()
+        invalidate_ad_eligibility(current_user.id)
         return jsonify({
             "message": "Ad preferences updated successfully",
             "ad_preferences": current_user.ad_preferences
@@ -239,6 +244,7 @@ def admin_update_subscription(subscription_id):
             subscription.end_date = datetime.fromisoformat(data['end_date'].replace('Z', '+00:00'))
         
         db.session.commit()
+        invalidate_ad_eligibility(subscription.user_id)
         
         return jsonify({
             "message": "Subscription updated successfully",
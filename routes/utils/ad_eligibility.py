@@ -0,0 +1,140 @@
+"""
+Ad Eligibility Cache
+
+Ad serving needs two facts per user: whether they currently have premium
+access and whether ads should be shown to them. This module keeps a compact
+record of the underlying fields (premium flag, premium expiry, ad preference)
+in the shared cache keyed by user id, so the serve endpoints do not load the
+User row on every request.
+
+Records expire after ELIGIBILITY_TTL seconds or at the premium expiry,
+whichever comes first, and are invalidated whenever the underlying columns
+change (see the User after_update listener below).
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from models import db, User
+from optimizations.cache_config import cache, safe_cache_get, safe_cache_set
+
+ELIGIBILITY_TTL = 600
+CACHE_KEY_PREFIX = 'ad_elig:'
+
+_TRACKED_FIELDS = ('has_premium_access', 'premium_expires_at', 'ad_preferences')
+
+
+def _cache_key(user_id) -> str:
+    return f"{CACHE_KEY_PREFIX}{user_id}"
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class AdEligibility:
+    """Compact, cacheable view of the User fields that drive ad serving."""
+
+    __slots__ = ('user_id', 'premium_access', 'premium_until', 'ad_preferences')
+
+    def __init__(self, user_id, premium_access=False, premium_until=None, ad_preferences=None):
+        self.user_id = user_id
+        self.premium_access = bool(premium_access)
+        self.premium_until = _as_utc(premium_until)
+        self.ad_preferences = ad_preferences or {}
+
+    @property
+    def has_premium(self) -> bool:
+        """Same rule as User.has_active_premium_subscription."""
+        if not self.premium_access:
+            return False
+        if self.premium_until is None:
+            return True
+        return self.premium_until > datetime.now(timezone.utc)
+
+    @property
+    def show_ads(self) -> bool:
+        """Same rule as User.should_show_ads."""
+        if self.has_premium:
+            return False
+        return bool(self.ad_preferences.get('show_ads', True))
+
+    def ttl(self) -> int:
+        """Seconds the record may be cached: capped at the premium expiry."""
+        if self.premium_access and self.premium_until is not None:
+            remaining = int((self.premium_until - datetime.now(timezone.utc)).total_seconds())
+            if remaining > 0:
+                return max(1, min(ELIGIBILITY_TTL, remaining))
+        return ELIGIBILITY_TTL
+
+    def to_dict(self) -> dict:
+        return {
+            'user_id': self.user_id,
+            'premium_access': self.premium_access,
+            'premium_until': self.premium_until.isoformat() if self.premium_until else None,
+            'ad_preferences': self.ad_preferences,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'AdEligibility':
+        until = data.get('premium_until')
+        return cls(
+            data['user_id'],
+            premium_access=data.get('premium_access', False),
+            premium_until=datetime.fromisoformat(until) if until else None,
+            ad_preferences=data.get('ad_preferences'),
+        )
+
+
+def get_ad_eligibility(user_id) -> Optional[AdEligibility]:
+    """
+    Get the ad eligibility record for a user, loading it on a cache miss.
+
+    Args:
+        user_id: User id (anything int() accepts)
+
+    Returns:
+        AdEligibility or None if the user does not exist
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    cached = safe_cache_get(_cache_key(user_id))
+    if cached is not None:
+        return AdEligibility.from_dict(cached) if cached else None
+
+    row = db.session.query(
+        User.has_premium_access, User.premium_expires_at, User.ad_preferences
+    ).filter(User.id == user_id).first()
+
+    if row is None:
+        # Remember unknown ids briefly so bogus user_id values cannot force a query per request
+        safe_cache_set(_cache_key(user_id), {}, timeout=60)
+        return None
+
+    eligibility = AdEligibility(user_id, row[0], row[1], row[2])
+    safe_cache_set(_cache_key(user_id), eligibility.to_dict(), timeout=eligibility.ttl())
+    return eligibility
+
+
+def invalidate_ad_eligibility(user_id) -> None:
+    """Drop the cached record for a user."""
+    try:
+        cache.delete(_cache_key(user_id))
+    except Exception:
+        pass
+
+
+@event.listens_for(User, 'after_update')
+def _invalidate_on_user_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _TRACKED_FIELDS):
+        invalidate_ad_eligibility(target.id)
@@ -0,0 +1,187 @@
+"""
+Ad Layout Recommendations
+
+Computes where "after N items" ads should go in a page's content grids.
+Candidate positions per page type come from the built-in LAYOUT_RULES plus
+the position values of active after_n_items placements for that page type.
+
+Results are memoized per (page_type, section layout signature). The signature
+only keeps what can change the answer (section keys, selectors and item
+counts clamped to the largest candidate position), so the number of distinct
+layouts stays small. Memoized entries are tagged with a layout version kept
+in the shared cache; any committed change to AdPlacement bumps the version,
+which makes every worker recompute on its next request.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, AdPlacement
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+
+LAYOUT_VERSION_KEY = 'ads_layout_version'
+MEMO_MAX_ENTRIES = 1024
+
+# Built-in insertion points per page type and section key
+LAYOUT_RULES = {
+    'home': {
+        'latest-articles': [3, 6],
+        'popular-news': [2, 4],
+    },
+    'news': {'news-grid': [3, 7]},
+    'album': {'albums-grid': [4, 9]},
+    'gallery': {'image-grid': [2, 5]},
+    'videos': {'videos-grid': [2, 5]},
+}
+
+# Selectors used when the client did not probe a section
+FALLBACK_SELECTORS = {
+    'latest-articles': '[data-group="latest-articles"] article',
+    'popular-news': '[data-group="popular-news"] article',
+    'news-grid': '#news-grid > *',
+    'albums-grid': '#albums-grid > *',
+    'videos-grid': '#videos-grid > *',
+    'image-grid': '#image-grid-container > *, #latest-image-grid-container > *',
+}
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def layout_version() -> str:
+    return safe_cache_get(LAYOUT_VERSION_KEY) or '0'
+
+
+def bump_layout_version() -> str:
+    """Invalidate every memoized recommendation in all workers."""
+    version = f"{time.time_ns():x}"
+    safe_cache_set(LAYOUT_VERSION_KEY, version, timeout=0)
+    with _memo_lock:
+        _memo.clear()
+    return version
+
+
+def _memo_get(key):
+    with _memo_lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+        return value
+
+
+def _memo_set(key, value):
+    with _memo_lock:
+        _memo[key] = value
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def candidate_positions(page_type: str, version: Optional[str] = None) -> Dict[str, List[int]]:
+    """Candidate "after N" positions per section key for a page type."""
+    version = version or layout_version()
+    memo_key = ('candidates', version, page_type)
+    cached = _memo_get(memo_key)
+    if cached is not None:
+        return cached
+
+    rules = LAYOUT_RULES.get(page_type, {})
+    placement_values = {
+        value for (value,) in db.session.query(AdPlacement.position_value).filter(
+            AdPlacement.is_active == True,
+            AdPlacement.page_type == page_type,
+            AdPlacement.position == 'after_n_items',
+            AdPlacement.position_value.isnot(None),
+        ).distinct()
+    } if rules else set()
+
+    candidates = {
+        key: sorted(set(after) | {v for v in placement_values if v > 0})
+        for key, after in rules.items()
+    }
+    _memo_set(memo_key, candidates)
+    return candidates
+
+
+def layout_signature(sections: List[dict], candidates: Dict[str, List[int]]) -> str:
+    """Stable hash of the parts of a section probe that affect recommendations."""
+    parts = []
+    for section in sorted(sections, key=lambda s: str(s.get('key') or 'default')):
+        key = str(section.get('key') or 'default')
+        if key not in candidates:
+            continue
+        ceiling = max(candidates[key]) if candidates[key] else 0
+        try:
+            count = max(0, int(section.get('item_count') or 0))
+        except (TypeError, ValueError):
+            count = 0
+        parts.append(f"{key}\x1f{section.get('selector') or ''}\x1f{min(count, ceiling)}")
+    return hashlib.md5('\x1e'.join(parts).encode()).hexdigest()
+
+
+def recommend_layout(page_type: str, sections: List[dict]) -> Dict[str, dict]:
+    """
+    Recommend insertion points for each known section of a page.
+
+    Args:
+        page_type: Page type (home, news, album, gallery, videos)
+        sections: Client probes like {"key", "selector", "item_count"}
+
+    Returns:
+        dict: {key: {"selector": str, "after": [n, ...]}}
+    """
+    version = layout_version()
+    candidates = candidate_positions(page_type, version)
+    memo_key = ('layout', version, page_type, layout_signature(sections, candidates))
+    cached = _memo_get(memo_key)
+    if cached is not None:
+        return cached
+
+    probed = {}
+    for section in sections:
+        try:
+            count = int(section.get('item_count') or 0)
+        except (TypeError, ValueError):
+            count = 0
+        probed[str(section.get('key') or 'default')] = {
+            'selector': section.get('selector') or '',
+            'item_count': count,
+        }
+
+    recommendations = {}
+    for key, positions in candidates.items():
+        sec = probed.get(key) or {'selector': FALLBACK_SELECTORS.get(key, ''), 'item_count': 0}
+        after = [n for n in positions if n <= max(0, sec['item_count'])]
+        # Always keep the smallest one even if zero count (to allow reservation)
+        if not after and positions:
+            after = [positions[0]]
+        recommendations[key] = {'selector': sec['selector'], 'after': after}
+
+    _memo_set(memo_key, recommendations)
+    return recommendations
+
+
+@event.listens_for(AdPlacement, 'after_insert')
+@event.listens_for(AdPlacement, 'after_update')
+@event.listens_for(AdPlacement, 'after_delete')
+def _mark_layout_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['ads_layout_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('ads_layout_dirty', False):
+        bump_layout_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('ads_layout_dirty', None)
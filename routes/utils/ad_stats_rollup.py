@@ -0,0 +1,353 @@
+"""
+Ad Stats Rollup Utilities
+
+Tracking endpoints write one AdStats row per ad per hour. This module keeps
+daily rollup tables (ad x day, campaign x day, placement x day) in sync with
+those rows, collapses old hourly rows into one row per ad per day, and answers
+dashboard queries with GROUP BY in SQL.
+
+Rollups cover every date before the "rollup boundary" (the day of the last
+refresh); dates from the boundary onwards are aggregated live from AdStats, so
+results stay exact between compactor runs.
+
+Every application process starts a compactor thread, but a pass only runs
+while holding an exclusive file lock in the instance folder; the other
+processes skip that pass.
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to a process lock
+    fcntl = None
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from models import (
+    db, Ad, AdPlacement, AdStats,
+    AdStatsDaily, AdCampaignStatsDaily, AdPlacementStatsDaily,
+)
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = 'ad_stats_compactor.lock'
+_process_lock = threading.Lock()
+
+DIMENSIONS = ('date', 'ad', 'campaign', 'placement')
+
+_SUMMED_COLUMNS = (
+    'impressions', 'clicks', 'viewable_impressions', 'revenue',
+    'unique_users', 'returning_users',
+    'desktop_impressions', 'mobile_impressions', 'tablet_impressions',
+)
+
+
+def _sum(column):
+    return func.coalesce(func.sum(column), 0)
+
+
+def refresh_rollups(start_date, end_date) -> int:
+    """
+    Rebuild all rollup rows for dates in [start_date, end_date] from AdStats.
+
+    Each table is cleared for the range and refilled with a single
+    INSERT ... SELECT ... GROUP BY, all in one transaction.
+
+    Returns:
+        int: Number of ad x day rollup rows written
+    """
+    now = literal(datetime.utcnow(), db.DateTime)
+    in_range = AdStats.date.between(start_date, end_date)
+
+    try:
+        for model in (AdStatsDaily, AdCampaignStatsDaily, AdPlacementStatsDaily):
+            db.session.execute(delete(model).where(model.date.between(start_date, end_date)))
+
+        ad_rows = db.session.execute(insert(AdStatsDaily).from_select(
+            ['ad_id', 'campaign_id', 'date', 'impressions', 'clicks', 'viewable_impressions', 'revenue',
+             'desktop_impressions', 'mobile_impressions', 'tablet_impressions', 'refreshed_at'],
+            select(
+                AdStats.ad_id, Ad.campaign_id, AdStats.date,
+                _sum(AdStats.impressions), _sum(AdStats.clicks), _sum(AdStats.viewable_impressions),
+                _sum(AdStats.revenue), _sum(AdStats.desktop_impressions), _sum(AdStats.mobile_impressions),
+                _sum(AdStats.tablet_impressions), now,
+            ).join(Ad, Ad.id == AdStats.ad_id).where(in_range)
+            .group_by(AdStats.ad_id, Ad.campaign_id, AdStats.date)
+        )).rowcount
+
+        db.session.execute(insert(AdCampaignStatsDaily).from_select(
+            ['campaign_id', 'date', 'impressions', 'clicks', 'viewable_impressions', 'revenue',
+             'active_ads', 'refreshed_at'],
+            select(
+                Ad.campaign_id, AdStats.date,
+                _sum(AdStats.impressions), _sum(AdStats.clicks), _sum(AdStats.viewable_impressions),
+                _sum(AdStats.revenue), func.count(func.distinct(AdStats.ad_id)), now,
+            ).join(Ad, Ad.id == AdStats.ad_id).where(in_range, Ad.campaign_id.isnot(None))
+            .group_by(Ad.campaign_id, AdStats.date)
+        ))
+
+        db.session.execute(insert(AdPlacementStatsDaily).from_select(
+            ['placement_id', 'date', 'impressions', 'clicks', 'viewable_impressions', 'revenue', 'refreshed_at'],
+            select(
+                AdPlacement.id, AdStats.date,
+                _sum(AdStats.impressions), _sum(AdStats.clicks), _sum(AdStats.viewable_impressions),
+                _sum(AdStats.revenue), now,
+            ).join(AdPlacement, AdPlacement.ad_id == AdStats.ad_id).where(in_range)
+            .group_by(AdPlacement.id, AdStats.date)
+        ))
+
+        db.session.commit()
+        return ad_rows or 0
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def compact_hourly_stats(before_date) -> int:
+    """
+    Collapse hourly AdStats rows dated before before_date into one row per ad per day.
+
+    Compacted rows keep every summed metric and have hour = NULL; the per-hour
+    geographic breakdowns are dropped.
+
+    Returns:
+        int: Net number of rows removed from ad_stats
+    """
+    hourly_dates = select(AdStats.date).where(
+        AdStats.date < before_date, AdStats.hour.isnot(None)
+    ).distinct()
+
+    try:
+        days = db.session.execute(
+            select(AdStats.ad_id, AdStats.date, *[_sum(getattr(AdStats, c)) for c in _SUMMED_COLUMNS])
+            .where(AdStats.date.in_(hourly_dates))
+            .group_by(AdStats.ad_id, AdStats.date)
+        ).all()
+        if not days:
+            return 0
+
+        removed = db.session.execute(
+            delete(AdStats).where(AdStats.date.in_({row.date for row in days})),
+            execution_options={'synchronize_session': False},
+        ).rowcount
+
+        now = datetime.utcnow()
+        db.session.execute(insert(AdStats), [
+            dict(zip(('ad_id', 'date') + _SUMMED_COLUMNS, tuple(row)),
+                 hour=None, created_at=now, updated_at=now)
+            for row in days
+        ])
+        db.session.commit()
+        return max((removed or 0) - len(days), 0)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rollup_boundary():
+    """First date that must be read live from AdStats, or None if no rollups exist yet."""
+    refreshed_at = db.session.query(func.max(AdStatsDaily.refreshed_at)).scalar()
+    if refreshed_at is None:
+        return None
+    if isinstance(refreshed_at, str):
+        refreshed_at = datetime.fromisoformat(refreshed_at)
+    return min(refreshed_at.date(), datetime.utcnow().date())
+
+
+def _rollup_query(dimension):
+    model, key = {
+        'date': (AdStatsDaily, None),
+        'ad': (AdStatsDaily, AdStatsDaily.ad_id),
+        'campaign': (AdCampaignStatsDaily, AdCampaignStatsDaily.campaign_id),
+        'placement': (AdPlacementStatsDaily, AdPlacementStatsDaily.placement_id),
+    }[dimension]
+    group = [model.date] + ([key] if key is not None else [])
+    query = db.session.query(
+        *group, _sum(model.impressions), _sum(model.clicks), _sum(model.revenue)
+    ).group_by(*group)
+    return query, model.date
+
+
+def _live_query(dimension):
+    key = {
+        'date': None,
+        'ad': AdStats.ad_id,
+        'campaign': Ad.campaign_id,
+        'placement': AdPlacement.id,
+    }[dimension]
+    group = [AdStats.date] + ([key] if key is not None else [])
+    query = db.session.query(
+        *group, _sum(AdStats.impressions), _sum(AdStats.clicks), _sum(AdStats.revenue)
+    )
+    if dimension == 'campaign':
+        query = query.join(Ad, Ad.id == AdStats.ad_id).filter(Ad.campaign_id.isnot(None))
+    elif dimension == 'placement':
+        query = query.join(AdPlacement, AdPlacement.ad_id == AdStats.ad_id)
+    return query.group_by(*group), AdStats.date
+
+
+def aggregate_stats(dimension: str = 'date', start_date=None, end_date=None) -> List[Dict]:
+    """
+    Aggregate impressions, clicks and revenue per day, optionally split by ad, campaign or placement.
+
+    Args:
+        dimension: One of DIMENSIONS
+        start_date: Inclusive lower date bound (optional)
+        end_date: Inclusive upper date bound (optional)
+
+    Returns:
+        list: Dicts with date, the dimension id (if any), impressions, clicks and revenue
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"dimension must be one of {', '.join(DIMENSIONS)}")
+
+    boundary = rollup_boundary()
+    parts = []
+    if boundary is not None and (start_date is None or start_date < boundary):
+        query, date_col = _rollup_query(dimension)
+        parts.append((query.filter(date_col < boundary), date_col))
+    if boundary is None or end_date is None or end_date >= boundary:
+        query, date_col = _live_query(dimension)
+        if boundary is not None:
+            query = query.filter(date_col >= boundary)
+        parts.append((query, date_col))
+
+    results = []
+    for query, date_col in parts:
+        if start_date:
+            query = query.filter(date_col >= start_date)
+        if end_date:
+            query = query.filter(date_col <= end_date)
+        for row in query.all():
+            item = {'date': row[0].isoformat() if hasattr(row[0], 'isoformat') else str(row[0])}
+            if dimension != 'date':
+                item[f'{dimension}_id'] = row[1]
+            item['impressions'] = int(row[-3] or 0)
+            item['clicks'] = int(row[-2] or 0)
+            item['revenue'] = float(row[-1] or 0)
+            results.append(item)
+    return results
+
+
+def stats_totals(start_date=None, end_date=None) -> Dict:
+    """Total impressions, clicks and revenue over a date range."""
+    totals = {'total_impressions': 0, 'total_clicks': 0, 'total_revenue': 0.0}
+    for row in aggregate_stats('date', start_date, end_date):
+        totals['total_impressions'] += row['impressions']
+        totals['total_clicks'] += row['clicks']
+        totals['total_revenue'] += row['revenue']
+    return totals
+
+
+def run_compaction(compact_after_days: int = 7, lookback_days: int = 1, today=None) -> Dict:
+    """
+    One compactor pass: refresh recent rollups and collapse old hourly rows.
+
+    The first pass (no rollups yet) rebuilds the full history. Later passes
+    start from the day of the last refresh, so days missed while the compactor
+    was down are re-rolled before their hourly rows are compacted.
+    """
+    today = today or datetime.utcnow().date()
+    boundary = rollup_boundary()
+    if boundary is None:
+        start_date = db.session.query(func.min(AdStats.date)).scalar() or today
+    else:
+        start_date = min(boundary, today - timedelta(days=lookback_days))
+
+    rollup_rows = refresh_rollups(start_date, today)
+    compacted_rows = compact_hourly_stats(today - timedelta(days=compact_after_days))
+    return {
+        'refreshed_from': start_date.isoformat(),
+        'rollup_rows': rollup_rows,
+        'compacted_rows': compacted_rows,
+    }
+
+
+@contextmanager
+def _pass_lock(path: str):
+    """Non-blocking exclusive lock on path; yields whether it was acquired."""
+    if fcntl is None:
+        acquired = _process_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _process_lock.release()
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class AdStatsCompactor:
+    """Daemon thread that runs run_compaction() every interval_seconds, one process at a time."""
+
+    def __init__(self, app, interval_seconds: int = 300, compact_after_days: int = 7,
+                 lock_path: Optional[str] = None):
+        self.app = app
+        self.interval_seconds = interval_seconds
+        self.compact_after_days = compact_after_days
+        self.lock_path = lock_path or os.path.join(app.instance_path, LOCK_FILENAME)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> Optional[Dict]:
+        """Run one pass; None if it failed or another process is running one."""
+        with _pass_lock(self.lock_path) as acquired:
+            if not acquired:
+                logger.debug("Ad stats compaction skipped: another process holds the lock")
+                return None
+            with self.app.app_context():
+                try:
+                    return run_compaction(self.compact_after_days)
+                except Exception as e:
+                    logger.error(f"Ad stats compaction failed: {e}")
+                    return None
+                finally:
+                    db.session.remove()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='ad-stats-compactor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Global compactor instance
+_compactor = None
+
+
+def start_ad_stats_compactor(app) -> AdStatsCompactor:
+    """Start the process-wide compactor using AD_STATS_* settings from app config."""
+    global _compactor
+    if _compactor is None:
+        _compactor = AdStatsCompactor(
+            app,
+            interval_seconds=int(app.config.get('AD_STATS_COMPACTOR_INTERVAL', 300)),
+            compact_after_days=int(app.config.get('AD_STATS_COMPACT_AFTER_DAYS', 7)),
+        )
+        _compactor.start()
+    return _compactor
@@ -0,0 +1,104 @@
+"""
+Comment Counters
+
+Comment rows carry denormalized like_count, dislike_count and reply_count
+columns so threads can be read without aggregating CommentLike or child
+rows. The endpoints adjust them with atomic "x = x + n" UPDATEs in the same
+transaction as the change itself; repair_comment_counters recomputes them
+from scratch in one set-based statement.
+
+reply_count counts visible replies: approved, not spam and not deleted.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import aliased
+
+from models import db, Comment, CommentLike
+
+
+def is_visible(comment: Comment) -> bool:
+    """Whether a comment is shown publicly (and counts as a reply)."""
+    return bool(comment.is_approved and not comment.is_spam and not comment.is_deleted)
+
+
+def bump_counters(comment_id: int, likes: int = 0, dislikes: int = 0, replies: int = 0) -> None:
+    """Atomically add the given deltas to a comment's counters."""
+    values = {}
+    if likes:
+        values[Comment.like_count] = Comment.like_count + likes
+    if dislikes:
+        values[Comment.dislike_count] = Comment.dislike_count + dislikes
+    if replies:
+        values[Comment.reply_count] = Comment.reply_count + replies
+    if values:
+        db.session.execute(
+            update(Comment).where(Comment.id == comment_id).values(values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_reaction_change(comment_id: int, before: Optional[bool], after: Optional[bool]) -> None:
+    """
+    Update like/dislike counters for one user's reaction change.
+
+    Args:
+        comment_id: Comment the reaction belongs to
+        before: True (like), False (dislike) or None (no reaction) before the change
+        after: Same, after the change
+    """
+    likes = (after is True) - (before is True)
+    dislikes = (after is False) - (before is False)
+    bump_counters(comment_id, likes=likes, dislikes=dislikes)
+
+
+def track_reply_visibility(comment: Comment, was_visible: bool) -> None:
+    """Adjust the parent's reply_count when a reply becomes visible or hidden."""
+    if not comment.parent_id:
+        return
+    now_visible = is_visible(comment)
+    if now_visible != was_visible:
+        bump_counters(comment.parent_id, replies=1 if now_visible else -1)
+
+
+def repair_comment_counters(comment_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute counters from CommentLike and reply rows in a single UPDATE.
+
+    Args:
+        comment_ids: Limit the repair to these comments (default: all)
+
+    Returns:
+        int: Number of comment rows updated
+    """
+    reply = aliased(Comment)
+
+    def reaction_count(is_like):
+        return select(func.count(CommentLike.id)).where(
+            CommentLike.comment_id == Comment.id,
+            CommentLike.is_like == is_like,
+            CommentLike.is_deleted == False,
+        ).scalar_subquery()
+
+    visible_replies = select(func.count(reply.id)).where(and_(
+        reply.parent_id == Comment.id,
+        reply.is_approved == True,
+        reply.is_spam == False,
+        reply.is_deleted == False,
+    )).scalar_subquery()
+
+    stmt = update(Comment).values(
+        like_count=reaction_count(True),
+        dislike_count=reaction_count(False),
+        reply_count=visible_replies,
+    ).execution_options(synchronize_session=False)
+    if comment_ids is not None:
+        comment_ids = list(comment_ids)
+        if not comment_ids:
+            return 0
+        stmt = stmt.where(Comment.id.in_(comment_ids))
+
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,172 @@
+"""
+Threaded Comment Loader
+
+Builds the JSON tree for a page of top-level comments in a fixed number of
+queries, independent of page size:
+
+1. approved, non-deleted replies of every comment on the page (one range
+   scan over the materialized path index)
+2. authors of all comments and replies (IN list)
+3. the viewer's own reactions (IN list, only when a viewer is given)
+
+Like, dislike and reply counts come from the denormalized columns on
+Comment (see comment_counters). The tree is then assembled in Python.
+
+Top-level comments are paged newest first with opaque keyset cursors over
+Comment.path instead of page numbers. Comments written without a path (raw
+inserts that bypass the assign_comment_path hook) get one the first time their
+thread is paged.
+"""
+
+import base64
+import re
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from models import db, Comment, CommentLike, User
+from routes.utils.comment_moderation import invalidate_comment_threads
+
+_PATH_RE = re.compile(r'^\d{%d}(\.\d{%d})*$' % (Comment.PATH_SEGMENT_WIDTH, Comment.PATH_SEGMENT_WIDTH))
+
+
+def encode_cursor(path: str) -> str:
+    """Opaque cursor for the position just after a comment path."""
+    return base64.urlsafe_b64encode(path.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed."""
+    try:
+        path = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not _PATH_RE.match(path):
+        raise ValueError('Invalid cursor')
+    return path
+
+
+def fill_missing_paths(content_type: str, content_id: int) -> int:
+    """
+    Assign materialized paths to the comments of a thread that have none,
+    parents before children (same scheme as assign_comment_path).
+
+    Returns:
+        int: Number of comments that got a path
+    """
+    rows = db.session.query(Comment.id, Comment.parent_id, Comment.path).filter(
+        Comment.content_type == content_type,
+        Comment.content_id == content_id,
+    ).all()
+    parents = {row.id: row.parent_id for row in rows}
+    paths = {row.id: row.path for row in rows}
+
+    def path_of(comment_id, seen=()):
+        if paths[comment_id] is None:
+            segment = Comment.path_segment(comment_id)
+            parent_id = parents[comment_id]
+            # Parents outside the thread or in a cycle start a new root
+            if parent_id in paths and parent_id not in seen:
+                segment = f"{path_of(parent_id, seen + (comment_id,))}.{segment}"
+            paths[comment_id] = segment
+        return paths[comment_id]
+
+    missing = Comment.query.filter(Comment.id.in_([row.id for row in rows if row.path is None])).all()
+    for comment in missing:
+        comment.path = path_of(comment.id)
+    if missing:
+        db.session.commit()
+        invalidate_comment_threads([(content_type, content_id)])
+    return len(missing)
+
+
+def page_top_level(query, cursor: Optional[str], per_page: int) -> Tuple[List[Comment], Optional[str]]:
+    """
+    Fetch one page of top-level comments, newest first.
+
+    Comments without a materialized path (rows written around the
+    assign_comment_path hook) are given one first, so they page normally.
+
+    Args:
+        query: Comment query already filtered to one thread's visible top-level comments
+        cursor: next_cursor from the previous page, or None for the first page
+        per_page: Page size
+
+    Returns:
+        tuple: (comments, next_cursor or None when this is the last page)
+    """
+    unpathed = query.filter(Comment.path.is_(None)).first()
+    if unpathed is not None:
+        fill_missing_paths(unpathed.content_type, unpathed.content_id)
+    if cursor:
+        query = query.filter(Comment.path < decode_cursor(cursor))
+    rows = query.order_by(Comment.path.desc()).limit(per_page + 1).all()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, encode_cursor(rows[-1].path)
+    return rows, None
+
+
+def _viewer_reactions(comment_ids, viewer_id):
+    rows = db.session.query(CommentLike.comment_id, CommentLike.is_like).filter(
+        CommentLike.comment_id.in_(comment_ids),
+        CommentLike.user_id == viewer_id,
+        CommentLike.is_deleted == False,
+    ).all()
+    return dict(rows)
+
+
+def load_comment_tree(comments: Iterable[Comment], viewer_id: Optional[int] = None) -> List[dict]:
+    """
+    Serialize top-level comments together with their replies.
+
+    Args:
+        comments: Top-level comments, already paged and ordered
+        viewer_id: Id of the logged-in user, adds user_liked/user_disliked
+
+    Returns:
+        list: Comment dicts, each with a "replies" list ordered oldest first
+    """
+    comments = list(comments)
+    if not comments:
+        return []
+
+    # Every reply sorts between its root's path and the root's path + "/" ("." < "/")
+    paths = [c.path for c in comments if c.path]
+    replies = []
+    if paths:
+        replies = Comment.query.filter(
+            Comment.content_type == comments[0].content_type,
+            Comment.content_id == comments[0].content_id,
+            Comment.path > min(paths) + '.',
+            Comment.path < max(paths) + '/',
+            Comment.parent_id.in_([c.id for c in comments]),
+            Comment.is_approved == True,
+            Comment.is_deleted == False,
+        ).order_by(Comment.path.asc()).all()
+
+    everything = comments + replies
+    ids = [c.id for c in everything]
+    authors = {
+        user.id: user
+        for user in User.query.filter(User.id.in_({c.user_id for c in everything})).all()
+    }
+    viewer = _viewer_reactions(ids, viewer_id) if viewer_id else None
+
+    def serialize(comment):
+        data = comment.to_dict(author=authors.get(comment.user_id))
+        if viewer is not None:
+            reaction = viewer.get(comment.id)
+            data['user_liked'] = reaction is True
+            data['user_disliked'] = reaction is False
+        return data
+
+    replies_by_parent = defaultdict(list)
+    for reply in replies:
+        replies_by_parent[reply.parent_id].append(serialize(reply))
+
+    tree = []
+    for comment in comments:
+        data = serialize(comment)
+        data['replies'] = replies_by_parent.get(comment.id, [])
+        tree.append(data)
+    return tree
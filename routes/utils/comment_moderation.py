@@ -0,0 +1,189 @@
+"""
+Comment Moderation Queue
+
+Admin moderation reads comments by their flags newest first. The queue is
+backed by idx_comment_moderation on (is_approved, is_spam, is_deleted,
+created_at) and paged with keyset cursors over (created_at, id), so deep
+pages cost the same as the first one.
+
+Bulk actions run as one UPDATE over the id list plus one set-based
+reply_count recount for the affected parents, inside a single transaction.
+Cached comment pages for the touched threads are invalidated afterwards in
+one batch by bumping per-thread versions that are part of the page cache
+keys (see thread_page_key).
+"""
+
+import base64
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from models import db, Comment
+from optimizations.cache_config import cache, safe_cache_get
+
+QUEUE_PAGE_SIZE = 20
+MAX_BULK_IDS = 500
+THREAD_PAGE_TIMEOUT = 300
+
+# status -> flag filters; every filter pins is_deleted so the index applies
+QUEUE_FILTERS = {
+    'all': {'is_deleted': False},
+    'pending': {'is_approved': False, 'is_spam': False, 'is_deleted': False},
+    'approved': {'is_approved': True, 'is_spam': False, 'is_deleted': False},
+    'rejected': {'is_approved': False, 'is_deleted': False},
+    'spam': {'is_spam': True, 'is_deleted': False},
+}
+
+# action -> column values written by the bulk UPDATE
+BULK_ACTIONS = {
+    'approve': {'is_approved': True, 'is_spam': False},
+    'reject': {'is_approved': False, 'is_spam': False},
+    'spam': {'is_approved': False, 'is_spam': True},
+    'delete': {'is_deleted': True},
+}
+
+
+# Thread page cache
+
+def _thread_version_key(content_type: str, content_id: int) -> str:
+    return f'comment_thread_version:{content_type}:{content_id}'
+
+
+def thread_page_key(content_type: str, content_id: int, per_page: int, cursor: Optional[str]) -> str:
+    """Cache key for one anonymous page of a thread; changes whenever the thread is invalidated."""
+    version = safe_cache_get(_thread_version_key(content_type, content_id)) or '0'
+    return f'comments_page:{content_type}:{content_id}:{version}:{per_page}:{cursor or ""}'
+
+
+def invalidate_comment_threads(threads: Iterable[Tuple[str, int]]) -> int:
+    """
+    Invalidate cached comment pages for the given threads in one cache call.
+
+    Args:
+        threads: (content_type, content_id) pairs
+
+    Returns:
+        int: Number of distinct threads invalidated
+    """
+    keys = {_thread_version_key(content_type, content_id) for content_type, content_id in threads}
+    if not keys:
+        return 0
+    version = f'{time.time_ns():x}'
+    try:
+        cache.set_many({key: version for key in keys}, timeout=0)
+    except Exception as e:
+        current_app.logger.warning(f"Comment thread invalidation failed: {e}")
+    return len(keys)
+
+
+# Moderation queue
+
+def encode_queue_cursor(created_at: datetime, comment_id: int) -> str:
+    """Opaque cursor for the queue position just after a comment."""
+    raw = f'{created_at.isoformat()}|{comment_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_queue_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_queue_cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, comment_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def moderation_query(status: str = 'all', content_type: str = ''):
+    """Comment query for a moderation status (unknown statuses fall back to 'all')."""
+    query = Comment.query.filter_by(**QUEUE_FILTERS.get(status, QUEUE_FILTERS['all']))
+    if content_type:
+        query = query.filter_by(content_type=content_type)
+    return query
+
+
+def page_queue(query, cursor: Optional[str], per_page: int = QUEUE_PAGE_SIZE) -> Tuple[List[Comment], Optional[str]]:
+    """
+    Fetch one page of the moderation queue, newest first.
+
+    Args:
+        query: Query from moderation_query
+        cursor: next_cursor from the previous page, or None for the first page
+        per_page: Page size
+
+    Returns:
+        tuple: (comments, next_cursor or None when this is the last page)
+    """
+    if cursor:
+        created_at, comment_id = decode_queue_cursor(cursor)
+        query = query.filter(or_(
+            Comment.created_at < created_at,
+            and_(Comment.created_at == created_at, Comment.id < comment_id),
+        ))
+    rows = query.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(per_page + 1).all()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, encode_queue_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, None
+
+
+# Bulk actions
+
+def _recount_replies(parent_ids: List[int]) -> None:
+    """Recompute reply_count for the given parents in one UPDATE (no commit)."""
+    reply = aliased(Comment)
+    visible_replies = select(func.count(reply.id)).where(and_(
+        reply.parent_id == Comment.id,
+        reply.is_approved == True,
+        reply.is_spam == False,
+        reply.is_deleted == False,
+    )).scalar_subquery()
+    db.session.execute(
+        update(Comment).where(Comment.id.in_(parent_ids)).values(reply_count=visible_replies)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bulk_moderate(action: str, ids: Iterable[int]) -> dict:
+    """
+    Apply a moderation action to many comments in one transaction.
+
+    Args:
+        action: One of BULK_ACTIONS
+        ids: Comment ids (at most MAX_BULK_IDS)
+
+    Returns:
+        dict: {'updated': rows changed, 'threads': threads invalidated}
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'Unknown action: {action}')
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return {'updated': 0, 'threads': 0}
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'At most {MAX_BULK_IDS} comments per request')
+
+    try:
+        affected = db.session.execute(
+            select(Comment.content_type, Comment.content_id, Comment.parent_id)
+            .where(Comment.id.in_(ids), Comment.is_deleted == False)
+        ).all()
+        values = dict(BULK_ACTIONS[action], updated_at=datetime.now(timezone.utc))
+        result = db.session.execute(
+            update(Comment).where(Comment.id.in_(ids), Comment.is_deleted == False).values(values)
+            .execution_options(synchronize_session=False)
+        )
+        parent_ids = sorted({row.parent_id for row in affected if row.parent_id})
+        if parent_ids:
+            _recount_replies(parent_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    threads = invalidate_comment_threads((row.content_type, row.content_id) for row in affected)
+    return {'updated': result.rowcount, 'threads': threads}
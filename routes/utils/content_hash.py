@@ -0,0 +1,36 @@
+"""
+Content Hashing
+
+SHA-256 helpers for image deduplication. Uploads are hashed while they are
+streamed to disk, so an identical upload is detected without reading the
+file a second time.
+"""
+
+import hashlib
+from typing import BinaryIO
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    """Hex SHA-256 of a file, read in CHUNK_SIZE blocks."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def save_stream_with_hash(stream: BinaryIO, path: str) -> str:
+    """
+    Copy a readable stream to path, hashing it on the way.
+
+    Returns:
+        str: Hex SHA-256 of the bytes written
+    """
+    sha = hashlib.sha256()
+    with open(path, 'wb') as out:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+            out.write(chunk)
+    return sha.hexdigest()
@@ -0,0 +1,153 @@
+"""
+Bulk Image Ingestion
+
+Imports a directory of images (e.g. images_to_upload/) straight into the
+library without going through the upload API.
+
+Files are hashed and then converted (WebP + thumbnails, the same pipeline as
+uploads) in a process pool. Image rows are written with one bulk INSERT per
+batch. A manifest file lists the SHA-256 of every file already handled, so an
+interrupted import continues where it stopped. Content the importing user
+already has (matching Image.content_hash) is skipped, as are duplicates within
+the run.
+Output names are derived from the content hash, so a batch that is converted
+again after a crash overwrites its own files.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from werkzeug.utils import secure_filename
+
+from models import db, Image
+from optimizations.image_jobs import process_image_file
+from routes.utils.content_hash import sha256_file
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+MANIFEST_NAME = '.ingest_manifest'
+
+
+def scan_directory(directory: str, extensions: Iterable[str] = IMAGE_EXTENSIONS) -> List[str]:
+    """Image files under directory (recursive), in a stable order."""
+    extensions = {ext.lower() for ext in extensions}
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                found.append(os.path.join(root, name))
+    return found
+
+
+def read_manifest(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def append_manifest(path: str, digests: Iterable[str]) -> None:
+    """Record handled hashes; flushed to disk before the next batch starts."""
+    with open(path, 'a') as f:
+        f.writelines(f'{digest}\n' for digest in digests)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def output_base(upload_dir: str, source: str, digest: str) -> str:
+    """Deterministic output path (without extension) for a source file."""
+    stem = secure_filename(os.path.splitext(os.path.basename(source))[0]) or 'image'
+    return os.path.join(upload_dir, f'{digest[:12]}_{stem[:80]}')
+
+
+def _hash_one(source: str) -> Tuple[str, Optional[str]]:
+    try:
+        return source, sha256_file(source)
+    except OSError:
+        return source, None
+
+
+def _convert_one(item: Tuple[str, str, str]) -> Tuple[str, Optional[str], Optional[str]]:
+    source, digest, base = item
+    try:
+        result = process_image_file(source, output_base=base)
+        return digest, result['webp'], None
+    except Exception as e:
+        return digest, None, f'{source}: {e}'
+
+
+def ingest_directory(directory: str, user_id: int, upload_dir: str = 'static/uploads',
+                     manifest_path: Optional[str] = None, workers: Optional[int] = None,
+                     batch_size: int = 200, is_visible: bool = True,
+                     report: Optional[Callable[[str], None]] = None,
+                     root_dir: str = PROJECT_ROOT) -> dict:
+    """
+    Import every image under directory as an Image owned by user_id.
+
+    Image.filepath is stored as upload_dir/<file>, relative to root_dir like
+    uploads through the app; root_dir is only used to locate the files.
+
+    Returns:
+        dict: counts for 'found', 'imported', 'skipped' (manifest, library or
+        in-run duplicates) and 'errors' (list of messages)
+    """
+    report = report or (lambda message: None)
+    manifest_path = manifest_path or os.path.join(directory, MANIFEST_NAME)
+    os.makedirs(os.path.join(root_dir, upload_dir), exist_ok=True)
+
+    done = read_manifest(manifest_path)
+    sources = scan_directory(directory)
+    stats = {'found': len(sources), 'imported': 0, 'skipped': 0, 'errors': []}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Hash everything first so duplicates are never decoded
+        hashed = []
+        for source, digest in pool.map(_hash_one, sources, chunksize=32):
+            if digest is None:
+                stats['errors'].append(f'{source}: unreadable')
+            else:
+                hashed.append((source, digest))
+
+        in_library = set()
+        digests = [digest for _, digest in hashed]
+        for start in range(0, len(digests), 500):
+            in_library.update(db.session.execute(
+                select(Image.content_hash).where(Image.user_id == user_id,
+                                                 Image.content_hash.in_(digests[start:start + 500]))
+            ).scalars())
+
+        pending, seen = [], set()
+        for source, digest in hashed:
+            if digest in done or digest in in_library or digest in seen:
+                stats['skipped'] += 1
+            else:
+                seen.add(digest)
+                pending.append((source, digest, output_base(os.path.join(root_dir, upload_dir), source, digest)))
+        report(f'{len(sources)} file(s) found, {len(pending)} to import, {stats["skipped"]} already present')
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            rows = []
+            for digest, webp_path, error in pool.map(_convert_one, batch, chunksize=4):
+                if error:
+                    stats['errors'].append(error)
+                    continue
+                rows.append({
+                    'filename': os.path.basename(webp_path),
+                    'filepath': os.path.join(upload_dir, os.path.basename(webp_path)),
+                    'content_hash': digest,
+                    'is_visible': is_visible,
+                    'user_id': user_id,
+                })
+            if rows:
+                # One executemany INSERT per batch, then mark the batch done
+                db.session.execute(insert(Image), rows)
+                db.session.commit()
+                append_manifest(manifest_path, [row['content_hash'] for row in rows])
+                stats['imported'] += len(rows)
+            report(f'  {min(start + batch_size, len(pending))}/{len(pending)} converted, {stats["imported"]} imported')
+
+    return stats
@@ -0,0 +1,186 @@
+"""
+Image Usage Index
+
+Keeps the image_usage table in step with the rows that reference library
+images, so "where is this image used?" is one indexed lookup instead of a
+scan over news and album bodies.
+
+References are collected when News, Album, AlbumChapter and Ad rows are
+flushed:
+
+- foreign keys (News.image_id, Album.cover_image_id)
+- image URL columns (og/twitter images, ad image URLs)
+- image links embedded in markdown/HTML bodies, either /img/<id>/... variant
+  URLs or static/uploads/<file> paths (thumbnails map to their image)
+
+Only owners whose tracked columns changed are rewritten. rebuild_image_usage
+recomputes the whole table, e.g. after the migration. Importing this module
+registers the flush listener (routes_images does so for the app).
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import db, Ad, Album, AlbumChapter, Image, ImageUsage, News
+
+# owner_type -> (model, id columns, URL columns, text columns)
+USAGE_SOURCES = {
+    'news': (News, ('image_id',), ('og_image', 'twitter_image'), ('content',)),
+    'album': (Album, ('cover_image_id',), ('og_image', 'twitter_image'), ('description',)),
+    'chapter': (AlbumChapter, (), ('og_image', 'twitter_image'), ()),
+    'ad': (Ad, (), ('image_url', 'image_upload_path'), ('html_content',)),
+}
+OWNER_TYPES = {spec[0]: owner_type for owner_type, spec in USAGE_SOURCES.items()}
+
+IMAGE_REF_RE = re.compile(
+    r'/img/(?P<id>\d+)/\d+\.\w+'
+    r'|static/uploads/(?P<file>[\w.\-]+?)(?:_thumb_(?:portrait|square|landscape))?(?P<ext>\.\w+)(?=[\s"\'\)\?#<]|$)'
+)
+
+Ref = Tuple[Optional[int], Optional[str], str]  # (image id, filename, field)
+
+
+def extract_refs(owner) -> List[Ref]:
+    """References held by an owner row, as (image_id or None, filename or None, field)."""
+    _, id_columns, url_columns, text_columns = USAGE_SOURCES[OWNER_TYPES[type(owner)]]
+    refs = []
+    for column in id_columns:
+        value = getattr(owner, column, None)
+        if value:
+            refs.append((int(value), None, column))
+    for column in url_columns + text_columns:
+        for match in IMAGE_REF_RE.finditer(getattr(owner, column, None) or ''):
+            if match.group('id'):
+                refs.append((int(match.group('id')), None, column))
+            else:
+                # Library files are stored as WebP; thumbnails share the base name
+                refs.append((None, f"{match.group('file')}.webp", column))
+    return refs
+
+
+def _resolve(connection, refs_by_owner: Dict[Tuple[str, int], List[Ref]]) -> List[dict]:
+    """Turn refs into image_usage rows, looking filenames and ids up in one query each."""
+    names = {name for refs in refs_by_owner.values() for _, name, _ in refs if name}
+    ids = {image_id for refs in refs_by_owner.values() for image_id, _, _ in refs if image_id}
+    by_name = dict(connection.execute(
+        select(Image.filename, Image.id).where(Image.filename.in_(names))
+    ).all()) if names else {}
+    existing = set(connection.execute(
+        select(Image.id).where(Image.id.in_(ids))
+    ).scalars()) if ids else set()
+
+    rows = set()
+    for (owner_type, owner_id), refs in refs_by_owner.items():
+        for image_id, name, field in refs:
+            image_id = image_id if image_id in existing else by_name.get(name)
+            if image_id:
+                rows.add((image_id, owner_type, owner_id, field))
+    return [dict(zip(('image_id', 'owner_type', 'owner_id', 'field'), row)) for row in sorted(rows)]
+
+
+def _tracked_columns(owner_type: str) -> Tuple[str, ...]:
+    _, id_columns, url_columns, text_columns = USAGE_SOURCES[owner_type]
+    return id_columns + url_columns + text_columns
+
+
+def _changed(obj) -> bool:
+    state = db.inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in _tracked_columns(OWNER_TYPES[type(obj)]))
+
+
+def write_usage(connection, refs_by_owner: Dict[Tuple[str, int], List[Ref]]) -> int:
+    """Replace the usage rows of the given owners. Returns rows inserted."""
+    if not refs_by_owner:
+        return 0
+    by_type = defaultdict(list)
+    for owner_type, owner_id in refs_by_owner:
+        by_type[owner_type].append(owner_id)
+    for owner_type, owner_ids in by_type.items():
+        connection.execute(delete(ImageUsage).where(
+            ImageUsage.owner_type == owner_type, ImageUsage.owner_id.in_(owner_ids)
+        ))
+    rows = _resolve(connection, refs_by_owner)
+    if rows:
+        connection.execute(insert(ImageUsage), rows)
+    return len(rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_image_usage(session, flush_context):
+    refs_by_owner = {}
+    for obj in session.new:
+        if type(obj) in OWNER_TYPES:
+            refs_by_owner[(OWNER_TYPES[type(obj)], obj.id)] = extract_refs(obj)
+    for obj in session.dirty:
+        if type(obj) in OWNER_TYPES and _changed(obj):
+            refs_by_owner[(OWNER_TYPES[type(obj)], obj.id)] = extract_refs(obj)
+    deleted_images = []
+    for obj in session.deleted:
+        if type(obj) in OWNER_TYPES:
+            refs_by_owner[(OWNER_TYPES[type(obj)], obj.id)] = []
+        elif isinstance(obj, Image):
+            deleted_images.append(obj.id)
+
+    connection = session.connection()
+    if deleted_images:
+        connection.execute(delete(ImageUsage).where(ImageUsage.image_id.in_(deleted_images)))
+    write_usage(connection, refs_by_owner)
+
+
+def rebuild_image_usage(batch_size: int = 500) -> int:
+    """Recompute the whole image_usage table from the owner rows. Returns rows written."""
+    db.session.execute(delete(ImageUsage))
+    written = 0
+    for owner_type, (model, *_columns) in USAGE_SOURCES.items():
+        columns = [model.id] + [getattr(model, c) for c in _tracked_columns(owner_type)]
+        result = db.session.execute(select(*columns).execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            refs_by_owner = {}
+            for row in batch:
+                owner = model()
+                for column, value in zip(['id'] + list(_tracked_columns(owner_type)), row):
+                    setattr(owner, column, value)
+                refs = extract_refs(owner)
+                if refs:
+                    refs_by_owner[(owner_type, row.id)] = refs
+            rows = _resolve(db.session.connection(), refs_by_owner)
+            if rows:
+                db.session.execute(insert(ImageUsage), rows)
+                written += len(rows)
+    db.session.commit()
+    return written
+
+
+def usage_for_image(image_id: int) -> List[dict]:
+    """Where an image is used, with owner titles, in one query."""
+    title = case(
+        (ImageUsage.owner_type == 'news', select(News.title).where(News.id == ImageUsage.owner_id).scalar_subquery()),
+        (ImageUsage.owner_type == 'album', select(Album.title).where(Album.id == ImageUsage.owner_id).scalar_subquery()),
+        (ImageUsage.owner_type == 'chapter', select(AlbumChapter.chapter_title).where(AlbumChapter.id == ImageUsage.owner_id).scalar_subquery()),
+        (ImageUsage.owner_type == 'ad', select(Ad.title).where(Ad.id == ImageUsage.owner_id).scalar_subquery()),
+        else_=literal(None),
+    )
+    rows = db.session.execute(
+        select(ImageUsage.owner_type, ImageUsage.owner_id, func.group_concat(ImageUsage.field), title.label('title'))
+        .where(ImageUsage.image_id == image_id)
+        .group_by(ImageUsage.owner_type, ImageUsage.owner_id)
+        .order_by(ImageUsage.owner_type, ImageUsage.owner_id)
+    ).all()
+    return [
+        {'owner_type': owner_type, 'owner_id': owner_id, 'fields': sorted(fields.split(',')), 'title': title}
+        for owner_type, owner_id, fields, title in rows
+    ]
+
+
+def images_in_use(image_ids: Iterable[int]) -> Set[int]:
+    """Subset of image ids that are referenced anywhere."""
+    image_ids = list(image_ids)
+    if not image_ids:
+        return set()
+    return set(db.session.execute(
+        select(ImageUsage.image_id).where(ImageUsage.image_id.in_(image_ids)).distinct()
+    ).scalars())
@@ -0,0 +1,181 @@
+"""
+robots.txt Publishing
+
+robots.txt only depends on the site URL its Sitemap lines point to, so it is
+rendered when that setting changes instead of on request: a committed change
+to SEOInjectionSettings or to the BrandIdentity SEO settings renders it in the
+saving transaction and, after commit, replaces ROBOTS_TXT_PATH (default
+<root_path>/robots.txt) atomically. The app renders it once at startup.
+
+The /robots.txt route never queries the database. It serves the file with an
+ETag and Last-Modified; the rendered text and its ETag are also kept in this
+worker's memory and in the shared cache, so the route still answers when the
+file cannot be written (read-only filesystems) and every worker sees the
+latest render.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from typing import Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, BrandIdentity, SEOInjectionSettings
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+
+logger = logging.getLogger(__name__)
+
+ROBOTS_CACHE_KEY = 'robots_txt'
+DEFAULT_WEBSITE_URL = 'https://hystory.id'
+
+ROBOTS_TEMPLATE = """User-agent: *
+Allow: /
+
+# Disallow admin and private areas
+Disallow: /settings/
+Disallow: /api/
+Disallow: /admin/
+Disallow: /login
+Disallow: /register
+Disallow: /logout
+
+# Allow important public content
+Allow: /news/
+Allow: /videos/
+Allow: /gallery/
+Allow: /about/
+Allow: /utama/
+Allow: /hypes/
+Allow: /premium/
+
+# Crawl delay (optional - be respectful to server)
+Crawl-delay: 1
+
+# Sitemap locations
+Sitemap: {website_url}/sitemap.xml
+Sitemap: {website_url}/sitemap-news.xml
+Sitemap: {website_url}/sitemap-index.xml
+"""
+
+_published = None  # this worker's last record: {'text', 'etag', 'modified', 'path'}
+
+
+def robots_website_url(session=None) -> str:
+    """Site URL from the SEO injection settings, then the SEO settings page, then the default."""
+    session = session or db.session
+    if inspect(session.connection()).has_table(SEOInjectionSettings.__tablename__):
+        url = session.scalar(select(SEOInjectionSettings.website_url).limit(1))
+        if url:
+            return url.rstrip('/')
+    settings = session.scalar(select(BrandIdentity.seo_settings).limit(1))
+    if isinstance(settings, dict) and settings.get('website_url'):
+        return settings['website_url'].rstrip('/')
+    return DEFAULT_WEBSITE_URL
+
+
+def render_robots_txt(session=None) -> str:
+    return ROBOTS_TEMPLATE.format(website_url=robots_website_url(session))
+
+
+def robots_path() -> str:
+    return current_app.config.get('ROBOTS_TXT_PATH') or os.path.join(current_app.root_path, 'robots.txt')
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def publish_robots_txt(text: Optional[str] = None) -> dict:
+    """
+    Write robots.txt and share it with every worker.
+
+    Args:
+        text: Rendered content (rendered from the database when omitted)
+
+    Returns:
+        dict: The published record
+    """
+    global _published
+    if text is None:
+        text = render_robots_txt()
+    etag = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    previous = _published or safe_cache_get(ROBOTS_CACHE_KEY)
+    modified = previous['modified'] if previous and previous['etag'] == etag else time.time()
+
+    path = robots_path()
+    try:
+        _write_atomic(path, text)
+    except OSError as e:
+        current_app.logger.warning(f"robots.txt is not writable, serving it from memory: {e}")
+        path = None
+
+    _published = {'text': text, 'etag': etag, 'modified': modified, 'path': path}
+    safe_cache_set(ROBOTS_CACHE_KEY, _published, timeout=0)
+    return _published
+
+
+def published_robots_txt() -> dict:
+    """The latest published record; renders only if nothing was published yet."""
+    global _published
+    shared = safe_cache_get(ROBOTS_CACHE_KEY)
+    if shared:
+        _published = shared
+    elif _published is None:
+        publish_robots_txt()
+    return _published
+
+
+def _settings_changed(session) -> bool:
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, SEOInjectionSettings):
+            return True
+        if isinstance(obj, BrandIdentity) and (
+                obj in session.new or obj in session.deleted
+                or inspect(obj).attrs.seo_settings.history.has_changes()):
+            return True
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_settings_change(session, flush_context):
+    if _settings_changed(session):
+        session.info['robots_txt_stale'] = True
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _render_after_flush(session, flush_context):
+    if session.info.pop('robots_txt_stale', False):
+        try:
+            session.info['robots_txt'] = render_robots_txt(session)
+        except Exception as e:
+            logger.warning(f"Could not render robots.txt: {e}")
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    text = session.info.pop('robots_txt', None)
+    if text is not None and has_app_context():
+        try:
+            publish_robots_txt(text)
+        except Exception as e:
+            logger.warning(f"Could not publish robots.txt: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('robots_txt_stale', None)
+    session.info.pop('robots_txt', None)
@@ -0,0 +1,178 @@
+"""
+Save-time SEO Materialization
+
+News articles, albums and chapters store their generated SEO on the row:
+slug, meta description and keywords, Open Graph and Twitter fields, canonical
+URL and the serialized JSON-LD block in schema_markup. inject_seo_data and the
+detail templates only read those columns.
+
+Session listeners regenerate a row's fields in the same transaction as the
+save whenever it is inserted or one of its SEO inputs changes (an article's
+chapters follow its content). Rows with is_seo_lock, and saves that set SEO
+fields by hand, are left alone. Changes that alter many rows at once - the
+brand name, website URL or SEO templates in BrandIdentity, or album fields
+that its chapters repeat - queue the incremental injection job in the
+background once the transaction commits.
+"""
+
+import logging
+from typing import Iterable
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, Album, AlbumChapter, BrandIdentity, News
+from seo_injector import seo_injection_job
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {News: 'news', Album: 'albums', AlbumChapter: 'chapters'}
+
+# model -> columns whose change alters its generated SEO (mirrors seo_injection_job.SOURCES)
+SEO_INPUTS = {
+    News: ('title', 'content', 'date', 'user_id', 'image_id', 'category_id',
+           'is_main_news', 'is_premium', 'is_archived'),
+    Album: ('title', 'description', 'author', 'user_id', 'cover_image_id', 'category_id',
+            'is_completed', 'is_premium', 'total_chapters'),
+    AlbumChapter: ('chapter_number', 'chapter_title', 'album_id', 'news_id'),
+}
+
+# Generated columns; a save that sets any of them is a manual SEO edit
+SEO_OUTPUTS = (
+    'seo_slug', 'meta_description', 'meta_keywords', 'meta_author', 'meta_language', 'meta_robots',
+    'og_title', 'og_description', 'og_image', 'canonical_url', 'schema_markup', 'structured_data_type',
+    'twitter_card', 'twitter_title', 'twitter_description', 'twitter_image',
+)
+_WRITTEN = SEO_OUTPUTS + ('seo_score', 'last_seo_audit', 'is_seo_lock', 'seo_source_hash')
+
+BRAND_INPUTS = ('brand_name', 'website_url', 'seo_settings')
+
+
+def _changed(obj, columns: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+def materialize_seo(session, objects) -> int:
+    """Regenerate the SEO fields of flushed rows in place; return how many succeeded."""
+    fingerprint = seo_injection_job.settings_fingerprint(session)
+    done = 0
+    for obj in objects:
+        model = type(obj)
+        _, sources, inject_item = seo_injection_job.SOURCES[CONTENT_TYPES[model]]
+        try:
+            row = session.execute(sources().where(model.id == obj.id)).first()
+            inject_item(obj)
+            obj.seo_source_hash = seo_injection_job.source_hash(fingerprint, row[3:])
+            done += 1
+        except Exception as e:
+            # Never fail the save: drop the partial output, the next injection run retries the row
+            session.expire(obj, _WRITTEN)
+            logger.warning(f"Could not generate SEO for {model.__name__} {obj.id}: {e}")
+    return done
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_seo_rows(session, flush_context, instances):
+    pending = session.info.setdefault('seo_pending', [])
+    rerun = session.info.setdefault('seo_rerun', set())
+
+    def add(obj):
+        if not obj.is_seo_lock and obj not in session.deleted and all(p is not obj for p in pending):
+            pending.append(obj)
+
+    for obj in list(session.new) + list(session.dirty):
+        model = type(obj)
+        if model is BrandIdentity:
+            if obj in session.new or _changed(obj, BRAND_INPUTS):
+                rerun.update(('news', 'albums', 'chapters'))
+            continue
+        inputs = SEO_INPUTS.get(model)
+        if inputs is None or _changed(obj, SEO_OUTPUTS):
+            continue
+        if obj in session.new:
+            add(obj)
+        elif _changed(obj, inputs):
+            add(obj)
+            if model is News:
+                for chapter in obj.album_chapters:
+                    add(chapter)
+            elif model is Album:
+                rerun.add('chapters')
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _materialize_after_flush(session, flush_context):
+    pending = session.info.pop('seo_pending', None)
+    if pending:
+        # The changes are flushed by the commit that follows (or the next flush)
+        materialize_seo(session, pending)
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_after_commit(session):
+    rerun = session.info.pop('seo_rerun', None)
+    if rerun and has_app_context():
+        try:
+            seo_injection_job.start_seo_injection_job(current_app._get_current_object(),
+                                                      [t for t in seo_injection_job.CONTENT_TYPES if t in rerun],
+                                                      queue=True)
+        except Exception as e:
+            logger.warning(f"Could not queue SEO recompute: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('seo_pending', None)
+    session.info.pop('seo_rerun', None)
+
+
+# seo_data keys served from the content row
+RENDERED_FIELDS = (
+    'meta_description', 'meta_keywords', 'meta_author', 'meta_language', 'meta_robots', 'canonical_url',
+    'og_title', 'og_description', 'og_image',
+    'twitter_card', 'twitter_title', 'twitter_description', 'twitter_image', 'schema_markup',
+)
+
+
+def content_seo_for_path(path: str):
+    """
+    Stored SEO of the visible article, album or chapter a public URL points to.
+
+    Reads only the precomputed columns, in one query.
+
+    Returns:
+        tuple: ({field: value} for the non-empty fields, og:type), or (None, None)
+    """
+    parts = path.strip('/').split('/')
+    try:
+        if len(parts) >= 4 and parts[0] in ('album', 'novel') and parts[2] == 'chapter':
+            stmt = (
+                select(*(getattr(AlbumChapter, f) for f in RENDERED_FIELDS))
+                .join(Album, AlbumChapter.album_id == Album.id)
+                .where(AlbumChapter.id == int(parts[3]), AlbumChapter.album_id == int(parts[1]),
+                       Album.is_visible.is_(True))
+            )
+            og_type = 'article'
+        elif len(parts) >= 2 and parts[0] in ('album', 'novel'):
+            stmt = (
+                select(*(getattr(Album, f) for f in RENDERED_FIELDS))
+                .where(Album.id == int(parts[1]), Album.is_visible.is_(True))
+            )
+            og_type = 'book'
+        elif len(parts) >= 2 and parts[0] in ('news', 'stories'):
+            stmt = (
+                select(*(getattr(News, f) for f in RENDERED_FIELDS))
+                .where(News.id == int(parts[1]), News.is_visible.is_(True))
+            )
+            og_type = 'article'
+        else:
+            return None, None
+    except ValueError:
+        return None, None  # Not a numeric id
+
+    row = db.session.execute(stmt).first()
+    if row is None:
+        return None, None
+    return {field: value for field, value in row._mapping.items() if value}, og_type
@@ -0,0 +1,111 @@
+"""
+Root SEO Resolver
+
+Resolves the RootSEO settings for a request path without a database query.
+Every worker keeps all active RootSEO rows in an immutable map (read-only
+mappings keyed by page_identifier), tagged with a version kept in the shared
+cache. Any committed change to RootSEO - the SEO admin endpoints, the root
+page injector - bumps the version, and each worker reloads its map on the
+next request that sees the new version.
+
+Paths resolve to the most specific identifier: "/" is "home", "/news/123/x"
+tries "news/123/x", "news/123", then "news".
+"""
+
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, RootSEO
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+
+ROOT_SEO_VERSION_KEY = 'root_seo_version'
+
+FIELDS = (
+    'page_identifier', 'page_name',
+    'meta_title', 'meta_description', 'meta_keywords', 'meta_author', 'meta_language', 'meta_robots',
+    'canonical_url', 'og_title', 'og_description', 'og_image', 'og_type',
+    'twitter_card', 'twitter_title', 'twitter_description', 'twitter_image',
+    'structured_data_type', 'schema_markup',
+)
+
+_snapshot = (None, MappingProxyType({}))  # (version, {page_identifier: entry})
+_snapshot_lock = threading.Lock()
+
+
+def root_seo_version() -> str:
+    return safe_cache_get(ROOT_SEO_VERSION_KEY) or '0'
+
+
+def bump_root_seo_version() -> str:
+    """Make every worker reload its root SEO map on its next request."""
+    global _snapshot
+    version = f"{time.time_ns():x}"
+    safe_cache_set(ROOT_SEO_VERSION_KEY, version, timeout=0)
+    with _snapshot_lock:
+        _snapshot = (None, MappingProxyType({}))
+    return version
+
+
+def _load_entries() -> Mapping[str, Mapping]:
+    rows = db.session.execute(
+        select(*(getattr(RootSEO, field) for field in FIELDS)).where(RootSEO.is_active.is_(True))
+    ).mappings()
+    return MappingProxyType({row['page_identifier']: MappingProxyType(dict(row)) for row in rows})
+
+
+def root_seo_map() -> Mapping[str, Mapping]:
+    """All active root SEO entries of the current version."""
+    global _snapshot
+    version = root_seo_version()
+    loaded_version, entries = _snapshot
+    if loaded_version == version:
+        return entries
+    with _snapshot_lock:
+        if _snapshot[0] != version:
+            _snapshot = (version, _load_entries())
+        return _snapshot[1]
+
+
+def resolve_root_seo(path: str) -> Optional[Mapping]:
+    """Root SEO entry for a request path, or None."""
+    entries = root_seo_map()
+    parts = [part for part in path.split('/') if part]
+    if not parts:
+        return entries.get('home')
+    for end in range(len(parts), 0, -1):
+        entry = entries.get('/'.join(parts[:end]))
+        if entry is not None:
+            return entry
+    return None
+
+
+def wants_seo(request) -> bool:
+    """False for API and JSON requests, whose responses never carry SEO tags."""
+    if request.path.startswith('/api/') or request.is_json:
+        return False
+    return request.accept_mimetypes.best != 'application/json'
+
+
+@event.listens_for(RootSEO, 'after_insert')
+@event.listens_for(RootSEO, 'after_update')
+@event.listens_for(RootSEO, 'after_delete')
+def _mark_root_seo_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['root_seo_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('root_seo_dirty', False):
+        bump_root_seo_version()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('root_seo_dirty', None)
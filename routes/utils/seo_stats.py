@@ -0,0 +1,159 @@
+"""
+SEO Coverage Statistics
+
+Counts behind the SEO dashboard: how many news articles, albums, chapters and
+root pages have each SEO field filled, how many are locked, and how their
+scores fall into bands. Each content type is summarized by one
+conditional-aggregation query (COUNT plus SUM(CASE WHEN ... THEN 1 ELSE 0 END)
+per field and band), so no rows are loaded. Root pages have no stored score;
+theirs is RootSEO.calculate_seo_score() written as a SQL expression.
+
+The result is kept in the shared cache under a version kept there too. A
+committed insert or delete of any of those rows, or a change to one of their
+SEO fields, bumps the version; counter updates do not.
+"""
+
+import time
+from typing import Dict
+
+from sqlalchemy import and_, case, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from models import db, Album, AlbumChapter, News, RootSEO
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+
+SEO_STATS_KEY = 'seo_coverage_stats:{}'
+SEO_STATS_VERSION_KEY = 'seo_coverage_stats_version'
+STATS_TIMEOUT = 3600  # safety net; saves invalidate sooner
+
+# stats key -> model, in dashboard order
+CONTENT_MODELS = {'articles': News, 'albums': Album, 'chapters': AlbumChapter}
+
+COVERAGE_FIELDS = ('meta_description', 'meta_keywords', 'og_title', 'og_description', 'schema_markup')
+CONTENT_ONLY_FIELDS = ('seo_slug',)
+
+# Fields RootSEO.calculate_seo_score() counts, each worth 100/8 points
+ROOT_SCORE_FIELDS = ('meta_title', 'meta_description', 'meta_keywords', 'og_title', 'og_description',
+                     'og_image', 'canonical_url', 'schema_markup')
+
+# model -> columns whose change alters the statistics
+TRACKED_MODELS = {
+    News: COVERAGE_FIELDS + CONTENT_ONLY_FIELDS + ('seo_score', 'is_seo_lock'),
+    Album: COVERAGE_FIELDS + CONTENT_ONLY_FIELDS + ('seo_score', 'is_seo_lock'),
+    AlbumChapter: COVERAGE_FIELDS + CONTENT_ONLY_FIELDS + ('seo_score', 'is_seo_lock'),
+    RootSEO: ROOT_SCORE_FIELDS,
+}
+
+
+def _filled(column):
+    return and_(column.isnot(None), column != '')
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _score_columns(score, total) -> dict:
+    """Aggregates of a score expression; bands match the dashboard's charts."""
+    return {
+        'total': total,
+        'scored': _count_if(score.isnot(None)),
+        'score_sum': func.coalesce(func.sum(score), 0),
+        'excellent': _count_if(score >= 90),
+        'good': _count_if(and_(score >= 80, score < 90)),
+        'fair': _count_if(and_(score >= 60, score < 80)),
+        'poor': _count_if(score < 60),
+        'incomplete': _count_if(and_(score >= 40, score < 80)),
+        'missing': _count_if(or_(score.is_(None), score < 40)),
+    }
+
+
+def root_seo_score():
+    """SQL form of RootSEO.calculate_seo_score()."""
+    filled = sum(case((_filled(getattr(RootSEO, field)), 1), else_=0) for field in ROOT_SCORE_FIELDS)
+    return (filled * 100) // len(ROOT_SCORE_FIELDS)
+
+
+def _content_stats(model) -> dict:
+    columns = _score_columns(model.seo_score, func.count(model.id))
+    for field in COVERAGE_FIELDS + CONTENT_ONLY_FIELDS:
+        columns[f'with_{field}'] = _count_if(_filled(getattr(model, field)))
+    columns['locked'] = _count_if(model.is_seo_lock.is_(True))
+    row = db.session.execute(select(*(c.label(name) for name, c in columns.items()))).one()
+    return {name: int(value) for name, value in row._mapping.items()}
+
+
+def _root_stats() -> dict:
+    columns = _score_columns(root_seo_score(), func.count(RootSEO.id))
+    for field in COVERAGE_FIELDS:
+        columns[f'with_{field}'] = _count_if(_filled(getattr(RootSEO, field)))
+    row = db.session.execute(select(*(c.label(name) for name, c in columns.items()))).one()
+    return {name: int(value) for name, value in row._mapping.items()}
+
+
+def compute_seo_stats() -> Dict[str, dict]:
+    """Coverage counts per content type, one query each."""
+    stats = {key: _content_stats(model) for key, model in CONTENT_MODELS.items()}
+    stats['root_pages'] = _root_stats()
+    return stats
+
+
+def stats_version() -> str:
+    return safe_cache_get(SEO_STATS_VERSION_KEY) or '0'
+
+
+def bump_seo_stats_version() -> str:
+    version = f"{time.time_ns():x}"
+    safe_cache_set(SEO_STATS_VERSION_KEY, version, timeout=0)
+    return version
+
+
+def get_seo_stats() -> Dict[str, dict]:
+    """
+    Cached coverage counts for the SEO dashboard.
+
+    Returns:
+        dict: {'articles'|'albums'|'chapters'|'root_pages': {'total', 'scored', 'score_sum',
+               'excellent', 'good', 'fair', 'poor', 'incomplete', 'missing', 'with_<field>', ...}}
+    """
+    key = SEO_STATS_KEY.format(stats_version())
+    stats = safe_cache_get(key)
+    if stats is None:
+        stats = compute_seo_stats()
+        safe_cache_set(key, stats, timeout=STATS_TIMEOUT)
+    return stats
+
+
+def _changed(obj, columns) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stats_changes(session, flush_context):
+    if session.info.get('seo_stats_dirty'):
+        return
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in TRACKED_MODELS:
+            session.info['seo_stats_dirty'] = True
+            return
+    for obj in session.dirty:
+        columns = TRACKED_MODELS.get(type(obj))
+        if columns and _changed(obj, columns):
+            session.info['seo_stats_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('seo_stats_dirty', False):
+        try:
+            bump_seo_stats_version()
+        except Exception:
+            # No app context (e.g. a bare script session): the cached stats expire after STATS_TIMEOUT
+            pass
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('seo_stats_dirty', None)
@@ -0,0 +1,235 @@
+"""
+Sitemap Shard Cache
+
+Keeps built sitemap shards on disk (SITEMAP_CACHE_DIR, default
+instance/sitemaps/) next to a manifest.json that records, per shard, its
+signature (row count, first/last id and max(updated_at) of its rows), an
+ETag of the file and when its content last changed.
+
+Crawler hits are answered from those files. Committed changes to news,
+albums, chapters, videos, images and categories (publish, unpublish, edits
+of sitemap-visible fields, inserts and deletes) bump a per-section version
+in the shared cache. The next request for a stale section runs one windowed
+signature query and rewrites only the shards whose signature changed;
+shards past the new end of the section are removed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Album, AlbumChapter, Category, Image, News, YouTubeVideo
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+from routes.utils.sitemap_stream import SECTION_NAMES, iter_urlset, shard_signatures, shard_size
+
+VERSION_KEY = 'sitemap_version:{}'
+MANIFEST_NAME = 'manifest.json'
+
+# model -> (sections it appears in, columns whose change alters those sections)
+TRACKED_MODELS = {
+    News: (('news', 'pages'), ('title', 'content', 'seo_slug', 'meta_robots', 'is_visible',
+                               'is_premium', 'is_main_news', 'date', 'tagar')),
+    Album: (('albums', 'chapters', 'pages'), ('title', 'is_visible', 'is_archived', 'is_premium',
+                                              'is_completed', 'is_hiatus')),
+    AlbumChapter: (('chapters',), ('chapter_title', 'album_id')),
+    YouTubeVideo: (('videos', 'pages'), ('youtube_id', 'is_visible')),
+    Image: (('images', 'pages'), ('is_visible',)),
+    Category: (('pages',), ('name',)),
+}
+
+
+def section_version(section: str) -> str:
+    return safe_cache_get(VERSION_KEY.format(section)) or '0'
+
+
+def bump_sitemap_sections(sections: Iterable[str]) -> None:
+    """Mark sections stale in all workers; their shards are checked on the next request."""
+    version = f"{time.time_ns():x}"
+    for section in sections:
+        safe_cache_set(VERSION_KEY.format(section), version, timeout=0)
+
+
+def _changed(obj, columns) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_sections(session, flush_context):
+    stale = session.info.setdefault('sitemap_stale', set())
+    for obj in list(session.new) + list(session.deleted):
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            stale.update(tracked[0])
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked and _changed(obj, tracked[1]):
+            stale.update(tracked[0])
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    stale = session.info.pop('sitemap_stale', None)
+    if stale:
+        try:
+            bump_sitemap_sections(stale)
+        except Exception:
+            # No app context (e.g. a bare script session): the next build compares signatures anyway
+            pass
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session):
+    session.info.pop('sitemap_stale', None)
+
+
+class SitemapCache:
+    """Built shard files plus their manifest in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def shard_path(self, section: str, number: int) -> str:
+        return os.path.join(self.directory, f"sitemap-{section}-{number}.xml")
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'shard_size': None, 'versions': {}, 'shards': {}}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def _write_shard(self, section: str, number: int) -> str:
+        """Stream one shard to disk and return the SHA-1 of its content."""
+        path = self.shard_path(section, number)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        digest = hashlib.sha1()
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for chunk in iter_urlset(section, number):
+                f.write(chunk)
+                digest.update(chunk.encode('utf-8'))
+        os.replace(tmp, path)
+        return digest.hexdigest()
+
+    def refresh(self, sections: Optional[Iterable[str]] = None) -> List[str]:
+        """Rebuild the changed shards of stale sections; return the rewritten shard names."""
+        sections = list(sections or SECTION_NAMES)
+        with self._lock:
+            manifest = self.load_manifest()
+            if manifest.get('shard_size') != shard_size():
+                # Shard boundaries moved: every shard is rebuilt
+                for entry in manifest.get('shards', {}).values():
+                    self._remove_shard(entry)
+                manifest = {'shard_size': shard_size(), 'versions': {}, 'shards': {}}
+
+            stale = {}
+            for section in sections:
+                version = section_version(section)
+                if manifest['versions'].get(section) != version:
+                    stale[section] = version
+            if not stale:
+                return []
+
+            rebuilt = []
+            for section, version in stale.items():
+                rebuilt.extend(self._refresh_section(manifest, section))
+                manifest['versions'][section] = version
+            self._save_manifest(manifest)
+            return rebuilt
+
+    def _refresh_section(self, manifest: dict, section: str) -> List[str]:
+        shards = manifest['shards']
+        if section == 'pages':
+            # Listing pages have no row signature; they follow any content change
+            signatures = {1: None}
+        else:
+            signatures = {
+                number: [count, first, last, newest.isoformat() if newest else None]
+                for number, (count, first, last, newest) in shard_signatures(section).items()
+            }
+
+        rebuilt = []
+        for number, signature in signatures.items():
+            name = f"{section}-{number}"
+            entry = shards.get(name)
+            if (entry and signature is not None and entry['signature'] == signature
+                    and os.path.exists(self.shard_path(section, number))):
+                continue
+            etag = self._write_shard(section, number)
+            modified = time.time() if not entry or entry['etag'] != etag else entry['modified']
+            shards[name] = {
+                'section': section,
+                'number': number,
+                'signature': signature,
+                'lastmod': signature[3] if signature else None,
+                'etag': etag,
+                'modified': modified,
+            }
+            rebuilt.append(name)
+
+        for name, entry in list(shards.items()):
+            if entry['section'] == section and entry['number'] not in signatures:
+                del shards[name]
+                self._remove_shard(entry)
+        return rebuilt
+
+    def _remove_shard(self, entry: dict) -> None:
+        try:
+            os.remove(self.shard_path(entry['section'], entry['number']))
+        except OSError:
+            pass
+
+    def is_built(self, sections: Optional[Iterable[str]] = None) -> bool:
+        versions = self.load_manifest()['versions']
+        return all(section in versions for section in sections or SECTION_NAMES)
+
+    def shards(self, sections: Optional[Iterable[str]] = None) -> List[dict]:
+        """Manifest entries of the given sections in index order."""
+        order = {section: position for position, section in enumerate(SECTION_NAMES)}
+        wanted = set(sections or SECTION_NAMES)
+        entries = [e for e in self.load_manifest()['shards'].values() if e['section'] in wanted]
+        return sorted(entries, key=lambda e: (order[e['section']], e['number']))
+
+    def shard(self, section: str, number: int) -> Optional[dict]:
+        return self.load_manifest()['shards'].get(f"{section}-{number}")
+
+
+def index_shards(entries: List[dict]) -> List[Tuple[str, int, Optional[datetime]]]:
+    """(section, number, lastmod) tuples for iter_sitemap_index."""
+    return [
+        (e['section'], e['number'], datetime.fromisoformat(e['lastmod']) if e['lastmod'] else None)
+        for e in entries
+    ]
+
+
+def index_etag(entries: List[dict]) -> str:
+    return hashlib.sha1('|'.join(f"{e['section']}-{e['number']}:{e['etag']}" for e in entries).encode()).hexdigest()
+
+
+def get_sitemap_cache() -> SitemapCache:
+    """The app's SitemapCache, created on first use."""
+    cache = current_app.extensions.get('sitemap_cache')
+    if cache is None:
+        directory = current_app.config.get('SITEMAP_CACHE_DIR') or os.path.join(current_app.instance_path, 'sitemaps')
+        cache = current_app.extensions['sitemap_cache'] = SitemapCache(directory)
+    return cache
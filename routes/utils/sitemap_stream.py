@@ -0,0 +1,314 @@
+"""
+Streaming Sitemaps
+
+Builds sitemap XML as text straight from yield_per batches of narrow
+(id, slug, updated_at, ...) row tuples, so memory stays flat no matter how
+many news articles, albums, chapters, videos or images the site holds.
+
+Every section is split into numbered shards of at most MAX_URLS_PER_SHARD
+URLs (the protocol limit), ordered by primary key so a row always lands in
+the same shard until rows before it are removed. The sitemap index lists
+/sitemap-<section>-<n>.xml for every shard; sitemap_cache keeps the built
+shards on disk.
+
+All functions need an app context; entry URLs are built with url_for, so
+streaming generators must run inside stream_with_context.
+"""
+
+import itertools
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from flask import current_app, url_for
+from sqlalchemy import func, literal, or_, select
+
+from models import db, Album, AlbumChapter, Category, Image, News, YouTubeVideo
+from routes.routes_public import safe_title
+
+MAX_URLS_PER_SHARD = 50000
+BATCH_SIZE = 1000
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+# Listing pages: (endpoint, changefreq, priority)
+STATIC_ENDPOINTS = [
+    ("main.home", "daily", 1.0),
+    ("main.news", "daily", 0.9),
+    ("main.videos", "weekly", 0.8),
+    ("main.gallery", "weekly", 0.7),
+    ("main.utama", "daily", 0.8),
+    ("main.about", "monthly", 0.5),
+    ("main.hypes", "weekly", 0.6),
+    ("main.premium", "weekly", 0.6),
+]
+
+# Paginated listings: (endpoint, count query, per page, max page, changefreq, priority)
+PAGINATED_ENDPOINTS = [
+    ("main.news", lambda: select(func.count(News.id)).where(News.is_visible == True), 20, 10, "daily", 0.6),
+    ("main.albums_list", lambda: select(func.count(Album.id)).where(
+        Album.is_visible == True, Album.is_archived == False), 12, 10, "weekly", 0.6),
+    ("main.videos", lambda: select(func.count(YouTubeVideo.id)).where(YouTubeVideo.is_visible == True), 6, 5, "weekly", 0.5),
+    ("main.gallery", lambda: select(func.count(Image.id)).where(Image.is_visible == True), 15, 5, "monthly", 0.4),
+]
+
+
+def format_lastmod(value) -> Optional[str]:
+    """Format a datetime as YYYY-MM-DD (UTC when naive); strings pass through."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.strftime("%Y-%m-%d")
+    return value or None
+
+
+def url_entry(loc: str, lastmod=None, changefreq: Optional[str] = None, priority=None) -> str:
+    """Render one <url> element."""
+    parts = ["<url><loc>", escape(loc), "</loc>"]
+    lastmod = format_lastmod(lastmod)
+    if lastmod:
+        parts += ["<lastmod>", lastmod, "</lastmod>"]
+    if changefreq:
+        parts += ["<changefreq>", changefreq, "</changefreq>"]
+    if priority:
+        parts += ["<priority>", str(priority), "</priority>"]
+    parts.append("</url>\n")
+    return "".join(parts)
+
+
+def calculate_days_old(date) -> int:
+    """Days since date (UTC when naive); 365 when unknown."""
+    if not date:
+        return 365
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - date).days
+
+
+def _news_entry(row) -> str:
+    news_id, seo_slug, updated_at, is_premium, is_main_news, read_count, date = row
+    if seo_slug:
+        loc = url_for("main.news_detail", news_id=news_id, news_title=seo_slug, _external=True)
+    else:
+        loc = url_for("main.news_detail_legacy", news_id=news_id, _external=True)
+
+    if is_main_news:
+        priority = 0.9
+    elif is_premium or (read_count and read_count > 100):
+        priority = 0.8
+    else:
+        priority = 0.7
+
+    if is_main_news:
+        changefreq = "daily"
+    elif is_premium:
+        changefreq = "weekly"
+    else:
+        days_old = calculate_days_old(date)
+        if days_old < 7:
+            changefreq = "daily"
+        elif days_old < 30:
+            changefreq = "weekly"
+        elif days_old < 90:
+            changefreq = "monthly"
+        else:
+            changefreq = "yearly"
+    return url_entry(loc, updated_at, changefreq, priority)
+
+
+def _album_entry(row) -> str:
+    album_id, title, updated_at, is_premium, is_completed, is_hiatus, total_reads = row
+    loc = url_for("main.album_detail", album_id=album_id,
+                  album_title=safe_title(title) or f"album-{album_id}", _external=True)
+
+    if is_premium:
+        priority = 0.9
+    elif (total_reads and total_reads > 1000) or is_completed:
+        priority = 0.8
+    else:
+        priority = 0.7
+
+    if is_hiatus or is_completed:
+        changefreq = "monthly"
+    elif is_premium or (total_reads and total_reads > 500):
+        changefreq = "weekly"
+    else:
+        changefreq = "monthly"
+    return url_entry(loc, updated_at, changefreq, priority)
+
+
+def _chapter_entry(row) -> str:
+    chapter_id, chapter_title, updated_at, album_id, is_premium, _ = row
+    loc = url_for("main.chapter_reader", album_id=album_id, chapter_id=chapter_id,
+                  chapter_title=safe_title(chapter_title) or f"chapter-{chapter_id}", _external=True)
+    return url_entry(loc, updated_at, "weekly" if is_premium else "monthly", 0.8 if is_premium else 0.7)
+
+
+def _video_entry(row) -> str:
+    _, youtube_id, updated_at = row
+    loc = url_for("main.videos", _external=True) + f"#video-{youtube_id}"
+    return url_entry(loc, updated_at, "weekly", 0.6)
+
+
+def _image_entry(row) -> str:
+    image_id, updated_at = row
+    loc = url_for("main.gallery", _external=True) + f"#image-{image_id}"
+    return url_entry(loc, updated_at, "monthly", 0.5)
+
+
+# section -> (row query ordered by primary key, row -> <url> text); every query selects updated_at.
+# Chapters also select album_updated_at: their entries repeat album fields (is_premium).
+SECTIONS = {
+    "news": (
+        lambda: select(News.id, News.seo_slug, News.updated_at, News.is_premium, News.is_main_news,
+                       News.read_count, News.date)
+        .where(News.is_visible == True,
+               or_(News.meta_robots.is_(None), ~func.lower(News.meta_robots).contains("noindex")))
+        .order_by(News.id),
+        _news_entry,
+    ),
+    "albums": (
+        lambda: select(Album.id, Album.title, Album.updated_at, Album.is_premium, Album.is_completed,
+                       Album.is_hiatus, Album.total_reads)
+        .where(Album.is_visible == True, Album.is_archived == False)
+        .order_by(Album.id),
+        _album_entry,
+    ),
+    "chapters": (
+        lambda: select(AlbumChapter.id, AlbumChapter.chapter_title, AlbumChapter.updated_at,
+                       AlbumChapter.album_id, Album.is_premium, Album.updated_at.label("album_updated_at"))
+        .join(Album, AlbumChapter.album_id == Album.id)
+        .where(Album.is_visible == True, Album.is_archived == False)
+        .order_by(AlbumChapter.id),
+        _chapter_entry,
+    ),
+    "videos": (
+        lambda: select(YouTubeVideo.id, YouTubeVideo.youtube_id, YouTubeVideo.updated_at)
+        .where(YouTubeVideo.is_visible == True)
+        .order_by(YouTubeVideo.id),
+        _video_entry,
+    ),
+    "images": (
+        lambda: select(Image.id, Image.updated_at)
+        .where(Image.is_visible == True)
+        .order_by(Image.id),
+        _image_entry,
+    ),
+}
+
+# "pages" holds listing, category, tag and pagination URLs; it is always a single shard
+SECTION_NAMES = ("pages",) + tuple(SECTIONS)
+
+
+def shard_size() -> int:
+    """URLs per shard: SITEMAP_MAX_URLS when set, never above the protocol limit."""
+    return max(1, min(int(current_app.config.get("SITEMAP_MAX_URLS", MAX_URLS_PER_SHARD)), MAX_URLS_PER_SHARD))
+
+
+def shard_signatures(section: str) -> Dict[int, Tuple[int, int, int, Optional[datetime]]]:
+    """Map shard number -> (row count, first id, last id, newest updated_at) in one windowed query.
+
+    A shard whose signature is unchanged holds the same rows with the same
+    updated_at values, so its XML does not need to be rebuilt. For chapters the
+    newest timestamp also covers their albums' updated_at.
+    """
+    query = SECTIONS[section][0]().order_by(None).subquery()
+    parent_updated_at = query.c.album_updated_at if "album_updated_at" in query.c else literal(None)
+    numbered = select(
+        query.c.id,
+        query.c.updated_at,
+        parent_updated_at.label("parent_updated_at"),
+        ((func.row_number().over(order_by=query.c.id) - 1) // shard_size()).label("shard"),
+    ).subquery()
+    rows = db.session.execute(
+        select(numbered.c.shard, func.count(), func.min(numbered.c.id), func.max(numbered.c.id),
+               func.max(numbered.c.updated_at), func.max(numbered.c.parent_updated_at))
+        .group_by(numbered.c.shard)
+        .order_by(numbered.c.shard)
+    )
+    return {
+        shard + 1: (count, first, last, max((t for t in (newest, parent) if t is not None), default=None))
+        for shard, count, first, last, newest, parent in rows
+    }
+
+
+def _safe_entries(section: str, rows: Iterable, render) -> Iterator[str]:
+    for row in rows:
+        try:
+            yield render(row)
+        except Exception as e:
+            current_app.logger.warning(f"Sitemap: Could not generate URL for {section} row {row[0]}: {e}")
+
+
+def _page_entries() -> Iterator[str]:
+    for endpoint, changefreq, priority in STATIC_ENDPOINTS:
+        try:
+            yield url_for(endpoint, _external=True), changefreq, priority
+        except Exception as e:
+            current_app.logger.warning(f"Sitemap: Could not generate URL for static endpoint '{endpoint}': {e}")
+
+    categories = db.session.execute(
+        select(Category.name).order_by(Category.name).execution_options(yield_per=BATCH_SIZE)
+    ).scalars()
+    for name in categories:
+        yield url_for("main.news", category=name, _external=True), "daily", 0.8
+
+    tags = set()
+    tag_strings = db.session.execute(
+        select(News.tagar).distinct()
+        .where(News.is_visible == True, News.tagar.isnot(None), News.tagar != "")
+        .execution_options(yield_per=BATCH_SIZE)
+    ).scalars()
+    for tag_string in tag_strings:
+        tags.update(tag.strip() for tag in tag_string.split(",") if tag.strip())
+    for tag in sorted(tags):
+        yield url_for("main.news", tag=tag, _external=True), "daily", 0.7
+
+    for endpoint, count_query, per_page, max_page, changefreq, priority in PAGINATED_ENDPOINTS:
+        total = db.session.execute(count_query()).scalar() or 0
+        if total > per_page:
+            for page in range(2, min(math.ceil(total / per_page), max_page) + 1):
+                yield url_for(endpoint, page=page, _external=True), changefreq, priority
+
+
+def iter_shard_entries(section: str, number: int) -> Iterator[List[str]]:
+    """Yield lists of <url> strings for one shard, one list per fetched batch."""
+    size = shard_size()
+    if section == "pages":
+        entries = (url_entry(loc, None, changefreq, priority) for loc, changefreq, priority in _page_entries())
+        entries = itertools.islice(entries, size)
+        while True:
+            batch = list(itertools.islice(entries, BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
+    query, render = SECTIONS[section]
+    statement = query().offset((number - 1) * size).limit(size).execution_options(yield_per=BATCH_SIZE)
+    for rows in db.session.execute(statement).partitions():
+        yield list(_safe_entries(section, rows, render))
+
+
+def iter_urlset(section: str, number: int) -> Iterator[str]:
+    """Stream one shard as a complete <urlset> document, one chunk per batch."""
+    yield XML_HEADER + URLSET_OPEN
+    for batch in iter_shard_entries(section, number):
+        yield "".join(batch)
+    yield URLSET_CLOSE
+
+
+def iter_sitemap_index(shards: Iterable[Tuple[str, int, Optional[datetime]]]) -> Iterator[str]:
+    """Stream a <sitemapindex> pointing at the given shards."""
+    yield XML_HEADER + INDEX_OPEN
+    for section, number, lastmod in shards:
+        loc = url_for("main.sitemap_shard", section=section, number=number, _external=True)
+        lastmod = format_lastmod(lastmod)
+        yield "<sitemap><loc>{}</loc>{}</sitemap>\n".format(
+            escape(loc), f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+        )
+    yield INDEX_CLOSE
@@ -0,0 +1,188 @@
+"""
+Comment Spam Scoring
+
+Scores a comment submission without touching the database:
+
+- all spam keywords are compiled into one case-insensitive regex; it is
+  rebuilt only when the keyword file changes (checked at most every
+  KEYWORD_RELOAD_INTERVAL seconds)
+- content checks (links, caps ratio, repeated characters) are single passes
+  over the text
+- per-user and per-IP posting rates over the last hour live in the shared
+  rate limit store (optimizations/rate_limiter.py: Redis, or the host's
+  SQLite file), so every worker sees the same counts and they survive restarts
+
+A submission is spam when its score reaches SPAM_THRESHOLD.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from optimizations.rate_limiter import RateLimiter, get_rate_limiter
+
+SPAM_THRESHOLD = 1.0
+KEYWORD_WEIGHT = 0.5
+MAX_LINKS = 3
+MAX_CAPS_RATIO = 0.7
+MAX_REPEAT_RATIO = 0.5
+USER_HOURLY_LIMIT = 10
+IP_HOURLY_LIMIT = 20
+RATE_WINDOW_SECONDS = 3600
+KEYWORD_RELOAD_INTERVAL = 5.0
+
+DEFAULT_KEYWORDS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'config', 'spam_keywords.txt'
+)
+
+LINK_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+
+
+class SpamResult:
+    """Score and the reasons that contributed to it."""
+
+    __slots__ = ('score', 'reasons')
+
+    def __init__(self):
+        self.score = 0.0
+        self.reasons = []
+
+    def add(self, weight: float, reason: str) -> None:
+        self.score += weight
+        self.reasons.append(reason)
+
+    @property
+    def is_spam(self) -> bool:
+        return self.score >= SPAM_THRESHOLD
+
+    def to_dict(self) -> dict:
+        return {'score': round(self.score, 3), 'is_spam': self.is_spam, 'reasons': list(self.reasons)}
+
+
+class SpamScorer:
+    """Keyword matcher plus shared posting rates for comment submissions."""
+
+    def __init__(self, keywords_file: Optional[str] = DEFAULT_KEYWORDS_FILE, keywords: Iterable[str] = (),
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.keywords_file = keywords_file
+        self.extra_keywords = list(keywords)
+        self._rate_limiter = rate_limiter
+        self._matcher = None
+        self._file_signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload(force=True)
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter or get_rate_limiter()
+
+    # Keyword matcher
+
+    def _read_file_keywords(self) -> List[str]:
+        if not self.keywords_file or not os.path.exists(self.keywords_file):
+            return []
+        with open(self.keywords_file, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.keywords_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError):
+            return None
+
+    def _reload(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < KEYWORD_RELOAD_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = now
+            signature = self._signature()
+            if not force and signature == self._file_signature:
+                return
+            self._file_signature = signature
+            self._matcher = self.build_matcher(self._read_file_keywords() + self.extra_keywords)
+
+    @staticmethod
+    def build_matcher(keywords: Iterable[str]):
+        """Compile keywords into one regex; longest alternatives first so overlaps prefer them."""
+        words = sorted({k.strip().lower() for k in keywords if k and k.strip()}, key=len, reverse=True)
+        if not words:
+            return None
+        pattern = '|'.join(r'\s+'.join(re.escape(part) for part in word.split()) for word in words)
+        return re.compile(rf'(?<!\w)(?:{pattern})(?!\w)', re.IGNORECASE)
+
+    def set_keywords(self, keywords: Iterable[str]) -> None:
+        """Replace the in-code keyword list and rebuild the matcher."""
+        self.extra_keywords = list(keywords)
+        self._reload(force=True)
+
+    def keyword_hits(self, content: str) -> List[str]:
+        self._reload()
+        matcher = self._matcher
+        if matcher is None:
+            return []
+        return sorted({m.group(0).lower() for m in matcher.finditer(content)})
+
+    # Scoring
+
+    def score(self, content: str, user_id=None, ip: Optional[str] = None) -> SpamResult:
+        """Score a submission. Does not record it; call record() once it is saved."""
+        result = SpamResult()
+        content = content or ''
+
+        links = len(LINK_RE.findall(content))
+        if links > MAX_LINKS:
+            result.add(1.0, f'links:{links}')
+
+        if len(content) > 10:
+            caps = sum(1 for c in content if c.isupper())
+            if caps / len(content) > MAX_CAPS_RATIO:
+                result.add(1.0, 'caps')
+
+        if len(content) > 5:
+            char, repeats = Counter(content).most_common(1)[0]
+            if repeats > len(content) * MAX_REPEAT_RATIO:
+                result.add(1.0, 'repeated_chars')
+
+        for word in self.keyword_hits(content):
+            result.add(KEYWORD_WEIGHT, f'keyword:{word}')
+
+        if user_id is not None and self._rate_count('user', user_id, USER_HOURLY_LIMIT) > USER_HOURLY_LIMIT:
+            result.add(1.0, 'user_rate')
+        if ip and self._rate_count('ip', ip, IP_HOURLY_LIMIT) > IP_HOURLY_LIMIT:
+            result.add(1.0, 'ip_rate')
+
+        return result
+
+    # Rates are kept one hit past the limit, so an exceeded limit shows as a count above it
+
+    def _rate_count(self, kind: str, identity, limit: int) -> int:
+        return self.rate_limiter.count(f'spam_{kind}:{identity}', limit + 1, RATE_WINDOW_SECONDS)
+
+    def record(self, user_id=None, ip: Optional[str] = None) -> None:
+        """Count an accepted submission towards the shared posting rates."""
+        if user_id is not None:
+            self.rate_limiter.hit(f'spam_user:{user_id}', USER_HOURLY_LIMIT + 1, RATE_WINDOW_SECONDS)
+        if ip:
+            self.rate_limiter.hit(f'spam_ip:{ip}', IP_HOURLY_LIMIT + 1, RATE_WINDOW_SECONDS)
+
+
+# Global spam scorer instance
+_spam_scorer = None
+_spam_scorer_lock = threading.Lock()
+
+
+def get_spam_scorer() -> SpamScorer:
+    """Get the process-wide spam scorer."""
+    global _spam_scorer
+    if _spam_scorer is None:
+        with _spam_scorer_lock:
+            if _spam_scorer is None:
+                _spam_scorer = SpamScorer(os.getenv('SPAM_KEYWORDS_FILE', DEFAULT_KEYWORDS_FILE))
+    return _spam_scorer
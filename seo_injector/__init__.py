@@ -0,0 +1,7 @@
+"""
+SEO Injector Package
+
+Batch SEO generation for news, albums, chapters and root pages. The modules
+double as command-line scripts; the application imports them as
+seo_injector.<module>.
+"""
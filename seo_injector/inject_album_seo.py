@@ -12,17 +12,19 @@ from urllib.parse import urlparse, urljoin
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)  # Insert at beginning to prioritize local imports
 
-# Import app and db from the local main module
-import importlib.util
-spec = importlib.util.spec_from_file_location("main", os.path.join(project_root, "main.py"))
-main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(main)
-app = main.app
-db = main.db
+from contextlib import nullcontext
+from flask import has_app_context
 
-from models import Album, Category, User, BrandIdentity
+from models import db, Album, Category, User, BrandIdentity
 from sqlalchemy import text
 
+def _app_context():
+    """Reuse the caller's app context; standalone runs load the app from main.py."""
+    if has_app_context():
+        return nullcontext()
+    from main import app
+    return app.app_context()
+
 def get_seo_injection_settings():
     """Get SEO injection settings from the database."""
     try:
@@ -369,8 +371,6 @@ def generate_open_graph_data(album):
 
 def clear_existing_seo(album):
     """Clear all existing SEO data from album."""
-    print(f"   🗑️ Clearing existing SEO data...")
-    
     # Clear all SEO fields
     album.meta_description = None
     album.meta_keywords = None
@@ -392,123 +392,75 @@ def clear_existing_seo(album):
     album.last_seo_audit = None
     album.is_seo_lock = False  # Reset lock to false
 
-def inject_album_seo():
-    """Inject SEO data for albums that don't have SEO fields populated."""
+def inject_album_item(album):
+    """Regenerate all SEO fields of one album in the current session (no commit)."""
+    # Clear existing SEO data first (force clean injection)
+    clear_existing_seo(album)
+    
+    # Generate SEO slug, meta description and keywords
+    album.seo_slug = generate_seo_slug(album.title)
+    album.meta_description = generate_meta_description(album)
+    album.meta_keywords = generate_meta_keywords(album)
+    
+    # Generate Open Graph data
+    album.og_title, album.og_description, album.og_image = generate_open_graph_data(album)
+    
+    # Generate schema markup
+    album.schema_markup = generate_schema_markup(album)
+    
+    # Get website URL for canonical URL
+    brand_info = BrandIdentity.query.first()
+    seo_settings = get_seo_settings()
+    website_url = get_website_url(brand_info, seo_settings)
+    
+    # Set default values
+    album.meta_author = album.author.get_full_name() if album.author else "Unknown Author"
+    album.meta_language = "id"
+    album.meta_robots = "index, follow"
+    album.twitter_card = "summary_large_image"
+    album.structured_data_type = "Book" if album.is_completed else "CreativeWork"
+    album.canonical_url = f"{website_url}/album/{album.id}"
+    
+    # Calculate SEO score
+    album.seo_score = calculate_seo_score(album)
+    album.last_seo_audit = datetime.now(timezone.utc)
+
+def inject_album_seo(force=False):
+    """Inject SEO data for albums whose content or SEO settings changed since the last run."""
     print("🎯 LilyOpenCMS Album SEO Injector")
     print("=" * 50)
     
-    with app.app_context():
-        # Get all albums
-        albums = Album.query.all()
-        print(f"📚 Found {len(albums)} albums in database")
-        
-        if not albums:
-            print("❌ No albums found in database")
-            return
-        
-        # Track statistics
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        locked_count = 0
-        
-        print(f"\n🔍 Analyzing albums for SEO injection...")
-        
-        for i, album in enumerate(albums, 1):
-            print(f"\n📖 [{i}/{len(albums)}] Processing: {album.title}")
-            
-            try:
-                # Check if SEO is locked
-                if album.is_seo_lock:
-                    print(f"   🔒 Skipping - SEO is locked")
-                    locked_count += 1
-                    continue
-                
-                # Clear existing SEO data first (force clean injection)
-                clear_existing_seo(album)
-                
-                # Generate SEO data
-                print(f"   🔧 Generating SEO data...")
-                
-                # Generate SEO slug
-                album.seo_slug = generate_seo_slug(album.title)
-                print(f"   ✅ Generated SEO slug: {album.seo_slug}")
-                
-                # Generate meta description
-                album.meta_description = generate_meta_description(album)
-                print(f"   ✅ Generated meta description: {album.meta_description[:50]}...")
-                
-                # Generate meta keywords
-                album.meta_keywords = generate_meta_keywords(album)
-                print(f"   ✅ Generated meta keywords: {album.meta_keywords}")
-                
-                # Generate Open Graph data
-                og_title, og_description, og_image = generate_open_graph_data(album)
-                
-                album.og_title = og_title
-                print(f"   ✅ Generated OG title: {album.og_title}")
-                
-                album.og_description = og_description
-                print(f"   ✅ Generated OG description: {album.og_description[:50]}...")
-                
-                album.og_image = og_image
-                print(f"   ✅ Set OG image: {album.og_image}")
-                
-                # Generate schema markup
-                album.schema_markup = generate_schema_markup(album)
-                print(f"   ✅ Generated schema markup")
-                
-                # Get website URL for canonical URL
-                brand_info = BrandIdentity.query.first()
-                seo_settings = get_seo_settings()
-                website_url = get_website_url(brand_info, seo_settings)
-                
-                # Set default values
-                album.meta_author = album.author.get_full_name() if album.author else "Unknown Author"
-                album.meta_language = "id"
-                album.meta_robots = "index, follow"
-                album.twitter_card = "summary_large_image"
-                album.structured_data_type = "Book" if album.is_completed else "CreativeWork"
-                album.canonical_url = f"{website_url}/album/{album.id}"
-                
-                # Calculate SEO score
-                album.seo_score = calculate_seo_score(album)
-                album.last_seo_audit = datetime.now(timezone.utc)
-                
-                print(f"   📊 SEO Score: {album.seo_score}/100")
-                
-                # Save to database
-                db.session.commit()
-                print(f"   ✅ Successfully updated SEO data")
-                updated_count += 1
-                
-            except Exception as e:
-                print(f"   ❌ Error processing album: {e}")
-                db.session.rollback()
-                error_count += 1
-        
-        # Final summary
-        print("\n" + "=" * 50)
-        print("📊 ALBUM SEO INJECTION SUMMARY")
-        print("=" * 50)
-        print(f"✅ Successfully updated: {updated_count} albums")
-        print(f"🔒 Skipped (SEO locked): {locked_count} albums")
-        print(f"❌ Errors: {error_count} albums")
-        print(f"📚 Total albums processed: {len(albums)}")
-        
-        if updated_count > 0:
-            print(f"\n🎉 Successfully injected SEO data for {updated_count} albums!")
-        elif locked_count > 0:
-            print(f"\nℹ️ All albums have locked SEO ({locked_count} albums)")
-        else:
-            print(f"\n⚠️ No albums were updated due to errors")
+    with _app_context():
+        from seo_injection_job import run_seo_injection_job
+        counts = run_seo_injection_job(['albums'], force=force)['progress']['albums']
+    
+    if not counts['total']:
+        print("❌ No albums found in database")
+        return
+    
+    # Final summary
+    print("\n" + "=" * 50)
+    print("📊 ALBUM SEO INJECTION SUMMARY")
+    print("=" * 50)
+    print(f"✅ Successfully updated: {counts['updated']} albums")
+    print(f"⏭️ Unchanged since last injection: {counts['unchanged']} albums")
+    print(f"🔒 Skipped (SEO locked): {counts['locked']} albums")
+    print(f"❌ Errors: {counts['errors']} albums")
+    print(f"📚 Total albums processed: {counts['processed']}")
+    
+    if counts['updated'] > 0:
+        print(f"\n🎉 Successfully injected SEO data for {counts['updated']} albums!")
+    elif counts['errors'] > 0:
+        print(f"\n⚠️ No albums were updated due to errors")
+    else:
+        print(f"\nℹ️ All albums are up to date or locked (use --force to re-inject)")
 
 def show_album_seo_stats():
     """Show statistics about album SEO data."""
     print("📊 Album SEO Statistics")
     print("=" * 30)
     
-    with app.app_context():
+    with _app_context():
         total_albums = Album.query.count()
         
         # Count albums with different SEO fields
@@ -543,14 +495,14 @@ def main():
     
     parser = argparse.ArgumentParser(description="Inject SEO data for albums")
     parser.add_argument("--stats", action="store_true", help="Show SEO statistics only")
-    parser.add_argument("--force", action="store_true", help="Force update even if SEO data exists")
+    parser.add_argument("--force", action="store_true", help="Re-inject rows whose content and settings are unchanged")
     
     args = parser.parse_args()
     
     if args.stats:
         show_album_seo_stats()
     else:
-        inject_album_seo()
+        inject_album_seo(force=args.force)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -12,17 +12,19 @@ from urllib.parse import urlparse, urljoin
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)  # Insert at beginning to prioritize local imports
 
-# Import app and db from the local main module
-import importlib.util
-spec = importlib.util.spec_from_file_location("main", os.path.join(project_root, "main.py"))
-main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(main)
-app = main.app
-db = main.db
+from contextlib import nullcontext
+from flask import has_app_context
 
-from models import AlbumChapter, Album, News, Category, User, Image, BrandIdentity
+from models import db, AlbumChapter, Album, News, Category, User, Image, BrandIdentity
 from sqlalchemy import text
 
+def _app_context():
+    """Reuse the caller's app context; standalone runs load the app from main.py."""
+    if has_app_context():
+        return nullcontext()
+    from main import app
+    return app.app_context()
+
 def get_seo_injection_settings():
     """Get SEO injection settings from the database."""
     try:
@@ -434,8 +436,6 @@ def generate_open_graph_data(chapter):
 
 def clear_existing_seo(chapter):
     """Clear all existing SEO data from chapter."""
-    print(f"   🗑️ Clearing existing SEO data...")
-    
     # Clear all SEO fields
     chapter.meta_description = None
     chapter.meta_keywords = None
@@ -457,127 +457,79 @@ def clear_existing_seo(chapter):
     chapter.last_seo_audit = None
     chapter.is_seo_lock = False  # Reset lock to false
 
-def inject_chapter_seo():
-    """Inject SEO data for album chapters that don't have SEO fields populated."""
+def inject_chapter_item(chapter):
+    """Regenerate all SEO fields of one chapter in the current session (no commit)."""
+    # Clear existing SEO data first (force clean injection)
+    clear_existing_seo(chapter)
+    
+    # Generate SEO slug, meta description and keywords
+    chapter.seo_slug = generate_seo_slug(f"chapter-{chapter.chapter_number}-{chapter.chapter_title}")
+    chapter.meta_description = generate_meta_description(chapter)
+    chapter.meta_keywords = generate_meta_keywords(chapter)
+    
+    # Generate Open Graph data
+    chapter.og_title, chapter.og_description, chapter.og_image = generate_open_graph_data(chapter)
+    
+    # Generate schema markup
+    chapter.schema_markup = generate_schema_markup(chapter)
+    
+    # Get website URL for canonical URL
+    brand_info = BrandIdentity.query.first()
+    seo_settings = get_seo_settings()
+    website_url = get_website_url(brand_info, seo_settings)
+    
+    # Set default values
+    if chapter.album and chapter.album.author:
+        chapter.meta_author = chapter.album.author.get_full_name()
+    else:
+        chapter.meta_author = "Unknown Author"
+    
+    chapter.meta_language = "id"
+    chapter.meta_robots = "index, follow"
+    chapter.twitter_card = "summary_large_image"
+    chapter.structured_data_type = "Chapter"
+    chapter.canonical_url = f"{website_url}/album/{chapter.album_id}/chapter/{chapter.chapter_number}"
+    
+    # Calculate SEO score
+    chapter.seo_score = calculate_seo_score(chapter)
+    chapter.last_seo_audit = datetime.now(timezone.utc)
+
+def inject_chapter_seo(force=False):
+    """Inject SEO data for chapters whose content or SEO settings changed since the last run."""
     print("🎯 LilyOpenCMS Chapter SEO Injector")
     print("=" * 50)
     
-    with app.app_context():
-        # Get all album chapters
-        chapters = AlbumChapter.query.all()
-        print(f"📖 Found {len(chapters)} chapters in database")
-        
-        if not chapters:
-            print("❌ No chapters found in database")
-            return
-        
-        # Track statistics
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        locked_count = 0
-        
-        print(f"\n🔍 Analyzing chapters for SEO injection...")
-        
-        for i, chapter in enumerate(chapters, 1):
-            print(f"\n📖 [{i}/{len(chapters)}] Processing: Chapter {chapter.chapter_number} - {chapter.chapter_title}")
-            
-            try:
-                # Check if SEO is locked
-                if chapter.is_seo_lock:
-                    print(f"   🔒 Skipping - SEO is locked")
-                    locked_count += 1
-                    continue
-                
-                # Clear existing SEO data first (force clean injection)
-                clear_existing_seo(chapter)
-                
-                # Generate SEO data
-                print(f"   🔧 Generating SEO data...")
-                
-                # Generate SEO slug
-                chapter.seo_slug = generate_seo_slug(f"chapter-{chapter.chapter_number}-{chapter.chapter_title}")
-                print(f"   ✅ Generated SEO slug: {chapter.seo_slug}")
-                
-                # Generate meta description
-                chapter.meta_description = generate_meta_description(chapter)
-                print(f"   ✅ Generated meta description: {chapter.meta_description[:50]}...")
-                
-                # Generate meta keywords
-                chapter.meta_keywords = generate_meta_keywords(chapter)
-                print(f"   ✅ Generated meta keywords: {chapter.meta_keywords}")
-                
-                # Generate Open Graph data
-                og_title, og_description, og_image = generate_open_graph_data(chapter)
-                
-                chapter.og_title = og_title
-                print(f"   ✅ Generated OG title: {chapter.og_title}")
-                
-                chapter.og_description = og_description
-                print(f"   ✅ Generated OG description: {chapter.og_description[:50]}...")
-                
-                chapter.og_image = og_image
-                print(f"   ✅ Set OG image: {chapter.og_image}")
-                
-                # Generate schema markup
-                chapter.schema_markup = generate_schema_markup(chapter)
-                print(f"   ✅ Generated schema markup")
-                
-                # Get website URL for canonical URL
-                brand_info = BrandIdentity.query.first()
-                seo_settings = get_seo_settings()
-                website_url = get_website_url(brand_info, seo_settings)
-                
-                # Set default values
-                if chapter.album and chapter.album.author:
-                    chapter.meta_author = chapter.album.author.get_full_name()
-                else:
-                    chapter.meta_author = "Unknown Author"
-                
-                chapter.meta_language = "id"
-                chapter.meta_robots = "index, follow"
-                chapter.twitter_card = "summary_large_image"
-                chapter.structured_data_type = "Chapter"
-                chapter.canonical_url = f"{website_url}/album/{chapter.album_id}/chapter/{chapter.chapter_number}"
-                
-                # Calculate SEO score
-                chapter.seo_score = calculate_seo_score(chapter)
-                chapter.last_seo_audit = datetime.now(timezone.utc)
-                
-                print(f"   📊 SEO Score: {chapter.seo_score}/100")
-                
-                # Save to database
-                db.session.commit()
-                print(f"   ✅ Successfully updated SEO data")
-                updated_count += 1
-                
-            except Exception as e:
-                print(f"   ❌ Error processing chapter: {e}")
-                db.session.rollback()
-                error_count += 1
-        
-        # Final summary
-        print("\n" + "=" * 50)
-        print("📊 CHAPTER SEO INJECTION SUMMARY")
-        print("=" * 50)
-        print(f"✅ Successfully updated: {updated_count} chapters")
-        print(f"🔒 Skipped (SEO locked): {locked_count} chapters")
-        print(f"❌ Errors: {error_count} chapters")
-        print(f"📖 Total chapters processed: {len(chapters)}")
-        
-        if updated_count > 0:
-            print(f"\n🎉 Successfully injected SEO data for {updated_count} chapters!")
-        elif locked_count > 0:
-            print(f"\nℹ️ All chapters have locked SEO ({locked_count} chapters)")
-        else:
-            print(f"\n⚠️ No chapters were updated due to errors")
+    with _app_context():
+        from seo_injection_job import run_seo_injection_job
+        counts = run_seo_injection_job(['chapters'], force=force)['progress']['chapters']
+    
+    if not counts['total']:
+        print("❌ No chapters found in database")
+        return
+    
+    # Final summary
+    print("\n" + "=" * 50)
+    print("📊 CHAPTER SEO INJECTION SUMMARY")
+    print("=" * 50)
+    print(f"✅ Successfully updated: {counts['updated']} chapters")
+    print(f"⏭️ Unchanged since last injection: {counts['unchanged']} chapters")
+    print(f"🔒 Skipped (SEO locked): {counts['locked']} chapters")
+    print(f"❌ Errors: {counts['errors']} chapters")
+    print(f"📖 Total chapters processed: {counts['processed']}")
+    
+    if counts['updated'] > 0:
+        print(f"\n🎉 Successfully injected SEO data for {counts['updated']} chapters!")
+    elif counts['errors'] > 0:
+        print(f"\n⚠️ No chapters were updated due to errors")
+    else:
+        print(f"\nℹ️ All chapters are up to date or locked (use --force to re-inject)")
 
 def show_chapter_seo_stats():
     """Show statistics about chapter SEO data."""
     print("📊 Chapter SEO Statistics")
     print("=" * 30)
     
-    with app.app_context():
+    with _app_context():
         total_chapters = AlbumChapter.query.count()
         
         # Count chapters with different SEO fields
@@ -612,14 +564,14 @@ def main():
     
     parser = argparse.ArgumentParser(description="Inject SEO data for album chapters")
     parser.add_argument("--stats", action="store_true", help="Show SEO statistics only")
-    parser.add_argument("--force", action="store_true", help="Force update even if SEO data exists")
+    parser.add_argument("--force", action="store_true", help="Re-inject rows whose content and settings are unchanged")
     
     args = parser.parse_args()
     
     if args.stats:
         show_chapter_seo_stats()
     else:
-        inject_chapter_seo()
+        inject_chapter_seo(force=args.force)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
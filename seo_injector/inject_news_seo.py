@@ -12,17 +12,19 @@ from urllib.parse import urlparse, urljoin
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)  # Insert at beginning to prioritize local imports
 
-# Import app and db from the local main module
-import importlib.util
-spec = importlib.util.spec_from_file_location("main", os.path.join(project_root, "main.py"))
-main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(main)
-app = main.app
-db = main.db
+from contextlib import nullcontext
+from flask import has_app_context
 
-from models import News, Category, User, Image, BrandIdentity
+from models import db, News, Category, User, Image, BrandIdentity
 from sqlalchemy import text
 
+def _app_context():
+    """Reuse the caller's app context; standalone runs load the app from main.py."""
+    if has_app_context():
+        return nullcontext()
+    from main import app
+    return app.app_context()
+
 def get_seo_injection_settings():
     """Get SEO injection settings from the database."""
     try:
@@ -534,8 +536,6 @@ def generate_open_graph_data(news_item):
 
 def clear_existing_seo(news_item):
     """Clear all existing SEO data from news item."""
-    print(f"   🗑️ Clearing existing SEO data...")
-    
     # Clear all SEO fields
     news_item.meta_description = None
     news_item.meta_keywords = None
@@ -557,148 +557,101 @@ def clear_existing_seo(news_item):
     news_item.last_seo_audit = None
     news_item.is_seo_lock = False  # Reset lock to false
 
-def inject_news_seo():
-    """Inject SEO data for news articles that don't have SEO fields populated."""
+def inject_news_item(news_item):
+    """Regenerate all SEO fields of one news article in the current session (no commit)."""
+    # Clear existing SEO data first (force clean injection)
+    clear_existing_seo(news_item)
+    
+    # Generate SEO slug
+    news_item.seo_slug = generate_seo_slug(news_item.title)
+    
+    # Generate meta title using template
+    seo_settings = get_seo_settings()
+    article_title_template = seo_settings.get('article_meta_title', '{title} - {brand_name}')
+    
+    # Get brand name
+    brand_name = "LilyOpenCMS"  # Default
+    try:
+        from models import BrandIdentity
+        brand_info = BrandIdentity.query.first()
+        if brand_info and brand_info.brand_name:
+            brand_name = brand_info.brand_name
+    except:
+        pass
+    
+    # Apply template for meta title
+    variables = {
+        'title': news_item.title,
+        'category': news_item.category.name if news_item.category else '',
+        'brand_name': brand_name
+    }
+    
+    news_item.meta_title = apply_template(article_title_template, variables)
+    if not news_item.meta_title or news_item.meta_title == article_title_template:
+        news_item.meta_title = f"{news_item.title} - {brand_name}"
+    
+    # Generate meta description and keywords
+    news_item.meta_description = generate_meta_description(news_item)
+    news_item.meta_keywords = generate_meta_keywords(news_item)
+    
+    # Generate Open Graph data
+    news_item.og_title, news_item.og_description, news_item.og_image = generate_open_graph_data(news_item)
+    
+    # Generate schema markup
+    news_item.schema_markup = generate_schema_markup(news_item)
+    
+    # Get website URL for canonical URL
+    brand_info = BrandIdentity.query.first()
+    website_url = get_website_url(brand_info, seo_settings)
+    
+    # Set default values
+    news_item.meta_author = news_item.author.get_full_name() if news_item.author else "Unknown Author"
+    news_item.meta_language = "id"
+    news_item.meta_robots = "index, follow"
+    news_item.twitter_card = "summary_large_image"
+    news_item.structured_data_type = "NewsArticle"
+    news_item.canonical_url = f"{website_url}/news/{news_item.id}"
+    
+    # Calculate SEO score
+    news_item.seo_score = calculate_seo_score(news_item)
+    news_item.last_seo_audit = datetime.now(timezone.utc)
+
+def inject_news_seo(force=False):
+    """Inject SEO data for news articles whose content or SEO settings changed since the last run."""
     print("🎯 LilyOpenCMS News SEO Injector")
     print("=" * 50)
     
-    with app.app_context():
-        # Get all news articles
-        news_items = News.query.all()
-        print(f"📰 Found {len(news_items)} news articles in database")
-        
-        if not news_items:
-            print("❌ No news articles found in database")
-            return
-        
-        # Track statistics
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        locked_count = 0
-        
-        print(f"\n🔍 Analyzing news articles for SEO injection...")
-        
-        for i, news_item in enumerate(news_items, 1):
-            print(f"\n📰 [{i}/{len(news_items)}] Processing: {news_item.title}")
-            
-            try:
-                # Check if SEO is locked
-                if news_item.is_seo_lock:
-                    print(f"   🔒 Skipping - SEO is locked")
-                    locked_count += 1
-                    continue
-                
-                # Clear existing SEO data first (force clean injection)
-                clear_existing_seo(news_item)
-                
-                # Generate SEO data
-                print(f"   🔧 Generating SEO data...")
-                
-                # Generate SEO slug
-                news_item.seo_slug = generate_seo_slug(news_item.title)
-                print(f"   ✅ Generated SEO slug: {news_item.seo_slug}")
-                
-                # Generate meta title using template
-                seo_settings = get_seo_settings()
-                article_title_template = seo_settings.get('article_meta_title', '{title} - {brand_name}')
-                
-                # Get brand name
-                brand_name = "LilyOpenCMS"  # Default
-                try:
-                    from models import BrandIdentity
-                    brand_info = BrandIdentity.query.first()
-                    if brand_info and brand_info.brand_name:
-                        brand_name = brand_info.brand_name
-                except:
-                    pass
-                
-                # Apply template for meta title
-                variables = {
-                    'title': news_item.title,
-                    'category': news_item.category.name if news_item.category else '',
-                    'brand_name': brand_name
-                }
-                
-                news_item.meta_title = apply_template(article_title_template, variables)
-                if not news_item.meta_title or news_item.meta_title == article_title_template:
-                    news_item.meta_title = f"{news_item.title} - {brand_name}"
-                print(f"   ✅ Generated meta title: {news_item.meta_title}")
-                
-                # Generate meta description
-                news_item.meta_description = generate_meta_description(news_item)
-                print(f"   ✅ Generated meta description: {news_item.meta_description[:50]}...")
-                
-                # Generate meta keywords
-                news_item.meta_keywords = generate_meta_keywords(news_item)
-                print(f"   ✅ Generated meta keywords: {news_item.meta_keywords}")
-                
-                # Generate Open Graph data
-                og_title, og_description, og_image = generate_open_graph_data(news_item)
-                
-                news_item.og_title = og_title
-                print(f"   ✅ Generated OG title: {news_item.og_title}")
-                
-                news_item.og_description = og_description
-                print(f"   ✅ Generated OG description: {news_item.og_description[:50]}...")
-                
-                news_item.og_image = og_image
-                print(f"   ✅ Set OG image: {news_item.og_image}")
-                
-                # Generate schema markup
-                news_item.schema_markup = generate_schema_markup(news_item)
-                print(f"   ✅ Generated schema markup")
-                
-                # Get website URL for canonical URL
-                brand_info = BrandIdentity.query.first()
-                website_url = get_website_url(brand_info, seo_settings)
-                
-                # Set default values
-                news_item.meta_author = news_item.author.get_full_name() if news_item.author else "Unknown Author"
-                news_item.meta_language = "id"
-                news_item.meta_robots = "index, follow"
-                news_item.twitter_card = "summary_large_image"
-                news_item.structured_data_type = "NewsArticle"
-                news_item.canonical_url = f"{website_url}/news/{news_item.id}"
-                
-                # Calculate SEO score
-                news_item.seo_score = calculate_seo_score(news_item)
-                news_item.last_seo_audit = datetime.now(timezone.utc)
-                
-                print(f"   📊 SEO Score: {news_item.seo_score}/100")
-                
-                # Save to database
-                db.session.commit()
-                print(f"   ✅ Successfully updated SEO data")
-                updated_count += 1
-                
-            except Exception as e:
-                print(f"   ❌ Error processing news article: {e}")
-                db.session.rollback()
-                error_count += 1
-        
-        # Final summary
-        print("\n" + "=" * 50)
-        print("📊 NEWS SEO INJECTION SUMMARY")
-        print("=" * 50)
-        print(f"✅ Successfully updated: {updated_count} news articles")
-        print(f"🔒 Skipped (SEO locked): {locked_count} news articles")
-        print(f"❌ Errors: {error_count} news articles")
-        print(f"📰 Total news articles processed: {len(news_items)}")
-        
-        if updated_count > 0:
-            print(f"\n🎉 Successfully injected SEO data for {updated_count} news articles!")
-        elif locked_count > 0:
-            print(f"\nℹ️ All news articles have locked SEO ({locked_count} articles)")
-        else:
-            print(f"\n⚠️ No news articles were updated due to errors")
+    with _app_context():
+        from seo_injection_job import run_seo_injection_job
+        counts = run_seo_injection_job(['news'], force=force)['progress']['news']
+    
+    if not counts['total']:
+        print("❌ No news articles found in database")
+        return
+    
+    # Final summary
+    print("\n" + "=" * 50)
+    print("📊 NEWS SEO INJECTION SUMMARY")
+    print("=" * 50)
+    print(f"✅ Successfully updated: {counts['updated']} news articles")
+    print(f"⏭️ Unchanged since last injection: {counts['unchanged']} news articles")
+    print(f"🔒 Skipped (SEO locked): {counts['locked']} news articles")
+    print(f"❌ Errors: {counts['errors']} news articles")
+    print(f"📰 Total news articles processed: {counts['processed']}")
+    
+    if counts['updated'] > 0:
+        print(f"\n🎉 Successfully injected SEO data for {counts['updated']} news articles!")
+    elif counts['errors'] > 0:
+        print(f"\n⚠️ No news articles were updated due to errors")
+    else:
+        print(f"\nℹ️ All news articles are up to date or locked (use --force to re-inject)")
 
 def show_news_seo_stats():
     """Show statistics about news SEO data."""
     print("📊 News SEO Statistics")
     print("=" * 30)
     
-    with app.app_context():
+    with _app_context():
         total_news = News.query.count()
         
         # Count news with different SEO fields
@@ -733,14 +686,14 @@ def main():
     
     parser = argparse.ArgumentParser(description="Inject SEO data for news articles")
     parser.add_argument("--stats", action="store_true", help="Show SEO statistics only")
-    parser.add_argument("--force", action="store_true", help="Force update even if SEO data exists")
+    parser.add_argument("--force", action="store_true", help="Re-inject rows whose content and settings are unchanged")
     
     args = parser.parse_args()
     
     if args.stats:
         show_news_seo_stats()
     else:
-        inject_news_seo()
+        inject_news_seo(force=args.force)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -9,17 +9,19 @@ import unicodedata
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)  # Insert at beginning to prioritize local imports
 
-# Import app and db from the local main module
-import importlib.util
-spec = importlib.util.spec_from_file_location("main", os.path.join(project_root, "main.py"))
-main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(main)
-app = main.app
-db = main.db
+from contextlib import nullcontext
+from flask import has_app_context
 
-from models import RootSEO, BrandIdentity
+from models import db, RootSEO, BrandIdentity
 from sqlalchemy import text
 
+def _app_context():
+    """Reuse the caller's app context; standalone runs load the app from main.py."""
+    if has_app_context():
+        return nullcontext()
+    from main import app
+    return app.app_context()
+
 def get_seo_injection_settings():
     """Get SEO injection settings from the database."""
     try:
@@ -325,7 +327,7 @@ def inject_root_seo():
     print("🎯 LilyOpenCMS Root SEO Injector")
     print("=" * 50)
     
-    with app.app_context():
+    with _app_context():
         # Get brand identity for default values
         brand_info = BrandIdentity.query.first()
         brand_name = brand_info.brand_name if brand_info else "LilyOpenCMS"
@@ -486,13 +488,15 @@ def inject_root_seo():
             print(f"\n🎉 Successfully processed root SEO data for {created_count} pages!")
         else:
             print(f"\n⚠️ No pages were processed due to errors")
+        
+        return {'total': len(default_pages), 'processed': created_count, 'errors': error_count}
 
 def show_root_seo_stats():
     """Show statistics about root SEO data."""
     print("📊 Root SEO Statistics")
     print("=" * 30)
     
-    with app.app_context():
+    with _app_context():
         total_pages = RootSEO.query.count()
         active_pages = RootSEO.query.filter_by(is_active=True).count()
         
@@ -534,7 +538,7 @@ def update_existing_seo():
     print("🔄 LilyOpenCMS Root SEO Updater")
     print("=" * 50)
     
-    with app.app_context():
+    with _app_context():
         # Get brand identity and settings
         brand_info = BrandIdentity.query.first()
         settings = load_root_seo_settings()
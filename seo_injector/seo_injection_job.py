@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Incremental SEO Injection Job
+
+Regenerates SEO fields only for the news articles, albums and chapters whose
+inputs changed since their last injection. Every row stores seo_source_hash,
+a SHA-256 of the columns its SEO output is derived from plus a fingerprint of
+the site-wide SEO settings. Rows are scanned in id order as narrow tuples;
+only rows whose hash differs (or every unlocked row when forced) are loaded,
+regenerated and committed CHUNK_SIZE rows per transaction.
+
+The admin API runs the job in a background thread inside the application's
+app context. Progress is kept in the shared cache under JOB_KEY so any worker
+can report it, and cancellation is a cache flag checked between chunks;
+chunks committed before the cancel stay committed.
+
+With workers > 1 the job coordinates a process pool instead: each content
+type is split into disjoint id ranges of RANGE_CHUNKS chunks, and every
+worker process (spawned, not forked) opens its own engine and session,
+regenerates a chunk in memory and writes it back with one executemany
+UPDATE ... WHERE id = :row_id.
+The coordinator merges the workers' counts and failure messages into the job
+state as ranges finish. Root pages always run in the coordinator.
+"""
+
+import os
+import copy
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, func, inspect, select, text
+
+from models import db, Album, AlbumChapter, BrandIdentity, Category, News
+from optimizations.cache_config import safe_cache_get, safe_cache_set
+
+from .inject_news_seo import inject_news_item
+from .inject_album_seo import inject_album_item
+from .inject_chapter_seo import inject_chapter_item
+from .inject_root_seo import inject_root_seo
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+CONTENT_TYPES = ('news', 'albums', 'chapters', 'root')
+FINISHED_STATUSES = ('completed', 'cancelled', 'failed')
+
+JOB_KEY = 'seo_injection_job'
+CANCEL_KEY = 'seo_injection_cancel:{}'
+RERUN_KEY = 'seo_injection_rerun'
+STATE_TIMEOUT = 24 * 3600
+STALE_AFTER = 300  # seconds without a progress update before a running job counts as dead
+
+# Parallel mode
+RANGE_CHUNKS = 5  # chunks per id range handed to a worker
+POLL_SECONDS = 1.0  # coordinator's progress and cancel check interval
+MAX_FAILURES = 50  # failure messages kept in the job state
+SQLITE_BUSY_TIMEOUT = 30
+WORKER_CONFIG = ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_ENGINE_OPTIONS')
+
+_start_lock = threading.Lock()
+
+
+# Each query selects (id, is_seo_lock, seo_source_hash, *inputs of the generated SEO fields).
+# updated_at is left out on purpose: the injection itself bumps it.
+def _news_sources():
+    return (
+        select(News.id, News.is_seo_lock, News.seo_source_hash,
+               News.title, News.content, News.date, News.user_id, News.image_id, Category.name,
+               News.is_main_news, News.is_premium, News.is_archived)
+        .outerjoin(Category, News.category_id == Category.id)
+    )
+
+
+def _album_sources():
+    return (
+        select(Album.id, Album.is_seo_lock, Album.seo_source_hash,
+               Album.title, Album.description, Album.author, Album.user_id, Album.cover_image_id,
+               Category.name, Album.is_completed, Album.is_premium, Album.total_chapters, Album.created_at)
+        .outerjoin(Category, Album.category_id == Category.id)
+    )
+
+
+def _chapter_sources():
+    return (
+        select(AlbumChapter.id, AlbumChapter.is_seo_lock, AlbumChapter.seo_source_hash,
+               AlbumChapter.chapter_number, AlbumChapter.chapter_title, AlbumChapter.album_id,
+               News.content, News.image_id,
+               Album.title, Album.author, Album.cover_image_id, Album.is_completed, Category.name)
+        .outerjoin(News, AlbumChapter.news_id == News.id)
+        .outerjoin(Album, AlbumChapter.album_id == Album.id)
+        .outerjoin(Category, Album.category_id == Category.id)
+    )
+
+
+# content type -> (model, source query, per-row injector)
+SOURCES = {
+    'news': (News, _news_sources, inject_news_item),
+    'albums': (Album, _album_sources, inject_album_item),
+    'chapters': (AlbumChapter, _chapter_sources, inject_chapter_item),
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def settings_fingerprint(session=None) -> str:
+    """Hash of the site-wide settings that every generated SEO field depends on."""
+    session = session or db.session
+    injection_settings = None
+    if inspect(session.connection()).has_table('seo_injection_settings'):
+        row = session.execute(text('SELECT * FROM seo_injection_settings LIMIT 1')).mappings().first()
+        injection_settings = dict(row) if row else None
+    brand = session.execute(
+        select(BrandIdentity.brand_name, BrandIdentity.website_url, BrandIdentity.seo_settings).limit(1)
+    ).first()
+    payload = [injection_settings, list(brand) if brand else None]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def source_hash(fingerprint: str, values: Iterable) -> str:
+    payload = json.dumps([fingerprint, list(values)], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def new_job_state(content_types: Iterable[str], force: bool = False, workers: int = 0) -> dict:
+    content_types = list(content_types)
+    return {
+        'id': uuid.uuid4().hex,
+        'status': 'pending',
+        'types': content_types,
+        'force': force,
+        'workers': workers,
+        'current': None,
+        'error': None,
+        'failures': [],
+        'started_at': _now(),
+        'updated_at': _now(),
+        'finished_at': None,
+        'progress': {
+            content_type: {'total': 0, 'processed': 0, 'updated': 0, 'unchanged': 0, 'locked': 0, 'errors': 0}
+            for content_type in content_types
+        },
+    }
+
+
+def _inject_chunk(model, inject_item, changed: Dict[int, str]) -> Tuple[int, int]:
+    """Regenerate and commit one chunk; return (updated, errors)."""
+    try:
+        items = db.session.scalars(select(model).where(model.id.in_(changed))).all()
+        for item in items:
+            inject_item(item)
+            item.seo_source_hash = changed[item.id]
+        db.session.commit()
+        return len(items), 0
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"SEO injection chunk of {model.__name__} failed, retrying row by row: {e}")
+
+    # Isolate the failing rows so one bad row only costs itself
+    updated = errors = 0
+    for row_id, digest in changed.items():
+        try:
+            item = db.session.get(model, row_id)
+            if item is None:
+                continue
+            inject_item(item)
+            item.seo_source_hash = digest
+            db.session.commit()
+            updated += 1
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"SEO injection failed for {model.__name__} {row_id}: {e}")
+            errors += 1
+    return updated, errors
+
+
+def _changed_chunks(content_type: str, fingerprint: str, force: bool, chunk_size: int, counts: dict,
+                    cancelled: Callable[[], bool], after_id: int = 0,
+                    upto_id: Optional[int] = None) -> Iterator[Tuple[Dict[int, str], int]]:
+    """Scan rows after_id < id <= upto_id in id order; yield ({id: new hash} to regenerate, rows scanned) per chunk."""
+    model, sources, _ = SOURCES[content_type]
+    last_id = after_id
+    while not cancelled():
+        query = sources().where(model.id > last_id)
+        if upto_id is not None:
+            query = query.where(model.id <= upto_id)
+        rows = db.session.execute(query.order_by(model.id).limit(chunk_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        changed = {}
+        for row_id, locked, stored_hash, *values in rows:
+            if locked:
+                counts['locked'] += 1
+                continue
+            digest = source_hash(fingerprint, values)
+            if force or digest != stored_hash:
+                changed[row_id] = digest
+            else:
+                counts['unchanged'] += 1
+        yield changed, len(rows)
+
+
+def _inject_rows(content_type: str, fingerprint: str, force: bool, chunk_size: int, counts: dict,
+                 report: Callable[[], None], cancelled: Callable[[], bool]) -> None:
+    model, _, inject_item = SOURCES[content_type]
+    counts['total'] = db.session.scalar(select(func.count()).select_from(model))
+    report()
+
+    for changed, scanned in _changed_chunks(content_type, fingerprint, force, chunk_size, counts, cancelled):
+        if changed:
+            updated, errors = _inject_chunk(model, inject_item, changed)
+            counts['updated'] += updated
+            counts['errors'] += errors
+        counts['processed'] += scanned
+        report()
+
+
+def _inject_root(counts: dict) -> None:
+    # A handful of fixed pages: always regenerated
+    result = inject_root_seo()
+    counts.update(total=result['total'], processed=result['total'],
+                  updated=result['processed'], errors=result['errors'])
+
+
+def pool_size(workers) -> int:
+    """
+    Worker processes for a requested pool size, capped at one per CPU;
+    'auto' means one per CPU.
+
+    Raises:
+        ValueError: Not a number
+    """
+    cpus = os.cpu_count() or 1
+    if workers == 'auto':
+        return cpus
+    return min(max(int(workers or 0), 0), cpus)
+
+
+def id_ranges(model, size: int) -> List[Tuple[int, Optional[int]]]:
+    """Split a table into (after_id, upto_id) ranges of about size rows; the last one is open-ended."""
+    ranges, last_id = [], 0
+    while True:
+        upper = db.session.scalar(
+            select(model.id).where(model.id > last_id).order_by(model.id).offset(size - 1).limit(1)
+        )
+        if upper is None:
+            if db.session.scalar(select(model.id).where(model.id > last_id).limit(1)) is not None:
+                ranges.append((last_id, None))
+            elif ranges:
+                # Rows inserted after the split belong to the last range
+                ranges[-1] = (ranges[-1][0], None)
+            return ranges
+        ranges.append((last_id, upper))
+        last_id = upper
+
+
+def _supports_workers() -> bool:
+    url = db.engine.url
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+
+
+def _worker_config() -> dict:
+    config = {key: current_app.config[key] for key in WORKER_CONFIG if key in current_app.config}
+    if db.engine.url.get_backend_name() == 'sqlite':
+        # Workers write in turns; wait for the lock instead of failing the chunk
+        options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        options['connect_args'] = {'timeout': SQLITE_BUSY_TIMEOUT, **options.get('connect_args', {})}
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return config
+
+
+def _init_worker(config: dict) -> None:
+    """Pool initializer: give the worker process its own app, engine and session."""
+    from flask import Flask
+    app = Flask('seo_injection_worker')
+    app.config.update(config)
+    db.init_app(app)
+    app.app_context().push()
+
+
+def _bulk_inject_chunk(model, inject_item, changed: Dict[int, str], failures: List[str]) -> Tuple[int, int]:
+    """Regenerate one chunk in memory and write it with one executemany UPDATE; return (updated, errors)."""
+    from routes.utils.image_usage import OWNER_TYPES, extract_refs, write_usage
+
+    items, errors = [], 0
+    with db.session.no_autoflush:
+        for item in db.session.scalars(select(model).where(model.id.in_(changed))).all():
+            try:
+                inject_item(item)
+            except Exception as e:
+                errors += 1
+                failures.append(f"{model.__name__} {item.id}: {e}")
+                continue
+            item.seo_source_hash = changed[item.id]
+            items.append(item)
+    if not items:
+        db.session.rollback()
+        return 0, errors
+
+    written = [prop for prop in inspect(model).column_attrs
+               if any(inspect(item).attrs[prop.key].history.has_changes() for item in items)]
+    rows = [dict({prop.columns[0].key: getattr(item, prop.key) for prop in written}, row_id=item.id)
+            for item in items]
+    refs = {(OWNER_TYPES[model], item.id): extract_refs(item) for item in items}
+    db.session.expunge_all()
+
+    table = model.__table__
+    try:
+        # Rows locked since the scan keep their manual SEO
+        result = db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id'), table.c.is_seo_lock.isnot(True)), rows
+        )
+        write_usage(db.session.connection(), refs)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        failures.append(f"{model.__name__} {min(changed)}-{max(changed)}: {e}")
+        return 0, errors + len(rows)
+    return (result.rowcount if result.rowcount >= 0 else len(rows)), errors
+
+
+def _inject_range(content_type: str, after_id: int, upto_id: Optional[int], fingerprint: str,
+                  force: bool, chunk_size: int) -> Tuple[dict, List[str]]:
+    """Pool entry point: inject one id range; return its (counts, failure messages)."""
+    model, _, inject_item = SOURCES[content_type]
+    counts = {'processed': 0, 'updated': 0, 'unchanged': 0, 'locked': 0, 'errors': 0}
+    failures = []
+    try:
+        for changed, scanned in _changed_chunks(content_type, fingerprint, force, chunk_size, counts,
+                                                lambda: False, after_id, upto_id):
+            if changed:
+                updated, errors = _bulk_inject_chunk(model, inject_item, changed, failures)
+                counts['updated'] += updated
+                counts['errors'] += errors
+            counts['processed'] += scanned
+    finally:
+        db.session.remove()
+    return counts, failures
+
+
+def _pool_context():
+    # The coordinator runs in a thread of a multi-threaded web worker; a forked
+    # child could inherit locks held by other threads (logging, engine pool,
+    # cache client). Spawned workers start clean and build their own app.
+    return multiprocessing.get_context('spawn')
+
+
+def _invalidate_bulk_writes(content_types: Iterable[str]) -> None:
+    """Worker writes bypass the session listeners; mark what they changed stale here."""
+    try:
+        from routes.utils.seo_stats import bump_seo_stats_version
+        from routes.utils.sitemap_cache import TRACKED_MODELS, bump_sitemap_sections
+    except ImportError:
+        return
+    bump_seo_stats_version()
+    bump_sitemap_sections({section for content_type in content_types
+                           for section in TRACKED_MODELS[SOURCES[content_type][0]][0]})
+
+
+def _inject_parallel(content_types: List[str], fingerprint: str, force: bool, chunk_size: int, workers: int,
+                     state: dict, report: Callable[[], None], cancelled: Callable[[], bool]) -> None:
+    tasks = []
+    for content_type in content_types:
+        model = SOURCES[content_type][0]
+        state['progress'][content_type]['total'] = db.session.scalar(select(func.count()).select_from(model))
+        tasks += [(content_type, after_id, upto_id)
+                  for after_id, upto_id in id_ranges(model, chunk_size * RANGE_CHUNKS)]
+    report()
+    # Hold no connection while the workers write
+    db.session.close()
+    if not tasks:
+        return
+
+    updated_types = set()
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=_pool_context(),
+                             initializer=_init_worker, initargs=(_worker_config(),)) as pool:
+        futures = {pool.submit(_inject_range, *task, fingerprint, force, chunk_size): task for task in tasks}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                content_type, after_id, upto_id = futures[future]
+                counts = state['progress'][content_type]
+                try:
+                    result, failures = future.result()
+                except Exception as e:
+                    logger.error(f"SEO injection worker failed on {content_type} after id {after_id}: {e}")
+                    result, failures = {'errors': 1}, [f"{content_type} ids {after_id + 1}-{upto_id or 'end'}: {e}"]
+                for key, value in result.items():
+                    counts[key] += value
+                if result.get('updated'):
+                    updated_types.add(content_type)
+                for message in failures:
+                    logger.warning(f"SEO injection failed for {message}")
+                state['failures'] = (state['failures'] + failures)[:MAX_FAILURES]
+            report()
+            if cancelled():
+                # Ranges already running finish and are merged; queued ones never start
+                for future in pending:
+                    future.cancel()
+
+    if updated_types:
+        _invalidate_bulk_writes(updated_types)
+
+
+def run_seo_injection_job(content_types: Iterable[str], force: bool = False, chunk_size: int = CHUNK_SIZE,
+                          state: Optional[dict] = None,
+                          on_progress: Optional[Callable[[dict], None]] = None,
+                          should_cancel: Optional[Callable[[], bool]] = None,
+                          workers: int = 0) -> dict:
+    """
+    Run an incremental SEO injection in the current app context.
+
+    Args:
+        content_types: Any of 'news', 'albums', 'chapters', 'root', in run order
+        force: Regenerate every unlocked row, even if its inputs are unchanged
+        chunk_size: Rows per scan and per commit
+        state: Job state to update (a new one is created when omitted)
+        on_progress: Called with the state after every chunk
+        should_cancel: Polled before every chunk; a true result stops the job
+        workers: Worker processes for news, albums and chapters (0 or 1 runs them
+                 here, one type after another)
+
+    Returns:
+        dict: The final job state
+    """
+    state = state or new_job_state(content_types, force, workers)
+    report = lambda: on_progress(state) if on_progress else None
+    cancelled = should_cancel or (lambda: False)
+
+    state['status'] = 'running'
+    try:
+        fingerprint = settings_fingerprint()
+        parallel = [t for t in state['types'] if t != 'root'] if workers > 1 and _supports_workers() else []
+        if parallel:
+            state['current'] = ', '.join(parallel)
+            _inject_parallel(parallel, fingerprint, force, chunk_size, workers, state, report, cancelled)
+        for content_type in state['types']:
+            if cancelled():
+                break
+            if content_type in parallel:
+                continue
+            state['current'] = content_type
+            counts = state['progress'][content_type]
+            if content_type == 'root':
+                _inject_root(counts)
+            else:
+                _inject_rows(content_type, fingerprint, force, chunk_size, counts, report, cancelled)
+            report()
+        state['status'] = 'cancelled' if cancelled() else 'completed'
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("SEO injection job failed")
+        state['status'] = 'failed'
+        state['error'] = str(e)
+
+    state['current'] = None
+    state['finished_at'] = _now()
+    report()
+    return state
+
+
+def get_job_state() -> Optional[dict]:
+    """State of the latest background job, or None if none ran recently."""
+    return safe_cache_get(JOB_KEY)
+
+
+def is_job_active(state: Optional[dict]) -> bool:
+    return bool(state) and state['status'] not in FINISHED_STATUSES \
+        and time.time() - state.get('heartbeat', 0) < STALE_AFTER
+
+
+def _save_state(state: dict) -> None:
+    state['heartbeat'] = time.time()
+    state['updated_at'] = _now()
+    safe_cache_set(JOB_KEY, state, timeout=STATE_TIMEOUT)
+
+
+def _next_queued_state() -> Optional[dict]:
+    """State for a follow-up run of the content types queued while the last job ran."""
+    with _start_lock:
+        queued = safe_cache_get(RERUN_KEY)
+        if not queued:
+            return None
+        safe_cache_set(RERUN_KEY, [], timeout=STATE_TIMEOUT)
+        state = new_job_state([t for t in CONTENT_TYPES if t in queued])
+        _save_state(state)
+        return state
+
+
+def _run_in_background(app, state: dict, chunk_size: int) -> None:
+    with app.app_context():
+        try:
+            while state:
+                cancel_key = CANCEL_KEY.format(state['id'])
+                run_seo_injection_job(state['types'], state['force'], chunk_size, state=state,
+                                      on_progress=_save_state,
+                                      should_cancel=lambda: bool(safe_cache_get(cancel_key)),
+                                      workers=state.get('workers', 0))
+                state = _next_queued_state()
+        finally:
+            db.session.remove()
+
+
+def start_seo_injection_job(app, content_types: Iterable[str], force: bool = False,
+                            chunk_size: int = CHUNK_SIZE, queue: bool = False,
+                            workers: int = 0) -> Tuple[dict, bool]:
+    """
+    Start a background injection unless one is already running.
+
+    With queue set, content types requested while a job runs are injected
+    again right after it finishes, so changes committed mid-run are not missed.
+    With workers above 1 the job coordinates a pool of worker processes.
+
+    Returns:
+        tuple: (job state, whether a new job was started)
+    """
+    with _start_lock:
+        current = get_job_state()
+        if is_job_active(current):
+            if queue:
+                queued = set(safe_cache_get(RERUN_KEY) or ()) | set(content_types)
+                safe_cache_set(RERUN_KEY, sorted(queued), timeout=STATE_TIMEOUT)
+            return current, False
+
+        state = new_job_state(content_types, force, workers)
+        _save_state(state)
+        snapshot = copy.deepcopy(state)
+        threading.Thread(target=_run_in_background, args=(app, state, chunk_size),
+                         name='seo-injection', daemon=True).start()
+        return snapshot, True
+
+
+def cancel_seo_injection_job() -> Optional[dict]:
+    """Ask the running job to stop after its current chunk; None if no job is running."""
+    state = get_job_state()
+    if not is_job_active(state):
+        return None
+    safe_cache_set(CANCEL_KEY.format(state['id']), True, timeout=STATE_TIMEOUT)
+    state['status'] = 'cancelling'
+    return state
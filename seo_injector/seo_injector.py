@@ -14,25 +14,27 @@ from typing import Dict, List, Any
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-# Import app and db from the local main module
-import importlib.util
-spec = importlib.util.spec_from_file_location("main", os.path.join(project_root, "main.py"))
-main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(main)
-app = main.app
-db = main.db
+from contextlib import nullcontext
+from flask import has_app_context
+
+def _app_context():
+    """Reuse the caller's app context; standalone runs load the app from main.py."""
+    if has_app_context():
+        return nullcontext()
+    from main import app
+    return app.app_context()
 
 # Import the individual injector modules
-from inject_news_seo import inject_news_seo as inject_news_seo_func
-from inject_album_seo import inject_album_seo as inject_album_seo_func
-from inject_chapter_seo import inject_chapter_seo as inject_chapter_seo_func
-from inject_root_seo import inject_root_seo as inject_root_seo_func
+from seo_injector.inject_news_seo import inject_news_seo as inject_news_seo_func
+from seo_injector.inject_album_seo import inject_album_seo as inject_album_seo_func
+from seo_injector.inject_chapter_seo import inject_chapter_seo as inject_chapter_seo_func
+from seo_injector.inject_root_seo import inject_root_seo as inject_root_seo_func
 
 # Import stats functions
-from inject_news_seo import show_news_seo_stats as show_news_seo_stats_func
-from inject_album_seo import show_album_seo_stats as show_album_seo_stats_func
-from inject_chapter_seo import show_chapter_seo_stats as show_chapter_seo_stats_func
-from inject_root_seo import show_root_seo_stats as show_root_seo_stats_func
+from seo_injector.inject_news_seo import show_news_seo_stats as show_news_seo_stats_func
+from seo_injector.inject_album_seo import show_album_seo_stats as show_album_seo_stats_func
+from seo_injector.inject_chapter_seo import show_chapter_seo_stats as show_chapter_seo_stats_func
+from seo_injector.inject_root_seo import show_root_seo_stats as show_root_seo_stats_func
 
 class SEOInjector:
     """Main SEO Injector class for handling all SEO operations."""
@@ -237,6 +239,43 @@ class SEOInjector:
         
         return summary
     
+    def run_parallel_injection(self, content_types: List[str], workers: int) -> Dict[str, Any]:
+        """Run SEO injection with news, albums and chapters split across worker processes."""
+        from seo_injector.seo_injection_job import run_seo_injection_job
+
+        print(f"🚀 Starting Parallel SEO Injection ({workers} workers)...")
+        print("=" * 60)
+
+        state = run_seo_injection_job(content_types, workers=workers)
+        progress = state['progress'].values()
+        total_updated = sum(counts['updated'] for counts in progress)
+        total_errors = sum(counts['errors'] for counts in progress)
+        total_locked = sum(counts.get('locked', 0) for counts in progress)
+
+        end_time = datetime.now(timezone.utc)
+        duration = (end_time - self.start_time).total_seconds()
+
+        print(f"✅ Total items updated: {total_updated}")
+        print(f"🔒 Total items locked: {total_locked}")
+        print(f"❌ Total errors: {total_errors}")
+        for message in state['failures']:
+            print(f"   ❌ {message}")
+        print(f"⏱️ Duration: {duration:.2f} seconds")
+        print("=" * 60)
+
+        return {
+            'status': 'error' if state['status'] == 'failed' else (
+                'completed' if total_errors == 0 else 'completed_with_errors'),
+            'message': state['error'] or f'SEO injection completed in {duration:.2f} seconds',
+            'total_updated': total_updated,
+            'total_errors': total_errors,
+            'total_locked': total_locked,
+            'duration_seconds': duration,
+            'start_time': self.start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'job': state
+        }
+
     def get_seo_stats(self) -> Dict[str, Any]:
         """Get SEO statistics for all content types."""
         try:
@@ -321,11 +360,15 @@ class SEOInjector:
         
         return details
 
-def run_seo_injection(injection_type: str = 'all') -> Dict[str, Any]:
-    """Run SEO injection for specified type."""
+def run_seo_injection(injection_type: str = 'all', workers: int = 0) -> Dict[str, Any]:
+    """Run SEO injection for specified type; workers > 1 runs it in a process pool."""
     injector = SEOInjector()
     
-    with app.app_context():
+    with _app_context():
+        if workers > 1 and injection_type in ('news', 'albums', 'chapters', 'all'):
+            from seo_injector.seo_injection_job import CONTENT_TYPES
+            content_types = list(CONTENT_TYPES) if injection_type == 'all' else [injection_type]
+            return injector.run_parallel_injection(content_types, workers)
         if injection_type == 'news':
             return injector.run_news_seo_injection()
         elif injection_type == 'albums':
@@ -346,7 +389,7 @@ def get_seo_statistics() -> Dict[str, Any]:
     """Get SEO statistics for all content types."""
     injector = SEOInjector()
     
-    with app.app_context():
+    with _app_context():
         return injector.get_seo_stats()
 
 if __name__ == "__main__":
@@ -356,6 +399,8 @@ if __name__ == "__main__":
     parser.add_argument("--type", choices=['news', 'albums', 'chapters', 'root', 'all'], 
                        default='all', help="Type of SEO injection to run")
     parser.add_argument("--stats", action="store_true", help="Show statistics only")
+    parser.add_argument("--workers", default="0",
+                       help="Worker processes for news, albums and chapters ('auto' = one per CPU, 0 = serial)")
     
     args = parser.parse_args()
     
@@ -363,5 +408,10 @@ if __name__ == "__main__":
         result = get_seo_statistics()
         print(json.dumps(result, indent=2))
     else:
-        result = run_seo_injection(args.type)
+        from seo_injector.seo_injection_job import pool_size
+        try:
+            workers = pool_size(args.workers)
+        except ValueError as e:
+            parser.error(f"--workers: {e}")
+        result = run_seo_injection(args.type, workers=workers)
         print(json.dumps(result, indent=2)) 
\ No newline at end of file
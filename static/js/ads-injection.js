@@ -257,30 +257,37 @@ class AdsInjectionSystem {
             }
         }
 
-        // Ask backend for layout recommendation to adjust "after N" smartly
+        // One round-trip: backend layout recommendation plus the ads to fill it
+        let prefetched = null;
         try {
-            const sectionsProbe = this.probeSectionsForCounts(placements);
-            const resp = await fetch('/ads/api/layout/recommend', {
-                method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ page_type: this.pageContext.pageType, sections: sectionsProbe })
-            });
-            if (resp.ok) {
-                const rec = await resp.json();
-                if (rec && rec.success && rec.recommendations) {
-                    placements = this.applyRecommendations(placements, rec.recommendations);
+            const layout = await this.loadLayoutAndAds(placements);
+            if (layout) {
+                placements = this.applyRecommendations(placements, layout.recommendations);
+                prefetched = layout.adsByPlacement;
+                // Exploded "after N" placements need their own containers
+                for (const placement of placements) {
+                    const placementKey = this.buildPlacementKey(placement);
+                    if (this.adPlacements.has(placementKey)) continue;
+                    this.adPlacements.set(placementKey, placement);
+                    if (!this.ensureAdContainer(placement)) this.retryCreateContainerForPlacement(placement);
                 }
             }
         } catch (_) {}
 
-        // If IO is available, observe containers; otherwise use batch serve
-        if (this.placementObserver) {
+        if (prefetched) {
+            for (const placement of placements) {
+                const ads = prefetched[this.buildPlacementKey(placement)];
+                if (ads) this.injectAdsForPlacement(ads, placement);
+            }
+        } else if (this.placementObserver) {
+            // If IO is available, observe containers; otherwise use batch serve
             for (const placement of placements) {
                 const container = this.adContainers.get(this.buildPlacementKey(placement));
                 if (container) this.placementObserver.observe(container);
             }
             // Prefetch ads in background to reduce perceived latency
             try { if (placements && placements.length) this.loadAdsForPlacementsBatch(placements); } catch (_) {}
-            } else {
+        } else {
             if (placements && placements.length) await this.loadAdsForPlacementsBatch(placements);
         }
 
@@ -1240,6 +1247,36 @@ class AdsInjectionSystem {
         return `ad_impr_${adId}_${day}`;
     }
     
+    async loadLayoutAndAds(placements) {
+        const response = await fetch('/ads/api/layout/serve', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                page_type: this.pageContext.pageType,
+                page_specific: this.pageContext.pageSpecific,
+                sections: this.probeSectionsForCounts(placements),
+                // "after N" keys go without the value; the server appends one per recommended position
+                placements: placements.map(p => ({
+                    key: this.buildPlacementKey(p.position === 'after_n_items' ? { ...p, positionValue: null } : p),
+                    qualifier: this.placementQualifier(p),
+                    section: p.section,
+                    position: p.position,
+                    position_value: p.positionValue,
+                    max_ads: p.maxAds || 1
+                })),
+                user_id: this.getUserId(),
+                user_has_premium: this.userPreferences.hasPremiumAccess,
+                user_should_show_ads: this.userPreferences.shouldShowAds,
+                device_type: this.deviceType,
+                card_style: this.pageContext.cardStyle
+            })
+        });
+        if (!response.ok) return null;
+        const data = await response.json();
+        if (!data || !data.success || !data.recommendations) return null;
+        return { recommendations: data.recommendations, adsByPlacement: data.adsByPlacement || {} };
+    }
+
     async loadAdsForPlacementsBatch(placements) {
         try {
             if (!placements || !placements.length) return;
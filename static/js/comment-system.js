@@ -15,7 +15,7 @@ class CommentSystem {
             ...options
         };
         
-        this.currentPage = 1;
+        this.nextCursor = null; // Opaque cursor for the next page of top-level comments
         this.comments = [];
         this.allComments = []; // Store all loaded comments
         this.isLoading = false;
@@ -173,30 +173,32 @@ class CommentSystem {
         }
     }
     
-    async loadComments(page = 1) {
+    async loadComments(cursor = null) {
         if (this.isLoading) return;
         
         this.isLoading = true;
         this.showLoading();
         
         try {
-            const response = await fetch(`/api/comments/${this.contentType}/${this.contentId}?page=${page}&per_page=${this.options.perPage}`);
+            const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+            const response = await fetch(`/api/comments/${this.contentType}/${this.contentId}?per_page=${this.options.perPage}${cursorParam}`);
             const data = await response.json();
             
             if (response.ok) {
-                if (page === 1) {
+                const hasNext = !!(data.pagination && data.pagination.has_next);
+                if (!cursor) {
                     // First load - store all comments and show initial amount
                     this.allComments = data.comments;
                     this.comments = this.allComments.slice(0, this.options.perPage); // Show initial 12
-                    this.hasMoreComments = this.allComments.length > this.options.perPage;
+                    this.hasMoreComments = hasNext || this.allComments.length > this.options.perPage;
                 } else {
                     // Load more - append to existing comments
                     this.allComments = [...this.allComments, ...data.comments];
                     this.comments = this.allComments.slice(0, this.options.perPage); // Show initial 12
-                    this.hasMoreComments = data.comments.length === this.options.perPage;
+                    this.hasMoreComments = hasNext;
                 }
                 
-                this.currentPage = page;
+                this.nextCursor = (data.pagination && data.pagination.next_cursor) || null;
                 this.renderComments();
                 
                 // Setup auto-load observer for new comments
@@ -263,7 +265,7 @@ class CommentSystem {
                 form.reset();
                 
                 // Reload comments to show the new comment
-                this.loadComments(1);
+                this.loadComments();
                 
                 // If it's a reply, hide the reply form
                 if (parentId) {
@@ -336,7 +338,7 @@ class CommentSystem {
             
             if (response.ok) {
                 this.showSuccess(data.message);
-                this.loadComments(this.currentPage);
+                this.loadComments();
             } else {
                 this.showError(data.error || 'Failed to update comment');
             }
@@ -373,7 +375,7 @@ class CommentSystem {
             
             if (response.ok) {
                 this.showSuccess(data.message);
-                this.loadComments(this.currentPage);
+                this.loadComments();
             } else {
                 this.showError(data.error || 'Failed to delete comment');
             }
@@ -653,47 +655,29 @@ class CommentSystem {
         const paginationContainer = document.querySelector('.comments-pagination');
         if (!paginationContainer) return;
         
-        if (pagination.pages <= 1) {
+        if (!pagination.has_next) {
             paginationContainer.innerHTML = '';
             return;
         }
         
-        let paginationHtml = '<ul class="pagination pagination-sm">';
-        
-        if (pagination.has_prev) {
-            paginationHtml += `<li class="page-item"><a class="page-link" href="#" data-page="${pagination.page - 1}">Previous</a></li>`;
-        }
-        
-        for (let i = 1; i <= pagination.pages; i++) {
-            const active = i === pagination.page ? 'active' : '';
-            paginationHtml += `<li class="page-item ${active}"><a class="page-link" href="#" data-page="${i}">${i}</a></li>`;
-        }
-        
-        if (pagination.has_next) {
-            paginationHtml += `<li class="page-item"><a class="page-link" href="#" data-page="${pagination.page + 1}">Next</a></li>`;
-        }
-        
-        paginationHtml += '</ul>';
-        paginationContainer.innerHTML = paginationHtml;
+        paginationContainer.innerHTML = `<ul class="pagination pagination-sm"><li class="page-item"><a class="page-link" href="#" data-cursor="${pagination.next_cursor}">Load more</a></li></ul>`;
         
         // Bind pagination events
         paginationContainer.addEventListener('click', (e) => {
             if (e.target.matches('.page-link')) {
                 e.preventDefault();
-                const page = parseInt(e.target.dataset.page);
-                this.loadComments(page);
+                this.loadComments(e.target.dataset.cursor);
             }
-        });
+        }, { once: true });
     }
     
     loadMoreComments() {
-        if (this.isLoading || !this.hasMoreComments) return;
+        if (this.isLoading || !this.hasMoreComments || !this.nextCursor) return;
         
-        this.isLoading = true;
         this.showLoadMoreLoading();
         
-        // Load more comments from server
-        this.loadComments(this.currentPage + 1);
+        // Load more comments from server (loadComments manages isLoading)
+        this.loadComments(this.nextCursor);
     }
     
     showLoading() {
@@ -1075,7 +1075,15 @@ function debounce(func, wait) {
 }
 
 // SEO Injection Functions
+let activeSEOInjection = null;  // type of the background job started from this page, if any
+
 function runSEOInjection(type) {
+    // A second click on the running job's button cancels it
+    if (activeSEOInjection === type) {
+        cancelSEOInjection();
+        return;
+    }
+    
     const buttonMap = {
         'news': 'run-articles-seo-injection',
         'albums': 'run-albums-seo-injection',
@@ -1099,7 +1107,8 @@ function runSEOInjection(type) {
       'Ini akan:\n' +
       '• Menghapus semua meta description, keywords, OG tags yang ada\n' +
       '• Membuat ulang SEO data berdasarkan konten dengan pembersihan markdown\n' +
-      '• Mengatur is_seo_lock = false untuk semua item\n\n' +
+      '• Mengatur is_seo_lock = false untuk semua item\n' +
+      '• Hanya memproses item yang konten atau pengaturan SEO-nya berubah sejak injeksi terakhir\n\n' +
       `Apakah Anda yakin ingin melanjutkan untuk ${typeLabels[type]}?`;
 
     const modal = document.getElementById('confirmation-modal');
@@ -1131,14 +1140,14 @@ function runSEOInjection(type) {
 
     function proceedInjection() {
     
-    // Disable button and show loading state
-    button.disabled = true;
+    // Show loading state; the button stays clickable to cancel the job
+    activeSEOInjection = type;
     button.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Menjalankan SEO Injection...';
     
     // Show progress toast
     showToast(`🚀 Memulai SEO Injection untuk ${typeLabels[type]}...`, 'info');
     
-    // Make API call to run SEO injection
+    // Start the background SEO injection job
     fetch('/api/seo/inject', {
         method: 'POST',
         headers: {
@@ -1155,22 +1164,25 @@ function runSEOInjection(type) {
         if (data.error) {
             throw new Error(data.error);
         }
-        
+        return waitForSEOInjection(data.job.id, progress => {
+            button.innerHTML = `<i class="fas fa-spinner fa-spin mr-2"></i>SEO Injection ${progress.processed}/${progress.total} (klik untuk batalkan)`;
+        }, type);
+    })
+    .then(job => {
         // Show success message with results
-        const result = data.result;
-        let message = `✅ SEO Injection untuk ${typeLabels[type]} selesai!\n\n`;
-        
-        if (result.total_updated > 0) {
-            message += `📊 Hasil:\n`;
-            message += `• Total item diperbarui: ${result.total_updated}\n`;
-            message += `• Total item terkunci: ${result.total_locked}\n`;
-            message += `• Total error: ${result.total_errors}\n`;
-            message += `• Durasi: ${result.duration_seconds.toFixed(2)} detik\n\n`;
-        }
+        const result = job.progress[type];
+        let message = job.status === 'cancelled'
+            ? `⏹️ SEO Injection untuk ${typeLabels[type]} dibatalkan.\n\n`
+            : `✅ SEO Injection untuk ${typeLabels[type]} selesai!\n\n`;
         
+        message += `📊 Hasil:\n`;
+        message += `• Total item diperbarui: ${result.updated}\n`;
+        message += `• Tidak berubah: ${result.unchanged}\n`;
+        message += `• Total item terkunci: ${result.locked}\n`;
+        message += `• Total error: ${result.errors}\n\n`;
         message += `🔄 Memuat ulang data...`;
         
-        showToast(message, 'success');
+        showToast(message, job.status === 'completed' ? 'success' : 'info');
         
         // Reload data based on type
         setTimeout(() => {
@@ -1196,13 +1208,60 @@ function runSEOInjection(type) {
         showToast(`❌ Error untuk ${typeLabels[type]}: ${error.message}`, 'error');
     })
     .finally(() => {
-        // Re-enable button
-        button.disabled = false;
+        // Restore button
+        activeSEOInjection = null;
         button.innerHTML = originalText;
     });
     }
 }
 
+// Poll /api/seo/inject/progress until the job finishes; resolves with the final job state
+function waitForSEOInjection(jobId, onProgress, type) {
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch('/api/seo/inject/progress', {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+            .then(response => response.json())
+            .then(data => {
+                const job = data.job;
+                if (!job || job.id !== jobId) {
+                    throw new Error('Status SEO Injection tidak ditemukan');
+                }
+                if (job.status === 'failed') {
+                    throw new Error(job.error || 'SEO Injection gagal');
+                }
+                if (job.progress[type]) {
+                    onProgress(job.progress[type]);
+                }
+                if (job.status === 'completed' || job.status === 'cancelled') {
+                    resolve(job);
+                } else if (!data.running) {
+                    throw new Error('SEO Injection berhenti tanpa menyelesaikan');
+                } else {
+                    setTimeout(poll, 1500);
+                }
+            })
+            .catch(reject);
+        };
+        poll();
+    });
+}
+
+function cancelSEOInjection() {
+    return fetch('/api/seo/inject/cancel', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        showToast(data.error ? `❌ ${data.error}` : '⏹️ SEO Injection akan berhenti setelah batch saat ini', data.error ? 'error' : 'info');
+    });
+}
+
 function confirmAndInjectSingle(type, id) {
     const typeLabels = {
         'article': 'Artikel',
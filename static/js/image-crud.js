@@ -358,6 +358,8 @@ document.getElementById('add-image-form').addEventListener('submit', async (e) =
         });
 
         if (!response.ok) throw new Error('Failed to upload image');
+        const data = await response.json();
+        if (data.status_url && window.waitForImageJob) await window.waitForImageJob(data.status_url);
 
         showToast('success', 'Image uploaded successfully!');
         fetchAndDisplayImages(1); // Refresh the image grid, go to page 1
@@ -450,6 +452,13 @@ async function confirmDelete() {
             method: 'DELETE',
         });
 
+        if (response.status === 409) {
+            const data = await response.json();
+            closeDeleteModal();
+            showToast('error', `Gambar masih digunakan di ${data.usage.length} konten.`);
+            openUsageModal(currentImageId, `#${currentImageId}`);
+            return;
+        }
         if (!response.ok) throw new Error('Failed to delete image');
 
         showToast('success', 'Image deleted successfully!');
@@ -579,7 +588,12 @@ if (confirmBulkDeleteBtnImg) {
                 const errorData = await response.json().catch(() => ({}));
                 throw new Error(errorData.error || `Gagal menghapus gambar (Status: ${response.status})`);
             }
-            showToast('success', 'Gambar berhasil dihapus!');
+            const result = await response.json();
+            if (result.skipped_in_use && result.skipped_in_use.length > 0) {
+                showToast('error', `${result.skipped_in_use.length} gambar masih digunakan dan tidak dihapus.`);
+            } else {
+                showToast('success', 'Gambar berhasil dihapus!');
+            }
             selectedImageIds.clear();
             updateBulkActionsBarImg();
             fetchAndDisplayImages(currentPage);
@@ -706,15 +720,29 @@ function openUsageModal(imageId, filename) {
     fetch(`/api/images/${imageId}/usage`)
         .then(res => res.json())
         .then(data => {
-            if (data.news && data.news.length > 0) {
-                const list = document.createElement('ul');
-                data.news.forEach(news => {
-                    const li = document.createElement('li');
-                    li.innerHTML = `<a href="${news.url}" target="_blank" class="text-blue-600 hover:underline">${news.title}</a>`;
-                    list.appendChild(li);
-                });
-                usageModalList.innerHTML = '<div class="font-semibold mb-2">Digunakan di artikel:</div>';
-                usageModalList.appendChild(list);
+            const others = (data.usage || []).filter(ref => ref.owner_type !== 'news');
+            if ((data.news && data.news.length > 0) || others.length > 0) {
+                usageModalList.innerHTML = '';
+                if (data.news && data.news.length > 0) {
+                    const list = document.createElement('ul');
+                    data.news.forEach(news => {
+                        const li = document.createElement('li');
+                        li.innerHTML = `<a href="${news.url}" target="_blank" class="text-blue-600 hover:underline">${news.title}</a>`;
+                        list.appendChild(li);
+                    });
+                    usageModalList.insertAdjacentHTML('beforeend', '<div class="font-semibold mb-2">Digunakan di artikel:</div>');
+                    usageModalList.appendChild(list);
+                }
+                if (others.length > 0) {
+                    const list = document.createElement('ul');
+                    others.forEach(ref => {
+                        const li = document.createElement('li');
+                        li.textContent = `${ref.owner_type} #${ref.owner_id}: ${ref.title || '-'} (${ref.fields.join(', ')})`;
+                        list.appendChild(li);
+                    });
+                    usageModalList.insertAdjacentHTML('beforeend', '<div class="font-semibold mt-3 mb-2">Digunakan di konten lain:</div>');
+                    usageModalList.appendChild(list);
+                }
             } else {
                 usageModalList.innerHTML = '<div class="text-gray-500">Gambar ini tidak digunakan di artikel manapun.</div>';
             }
@@ -0,0 +1,15 @@
+// Poll a background image processing job until it finishes
+async function waitForImageJob(statusUrl, { interval = 750, timeout = 120000 } = {}) {
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    const response = await fetch(statusUrl, { headers: { 'Accept': 'application/json' } });
+    const job = await response.json();
+    if (!response.ok) throw new Error(job.error || 'Failed to read image job');
+    if (job.status === 'done') return job;
+    if (job.status === 'failed') throw new Error(job.error || 'Image processing failed');
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+  throw new Error('Image processing timed out');
+}
+
+window.waitForImageJob = waitForImageJob;
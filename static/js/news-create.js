@@ -523,6 +523,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const resp = await fetch('/api/images', { method: 'POST', body: fd });
                 const data = await resp.json();
                 if (!resp.ok) throw new Error(data.error || 'Upload failed');
+                if (data.status_url && window.waitForImageJob) await window.waitForImageJob(data.status_url);
 
                 // Clear inputs after successful upload
                 nameInput.value = '';
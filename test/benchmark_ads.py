@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Ad Serving Benchmark
+
+Seeds campaigns, ads and placements into a throwaway SQLite database, drives
+the ad serving and tracking endpoints through the Flask test client from a
+pool of worker threads, and reports latency percentiles, SQL queries per
+request and throughput. Results are written as JSON so runs from different
+commits can be compared with --compare.
+
+Usage:
+    python test/benchmark_ads.py --requests 500 --concurrency 8
+    python test/benchmark_ads.py --compare test/reports/benchmark_ads_<stamp>.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, AdCampaign, Ad, AdPlacement
+
+SCENARIOS = ('serve', 'serve_batch', 'layout_serve', 'track_impression', 'track_click')
+
+PAGE_TYPES = ('home', 'news', 'album', 'category')
+SECTIONS = ('header', 'sidebar', 'content', 'footer')
+POSITIONS = ('top', 'middle', 'bottom', 'after_n_items')
+
+
+class QueryCounter:
+    """Counts SQL statements executed by the current thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def create_benchmark_app(workdir, use_cache=True):
+    """Create an app with the ads blueprint on a file-backed SQLite database in workdir"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+    app.config['SECRET_KEY'] = 'benchmark-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache' if use_cache else 'NullCache'
+    app.config['RATE_LIMIT_BACKEND'] = 'sqlite'
+    app.config['RATE_LIMIT_SQLITE_PATH'] = os.path.join(workdir, 'rate_limits.db')
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    from optimizations.rate_limiter import reset_rate_limiter
+    reset_rate_limiter()
+
+    from routes.routes_ads import ads_bp
+    app.register_blueprint(ads_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_ads(campaigns, ads_per_campaign, placements_per_ad, seed=42):
+    """Insert campaigns, ads and placements; return the placement slots that have ads"""
+    rng = random.Random(seed)
+    slots = set()
+
+    campaign_rows = [AdCampaign(name=f'Benchmark Campaign {i}', is_active=True) for i in range(campaigns)]
+    db.session.add_all(campaign_rows)
+    db.session.flush()
+
+    for campaign in campaign_rows:
+        for i in range(ads_per_campaign):
+            ad = Ad(
+                title=f'Benchmark Ad {campaign.id}-{i}',
+                ad_type='internal',
+                content_type='text',
+                text_content='Benchmark ad body',
+                campaign_id=campaign.id,
+                is_active=True,
+            )
+            db.session.add(ad)
+            db.session.flush()
+
+            for _ in range(placements_per_ad):
+                page_type, section, position = rng.choice(PAGE_TYPES), rng.choice(SECTIONS), rng.choice(POSITIONS)
+                position_value = rng.choice((3, 6, 9)) if position == 'after_n_items' else None
+                db.session.add(AdPlacement(
+                    name=f'{page_type}/{section}/{position}',
+                    page_type=page_type,
+                    section=section,
+                    position=position,
+                    position_value=position_value,
+                    display_frequency=1.0,
+                    rotation_type='random',
+                    ad_id=ad.id,
+                ))
+                slots.add((page_type, section, position, position_value))
+
+    db.session.commit()
+    ad_ids = [row[0] for row in db.session.query(Ad.id).all()]
+    return sorted(slots, key=str), ad_ids
+
+
+def _slot_payload(slot):
+    page_type, section, position, position_value = slot
+    payload = {'page_type': page_type, 'section': section, 'position': position, 'max_ads': 1}
+    if position_value is not None:
+        payload['position_value'] = position_value
+    return payload
+
+
+def build_request(scenario, index, slots, ad_ids, rng):
+    """Return (path, json body, headers) for one request of a scenario"""
+    # Spread clients over many addresses so per-IP rate limits model real traffic
+    headers = {'X-Forwarded-For': f'10.{index % 250}.{(index // 250) % 250}.{rng.randint(1, 250)}'}
+
+    if scenario == 'serve':
+        return '/ads/api/serve', _slot_payload(rng.choice(slots)), headers
+    if scenario == 'serve_batch':
+        placements = []
+        for n, slot in enumerate(rng.sample(slots, min(4, len(slots)))):
+            placements.append(dict(_slot_payload(slot), key=f'slot_{n}'))
+        return '/ads/api/serve/batch', {'placements': placements}, headers
+    if scenario == 'layout_serve':
+        page_type = rng.choice(('home', 'news'))
+        sections = [{'key': 'latest-articles', 'selector': '[data-group="latest-articles"] article',
+                     'item_count': rng.randint(0, 12)}]
+        placements = [
+            {'key': 'content_top', 'section': 'content', 'position': 'top'},
+            {'key': 'content_latest', 'qualifier': 'latest-articles', 'section': 'content', 'position': 'after_n_items'},
+        ]
+        return '/ads/api/layout/serve', {'page_type': page_type, 'sections': sections, 'placements': placements}, headers
+    if scenario == 'track_impression':
+        return '/ads/api/track-impression', {'ad_id': rng.choice(ad_ids), 'event_id': f'bench-{index}', 'viewable': True}, headers
+    if scenario == 'track_click':
+        return '/ads/api/track-click', {'ad_id': rng.choice(ad_ids), 'event_id': f'bench-{index}'}, headers
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_scenario(app, counter, scenario, total_requests, concurrency, slots, ad_ids, seed=42):
+    """Run one scenario and return its summary"""
+    local = threading.local()
+
+    def one_request(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        rng = random.Random(seed * 1000003 + index)
+        path, body, headers = build_request(scenario, index, slots, ad_ids, rng)
+
+        counter.reset()
+        start = time.perf_counter()
+        response = client.post(path, json=body, headers=headers)
+        data = response.get_data()
+        elapsed = time.perf_counter() - start
+        return elapsed, counter.count, response.status_code, len(data)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(s[0] * 1000.0 for s in samples)
+    statuses = {}
+    for _, _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'status_codes': statuses,
+        'errors': sum(1 for s in samples if s[2] >= 500),
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1],
+        },
+        'queries_per_request': sum(s[1] for s in samples) / len(samples),
+        'response_bytes_mean': sum(s[3] for s in samples) / len(samples),
+        'requests_per_second': total_requests / wall if wall > 0 else 0.0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(requests_per_scenario=200, concurrency=4, campaigns=5, ads_per_campaign=10,
+                  placements_per_ad=3, scenarios=SCENARIOS, use_cache=True, seed=42):
+    """Seed a throwaway database, run every scenario and return the full report"""
+    workdir = tempfile.mkdtemp(prefix='lilycms_bench_')
+    try:
+        app = create_benchmark_app(workdir, use_cache=use_cache)
+        counter = QueryCounter()
+        with app.app_context():
+            slots, ad_ids = seed_ads(campaigns, ads_per_campaign, placements_per_ad, seed=seed)
+            counter.attach(db.engine)
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = run_scenario(
+                app, counter, scenario, requests_per_scenario, concurrency, slots, ad_ids, seed=seed
+            )
+
+        return {
+            'benchmark': 'ads',
+            'timestamp': datetime.now().isoformat(),
+            'commit': _git_commit(),
+            'params': {
+                'requests': requests_per_scenario,
+                'concurrency': concurrency,
+                'campaigns': campaigns,
+                'ads_per_campaign': ads_per_campaign,
+                'placements_per_ad': placements_per_ad,
+                'cache': use_cache,
+                'seed': seed,
+            },
+            'results': results,
+        }
+    finally:
+        from optimizations.rate_limiter import reset_rate_limiter
+        reset_rate_limiter()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare_reports(baseline, current):
+    """Return {scenario: {metric: percent change}} for the headline metrics"""
+    deltas = {}
+    for scenario, result in current['results'].items():
+        base = baseline.get('results', {}).get(scenario)
+        if not base:
+            continue
+        pairs = {
+            'p50': (base['latency_ms']['p50'], result['latency_ms']['p50']),
+            'p95': (base['latency_ms']['p95'], result['latency_ms']['p95']),
+            'p99': (base['latency_ms']['p99'], result['latency_ms']['p99']),
+            'queries_per_request': (base['queries_per_request'], result['queries_per_request']),
+            'requests_per_second': (base['requests_per_second'], result['requests_per_second']),
+        }
+        deltas[scenario] = {
+            metric: ((new - old) / old * 100.0) if old else 0.0
+            for metric, (old, new) in pairs.items()
+        }
+    return deltas
+
+
+def print_report(report, deltas=None):
+    print("=" * 78)
+    print(f"AD SERVING BENCHMARK  commit={report.get('commit')}  params={report['params']}")
+    print("=" * 78)
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>8}{'req/s':>10}  status")
+    for scenario, r in report['results'].items():
+        print(f"{scenario:<18}{r['latency_ms']['p50']:>9.2f}{r['latency_ms']['p95']:>9.2f}"
+              f"{r['latency_ms']['p99']:>9.2f}{r['queries_per_request']:>8.1f}"
+              f"{r['requests_per_second']:>10.1f}  {r['status_codes']}")
+        if deltas and scenario in deltas:
+            d = deltas[scenario]
+            print(f"{'  vs baseline':<18}{d['p50']:>+8.1f}%{d['p95']:>+8.1f}%{d['p99']:>+8.1f}%"
+                  f"{d['queries_per_request']:>+7.1f}%{d['requests_per_second']:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ad serving and tracking endpoints')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Worker threads')
+    parser.add_argument('--campaigns', type=int, default=5)
+    parser.add_argument('--ads-per-campaign', type=int, default=10)
+    parser.add_argument('--placements-per-ad', type=int, default=3)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated subset of scenarios')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the serve response cache')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Report path (default: test/reports/benchmark_ads_<timestamp>.json)')
+    parser.add_argument('--compare', help='Baseline report to compare against')
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = run_benchmark(
+        requests_per_scenario=args.requests,
+        concurrency=args.concurrency,
+        campaigns=args.campaigns,
+        ads_per_campaign=args.ads_per_campaign,
+        placements_per_ad=args.placements_per_ad,
+        scenarios=scenarios,
+        use_cache=not args.no_cache,
+        seed=args.seed,
+    )
+
+    deltas = None
+    if args.compare:
+        with open(args.compare) as f:
+            deltas = compare_reports(json.load(f), report)
+        report['compared_to'] = {'path': args.compare, 'percent_change': deltas}
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).parent / 'reports' / f"benchmark_ads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report, deltas)
+    print(f"\n📄 Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
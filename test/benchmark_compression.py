@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Response Compression Benchmark
+
+Serves a news listing page (HTML) and its JSON API through the compression
+middleware and measures, per encoding, response bytes, in-process time to
+first byte and the estimated delivery time over a link of --bandwidth-mbps.
+The 'off' mode runs without the middleware as the baseline. Results are
+written as JSON so runs from different commits can be compared with --compare.
+
+Usage:
+    python test/benchmark_compression.py --requests 300 --concurrency 4
+    python test/benchmark_compression.py --compare test/reports/benchmark_compression_<stamp>.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, render_template_string
+
+from benchmark_ads import percentile, _git_commit
+from optimizations.compression import init_compression, brotli
+
+PATHS = ('/news', '/api/news')
+MODES = ('off', 'identity', 'gzip', 'br')
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="id"><head><title>Berita Terbaru</title></head>
+<body><main class="container mx-auto">
+{% for item in items %}
+  <article class="news-card rounded-lg shadow" data-id="{{ item.id }}">
+    <a href="/news/{{ item.id }}/{{ item.slug }}"><h2 class="text-xl font-bold">{{ item.title }}</h2></a>
+    <p class="text-gray-600">{{ item.summary }}</p>
+    <span class="text-sm">{{ item.category }} &middot; {{ item.date }}</span>
+  </article>
+{% endfor %}
+</main></body></html>"""
+
+
+def build_items(count):
+    categories = ('Politik', 'Ekonomi', 'Olahraga', 'Teknologi', 'Hiburan')
+    return [{
+        'id': i,
+        'slug': f'berita-terkini-nomor-{i}',
+        'title': f'Berita terkini nomor {i} tentang perkembangan terbaru',
+        'summary': f'Ringkasan singkat artikel {i}: laporan lengkap dari lapangan dengan detail dan analisis.',
+        'category': categories[i % len(categories)],
+        'date': f'2026-01-{i % 28 + 1:02d}',
+    } for i in range(count)]
+
+
+def create_benchmark_app(compress=True, items=60):
+    """Create an app serving the HTML page and JSON API, optionally behind the middleware"""
+    app = Flask(__name__)
+    app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+    data = build_items(items)
+
+    @app.route('/news')
+    def news():
+        return render_template_string(PAGE_TEMPLATE, items=data)
+
+    @app.route('/api/news')
+    def api_news():
+        return jsonify(items=data)
+
+    if compress:
+        init_compression(app)
+    return app
+
+
+def run_mode(app, mode, path, total_requests, concurrency, bandwidth_mbps):
+    """Request one path repeatedly in one mode and summarize bytes and timings"""
+    headers = {} if mode in ('off', 'identity') else {'Accept-Encoding': mode}
+    local = threading.local()
+
+    def one_request(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers, buffered=False)
+        chunks = iter(response.response)
+        first = next(chunks, b'')
+        ttfb = time.perf_counter() - start
+        size = len(first) + sum(len(chunk) for chunk in chunks)
+        total = time.perf_counter() - start
+        response.close()
+        return ttfb, total, size, response.headers.get('Content-Encoding', 'identity')
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - wall_start
+
+    ttfbs = sorted(s[0] * 1000.0 for s in samples)
+    bytes_mean = sum(s[2] for s in samples) / len(samples)
+    transfer_ms = bytes_mean * 8 / (bandwidth_mbps * 1_000_000) * 1000.0
+    return {
+        'requests': total_requests,
+        'encoding': samples[0][3],
+        'bytes_mean': bytes_mean,
+        'ttfb_ms': {'p50': percentile(ttfbs, 50), 'p95': percentile(ttfbs, 95), 'max': ttfbs[-1]},
+        'server_ms_mean': sum(s[1] for s in samples) / len(samples) * 1000.0,
+        'estimated_delivery_ms': percentile(ttfbs, 50) + transfer_ms,
+        'requests_per_second': total_requests / wall if wall > 0 else 0.0,
+    }
+
+
+def run_benchmark(requests_per_case=200, concurrency=4, items=60, bandwidth_mbps=10.0, modes=MODES):
+    """Run every mode against every path and return the full report"""
+    modes = [m for m in modes if m != 'br' or brotli is not None]
+    plain_app = create_benchmark_app(compress=False, items=items)
+    compressed_app = create_benchmark_app(compress=True, items=items)
+
+    results = {}
+    for path in PATHS:
+        for mode in modes:
+            app = plain_app if mode == 'off' else compressed_app
+            results[f'{path} {mode}'] = run_mode(app, mode, path, requests_per_case, concurrency, bandwidth_mbps)
+
+    return {
+        'benchmark': 'compression',
+        'timestamp': datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'params': {
+            'requests': requests_per_case,
+            'concurrency': concurrency,
+            'items': items,
+            'bandwidth_mbps': bandwidth_mbps,
+            'brotli': brotli is not None,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline, current):
+    """Return {case: {metric: percent change}} for the headline metrics"""
+    deltas = {}
+    for case, result in current['results'].items():
+        base = baseline.get('results', {}).get(case)
+        if not base:
+            continue
+        pairs = {
+            'bytes_mean': (base['bytes_mean'], result['bytes_mean']),
+            'ttfb_p50': (base['ttfb_ms']['p50'], result['ttfb_ms']['p50']),
+            'estimated_delivery_ms': (base['estimated_delivery_ms'], result['estimated_delivery_ms']),
+        }
+        deltas[case] = {
+            metric: ((new - old) / old * 100.0) if old else 0.0
+            for metric, (old, new) in pairs.items()
+        }
+    return deltas
+
+
+def print_report(report, deltas=None):
+    print("=" * 78)
+    print(f"COMPRESSION BENCHMARK  commit={report.get('commit')}  params={report['params']}")
+    print("=" * 78)
+    print(f"{'case':<22}{'bytes':>10}{'ttfb p50':>10}{'ttfb p95':>10}{'deliver ms':>12}{'req/s':>9}")
+    for case, r in report['results'].items():
+        print(f"{case:<22}{r['bytes_mean']:>10.0f}{r['ttfb_ms']['p50']:>10.2f}{r['ttfb_ms']['p95']:>10.2f}"
+              f"{r['estimated_delivery_ms']:>12.2f}{r['requests_per_second']:>9.1f}")
+        if deltas and case in deltas:
+            d = deltas[case]
+            print(f"{'  vs baseline':<22}{d['bytes_mean']:>+9.1f}%{d['ttfb_p50']:>+9.1f}%"
+                  f"{'':>10}{d['estimated_delivery_ms']:>+11.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dynamic response compression')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per path and mode')
+    parser.add_argument('--concurrency', type=int, default=4, help='Worker threads')
+    parser.add_argument('--items', type=int, default=60, help='News items per page')
+    parser.add_argument('--bandwidth-mbps', type=float, default=10.0, help='Link speed for delivery estimates')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated subset of modes')
+    parser.add_argument('--output', help='Report path (default: test/reports/benchmark_compression_<timestamp>.json)')
+    parser.add_argument('--compare', help='Baseline report to compare against')
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    report = run_benchmark(args.requests, args.concurrency, args.items, args.bandwidth_mbps, modes)
+
+    deltas = None
+    if args.compare:
+        with open(args.compare) as f:
+            deltas = compare_reports(json.load(f), report)
+        report['compared_to'] = {'path': args.compare, 'percent_change': deltas}
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).parent / 'reports' / f"benchmark_compression_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report, deltas)
+    print(f"\n📄 Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script for the Ad Eligibility Cache
+
+Verifies that:
+1. Eligibility matches User.has_active_premium_subscription / should_show_ads
+2. Serving ads with a cached record never queries or writes the user table
+3. Changing premium fields or ad preferences invalidates the record
+4. Records are never cached past the premium expiry
+"""
+
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, User, UserRole
+from routes.utils.ad_eligibility import AdEligibility, get_ad_eligibility
+
+
+def create_test_app():
+    """Create a test Flask app with the ads blueprint"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    from routes.routes_ads import ads_bp
+    app.register_blueprint(ads_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def create_user(username, premium_until=None, has_premium_access=False, ad_preferences=None):
+    user = User(username=username, role=UserRole.GENERAL, is_active=True)
+    user.set_password('password123')
+    user.has_premium_access = has_premium_access
+    user.premium_expires_at = premium_until
+    user.ad_preferences = ad_preferences if ad_preferences is not None else {'show_ads': True}
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_matches_user_rules():
+    """Test that eligibility mirrors the User model rules"""
+    print("Testing eligibility rules...")
+
+    app = create_test_app()
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        cases = [
+            create_user('free'),
+            create_user('premium_adfree', now + timedelta(days=3), True, {'show_ads': False}),
+            create_user('premium_ads', now + timedelta(days=3), True, {'show_ads': True}),
+            create_user('lifetime', None, True, {'show_ads': False}),
+        ]
+        for user_id in cases:
+            eligibility = get_ad_eligibility(user_id)
+            user = db.session.get(User, user_id)
+            assert eligibility.has_premium == user.has_active_premium_subscription(), user.username
+            assert eligibility.show_ads == user.should_show_ads(), user.username
+
+        assert get_ad_eligibility(99999) is None, "Unknown users have no record"
+        assert get_ad_eligibility('not-a-number') is None
+    print("✓ Eligibility matches user rules")
+
+
+def test_serving_skips_user_table():
+    """Test that a cached record keeps ad serving off the user table"""
+    print("Testing serve path with cached eligibility...")
+
+    app = create_test_app()
+    with app.app_context():
+        user_id = create_user('expired', datetime.now(timezone.utc) - timedelta(days=1), True, {'show_ads': False})
+        engine = db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lower())
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        body = {'page_type': 'home', 'section': 'content', 'position': 'top', 'user_id': user_id}
+        client.post('/ads/api/serve', json=body)
+        first = list(statements)
+        statements.clear()
+        response = client.post('/ads/api/serve/batch', json={'placements': [dict(body, key='a')], 'user_id': user_id})
+        assert response.status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert not any(s.startswith('update') for s in first), "Serving must not write the user row"
+    assert not any('from "user"' in s or 'from user' in s for s in statements), \
+        "Cached eligibility must avoid the user table"
+    print("✓ Serving never touches the user table once cached")
+
+
+def test_invalidation_on_change():
+    """Test that updates to tracked columns drop the cached record"""
+    print("Testing invalidation...")
+
+    app = create_test_app()
+    with app.app_context():
+        user_id = create_user('switcher')
+        assert get_ad_eligibility(user_id).has_premium is False
+
+        user = db.session.get(User, user_id)
+        user.has_premium_access = True
+        user.premium_expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+        user.ad_preferences = {'show_ads': False}
+        db.session.commit()
+
+        eligibility = get_ad_eligibility(user_id)
+        assert eligibility.has_premium is True, "Premium change should be visible immediately"
+        assert eligibility.show_ads is False
+    print("✓ Changes invalidate the cache")
+
+
+def test_ttl_capped_at_expiry():
+    """Test that records expire no later than the premium expiry"""
+    print("Testing TTL cap...")
+
+    soon = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 1 <= AdEligibility(1, True, soon).ttl() <= 90
+    assert AdEligibility(1, False, None).ttl() == 600
+    assert AdEligibility(1, True, None).ttl() == 600
+    print("✓ TTL is capped at premium expiry")
+
+
+def run_all_tests():
+    """Run all ad eligibility tests"""
+    print("=" * 60)
+    print("AD ELIGIBILITY CACHE TESTS")
+    print("=" * 60)
+
+    try:
+        test_matches_user_rules()
+        test_serving_skips_user_table()
+        test_invalidation_on_change()
+        test_ttl_capped_at_expiry()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for Ad Layout Recommendations
+
+Verifies that:
+1. Recommendations follow the built-in rules and client item counts
+2. Repeated layouts are served from the memo without SQL queries
+3. Committing a placement change refreshes the candidate positions
+4. /ads/api/layout/serve returns recommendations and ads in one response
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, AdCampaign, Ad, AdPlacement
+from routes.utils.ad_layout import recommend_layout, layout_version
+
+
+def create_test_app():
+    """Create a test Flask app with the ads blueprint"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    from routes.routes_ads import ads_bp
+    app.register_blueprint(ads_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def create_ad(page_type='home', section='content', position='top', position_value=None):
+    campaign = AdCampaign(name='Layout Campaign', is_active=True)
+    db.session.add(campaign)
+    db.session.flush()
+    ad = Ad(title='Layout Ad', ad_type='internal', content_type='text',
+            text_content='Layout ad body', campaign_id=campaign.id, is_active=True)
+    db.session.add(ad)
+    db.session.flush()
+    placement = AdPlacement(name='Layout Placement', page_type=page_type, section=section,
+                            position=position, position_value=position_value,
+                            display_frequency=1.0, rotation_type='random', ad_id=ad.id)
+    db.session.add(placement)
+    db.session.commit()
+    return placement.id
+
+
+def test_rules_and_counts():
+    """Test that recommendations follow rules and item counts"""
+    print("Testing layout rules...")
+
+    app = create_test_app()
+    with app.app_context():
+        rec = recommend_layout('home', [
+            {'key': 'latest-articles', 'selector': '.latest article', 'item_count': 4},
+        ])
+        assert rec['latest-articles'] == {'selector': '.latest article', 'after': [3]}
+        # Unprobed sections fall back to their known selector and the smallest position
+        assert rec['popular-news'] == {'selector': '[data-group="popular-news"] article', 'after': [2]}
+
+        assert recommend_layout('news', [{'key': 'news-grid', 'item_count': 50}])['news-grid']['after'] == [3, 7]
+        assert recommend_layout('unknown', []) == {}
+    print("✓ Rules and counts respected")
+
+
+def test_memo_avoids_queries():
+    """Test that a repeated layout signature is answered without SQL"""
+    print("Testing memoized layouts...")
+
+    app = create_test_app()
+    with app.app_context():
+        sections = [{'key': 'news-grid', 'selector': '#news-grid > *', 'item_count': 20}]
+        first = recommend_layout('news', sections)
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            # Counts past the largest candidate share the same signature
+            again = recommend_layout('news', [dict(sections[0], item_count=500)])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        assert again == first
+        assert statements == [], f"Memoized layout should not query, got {statements}"
+    print("✓ Memo hit issues no queries")
+
+
+def test_placement_change_refreshes():
+    """Test that committing a placement bumps the version and adds its position"""
+    print("Testing refresh on placement change...")
+
+    app = create_test_app()
+    with app.app_context():
+        sections = [{'key': 'news-grid', 'item_count': 20}]
+        assert recommend_layout('news', sections)['news-grid']['after'] == [3, 7]
+        before = layout_version()
+
+        placement_id = create_ad(page_type='news', position='after_n_items', position_value=5)
+        assert layout_version() != before, "Commit should bump the layout version"
+        assert recommend_layout('news', sections)['news-grid']['after'] == [3, 5, 7]
+
+        placement = db.session.get(AdPlacement, placement_id)
+        placement.is_active = False
+        db.session.commit()
+        assert recommend_layout('news', sections)['news-grid']['after'] == [3, 7]
+    print("✓ Placement changes refresh recommendations")
+
+
+def test_layout_serve_endpoint():
+    """Test the combined layout + ads endpoint"""
+    print("Testing /ads/api/layout/serve...")
+
+    app = create_test_app()
+    with app.app_context():
+        create_ad(page_type='home', section='content', position='top')
+        create_ad(page_type='home', section='content', position='after_n_items', position_value=3)
+
+    client = app.test_client()
+    response = client.post('/ads/api/layout/serve', json={
+        'page_type': 'home',
+        'sections': [{'key': 'latest-articles', 'selector': '.latest article', 'item_count': 10}],
+        'placements': [
+            {'key': 'content_top', 'section': 'content', 'position': 'top'},
+            {'key': 'content_latest', 'qualifier': 'latest-articles', 'section': 'content', 'position': 'after_n_items'},
+        ],
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    assert data['recommendations']['latest-articles']['after'] == [3, 6]
+
+    keys = [p['key'] for p in data['placements']]
+    assert keys == ['content_top', 'content_latest_3', 'content_latest_6'], keys
+    assert len(data['adsByPlacement']['content_top']) == 1
+    assert len(data['adsByPlacement']['content_latest_3']) == 1
+    assert data['adsByPlacement']['content_latest_6'] == []
+
+    bad = client.post('/ads/api/layout/serve', json={'sections': []})
+    assert bad.status_code == 400
+    print("✓ Layout and ads served in one response")
+
+
+def run_all_tests():
+    """Run all ad layout tests"""
+    print("=" * 60)
+    print("AD LAYOUT RECOMMENDATION TESTS")
+    print("=" * 60)
+
+    try:
+        test_rules_and_counts()
+        test_memo_avoids_queries()
+        test_placement_change_refreshes()
+        test_layout_serve_endpoint()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
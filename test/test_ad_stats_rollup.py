@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Test script for the Ad Stats Rollups
+
+Verifies that:
+1. Rollups match raw hourly AdStats per day, campaign and placement
+2. Days after the last refresh are still counted (read live)
+3. Compaction collapses old hourly rows without changing totals
+4. A pass after a gap of several days re-rolls every missed day
+5. Only one process runs a compactor pass at a time
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import (
+    db, Ad, AdCampaign, AdPlacement, AdStats,
+    AdStatsDaily, AdCampaignStatsDaily, AdPlacementStatsDaily,
+)
+from routes.utils.ad_stats_rollup import (
+    AdStatsCompactor,
+    _pass_lock,
+    aggregate_stats,
+    compact_hourly_stats,
+    refresh_rollups,
+    run_compaction,
+    stats_totals,
+)
+
+
+def create_test_app():
+    """Create a test Flask app"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_stats(today, days=10):
+    """Seed one campaign with two ads (one placed) and 3 hourly rows per ad per day"""
+    campaign = AdCampaign(name='Campaign')
+    db.session.add(campaign)
+    db.session.flush()
+
+    ad_a = Ad(title='A', ad_type='internal', content_type='text', text_content='a', campaign_id=campaign.id)
+    ad_b = Ad(title='B', ad_type='internal', content_type='text', text_content='b')
+    db.session.add_all([ad_a, ad_b])
+    db.session.flush()
+
+    placement = AdPlacement(name='Sidebar', page_type='news', section='sidebar', position='top',
+                             display_frequency=1.0, rotation_type='random', ad_id=ad_a.id)
+    db.session.add(placement)
+
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        for hour in (1, 8, 20):
+            db.session.add(AdStats(ad_id=ad_a.id, date=day, hour=hour, impressions=10, clicks=1, revenue=0.5))
+            db.session.add(AdStats(ad_id=ad_b.id, date=day, hour=hour, impressions=4, clicks=0, revenue=0))
+    db.session.commit()
+    return campaign.id, ad_a.id, ad_b.id, placement.id
+
+
+def test_rollups_match_raw_stats():
+    """Test that rollups reproduce the raw hourly totals along every dimension"""
+    print("Testing rollups against raw stats...")
+
+    app = create_test_app()
+    with app.app_context():
+        today = datetime.utcnow().date()
+        campaign_id, ad_a, ad_b, placement_id = seed_stats(today)
+
+        refresh_rollups(today - timedelta(days=9), today)
+
+        assert AdStatsDaily.query.count() == 20, "One rollup row per ad per day"
+        assert AdCampaignStatsDaily.query.count() == 10, "Only the campaign ad rolls up to the campaign"
+        assert AdPlacementStatsDaily.query.count() == 10, "Only the placed ad rolls up to the placement"
+
+        row = AdStatsDaily.query.filter_by(ad_id=ad_a, date=today).one()
+        assert (row.impressions, row.clicks, row.campaign_id) == (30, 3, campaign_id)
+
+        by_date = {r['date']: r for r in aggregate_stats('date')}
+        assert len(by_date) == 10
+        assert by_date[today.isoformat()]['impressions'] == 42
+        assert abs(by_date[today.isoformat()]['revenue'] - 1.5) < 1e-9
+
+        by_campaign = aggregate_stats('campaign', start_date=today - timedelta(days=1))
+        assert sorted(r['impressions'] for r in by_campaign) == [30, 30]
+        assert all(r['campaign_id'] == campaign_id for r in by_campaign)
+
+        by_placement = aggregate_stats('placement')
+        assert sum(r['clicks'] for r in by_placement) == 30
+        assert all(r['placement_id'] == placement_id for r in by_placement)
+    print("✓ Rollups match raw stats")
+
+
+def test_live_days_after_refresh():
+    """Test that stats recorded after the last refresh are still included"""
+    print("Testing live aggregation after the rollup boundary...")
+
+    app = create_test_app()
+    with app.app_context():
+        today = datetime.utcnow().date()
+        _, ad_a, _, _ = seed_stats(today, days=3)
+        refresh_rollups(today - timedelta(days=2), today)
+
+        db.session.add(AdStats(ad_id=ad_a, date=today, hour=23, impressions=100, clicks=5, revenue=0))
+        db.session.commit()
+
+        totals = stats_totals(start_date=today)
+        assert totals['total_impressions'] == 142, f"Today's new row must be counted, got {totals}"
+        assert totals['total_clicks'] == 8
+    print("✓ Live aggregation covers unrolled days")
+
+
+def test_compaction_preserves_totals():
+    """Test that old hourly rows are collapsed into one row per ad per day"""
+    print("Testing hourly compaction...")
+
+    app = create_test_app()
+    with app.app_context():
+        today = datetime.utcnow().date()
+        seed_stats(today, days=10)
+        before = stats_totals()
+
+        result = run_compaction(compact_after_days=7, today=today)
+        assert result['compacted_rows'] == 2 * 2 * 2, f"Two ads x 2 old days collapse 3 rows into 1, got {result}"
+
+        old = AdStats.query.filter(AdStats.date < today - timedelta(days=7)).all()
+        assert len(old) == 4 and all(s.hour is None for s in old), "Old days keep one daily row per ad"
+        assert AdStats.query.filter(AdStats.date >= today - timedelta(days=7)).count() == 48, "Recent hourly rows stay"
+
+        assert stats_totals() == before, "Compaction must not change totals"
+        assert compact_hourly_stats(today - timedelta(days=7)) == 0, "Compaction is idempotent"
+
+        refresh_rollups(today - timedelta(days=9), today)
+        assert stats_totals() == before, "Rollups rebuilt from compacted rows keep totals"
+    print("✓ Compaction preserves totals")
+
+
+def test_compactor_gap():
+    """Test that a pass after several idle days refreshes the days in between"""
+    print("Testing compactor gap...")
+
+    app = create_test_app()
+    with app.app_context():
+        today = datetime.utcnow().date()
+        _, ad_a, _, _ = seed_stats(today, days=3)
+        run_compaction(today=today)
+
+        # The compactor is down for three days while tracking goes on
+        missed = today + timedelta(days=1)
+        db.session.add(AdStats(ad_id=ad_a, date=missed, hour=9, impressions=7, clicks=1, revenue=0.25))
+        db.session.commit()
+
+        result = run_compaction(today=today + timedelta(days=3))
+        assert result['refreshed_from'] == today.isoformat(), result
+        row = AdStatsDaily.query.filter_by(ad_id=ad_a, date=missed).one()
+        assert row.impressions == 7 and row.clicks == 1
+    print("✓ Days missed by the compactor are re-rolled")
+
+
+def test_single_compactor_pass():
+    """Test that a compactor skips its pass while another process holds the lock"""
+    print("Testing compactor lock...")
+
+    app = create_test_app()
+    lock_dir = tempfile.mkdtemp()
+    try:
+        lock_path = os.path.join(lock_dir, 'compactor.lock')
+        compactor = AdStatsCompactor(app, lock_path=lock_path)
+        # Each open holds its own flock, like a second worker process would
+        with _pass_lock(lock_path) as acquired:
+            assert acquired
+            assert compactor.run_once() is None, "Pass skipped while the lock is held"
+        result = compactor.run_once()
+        assert result is not None and 'rollup_rows' in result
+    finally:
+        shutil.rmtree(lock_dir)
+    print("✓ One compactor pass at a time")
+
+
+def run_all_tests():
+    """Run all ad stats rollup tests"""
+    print("=" * 60)
+    print("AD STATS ROLLUP TESTS")
+    print("=" * 60)
+
+    try:
+        test_rollups_match_raw_stats()
+        test_live_days_after_refresh()
+        test_compaction_preserves_totals()
+        test_compactor_gap()
+        test_single_compactor_pass()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
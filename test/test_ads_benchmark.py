@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the Ad Serving Benchmark harness
+
+Verifies that:
+1. A small benchmark run covers every scenario without server errors
+2. Reports carry latency percentiles, queries per request and throughput
+3. Reports can be compared against a baseline
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_ads import SCENARIOS, compare_reports, percentile, run_benchmark
+
+
+def test_percentile():
+    """Test nearest-rank percentiles"""
+    print("Testing percentile helper...")
+
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+    print("✓ Percentiles are nearest-rank")
+
+
+def test_small_benchmark_run():
+    """Test a small run over every scenario"""
+    print("Testing a small benchmark run...")
+
+    report = run_benchmark(requests_per_scenario=20, concurrency=2, campaigns=2, ads_per_campaign=3)
+
+    assert set(report['results']) == set(SCENARIOS), "Every scenario should be reported"
+    for scenario, result in report['results'].items():
+        assert result['errors'] == 0, f"{scenario} returned server errors: {result['status_codes']}"
+        assert result['requests'] == 20
+        latency = result['latency_ms']
+        assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+        assert result['queries_per_request'] > 0, f"{scenario} should issue SQL queries"
+        assert result['requests_per_second'] > 0
+
+    deltas = compare_reports(report, report)
+    assert all(value == 0.0 for metrics in deltas.values() for value in metrics.values()), \
+        "A report compared with itself shows no change"
+    print("✓ Small benchmark run works")
+
+
+def run_all_tests():
+    """Run all benchmark harness tests"""
+    print("=" * 60)
+    print("AD BENCHMARK HARNESS TESTS")
+    print("=" * 60)
+
+    try:
+        test_percentile()
+        test_small_benchmark_run()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for the static asset pipeline
+
+Verifies that:
+1. build_assets fingerprints files, writes compressed siblings and a manifest
+2. Rebuilds skip unchanged files
+3. url_for('static') emits hashed names once the manifest is loaded
+4. The static endpoint negotiates Accept-Encoding and serves hashed names immutable
+"""
+
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, url_for
+from optimizations import asset_pipeline
+from optimizations.asset_pipeline import build_assets, init_asset_pipeline, negotiate_encoding
+
+CSS = ("body { margin: 0; padding: 0; }\n" * 200).encode()
+
+
+def make_static(tmpdir):
+    static_dir = os.path.join(tmpdir, 'static')
+    os.makedirs(os.path.join(static_dir, 'css'))
+    os.makedirs(os.path.join(static_dir, 'pic'))
+    os.makedirs(os.path.join(static_dir, 'uploads'))
+    with open(os.path.join(static_dir, 'css', 'site.css'), 'wb') as f:
+        f.write(CSS)
+    with open(os.path.join(static_dir, 'pic', 'logo.png'), 'wb') as f:
+        f.write(os.urandom(2048))
+    with open(os.path.join(static_dir, 'uploads', 'user.webp'), 'wb') as f:
+        f.write(os.urandom(512))
+    return static_dir
+
+
+def test_build():
+    """Test manifest contents and incremental rebuilds"""
+    print("Testing asset build...")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        static_dir = make_static(tmpdir)
+        result = build_assets(static_dir, workers=2)
+        assert result['files'] == 2 and result['compressed'] == 1, result
+
+        with open(os.path.join(static_dir, 'asset-manifest.json')) as f:
+            files = json.load(f)['files']
+        assert set(files) == {'css/site.css', 'pic/logo.png'}, "uploads/ is not a build asset"
+        css = files['css/site.css']
+        assert css['hashed'].startswith('css/site.') and css['hashed'].endswith('.css')
+        with open(os.path.join(static_dir, 'css', 'site.css.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == CSS
+        if asset_pipeline.brotli is not None:
+            assert 'br' in css['encodings']
+        assert files['pic/logo.png']['encodings'] == {}, "Binary images are not recompressed"
+
+        mtime = os.path.getmtime(os.path.join(static_dir, 'css', 'site.css.gz'))
+        build_assets(static_dir, workers=1)
+        assert os.path.getmtime(os.path.join(static_dir, 'css', 'site.css.gz')) == mtime, "Unchanged files are skipped"
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Manifest written with compressed siblings")
+
+
+def test_serving():
+    """Test URL rewriting, negotiation and caching headers"""
+    print("Testing static serving...")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        static_dir = make_static(tmpdir)
+        build_assets(static_dir, workers=1)
+        app = Flask(__name__, static_folder=static_dir)
+        pipeline = init_asset_pipeline(app)
+        hashed = pipeline.files['css/site.css']['hashed']
+
+        with app.test_request_context():
+            assert url_for('static', filename='css/site.css') == f'/static/{hashed}'
+            assert url_for('static', filename='uploads/user.webp') == '/static/uploads/user.webp'
+
+        client = app.test_client()
+        response = client.get(f'/static/{hashed}', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert 'immutable' in response.headers['Cache-Control']
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == CSS
+
+        identity = client.get(f'/static/{hashed}', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in identity.headers and identity.data == CSS
+        assert identity.headers['ETag'] != response.headers['ETag']
+
+        revalidated = client.get(f'/static/{hashed}', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
+
+        plain = client.get('/static/css/site.css', headers={'Accept-Encoding': 'gzip'})
+        assert plain.headers['Content-Encoding'] == 'gzip' and 'immutable' not in (plain.headers.get('Cache-Control') or '')
+        assert client.get('/static/uploads/user.webp').status_code == 200
+        assert client.get('/static/missing.css').status_code == 404
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Hashed URLs served precompressed and immutable")
+
+
+def test_negotiation():
+    """Test Accept-Encoding parsing"""
+    print("Testing encoding negotiation...")
+
+    both = {'br': 1, 'gzip': 1}
+    assert negotiate_encoding('gzip, deflate, br', both) == 'br'
+    assert negotiate_encoding('br;q=0, gzip', both) == 'gzip'
+    assert negotiate_encoding('*', {'gzip': 1}) == 'gzip'
+    assert negotiate_encoding('', both) is None
+    assert negotiate_encoding('br', {'gzip': 1}) is None
+    print("✓ Encodings chosen by preference and q-values")
+
+
+def run_all_tests():
+    """Run all asset pipeline tests"""
+    print("=" * 60)
+    print("ASSET PIPELINE TESTS")
+    print("=" * 60)
+
+    try:
+        test_build()
+        test_serving()
+        test_negotiation()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
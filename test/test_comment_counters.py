@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test script for denormalized Comment counters
+
+Verifies that:
+1. Like/dislike endpoint actions keep like_count/dislike_count in step
+2. Reply creation, moderation and deletion keep the parent's reply_count in step
+3. repair_comment_counters fixes drifted counters in one statement
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from models import db, User, UserRole, Category, News, Comment, CommentLike
+from routes.utils.comment_counters import repair_comment_counters
+
+
+def create_test_app():
+    """Create a test Flask app with the comments blueprint"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes.routes_comments import comments_bp
+    app.register_blueprint(comments_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed(app):
+    """Create an admin, a reader, a news article and one comment"""
+    with app.app_context():
+        admin = User(username='moderator', role=UserRole.ADMIN, is_active=True, verified=True)
+        reader = User(username='reader', role=UserRole.GENERAL, is_active=True, verified=True)
+        for user in (admin, reader):
+            user.set_password('password123')
+        category = Category(name='Counters')
+        db.session.add_all([admin, reader, category])
+        db.session.flush()
+        news = News(title='Counters', content='Body', category_id=category.id, user_id=admin.id)
+        db.session.add(news)
+        db.session.flush()
+        comment = Comment(content='Top level', content_type='news', content_id=news.id, user_id=admin.id)
+        db.session.add(comment)
+        db.session.commit()
+        return admin.id, reader.id, news.id, comment.id
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def counters(app, comment_id):
+    with app.app_context():
+        row = db.session.get(Comment, comment_id)
+        return row.like_count, row.dislike_count, row.reply_count
+
+
+def test_reaction_counters():
+    """Test like, dislike, switch, remove and re-add"""
+    print("Testing reaction counters...")
+
+    app = create_test_app()
+    admin_id, reader_id, news_id, comment_id = seed(app)
+    client = app.test_client()
+    login(client, reader_id)
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        data = client.post(f'/api/comments/{comment_id}/like', json={'is_like': True}).get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert (data['likes_count'], data['dislikes_count'], data['user_liked']) == (1, 0, True)
+    assert any('like_count=(comment.like_count+' in s.replace(' ', '') for s in statements), \
+        "Counters must be updated with an atomic increment"
+    assert not any('count(' in s.lower() for s in statements), "No aggregation on write"
+
+    steps = [
+        (False, (0, 1)),   # switch to dislike
+        (False, (0, 0)),   # remove dislike
+        (True, (1, 0)),    # like again after removal
+    ]
+    for is_like, expected in steps:
+        data = client.post(f'/api/comments/{comment_id}/like', json={'is_like': is_like}).get_json()
+        assert (data['likes_count'], data['dislikes_count']) == expected, (is_like, data)
+    assert counters(app, comment_id)[:2] == (1, 0)
+    print("✓ Reaction counters follow every action")
+
+
+def test_reply_counters():
+    """Test that reply_count tracks visible replies"""
+    print("Testing reply counters...")
+
+    app = create_test_app()
+    admin_id, reader_id, news_id, comment_id = seed(app)
+    client = app.test_client()
+    login(client, reader_id)
+
+    body = {'content': 'A thoughtful reply', 'content_type': 'news', 'content_id': news_id, 'parent_id': comment_id}
+    response = client.post('/api/comments', json=body)
+    assert response.status_code == 201, response.get_json()
+    reply_id = response.get_json()['comment']['id']
+    assert counters(app, comment_id)[2] == 1, "Auto-approved reply counts"
+
+    admin = app.test_client()
+    login(admin, admin_id)
+    admin.post(f'/admin/comments/{reply_id}/mark-spam')
+    assert counters(app, comment_id)[2] == 0, "Spam replies are hidden"
+    admin.post(f'/admin/comments/{reply_id}/approve')
+    admin.post(f'/admin/comments/{reply_id}/approve')
+    assert counters(app, comment_id)[2] == 1, "Approving twice counts once"
+
+    client.delete(f'/api/comments/{reply_id}')
+    assert counters(app, comment_id)[2] == 0, "Deleted replies are not counted"
+    print("✓ Reply counters follow moderation")
+
+
+def test_repair():
+    """Test the set-based repair job"""
+    print("Testing counter repair...")
+
+    app = create_test_app()
+    admin_id, reader_id, news_id, comment_id = seed(app)
+    with app.app_context():
+        db.session.add(CommentLike(comment_id=comment_id, user_id=reader_id, is_like=True))
+        db.session.add(CommentLike(comment_id=comment_id, user_id=admin_id, is_like=False))
+        db.session.add(Comment(content='Reply', content_type='news', content_id=news_id,
+                               user_id=reader_id, parent_id=comment_id))
+        db.session.query(Comment).filter_by(id=comment_id).update({'like_count': 42})
+        db.session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            updated = repair_comment_counters()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        assert updated == 2
+        assert len([s for s in statements if s.lstrip().upper().startswith('UPDATE')]) == 1
+        assert repair_comment_counters([]) == 0
+    assert counters(app, comment_id) == (1, 1, 1)
+    print("✓ Repair recomputes counters in one UPDATE")
+
+
+def run_all_tests():
+    """Run all comment counter tests"""
+    print("=" * 60)
+    print("COMMENT COUNTER TESTS")
+    print("=" * 60)
+
+    try:
+        test_reaction_counters()
+        test_reply_counters()
+        test_repair()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
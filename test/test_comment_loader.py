@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the Threaded Comment Loader
+
+Verifies that:
+1. The loaded tree has the right replies, authors and reaction counts
+2. The viewer's own likes/dislikes are reported
+3. GET /api/comments/<type>/<id> issues the same number of queries for any page size
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from models import db, User, UserRole, Category, News, Comment, CommentLike
+from routes.utils.comment_loader import load_comment_tree
+from routes.utils.comment_counters import repair_comment_counters
+
+
+def create_test_app():
+    """Create a test Flask app with the comments blueprint"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes.routes_comments import comments_bp
+    app.register_blueprint(comments_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_comments(top_level, replies_per_comment=2):
+    """Create a news article with a threaded discussion; return (news_id, user_ids)"""
+    users = []
+    for i in range(4):
+        user = User(username=f'commenter{i}', role=UserRole.GENERAL, is_active=True)
+        user.set_password('password123')
+        users.append(user)
+    category = Category(name='Comments')
+    db.session.add_all(users + [category])
+    db.session.flush()
+
+    news = News(title='Discussion', content='Body', category_id=category.id, user_id=users[0].id)
+    db.session.add(news)
+    db.session.flush()
+
+    start = datetime(2024, 1, 1)
+    for i in range(top_level):
+        comment = Comment(content=f'Comment {i}', content_type='news', content_id=news.id,
+                          user_id=users[i % 4].id, created_at=start + timedelta(minutes=i))
+        db.session.add(comment)
+        db.session.flush()
+        for j in range(replies_per_comment):
+            db.session.add(Comment(content=f'Reply {i}.{j}', content_type='news', content_id=news.id,
+                                   user_id=users[(i + j + 1) % 4].id, parent_id=comment.id,
+                                   created_at=start + timedelta(minutes=i, seconds=j + 1)))
+        for k, user in enumerate(users[1:]):
+            db.session.add(CommentLike(comment_id=comment.id, user_id=user.id, is_like=k != 2))
+    db.session.commit()
+    repair_comment_counters()
+    return news.id, [u.id for u in users]
+
+
+class QueryCounter:
+    """Count SQL statements sent to an engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _record(self, conn, cursor, statement, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+
+def test_tree_contents():
+    """Test replies, authors, counts and viewer reactions"""
+    print("Testing comment tree contents...")
+
+    app = create_test_app()
+    with app.app_context():
+        news_id, user_ids = seed_comments(top_level=3)
+        deleted = Comment.query.filter_by(content='Reply 0.1').first()
+        deleted.is_deleted = True
+        db.session.commit()
+        repair_comment_counters([deleted.parent_id])
+
+        top = Comment.query.filter_by(parent_id=None).order_by(Comment.created_at.desc()).all()
+        tree = load_comment_tree(top, viewer_id=user_ids[1])
+
+        assert [c['content'] for c in tree] == ['Comment 2', 'Comment 1', 'Comment 0']
+        oldest = tree[-1]
+        assert [r['content'] for r in oldest['replies']] == ['Reply 0.0'], "Deleted replies are hidden"
+        assert oldest['replies_count'] == 1
+        assert oldest['likes_count'] == 2 and oldest['dislikes_count'] == 1
+        assert oldest['user']['username'] == 'commenter0'
+        assert oldest['user_liked'] is True and oldest['user_disliked'] is False
+        assert oldest['replies'][0]['user_liked'] is False
+
+        expected = db.session.get(Comment, oldest['id']).to_dict()
+        for field in ('likes_count', 'dislikes_count', 'replies_count', 'user'):
+            assert oldest[field] == expected[field], field
+
+        assert load_comment_tree([]) == []
+    print("✓ Tree matches per-comment serialization")
+
+
+def test_constant_queries():
+    """Test that the query count does not depend on page size"""
+    print("Testing constant query count...")
+
+    app = create_test_app()
+    with app.app_context():
+        news_id, user_ids = seed_comments(top_level=30, replies_per_comment=3)
+        engine = db.engine
+
+        counts = {}
+        for per_page in (1, 5, 30):
+            top = Comment.query.filter_by(parent_id=None).limit(per_page).all()
+            with QueryCounter(engine) as counter:
+                load_comment_tree(top, viewer_id=user_ids[2])
+            counts[per_page] = counter.count
+        assert len(set(counts.values())) == 1, f"Loader queries vary with page size: {counts}"
+        assert counts[1] == 3, counts
+        db.session.remove()
+
+    client = app.test_client()
+    counts = {}
+    for per_page in (1, 5, 30):
+        with QueryCounter(engine) as counter:
+            response = client.get(f'/api/comments/news/{news_id}?per_page={per_page}')
+        assert response.status_code == 200
+        assert len(response.get_json()['comments']) == per_page
+        counts[per_page] = counter.count
+    assert len(set(counts.values())) == 1, f"Endpoint queries vary with page size: {counts}"
+    print(f"✓ {counts[1]} queries per request for every page size")
+
+
+def run_all_tests():
+    """Run all comment loader tests"""
+    print("=" * 60)
+    print("THREADED COMMENT LOADER TESTS")
+    print("=" * 60)
+
+    try:
+        test_tree_contents()
+        test_constant_queries()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
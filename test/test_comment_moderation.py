@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test script for the comment moderation queue
+
+Verifies that:
+1. The queue walks every matching comment exactly once with keyset cursors
+2. Queue filters are served by idx_comment_moderation
+3. Bulk actions run as one UPDATE in one transaction and keep reply counts right
+4. Cached anonymous comment pages are invalidated after bulk moderation
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event, text
+from models import db, User, UserRole, Category, News, Comment
+from routes.utils.comment_moderation import (
+    moderation_query, page_queue, encode_queue_cursor, decode_queue_cursor,
+)
+
+
+def create_test_app():
+    """Create a test Flask app with the comments blueprint"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes.routes_comments import comments_bp
+    app.register_blueprint(comments_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed(app, pending=25):
+    """Create an admin, a news article, one approved parent and pending replies"""
+    with app.app_context():
+        admin = User(username='moderator', role=UserRole.ADMIN, is_active=True, verified=True)
+        admin.set_password('password123')
+        category = Category(name='Moderation')
+        db.session.add_all([admin, category])
+        db.session.flush()
+        news = News(title='Moderation', content='Body', category_id=category.id, user_id=admin.id)
+        db.session.add(news)
+        db.session.flush()
+        parent = Comment(content='Parent', content_type='news', content_id=news.id,
+                         user_id=admin.id, is_approved=True)
+        db.session.add(parent)
+        db.session.flush()
+        base = datetime(2026, 1, 1)
+        for i in range(pending):
+            # Pairs share a timestamp so the id tiebreaker is exercised
+            db.session.add(Comment(content=f'Pending {i}', content_type='news', content_id=news.id,
+                                   user_id=admin.id, parent_id=parent.id, is_approved=False,
+                                   created_at=base + timedelta(minutes=i // 2)))
+        db.session.commit()
+        return admin.id, news.id, parent.id
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def test_queue_walk():
+    """Test keyset paging over the pending queue"""
+    print("Testing moderation queue paging...")
+
+    app = create_test_app()
+    seed(app)
+    with app.app_context():
+        query = moderation_query('pending')
+        seen, cursor = [], None
+        while True:
+            rows, cursor = page_queue(query, cursor, per_page=4)
+            seen += [(c.created_at, c.id) for c in rows]
+            if not cursor:
+                break
+        assert len(seen) == 25 and len(set(seen)) == 25
+        assert seen == sorted(seen, reverse=True), "Newest first with id tiebreaker"
+
+        plan = ' '.join(str(row) for row in db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM comment WHERE is_approved = 0 AND is_spam = 0 "
+            "AND is_deleted = 0 ORDER BY created_at DESC LIMIT 20"
+        )))
+        assert 'idx_comment_moderation' in plan, plan
+
+        stamp = datetime(2026, 1, 1, 12, 30)
+        assert decode_queue_cursor(encode_queue_cursor(stamp, 9)) == (stamp, 9)
+        for bad in ('', '!!!', encode_queue_cursor(stamp, 9)[:-3]):
+            try:
+                decode_queue_cursor(bad)
+            except ValueError:
+                continue
+            raise AssertionError(f"Cursor should be rejected: {bad!r}")
+    print("✓ Queue cursors walk every comment once")
+
+
+def test_bulk_actions():
+    """Test set-based bulk moderation"""
+    print("Testing bulk moderation...")
+
+    app = create_test_app()
+    admin_id, news_id, parent_id = seed(app, pending=10)
+    with app.app_context():
+        ids = [c.id for c in moderation_query('pending').all()]
+        engine = db.engine
+
+    client = app.test_client()
+    login(client, admin_id)
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lstrip().upper())
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/admin/comments/bulk', json={'action': 'approve', 'ids': ids})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    data = response.get_json()
+    assert response.status_code == 200, data
+    assert data['updated'] == 10 and data['threads'] == 1
+    updates = [s for s in statements if s.startswith('UPDATE')]
+    assert len(updates) == 2, "One UPDATE for the rows and one for the parent counters"
+
+    with app.app_context():
+        assert db.session.get(Comment, parent_id).reply_count == 10
+        assert moderation_query('pending').count() == 0
+
+    data = client.post('/admin/comments/bulk', json={'action': 'delete', 'ids': ids[:4]}).get_json()
+    assert data['updated'] == 4
+    with app.app_context():
+        assert db.session.get(Comment, parent_id).reply_count == 6
+        assert moderation_query('approved').count() == 7
+
+    assert client.post('/admin/comments/bulk', json={'action': 'nuke', 'ids': ids}).status_code == 400
+    assert client.post('/admin/comments/bulk', json={'action': 'spam', 'ids': []}).status_code == 400
+    assert client.post('/admin/comments/bulk', json={'action': 'spam', 'ids': ['x']}).status_code == 400
+    print("✓ Bulk actions are single statements")
+
+
+def test_pages_invalidated():
+    """Test that cached public comment pages are dropped after moderation"""
+    print("Testing page invalidation...")
+
+    app = create_test_app()
+    admin_id, news_id, parent_id = seed(app, pending=0)
+    with app.app_context():
+        pending = Comment(content='Waiting', content_type='news', content_id=news_id,
+                          user_id=admin_id, is_approved=False)
+        db.session.add(pending)
+        db.session.commit()
+        pending_id = pending.id
+
+    public = app.test_client()
+    url = f'/api/comments/news/{news_id}'
+    assert public.get(url).get_json()['pagination']['total'] == 1
+
+    with app.app_context():
+        # Out-of-band change: the cached page must still be served
+        Comment.query.filter_by(id=parent_id).update({'content': 'Edited directly'})
+        db.session.commit()
+    assert public.get(url).get_json()['comments'][0]['content'] == 'Parent', "Page is cached"
+
+    admin = app.test_client()
+    login(admin, admin_id)
+    admin.post('/admin/comments/bulk', json={'action': 'approve', 'ids': [pending_id]})
+    data = public.get(url).get_json()
+    assert data['pagination']['total'] == 2
+    assert 'Edited directly' in [c['content'] for c in data['comments']]
+    print("✓ Moderated threads are invalidated")
+
+
+def run_all_tests():
+    """Run all comment moderation tests"""
+    print("=" * 60)
+    print("COMMENT MODERATION TESTS")
+    print("=" * 60)
+
+    try:
+        test_queue_walk()
+        test_bulk_actions()
+        test_pages_invalidated()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
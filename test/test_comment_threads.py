@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script for materialized-path comment threads
+
+Verifies that:
+1. Comments get a path on insert, nested under their parent's path
+2. A whole subtree is one range on (content_type, content_id, path)
+3. Cursor pagination walks every top-level comment exactly once, newest first
+   (comments inserted without a path get one when their thread is paged)
+4. Both comment APIs reject malformed cursors
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from models import db, User, UserRole, Category, News, Comment
+from routes.utils.comment_loader import encode_cursor, decode_cursor
+
+
+def create_test_app():
+    """Create a test Flask app with both comment APIs"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes.routes_comments import comments_bp
+    app.register_blueprint(comments_bp)
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint, url_prefix='/main')
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_thread(top_level):
+    """Create a news article with top-level comments and a nested reply chain"""
+    user = User(username='threader', role=UserRole.GENERAL, is_active=True)
+    user.set_password('password123')
+    category = Category(name='Threads')
+    db.session.add_all([user, category])
+    db.session.flush()
+    news = News(title='Threads', content='Body', category_id=category.id, user_id=user.id)
+    db.session.add(news)
+    db.session.flush()
+
+    roots = []
+    for i in range(top_level):
+        root = Comment(content=f'Root {i}', content_type='news', content_id=news.id, user_id=user.id)
+        db.session.add(root)
+        db.session.flush()
+        roots.append(root)
+    db.session.commit()
+    return news.id, user.id, roots
+
+
+def test_paths_assigned():
+    """Test path assignment and subtree range scans"""
+    print("Testing materialized paths...")
+
+    app = create_test_app()
+    with app.app_context():
+        news_id, user_id, roots = seed_thread(3)
+        root = roots[1]
+        # Parent and child in the same flush
+        reply = Comment(content='Reply', content_type='news', content_id=news_id, user_id=user_id, parent=root)
+        nested = Comment(content='Nested', content_type='news', content_id=news_id, user_id=user_id, parent=reply)
+        db.session.add_all([reply, nested])
+        db.session.commit()
+
+        assert root.path == Comment.path_segment(root.id)
+        assert reply.path == f'{root.path}.{Comment.path_segment(reply.id)}'
+        assert nested.path.startswith(reply.path + '.')
+        assert db.session.get(Comment, nested.id).path == nested.path, "Path is persisted"
+
+        subtree = Comment.query.filter(
+            Comment.content_type == 'news', Comment.content_id == news_id,
+            Comment.path >= root.path, Comment.path < root.path + '/',
+        ).order_by(Comment.path).all()
+        assert [c.content for c in subtree] == ['Root 1', 'Reply', 'Nested']
+    print("✓ Paths nest and subtrees are one range")
+
+
+def test_cursor_walk():
+    """Test walking all pages with cursors on both APIs"""
+    print("Testing cursor pagination...")
+
+    app = create_test_app()
+    with app.app_context():
+        news_id, user_id, roots = seed_thread(7)
+        db.session.add(Comment(content='Reply', content_type='news', content_id=news_id,
+                               user_id=user_id, parent_id=roots[-1].id))
+        db.session.commit()
+        # Rows written around the path hook (e.g. raw SQL)
+        table = Comment.__table__
+        unpathed_id = db.session.execute(table.insert().values(
+            content='Unpathed', content_type='news', content_id=news_id, user_id=user_id,
+            is_approved=True, is_deleted=False)).inserted_primary_key[0]
+        reply_id = db.session.execute(table.insert().values(
+            content='Unpathed reply', content_type='news', content_id=news_id, user_id=user_id,
+            parent_id=unpathed_id, is_approved=True, is_deleted=False)).inserted_primary_key[0]
+        db.session.commit()
+        expected = [unpathed_id] + [r.id for r in reversed(roots)]
+
+    client = app.test_client()
+    for base in (f'/api/comments/news/{news_id}', f'/main/api/comments/news/{news_id}'):
+        with app.app_context():
+            db.session.execute(table.update().where(table.c.id.in_([unpathed_id, reply_id])).values(path=None))
+            db.session.commit()
+        seen, cursor, pages = [], None, 0
+        while True:
+            url = f'{base}?per_page=3' + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(url).get_json()
+            seen += [c['id'] for c in data['comments']]
+            pages += 1
+            assert data['pagination']['total'] == 8
+            if pages == 1:
+                assert data['comments'][0]['id'] == unpathed_id
+            cursor = data['pagination']['next_cursor']
+            assert data['pagination']['has_next'] == (cursor is not None)
+            if not cursor:
+                break
+        assert seen == expected, f"{base}: {seen}"
+        assert pages == 3
+        with app.app_context():
+            assert db.session.get(Comment, reply_id).path == \
+                f'{Comment.path_segment(unpathed_id)}.{Comment.path_segment(reply_id)}'
+
+        assert client.get(f'{base}?cursor=not-a-cursor').status_code == 400
+
+    first = client.get(f'/api/comments/news/{news_id}?per_page=1').get_json()
+    assert [r['id'] for r in first['comments'][0]['replies']] == [reply_id], "Reply paths are filled in too"
+    cursor = first['pagination']['next_cursor']
+    second = client.get(f'/api/comments/news/{news_id}?per_page=1&cursor={cursor}').get_json()
+    assert [r['content'] for r in second['comments'][0]['replies']] == ['Reply']
+    print("✓ Cursors walk every comment once")
+
+
+def test_cursor_roundtrip():
+    """Test that cursors are opaque and validated"""
+    print("Testing cursor encoding...")
+
+    path = '0000000012.0000000040'
+    cursor = encode_cursor(path)
+    assert '.' not in cursor and path not in cursor
+    assert decode_cursor(cursor) == path
+    for bad in ('', '!!!', encode_cursor('12'), encode_cursor("0000000001' OR 1=1")):
+        try:
+            decode_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Cursor should be rejected: {bad!r}")
+    print("✓ Cursors round-trip and reject garbage")
+
+
+def run_all_tests():
+    """Run all comment thread tests"""
+    print("=" * 60)
+    print("COMMENT THREAD TESTS")
+    print("=" * 60)
+
+    try:
+        test_paths_assigned()
+        test_cursor_walk()
+        test_cursor_roundtrip()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test script for the response compression middleware
+
+Verifies that:
+1. Large HTML/JSON responses are gzip/brotli-compressed per Accept-Encoding
+2. Small, binary, pre-encoded and streamed responses pass through
+3. Vary is set and ETag revalidation still answers 304
+4. Compressed bodies of ETagged responses are cached
+5. Precompressed static assets behind the middleware still revalidate
+"""
+
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from optimizations import compression
+from optimizations.compression import init_compression
+from optimizations.asset_pipeline import build_assets, init_asset_pipeline
+
+PAGE = '<html><body>' + '<p>Berita terbaru hari ini</p>' * 400 + '</body></html>'
+
+
+def create_test_app():
+    """Create a small app behind the middleware"""
+    app = Flask(__name__)
+    app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+    app.config['COMPRESS_MIN_SIZE'] = 500
+
+    @app.route('/page')
+    def page():
+        response = Response(PAGE, mimetype='text/html')
+        response.headers['Vary'] = 'Cookie'
+        return response
+
+    @app.route('/tagged')
+    def tagged():
+        response = Response(PAGE, mimetype='text/html')
+        response.set_etag('page-v1')
+        return response.make_conditional(request)
+
+    @app.route('/api')
+    def api():
+        return jsonify(items=[{'id': i, 'title': f'Item {i}'} for i in range(200)])
+
+    @app.route('/small')
+    def small():
+        return 'ok'
+
+    @app.route('/binary')
+    def binary():
+        return Response(b'\x89PNG' + b'\0' * 4000, mimetype='image/png')
+
+    @app.route('/encoded')
+    def encoded():
+        response = Response(gzip.compress(PAGE.encode()), mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    @app.route('/stream')
+    def stream():
+        return Response(stream_with_context(chunk for chunk in [PAGE, PAGE]), mimetype='text/html')
+
+    middleware = init_compression(app)
+    return app, middleware
+
+
+def test_compresses_eligible_responses():
+    """Test gzip and brotli encoding of HTML and JSON"""
+    print("Testing compression...")
+
+    app, _ = create_test_app()
+    client = app.test_client()
+
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode() == PAGE
+    assert int(response.headers['Content-Length']) == len(response.data) < len(PAGE) // 5
+    assert response.headers['Vary'] == 'Cookie, Accept-Encoding'
+
+    api = client.get('/api', headers={'Accept-Encoding': 'gzip'})
+    assert api.headers['Content-Encoding'] == 'gzip' and b'Item 199' in gzip.decompress(api.data)
+
+    if compression.brotli is not None:
+        br = client.get('/page', headers={'Accept-Encoding': 'gzip, br'})
+        assert br.headers['Content-Encoding'] == 'br'
+        assert compression.brotli.decompress(br.data).decode() == PAGE
+
+    plain = client.get('/page')
+    assert 'Content-Encoding' not in plain.headers and plain.data.decode() == PAGE
+    assert 'Accept-Encoding' in plain.headers['Vary'], "Uncompressed variant still varies"
+    print("✓ Eligible responses compressed per Accept-Encoding")
+
+
+def test_passthrough():
+    """Test responses that must not be compressed"""
+    print("Testing passthrough...")
+
+    app, _ = create_test_app()
+    client = app.test_client()
+    headers = {'Accept-Encoding': 'gzip'}
+
+    for path in ('/small', '/binary'):
+        response = client.get(path, headers=headers)
+        assert 'Content-Encoding' not in response.headers, path
+        assert 'Vary' not in response.headers, path
+
+    encoded = client.get('/encoded', headers=headers)
+    assert gzip.decompress(encoded.data).decode() == PAGE, "Already-encoded bodies are not re-compressed"
+
+    streamed = client.get('/stream', headers=headers)
+    assert 'Content-Encoding' not in streamed.headers and streamed.data.decode() == PAGE * 2
+
+    ranged = client.get('/page', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+    assert 'Content-Encoding' not in ranged.headers
+    print("✓ Small, binary, encoded, streamed and ranged responses untouched")
+
+
+def test_etag_and_cache():
+    """Test encoding-specific ETags, 304s and the compressed body cache"""
+    print("Testing ETag handling...")
+
+    app, middleware = create_test_app()
+    client = app.test_client()
+
+    first = client.get('/tagged', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['ETag'] == '"page-v1~gzip"'
+    second = client.get('/tagged', headers={'Accept-Encoding': 'gzip'})
+    assert second.data == first.data
+    assert middleware.cache.hits == 1 and middleware.cache.misses == 1
+
+    revalidated = client.get('/tagged', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.headers['ETag'] == '"page-v1~gzip"'
+
+    identity = client.get('/tagged', headers={'If-None-Match': '"page-v1"'})
+    assert identity.status_code == 304 and identity.headers['ETag'] == '"page-v1"'
+    print("✓ ETags distinguish encodings and compressed bodies are reused")
+
+
+def test_precompressed_assets():
+    """Test that the asset pipeline's own encoding ETags pass through untouched"""
+    print("Testing precompressed assets behind the middleware...")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        static_dir = os.path.join(tmpdir, 'static')
+        os.makedirs(os.path.join(static_dir, 'css'))
+        with open(os.path.join(static_dir, 'css', 'app.css'), 'w') as f:
+            f.write("body { margin: 0; padding: 0; }\n" * 200)
+        build_assets(static_dir, workers=1)
+        app = Flask(__name__, static_folder=static_dir)
+        pipeline = init_asset_pipeline(app)
+        init_compression(app)
+        client = app.test_client()
+        url = f"/static/{pipeline.files['css/app.css']['hashed']}"
+
+        for accept in ('gzip', 'identity'):
+            response = client.get(url, headers={'Accept-Encoding': accept})
+            assert response.status_code == 200 and '~' not in response.headers['ETag']
+            revalidated = client.get(url, headers={'Accept-Encoding': accept,
+                                                   'If-None-Match': response.headers['ETag']})
+            assert revalidated.status_code == 304, (accept, response.headers['ETag'])
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Precompressed assets answer 304 for their own ETags")
+
+
+def run_all_tests():
+    """Run all compression tests"""
+    print("=" * 60)
+    print("COMPRESSION MIDDLEWARE TESTS")
+    print("=" * 60)
+
+    try:
+        test_compresses_eligible_responses()
+        test_passthrough()
+        test_etag_and_cache()
+        test_precompressed_assets()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
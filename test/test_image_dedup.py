@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test script for content-hash image upload deduplication
+
+Verifies that:
+1. Uploads are hashed while streamed to disk
+2. Re-uploading identical bytes returns the uploader's existing record without a new file or job
+3. Another user uploading the same bytes gets their own record
+4. The content hash is unique per user at the database level
+"""
+
+import sys
+import os
+import io
+import hashlib
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy.exc import IntegrityError
+from models import db, User, UserRole, Image
+from optimizations import image_jobs
+from optimizations.image_jobs import reset_image_job_queue
+from routes.utils.content_hash import save_stream_with_hash, sha256_file
+
+
+def create_test_app(tmpdir):
+    """Create a test Flask app with the image routes and inline image jobs"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['IMAGE_JOB_WORKERS'] = 0
+    app.config['IMAGE_JOB_DB_PATH'] = os.path.join(tmpdir, 'image_jobs.db')
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def jpeg_bytes(color):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (800, 600), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_stream_hash():
+    """Test hashing while copying"""
+    print("Testing streaming hash...")
+
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'blob')
+        digest = save_stream_with_hash(io.BytesIO(data), path)
+        assert digest == hashlib.sha256(data).hexdigest()
+        assert sha256_file(path) == digest
+        with open(path, 'rb') as f:
+            assert f.read() == data
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Hash matches the bytes written")
+
+
+def test_duplicate_upload():
+    """Test that identical uploads reuse the first record"""
+    print("Testing duplicate uploads...")
+
+    tmpdir = tempfile.mkdtemp()
+    reset_image_job_queue()
+    app = create_test_app(tmpdir)
+    processed = []
+    original_process = image_jobs.process_image_file
+
+    def counting_process(path, progress=None):
+        processed.append(path)
+        return original_process(path, progress)
+
+    image_jobs.process_image_file = counting_process
+    try:
+        with app.app_context():
+            user = User(username='deduper', role=UserRole.ADMIN, is_active=True, verified=True)
+            user.set_password('password123')
+            writer = User(username='otherwriter', role=UserRole.GENERAL, is_active=True, verified=True)
+            writer.set_password('password123')
+            db.session.add_all([user, writer])
+            db.session.commit()
+            user_id, writer_id = user.id, writer.id
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+
+        payload = jpeg_bytes((250, 10, 10))
+
+        def upload(data, name, client=client):
+            return client.post('/api/images', data={'file': (io.BytesIO(data), 'x.jpg'), 'name': name},
+                               content_type='multipart/form-data')
+
+        first = upload(payload, 'deduptest-a.jpg')
+        assert first.status_code == 202, first.get_json()
+        first_id = first.get_json()['id']
+
+        before = set(os.listdir('static/uploads'))
+        second = upload(payload, 'deduptest-b.jpg')
+        data = second.get_json()
+        assert second.status_code == 200 and data['duplicate'] is True and data['id'] == first_id
+        assert set(os.listdir('static/uploads')) == before, "Duplicate bytes are not kept on disk"
+        assert len(processed) == 1, "Duplicates skip image processing"
+
+        other = upload(jpeg_bytes((10, 250, 10)), 'deduptest-c.jpg')
+        assert other.status_code == 202 and other.get_json()['id'] != first_id
+
+        writer_client = app.test_client()
+        with writer_client.session_transaction() as sess:
+            sess['_user_id'] = str(writer_id)
+        theirs = upload(payload, 'deduptest-d.jpg', client=writer_client)
+        assert theirs.status_code == 202, theirs.get_json()
+        theirs_id = theirs.get_json()['id']
+        assert theirs_id != first_id, "Other users' images are never handed out"
+        again = upload(payload, 'deduptest-e.jpg', client=writer_client).get_json()
+        assert again['duplicate'] is True and again['id'] == theirs_id
+        assert len(processed) == 3
+
+        with app.app_context():
+            first_image = db.session.get(Image, first_id)
+            assert first_image.content_hash == hashlib.sha256(payload).hexdigest()
+            assert db.session.get(Image, theirs_id).user_id == writer_id
+            assert db.session.get(Image, theirs_id).content_hash == first_image.content_hash
+            assert Image.query.count() == 3
+    finally:
+        image_jobs.process_image_file = original_process
+        reset_image_job_queue()
+        for name in os.listdir('static/uploads'):
+            if 'deduptest' in name:
+                os.remove(os.path.join('static/uploads', name))
+        shutil.rmtree(tmpdir)
+    print("✓ Identical uploads return the uploader's existing image")
+
+
+def test_unique_index():
+    """Test the database constraint behind deduplication"""
+    print("Testing unique content hash...")
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_test_app(tmpdir)
+    try:
+        with app.app_context():
+            user = User(username='unique', role=UserRole.ADMIN, is_active=True)
+            user.set_password('password123')
+            other = User(username='unique2', role=UserRole.GENERAL, is_active=True)
+            other.set_password('password123')
+            db.session.add_all([user, other])
+            db.session.flush()
+            db.session.add_all([
+                Image(filename='a.webp', filepath='a.webp', content_hash='ab' * 32, user_id=user.id),
+                Image(filename='b.webp', filepath='b.webp', user_id=user.id),
+                Image(filename='c.webp', filepath='c.webp', user_id=user.id),
+                Image(filename='e.webp', filepath='e.webp', content_hash='ab' * 32, user_id=other.id),
+            ])
+            db.session.commit()
+            db.session.add(Image(filename='d.webp', filepath='d.webp', content_hash='ab' * 32, user_id=user.id))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            else:
+                raise AssertionError("Duplicate content hash of one user must be rejected")
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Hashes are unique per user; unhashed rows are allowed")
+
+
+def run_all_tests():
+    """Run all image dedup tests"""
+    print("=" * 60)
+    print("IMAGE DEDUP TESTS")
+    print("=" * 60)
+
+    try:
+        test_stream_hash()
+        test_duplicate_upload()
+        test_unique_index()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk image ingestion
+
+Verifies that:
+1. A directory is converted in a process pool and inserted as Image rows
+2. Duplicates (within the run or already in the library) are skipped
+3. A rerun resumes from the manifest without reprocessing
+4. Unreadable files are reported and retried on the next run
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+from flask import Flask
+from models import db, User, UserRole, Image
+from routes.utils.image_ingest import ingest_directory, read_manifest
+from routes.utils.content_hash import sha256_file
+
+
+def create_test_app():
+    """Create a minimal Flask app with an in-memory database"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def write_image(path, color, fmt='JPEG'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    PILImage.new('RGB', (640, 480), color).save(path, fmt)
+    return path
+
+
+def test_ingest_and_resume():
+    """Test a full import, dedup and a resumed run"""
+    print("Testing bulk ingestion...")
+
+    tmpdir = tempfile.mkdtemp()
+    source_dir = os.path.join(tmpdir, 'images_to_upload')
+    app = create_test_app()
+    try:
+        for i in range(6):
+            write_image(os.path.join(source_dir, f'photo {i}.jpg'), (i * 40, 90, 200 - i * 30))
+        write_image(os.path.join(source_dir, 'nested', 'scan.png'), (1, 2, 3), 'PNG')
+        shutil.copy(os.path.join(source_dir, 'photo 0.jpg'), os.path.join(source_dir, 'nested', 'copy.jpg'))
+        with open(os.path.join(source_dir, 'broken.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        with open(os.path.join(source_dir, 'notes.txt'), 'w') as f:
+            f.write('ignored')
+
+        with app.app_context():
+            user = User(username='ingest', role=UserRole.ADMIN, is_active=True)
+            user.set_password('password123')
+            db.session.add(user)
+            db.session.flush()
+            # Already in the library
+            db.session.add(Image(filename='old.webp', filepath='old.webp', user_id=user.id,
+                                 content_hash=sha256_file(os.path.join(source_dir, 'photo 5.jpg'))))
+            db.session.commit()
+
+            stats = ingest_directory(source_dir, user.id, upload_dir='uploads', root_dir=tmpdir,
+                                     workers=2, batch_size=3)
+            assert stats['found'] == 9 and stats['imported'] == 6 and stats['skipped'] == 2, stats
+            assert len(stats['errors']) == 1 and 'broken.jpg' in stats['errors'][0]
+
+            images = Image.query.filter(Image.filename != 'old.webp').all()
+            assert len(images) == 6
+            for image in images:
+                assert image.filename.endswith('.webp') and image.filename.startswith(image.content_hash[:12])
+                assert image.filepath == os.path.join('uploads', image.filename), "Stored relative to the root"
+                path = os.path.join(tmpdir, image.filepath)
+                with PILImage.open(path) as img:
+                    assert img.format == 'WEBP' and img.width == 1280
+                assert os.path.exists(path.replace('.webp', '_thumb_square.webp'))
+            assert os.path.exists(os.path.join(source_dir, 'photo 0.jpg')), "Sources are kept"
+            assert read_manifest(os.path.join(source_dir, '.ingest_manifest')) == {i.content_hash for i in images}
+
+            # Resume: everything is found in the manifest or library
+            again = ingest_directory(source_dir, user.id, upload_dir='uploads', root_dir=tmpdir, workers=1)
+            assert again['imported'] == 0 and again['skipped'] == 8, again
+            assert len(again['errors']) == 1, "Failures are not recorded as done"
+            assert Image.query.count() == 7
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Directory imported once; rerun resumes from the manifest")
+
+
+def run_all_tests():
+    """Run all image ingestion tests"""
+    print("=" * 60)
+    print("IMAGE INGEST TESTS")
+    print("=" * 60)
+
+    try:
+        test_ingest_and_resume()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
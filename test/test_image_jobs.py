@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Test script for background image processing jobs
+
+Verifies that:
+1. process_image_file writes the WebP rendition and thumbnails and drops the original
+2. Jobs run in the worker pool and report progress and variants through the job table
+3. Uploads return 202 with a job id that the status endpoint resolves
+4. Failed jobs remove the placeholder Image record
+"""
+
+import sys
+import os
+import io
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+from flask import Flask
+from flask_login import LoginManager
+from models import db, User, UserRole, Image
+from optimizations.image_jobs import (
+    ImageJobQueue, process_image_file, reset_image_job_queue, STATUS_DONE, STATUS_FAILED,
+)
+
+
+def write_jpeg(path, size=(1600, 900)):
+    PILImage.new('RGB', size, (200, 80, 40)).save(path, 'JPEG')
+    return path
+
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.store.get(job_id)
+        if job['status'] in (STATUS_DONE, STATUS_FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def create_test_app(tmpdir):
+    """Create a test Flask app with the image routes and a one-process pool"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['IMAGE_JOB_WORKERS'] = 1
+    app.config['IMAGE_JOB_DB_PATH'] = os.path.join(tmpdir, 'image_jobs.db')
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def test_process_image_file():
+    """Test the PIL pipeline run by each job"""
+    print("Testing image processing...")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        source = write_jpeg(os.path.join(tmpdir, 'cover.jpg'))
+        steps = []
+        result = process_image_file(source, progress=steps.append)
+        assert not os.path.exists(source), "Original is removed"
+        with PILImage.open(result['webp']) as img:
+            assert img.format == 'WEBP' and img.size == (1280, 720)
+        sizes = {style: PILImage.open(path).size for style, path in result['thumbnails'].items()}
+        assert sizes == {'portrait': (400, 600), 'square': (400, 400), 'landscape': (600, 400)}
+        assert steps == sorted(steps) and steps[-1] == 90
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ WebP rendition and thumbnails written")
+
+
+def test_pool_jobs():
+    """Test jobs processed by the worker pool and resumed after a restart"""
+    print("Testing worker pool...")
+
+    tmpdir = tempfile.mkdtemp()
+    queue = ImageJobQueue(os.path.join(tmpdir, 'jobs.db'), workers=2)
+    try:
+        job_ids = [queue.submit(write_jpeg(os.path.join(tmpdir, f'img{i}.jpg'))) for i in range(3)]
+        broken = os.path.join(tmpdir, 'broken.jpg')
+        with open(broken, 'wb') as f:
+            f.write(b'not an image')
+        broken_id = queue.submit(broken)
+
+        for job_id in job_ids:
+            job = wait_for(queue, job_id)
+            assert job['status'] == STATUS_DONE and job['progress'] == 100
+            assert os.path.exists(job['result']['webp'])
+        failed = wait_for(queue, broken_id)
+        assert failed['status'] == STATUS_FAILED and 'Processing error' in failed['error']
+
+        # A job queued by a process that died is picked up by the next queue
+        orphan = queue.store.create(write_jpeg(os.path.join(tmpdir, 'orphan.jpg')))
+        queue.close()
+        queue = ImageJobQueue(queue.store.path, workers=1)
+        assert queue.resume() == 1
+        assert wait_for(queue, orphan)['status'] == STATUS_DONE
+        assert not queue.store.claim(orphan), "Finished jobs cannot be claimed again"
+    finally:
+        queue.close()
+        shutil.rmtree(tmpdir)
+    print("✓ Pool processes jobs and resumes orphans")
+
+
+def test_upload_endpoint():
+    """Test the 202 upload flow and the job status API"""
+    print("Testing upload endpoint...")
+
+    tmpdir = tempfile.mkdtemp()
+    reset_image_job_queue()
+    app = create_test_app(tmpdir)
+    created = []
+    try:
+        with app.app_context():
+            user = User(username='uploader', role=UserRole.ADMIN, is_active=True, verified=True)
+            user.set_password('password123')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+
+        buffer = io.BytesIO()
+        PILImage.new('RGB', (1400, 1000), (10, 120, 200)).save(buffer, 'JPEG')
+        buffer.seek(0)
+        start = time.perf_counter()
+        response = client.post('/api/images', data={'file': (buffer, 'cover.jpg'), 'name': 'jobtest.jpg'},
+                               content_type='multipart/form-data')
+        elapsed = time.perf_counter() - start
+        data = response.get_json()
+        assert response.status_code == 202, data
+        assert data['status_url'] == f"/api/images/jobs/{data['job_id']}"
+        print(f"  upload answered in {elapsed * 1000:.0f}ms")
+
+        deadline = time.time() + 30
+        while True:
+            job = client.get(data['status_url']).get_json()
+            if job['status'] in (STATUS_DONE, STATUS_FAILED) or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        assert job['status'] == STATUS_DONE, job
+        assert job['image_id'] == data['id']
+        assert set(job['variants']) == {'webp', 'thumb_portrait', 'thumb_square', 'thumb_landscape'}
+        assert job['variants']['webp'].startswith('/static/uploads/')
+
+        with app.app_context():
+            image = db.session.get(Image, data['id'])
+            created.append(image.filepath)
+            created += [image.filepath.replace('.webp', f'_thumb_{s}.webp') for s in ('portrait', 'square', 'landscape')]
+            assert os.path.exists(image.filepath)
+
+        # Failed processing removes the placeholder record
+        bad = client.post('/api/images', data={'file': (io.BytesIO(b'garbage'), 'bad.jpg'), 'name': 'jobtest-bad.jpg'},
+                          content_type='multipart/form-data').get_json()
+        deadline = time.time() + 30
+        while client.get(bad['status_url']).get_json()['status'] not in (STATUS_FAILED, STATUS_DONE):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        for _ in range(100):
+            with app.app_context():
+                if db.session.get(Image, bad['id']) is None:
+                    break
+            time.sleep(0.05)
+        else:
+            raise AssertionError("Placeholder image of a failed job should be removed")
+
+        assert client.get('/api/images/jobs/unknown').status_code == 404
+    finally:
+        reset_image_job_queue()
+        for path in created:
+            if os.path.exists(path):
+                os.remove(path)
+        for name in os.listdir('static/uploads'):
+            if 'jobtest' in name:
+                os.remove(os.path.join('static/uploads', name))
+        shutil.rmtree(tmpdir)
+    print("✓ Uploads are accepted and tracked by job id")
+
+
+def run_all_tests():
+    """Run all image job tests"""
+    print("=" * 60)
+    print("IMAGE JOB TESTS")
+    print("=" * 60)
+
+    try:
+        test_process_image_file()
+        test_pool_jobs()
+        test_upload_endpoint()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the image usage index
+
+Verifies that:
+1. Saving news, albums and ads records their image references in image_usage
+2. Edits and deletes keep the index in step
+3. The usage endpoint answers from the index and deletes of used images are refused
+4. rebuild_image_usage reproduces the incrementally maintained index
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from models import db, User, UserRole, Image, ImageUsage, News, Album, Category, Ad
+from routes.utils.image_usage import rebuild_image_usage, usage_for_image
+
+
+def create_test_app():
+    """Create a test Flask app with the image routes"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+    app.register_error_handler(404, lambda e: ('Not Found', 404))
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed(app):
+    with app.app_context():
+        user = User(username='usage', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        category = Category(name='Usage')
+        db.session.add_all([user, category])
+        db.session.flush()
+        images = [Image(filename=f'pic{i}.webp', filepath=f'static/uploads/pic{i}.webp', user_id=user.id)
+                  for i in range(4)]
+        db.session.add_all(images)
+        db.session.commit()
+        return user.id, category.id, [image.id for image in images]
+
+
+def usage_rows():
+    return sorted((u.image_id, u.owner_type, u.owner_id, u.field) for u in ImageUsage.query.all())
+
+
+def test_index_maintained_on_save():
+    """Test that flushes record, rewrite and drop references"""
+    print("Testing index maintenance...")
+
+    app = create_test_app()
+    user_id, category_id, (a, b, c, d) = seed(app)
+    with app.app_context():
+        news = News(
+            title='Story', category_id=category_id, user_id=user_id, image_id=a,
+            content=f'Intro ![x](/static/uploads/pic1_thumb_square.webp) and ![y](/img/{c}/640.webp)',
+            og_image='https://example.com/static/uploads/pic1.webp',
+        )
+        album = Album(title='Book', category_id=category_id, user_id=user_id, cover_image_id=b)
+        ad = Ad(title='Banner', ad_type='internal', content_type='image', image_url='/static/uploads/pic3.webp')
+        db.session.add_all([news, album, ad])
+        db.session.commit()
+        assert usage_rows() == sorted([
+            (a, 'news', news.id, 'image_id'),
+            (b, 'news', news.id, 'content'),
+            (c, 'news', news.id, 'content'),
+            (b, 'news', news.id, 'og_image'),
+            (b, 'album', album.id, 'cover_image_id'),
+            (b, 'album', album.id, 'og_image'),  # generated from the cover on save
+            (d, 'ad', ad.id, 'image_url'),
+        ]), usage_rows()
+
+        # Untracked edits do not touch the index
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        news.read_count = 5
+        db.session.commit()
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert not any('image_usage' in sql for sql in statements), statements
+
+        news.content = 'No pictures any more'
+        news.og_image = None
+        db.session.commit()
+        assert [row for row in usage_rows() if row[1] == 'news'] == [(a, 'news', news.id, 'image_id')]
+
+        db.session.delete(ad)
+        db.session.commit()
+        assert all(row[1] != 'ad' for row in usage_rows())
+
+        incremental = usage_rows()
+        assert rebuild_image_usage(batch_size=1) == len(incremental)
+        assert usage_rows() == incremental, "Rebuild matches the incremental index"
+    print("✓ References follow saves, edits and deletes")
+
+
+def test_usage_endpoint_and_delete_guard():
+    """Test the usage API and the in-use delete check"""
+    print("Testing usage endpoint...")
+
+    app = create_test_app()
+    user_id, category_id, (a, b, c, d) = seed(app)
+    with app.app_context():
+        news = News(title='Lead story', content='Body', category_id=category_id, user_id=user_id, image_id=a)
+        album = Album(title='Book', category_id=category_id, user_id=user_id, cover_image_id=a)
+        db.session.add_all([news, album])
+        db.session.commit()
+        news_id = news.id
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        usage = usage_for_image(a)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len(statements) == 1, statements
+        assert [(u['owner_type'], u['title'], u['fields']) for u in usage] == [
+            ('album', 'Book', ['cover_image_id', 'og_image']), ('news', 'Lead story', ['image_id', 'og_image'])]
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+
+    data = client.get(f'/api/images/{a}/usage').get_json()
+    assert [n['id'] for n in data['news']] == [news_id] and len(data['usage']) == 2
+
+    listed = client.get('/api/images?usage=used&all_users=true').get_json()
+    assert [item['id'] for item in listed['items']] == [a], listed
+
+    response = client.delete(f'/api/images/{a}')
+    assert response.status_code == 409 and len(response.get_json()['usage']) == 2
+
+    result = client.post('/api/images/bulk-delete', json={'ids': [a, b]}).get_json()
+    assert result == {'deleted': 1, 'skipped_in_use': [a]}, result
+
+    assert client.delete(f'/api/images/{a}?force=1').status_code == 200
+    with app.app_context():
+        assert db.session.get(Image, a) is None
+        assert ImageUsage.query.filter_by(image_id=a).count() == 0
+    print("✓ Usage served from the index; used images are protected")
+
+
+def run_all_tests():
+    """Run all image usage tests"""
+    print("=" * 60)
+    print("IMAGE USAGE TESTS")
+    print("=" * 60)
+
+    try:
+        test_index_maintained_on_save()
+        test_usage_endpoint_and_delete_guard()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
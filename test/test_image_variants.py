@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test script for on-demand responsive image variants
+
+Verifies that:
+1. /img/<id>/<width>.<fmt> generates WebP, AVIF and JPEG renditions at the requested width
+2. Variants are stored under the source content hash and reused
+3. Responses carry immutable cache headers and honour If-None-Match
+4. Concurrent requests generate each variant once
+5. srcset helpers emit variant URLs for Image records
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+from flask import Flask
+from models import db, User, UserRole, Image
+from optimizations import image_variants
+from optimizations.image_variants import ensure_variant, source_hash, variant_path
+
+
+def create_test_app(tmpdir):
+    """Create a test Flask app with the image routes and a temporary variant dir"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['IMAGE_VARIANT_DIR'] = os.path.join(tmpdir, 'variants')
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+    # Plain 404s; the site error page needs the full template context
+    app.register_error_handler(404, lambda e: ('Not Found', 404))
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_image(app, tmpdir, size=(2400, 1600)):
+    source = os.path.join(tmpdir, 'cover.jpg')
+    PILImage.new('RGB', size, (30, 140, 90)).save(source, 'JPEG', quality=90)
+    with app.app_context():
+        user = User(username='variants', role=UserRole.ADMIN, is_active=True)
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        image = Image(filename='cover.jpg', filepath=source, user_id=user.id, is_visible=True)
+        db.session.add(image)
+        db.session.commit()
+        return image.id, source
+
+
+def test_variant_endpoint():
+    """Test generation, formats and caching headers"""
+    print("Testing variant endpoint...")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        app = create_test_app(tmpdir)
+        image_id, source = seed_image(app, tmpdir)
+        client = app.test_client()
+
+        for fmt, pil_format in (('webp', 'WEBP'), ('avif', 'AVIF'), ('jpg', 'JPEG')):
+            response = client.get(f'/img/{image_id}/640.{fmt}')
+            assert response.status_code == 200, (fmt, response.status_code)
+            with PILImage.open(io.BytesIO(response.data)) as img:
+                assert img.format == pil_format and img.size == (640, 427), (fmt, img.format, img.size)
+            cache_control = response.headers['Cache-Control']
+            assert 'immutable' in cache_control and 'max-age=31536000' in cache_control
+
+        digest = source_hash(source)
+        stored = variant_path(digest, 640, 'webp', os.path.join(tmpdir, 'variants'))
+        assert os.path.exists(stored), "Variant stored under the content hash"
+
+        again = client.get(f'/img/{image_id}/640.webp')
+        revalidated = client.get(f'/img/{image_id}/640.webp', headers={'If-None-Match': again.headers['ETag']})
+        assert revalidated.status_code == 304
+
+        assert client.get(f'/img/{image_id}/641.webp').status_code == 404, "Arbitrary widths are refused"
+        assert client.get(f'/img/{image_id}/640.gif').status_code == 404
+        assert client.get('/img/999/640.webp').status_code == 404
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ Variants generated with immutable caching")
+
+
+def test_single_generation():
+    """Test that concurrent requests for one variant render it once"""
+    print("Testing concurrent generation...")
+
+    tmpdir = tempfile.mkdtemp()
+    renders = []
+    original_render = image_variants.render_variant
+
+    def counting_render(*args):
+        renders.append(args)
+        original_render(*args)
+
+    image_variants.render_variant = counting_render
+    try:
+        source = os.path.join(tmpdir, 'big.jpg')
+        PILImage.new('RGB', (3000, 2000), (120, 20, 200)).save(source, 'JPEG')
+        root = os.path.join(tmpdir, 'variants')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ensure_variant(source, 320, 'webp', root)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(renders) == 1, f"Rendered {len(renders)} times"
+        assert len({path for path, _ in results}) == 1
+    finally:
+        image_variants.render_variant = original_render
+        shutil.rmtree(tmpdir)
+    print("✓ Each variant is rendered once")
+
+
+def test_srcset_helpers():
+    """Test variant URL helpers used by templates"""
+    print("Testing srcset helpers...")
+
+    from optimizations.frontend_optimization import generate_image_srcset, get_optimized_image_url
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        app = create_test_app(tmpdir)
+        image_id, _ = seed_image(app, tmpdir)
+        with app.test_request_context():
+            image = db.session.get(Image, image_id)
+            srcset = generate_image_srcset(image)
+            entries = [part.split(' ') for part in srcset.split(', ')]
+            assert [w for _, w in entries] == ['320w', '640w', '960w', '1280w']
+            assert all(url.startswith(f'/img/{image_id}/') and '?v=' in url for url, _ in entries)
+            assert get_optimized_image_url(image_id, 960) == f'/img/{image_id}/960.webp'
+            assert get_optimized_image_url('/static/a.jpg', 300) == '/static/a.jpg?w=300'
+    finally:
+        shutil.rmtree(tmpdir)
+    print("✓ srcset points at generated variants")
+
+
+def run_all_tests():
+    """Run all image variant tests"""
+    print("=" * 60)
+    print("IMAGE VARIANT TESTS")
+    print("=" * 60)
+
+    try:
+        test_variant_endpoint()
+        test_single_generation()
+        test_srcset_helpers()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test script for the Rate Limiter
+
+Verifies that:
+1. The SQLite token bucket enforces limits and refills over time
+2. Separate connections (workers) share the same buckets
+3. Dedupe markers expire after their TTL
+4. Storage stays bounded after pruning
+5. Ad tracking endpoints return 429 without Redis
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, Ad
+from optimizations.rate_limiter import (
+    RateLimiter,
+    SQLiteRateLimitBackend,
+    reset_rate_limiter,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _temp_db_path():
+    return os.path.join(tempfile.mkdtemp(prefix='lilycms_rl_'), 'rate_limits.db')
+
+
+def test_token_bucket_limit_and_refill():
+    """Test that the limit is enforced and tokens refill with time"""
+    print("Testing token bucket limit and refill...")
+
+    clock = FakeClock()
+    limiter = RateLimiter(SQLiteRateLimitBackend(_temp_db_path(), clock=clock))
+
+    results = [limiter.hit('impr:1.2.3.4', limit=5, window_seconds=60) for _ in range(6)]
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False], "Sixth hit should be rejected"
+    assert results[4][1] == 5, "Fifth hit should report 5 hits in window"
+    assert limiter.count('impr:1.2.3.4', limit=5, window_seconds=60) == 5, "Counting does not record a hit"
+    assert limiter.count('impr:0.0.0.0', limit=5, window_seconds=60) == 0
+
+    # One token refills every 12 seconds (5 per 60s)
+    clock.now += 12
+    assert limiter.is_limited('impr:1.2.3.4', limit=5, window_seconds=60) is False, "Refilled token should allow a hit"
+    assert limiter.is_limited('impr:1.2.3.4', limit=5, window_seconds=60) is True, "Bucket should be empty again"
+
+    # Other keys are independent
+    assert limiter.is_limited('impr:5.6.7.8', limit=5, window_seconds=60) is False
+    print("✓ Token bucket limit and refill work")
+
+
+def test_buckets_shared_across_workers():
+    """Test that two backends on the same file share state like gunicorn workers would"""
+    print("Testing shared state across workers...")
+
+    path = _temp_db_path()
+    clock = FakeClock()
+    worker_a = RateLimiter(SQLiteRateLimitBackend(path, clock=clock))
+    worker_b = RateLimiter(SQLiteRateLimitBackend(path, clock=clock))
+
+    allowed = 0
+    for i in range(10):
+        limiter = worker_a if i % 2 == 0 else worker_b
+        if not limiter.is_limited('click:9.9.9.9', limit=4, window_seconds=60):
+            allowed += 1
+
+    assert allowed == 4, f"Workers together should allow exactly 4 hits, got {allowed}"
+    print("✓ Buckets are shared across workers")
+
+
+def test_dedupe_ttl():
+    """Test that dedupe markers block repeats until they expire"""
+    print("Testing dedupe TTL...")
+
+    clock = FakeClock()
+    limiter = RateLimiter(SQLiteRateLimitBackend(_temp_db_path(), clock=clock))
+
+    assert limiter.is_duplicate('dedupe:abc', ttl_seconds=300) is False, "First event is not a duplicate"
+    assert limiter.is_duplicate('dedupe:abc', ttl_seconds=300) is True, "Repeat within TTL is a duplicate"
+    clock.now += 301
+    assert limiter.is_duplicate('dedupe:abc', ttl_seconds=300) is False, "Event after TTL is not a duplicate"
+    print("✓ Dedupe TTL works")
+
+
+def test_prune_bounds_storage():
+    """Test that pruning removes refilled buckets and enforces max_keys"""
+    print("Testing bounded storage...")
+
+    clock = FakeClock()
+    backend = SQLiteRateLimitBackend(_temp_db_path(), max_keys=50, clock=clock)
+    limiter = RateLimiter(backend)
+
+    for i in range(200):
+        limiter.hit(f'impr:10.0.0.{i}', limit=60, window_seconds=60)
+    backend.prune()
+    count = backend._connect().execute("SELECT COUNT(*) FROM rate_bucket").fetchone()[0]
+    assert count == 50, f"Table should be capped at max_keys, got {count}"
+
+    clock.now += 61
+    backend.prune()
+    count = backend._connect().execute("SELECT COUNT(*) FROM rate_bucket").fetchone()[0]
+    assert count == 0, "Refilled buckets should be pruned"
+    print("✓ Storage stays bounded")
+
+
+def create_test_app(rate_limit_path):
+    """Create a test Flask app with the ads blueprint and no Redis"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['RATE_LIMIT_BACKEND'] = 'sqlite'
+    app.config['RATE_LIMIT_SQLITE_PATH'] = rate_limit_path
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    from routes.routes_ads import ads_bp
+    app.register_blueprint(ads_bp)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def test_ad_tracking_rate_limited_without_redis():
+    """Test that impression tracking is limited and deduped on the SQLite fallback"""
+    print("Testing ad tracking rate limit without Redis...")
+
+    reset_rate_limiter()
+    app = create_test_app(_temp_db_path())
+    try:
+        with app.app_context():
+            ad = Ad(title='Test Ad', ad_type='internal', content_type='text', text_content='Hello')
+            db.session.add(ad)
+            db.session.commit()
+            ad_id = ad.id
+
+        client = app.test_client()
+
+        response = client.post('/ads/api/track-impression', json={'ad_id': ad_id, 'event_id': 'same'})
+        assert response.status_code == 200
+        response = client.post('/ads/api/track-impression', json={'ad_id': ad_id, 'event_id': 'same'})
+        assert json.loads(response.data).get('deduped') is True, "Repeated event should be deduped"
+
+        statuses = [
+            client.post('/ads/api/track-impression', json={'ad_id': ad_id, 'event_id': f'e{i}'}).status_code
+            for i in range(60)
+        ]
+        assert statuses[-1] == 429, "Hits beyond 60 per minute should be rejected"
+        assert statuses.count(429) == 2, "Exactly the two hits over the limit should be rejected"
+
+        with app.app_context():
+            assert db.session.get(Ad, ad_id).impressions == 59, "Deduped and limited hits must not be recorded"
+        print("✓ Ad tracking is rate limited without Redis")
+    finally:
+        reset_rate_limiter()
+
+
+def run_all_tests():
+    """Run all rate limiter tests"""
+    print("=" * 60)
+    print("RATE LIMITER TESTS")
+    print("=" * 60)
+
+    try:
+        test_token_bucket_limit_and_refill()
+        test_buckets_shared_across_workers()
+        test_dedupe_ttl()
+        test_prune_bounds_storage()
+        test_ad_tracking_rate_limited_without_redis()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
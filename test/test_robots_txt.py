@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for robots.txt publishing
+
+Verifies that:
+1. robots.txt is served from the published file with ETag/Last-Modified, without queries
+2. Changing the SEO settings re-renders and rewrites it atomically
+3. Unrelated saves leave it alone
+4. A read-only filesystem falls back to the in-memory copy
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, BrandIdentity, SEOInjectionSettings
+from routes.utils.robots_txt import publish_robots_txt
+from test_seo_injection_job import create_test_app
+from test_seo_materialize import wait_for_job
+
+
+def create_robots_app(directory, robots_path):
+    # A file database: brand changes start the background SEO recompute
+    app = create_test_app(db_path=os.path.join(directory, 'robots.db'))
+    app.config['ROBOTS_TXT_PATH'] = robots_path
+    with app.app_context():
+        db.session.add(BrandIdentity(brand_name='Lily'))
+        db.session.commit()
+        publish_robots_txt()
+    wait_for_job(app)  # the new brand row queues a recompute; let it finish before counting queries
+    return app
+
+
+def cleanup(app, directory):
+    wait_for_job(app)
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(directory)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_served_from_file():
+    """Test that robots.txt is served from disk and revalidates"""
+    print("Testing robots.txt serving...")
+
+    robots_dir = tempfile.mkdtemp()
+    path = os.path.join(robots_dir, 'robots.txt')
+    app = create_robots_app(robots_dir, path)
+    try:
+        assert 'Sitemap: https://hystory.id/sitemap.xml' in read(path)
+        client = app.test_client()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+        response = client.get('/robots.txt')
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert statements == [], statements
+        assert response.status_code == 200 and response.mimetype == 'text/plain'
+        assert response.get_data(as_text=True) == read(path)
+        assert response.headers['ETag'] and response.headers['Last-Modified']
+        assert client.get('/robots.txt', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    finally:
+        cleanup(app, robots_dir)
+    print("✓ Served from the published file without queries")
+
+
+def test_rendered_on_settings_change():
+    """Test that settings saves re-render robots.txt and other saves do not"""
+    print("Testing re-render on settings change...")
+
+    robots_dir = tempfile.mkdtemp()
+    path = os.path.join(robots_dir, 'robots.txt')
+    app = create_robots_app(robots_dir, path)
+    try:
+        client = app.test_client()
+        etag = client.get('/robots.txt').headers['ETag']
+
+        with app.app_context():
+            brand = BrandIdentity.query.first()
+            brand.seo_settings = {'website_url': 'https://brand.example/'}
+            db.session.commit()
+        assert 'Sitemap: https://brand.example/sitemap-news.xml' in read(path)
+        response = client.get('/robots.txt', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.headers['ETag'] != etag
+        etag = response.headers['ETag']
+
+        with app.app_context():
+            db.session.add(SEOInjectionSettings(website_url='https://seo.example'))
+            db.session.commit()
+        assert 'Sitemap: https://seo.example/sitemap.xml' in read(path)
+
+        modified = os.path.getmtime(path)
+        with app.app_context():
+            BrandIdentity.query.first().tagline = 'Berita terkini'
+            db.session.commit()
+        assert os.path.getmtime(path) == modified, "Unrelated saves do not rewrite robots.txt"
+        assert [name for name in os.listdir(robots_dir) if name.endswith('.tmp')] == []
+    finally:
+        cleanup(app, robots_dir)
+    print("✓ Re-rendered only when the SEO settings change")
+
+
+def test_read_only_filesystem():
+    """Test the in-memory copy when the file cannot be written"""
+    print("Testing read-only fallback...")
+
+    robots_dir = tempfile.mkdtemp()
+    missing = os.path.join(robots_dir, 'read-only', 'robots.txt')
+    app = create_robots_app(robots_dir, missing)
+    client = app.test_client()
+
+    response = client.get('/robots.txt')
+    assert response.status_code == 200 and 'User-agent: *' in response.get_data(as_text=True)
+    assert client.get('/robots.txt', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        db.session.add(SEOInjectionSettings(website_url='https://memory.example'))
+        db.session.commit()
+    assert 'https://memory.example/sitemap.xml' in client.get('/robots.txt').get_data(as_text=True)
+    assert not os.path.exists(missing)
+    cleanup(app, robots_dir)
+    print("✓ Served from memory when the disk is not writable")
+
+
+def run_all_tests():
+    """Run all robots.txt tests"""
+    print("=" * 60)
+    print("ROBOTS.TXT TESTS")
+    print("=" * 60)
+
+    try:
+        test_served_from_file()
+        test_rendered_on_settings_change()
+        test_read_only_filesystem()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
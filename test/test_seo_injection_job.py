@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental, chunked SEO injection job
+
+Verifies that:
+1. Only rows whose content or SEO settings changed are regenerated
+2. Locked rows are skipped and --force re-injects unchanged rows
+3. Rows are committed in chunks, not one transaction per row
+4. A cancel request stops the job between chunks
+5. The API starts the job in the background and reports its progress
+6. Parallel mode splits rows across worker processes and matches the serial run
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event, insert, update
+from models import db, User, UserRole, News, Album, AlbumChapter, Category, BrandIdentity, ImageUsage
+
+from seo_injector.seo_injection_job import run_seo_injection_job, get_job_state, id_ranges, pool_size
+
+
+def create_test_app(db_path=None):
+    """Create a test Flask app with the SEO routes"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}' if db_path else 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed(app, news_count=5):
+    with app.app_context():
+        user = User(username='seoadmin', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        category = Category(name='Berita')
+        db.session.add_all([user, category])
+        # Core statements bypass the save-time SEO listeners, like rows written before they existed
+        db.session.execute(insert(BrandIdentity).values(brand_name='Lily'))
+        db.session.flush()
+        for i in range(news_count):
+            db.session.add(News(title=f'Berita nomor {i}', content=f'Isi berita {i}',
+                                category_id=category.id, user_id=user.id))
+        db.session.add(News(title='Terkunci', content='Isi', category_id=category.id, user_id=user.id,
+                            is_seo_lock=True, meta_description='Manual'))
+        album = Album(title='Novel Satu', description='Sinopsis', category_id=category.id, user_id=user.id)
+        db.session.add(album)
+        db.session.flush()
+        for n in range(1, 3):
+            news = News(title=f'Bab {n}', content='Isi bab', category_id=category.id, user_id=user.id)
+            db.session.add(news)
+            db.session.flush()
+            db.session.add(AlbumChapter(album_id=album.id, news_id=news.id, chapter_number=n,
+                                        chapter_title=f'Bab {n}'))
+        db.session.flush()
+        for model in (News, Album, AlbumChapter):
+            db.session.execute(update(model).values(seo_source_hash=None))
+        db.session.commit()
+        return user.id
+
+
+def test_incremental_runs():
+    """Test that unchanged rows are skipped on the next run"""
+    print("Testing incremental injection...")
+
+    app = create_test_app()
+    seed(app)
+    with app.app_context():
+        state = run_seo_injection_job(['news', 'albums', 'chapters'])
+        assert state['status'] == 'completed', state
+        news = state['progress']['news']
+        assert news == {'total': 8, 'processed': 8, 'updated': 7, 'unchanged': 0, 'locked': 1, 'errors': 0}, news
+        assert state['progress']['albums']['updated'] == 1
+        assert state['progress']['chapters']['updated'] == 2
+
+        story = db.session.get(News, 1)
+        assert story.seo_slug == 'berita-nomor-0' and story.og_title == 'Berita nomor 0 - Lily'
+        assert story.seo_source_hash and story.schema_markup
+        assert db.session.get(News, 6).meta_description == 'Manual', "Locked rows are left alone"
+
+        state = run_seo_injection_job(['news', 'albums', 'chapters'])
+        assert [state['progress'][t]['updated'] for t in ('news', 'albums', 'chapters')] == [0, 0, 0]
+        assert state['progress']['news']['unchanged'] == 7
+
+        db.session.execute(update(News).where(News.id == 2).values(title='Berita baru'))
+        db.session.commit()
+        state = run_seo_injection_job(['news'])
+        assert state['progress']['news']['updated'] == 1
+        assert db.session.get(News, 2).seo_slug == 'berita-baru'
+
+        db.session.execute(update(News).where(News.id == 7).values(content='Isi bab yang direvisi'))
+        db.session.commit()
+        state = run_seo_injection_job(['chapters'])
+        assert state['progress']['chapters']['updated'] == 1, "Chapter hash follows its news content"
+
+        db.session.execute(update(BrandIdentity).values(brand_name='Lily Baru'))
+        db.session.commit()
+        state = run_seo_injection_job(['news'])
+        assert state['progress']['news']['updated'] == 7, "Settings changes re-inject every row"
+        assert db.session.get(News, 1).og_title == 'Berita nomor 0 - Lily Baru'
+
+        state = run_seo_injection_job(['albums'], force=True)
+        assert state['progress']['albums']['updated'] == 1
+    print("✓ Only changed rows regenerated")
+
+
+def test_chunked_commits_and_cancel():
+    """Test commits per chunk and cancellation between chunks"""
+    print("Testing chunked commits and cancellation...")
+
+    app = create_test_app()
+    seed(app, news_count=9)
+    with app.app_context():
+        commits = []
+        listener = lambda session: commits.append(1)
+        event.listen(db.session(), 'after_commit', listener)
+        try:
+            state = run_seo_injection_job(['news'], chunk_size=4)
+        finally:
+            event.remove(db.session(), 'after_commit', listener)
+        # 12 news rows (one locked) -> 3 chunks of at most 4 rows, one commit each
+        assert state['progress']['news']['updated'] == 11
+        assert len(commits) == 3, commits
+
+        chunks = []
+        state = run_seo_injection_job(['news', 'albums'], force=True, chunk_size=4,
+                                      on_progress=lambda s: chunks.append(s['progress']['news']['processed']),
+                                      should_cancel=lambda: len(chunks) >= 2)
+        assert state['status'] == 'cancelled', state
+        assert state['progress']['news']['processed'] == 4, state['progress']
+        assert state['progress']['albums']['processed'] == 0
+    print("✓ One commit per chunk, cancel stops between chunks")
+
+
+def test_api_runs_in_background():
+    """Test the start, progress and cancel endpoints"""
+    print("Testing background injection API...")
+
+    # A file database: the job thread and request threads must not share one in-memory connection
+    db_dir = tempfile.mkdtemp()
+    app = create_test_app(db_path=os.path.join(db_dir, 'seo.db'))
+    user_id = seed(app)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+
+    assert client.post('/api/seo/inject', json={'type': 'bogus'}).status_code == 400
+    assert client.post('/api/seo/inject', json={'type': 'news', 'workers': 'many'}).status_code == 400
+    assert pool_size((os.cpu_count() or 1) + 1) == (os.cpu_count() or 1), "Capped at one worker per CPU"
+
+    with app.app_context():
+        editor = User(username='seoeditor', role=UserRole.GENERAL, is_active=True, verified=True)
+        editor.set_password('password123')
+        db.session.add(editor)
+        db.session.commit()
+        editor_id = editor.id
+    editor_client = app.test_client()
+    with editor_client.session_transaction() as sess:
+        sess['_user_id'] = str(editor_id)
+    cpu_count, os.cpu_count = os.cpu_count, lambda: 4
+    try:
+        response = editor_client.post('/api/seo/inject', json={'type': 'news', 'workers': 2})
+    finally:
+        os.cpu_count = cpu_count
+    assert response.status_code == 403, "Parallel mode is for admins"
+
+    response = client.post('/api/seo/inject', json={'type': 'news'})
+    assert response.status_code == 202, response.data
+    job_id = response.get_json()['job']['id']
+
+    path_len = len(sys.path)
+    for _ in range(100):
+        progress = client.get('/api/seo/inject/progress').get_json()
+        if not progress['running'] and progress['job']['status'] == 'completed':
+            break
+        time.sleep(0.05)
+    job = progress['job']
+    assert job['id'] == job_id and job['status'] == 'completed', job
+    assert job['progress']['news']['updated'] == 7
+    assert len(sys.path) == path_len, "Polling progress must not grow sys.path"
+
+    assert client.post('/api/seo/inject/cancel').status_code == 404, "Nothing left to cancel"
+    with app.app_context():
+        assert get_job_state()['id'] == job_id
+        assert db.session.get(News, 1).seo_source_hash
+        db.engine.dispose()
+    shutil.rmtree(db_dir)
+    print("✓ Injection runs in the background with progress")
+
+
+def test_parallel_workers():
+    """Test the worker pool against the serial run"""
+    print("Testing parallel injection...")
+
+    # Worker processes open their own connections, so the database must be a file
+    db_dir = tempfile.mkdtemp()
+    app = create_test_app(db_path=os.path.join(db_dir, 'seo.db'))
+    seed(app, news_count=9)
+    with app.app_context():
+        assert id_ranges(News, 4) == [(0, 4), (4, 8), (8, None)]
+        assert id_ranges(News, 12) == [(0, None)] and id_ranges(News, 5) == [(0, 5), (5, 10), (10, None)]
+        assert id_ranges(Album, 4) == [(0, None)]
+
+        state = run_seo_injection_job(['news', 'albums', 'chapters', 'root'], chunk_size=2, workers=2)
+        assert state['status'] == 'completed', state
+        assert state['progress']['news'] == {'total': 12, 'processed': 12, 'updated': 11, 'unchanged': 0,
+                                             'locked': 1, 'errors': 0}, state['progress']['news']
+        assert state['progress']['albums']['updated'] == 1 and state['progress']['chapters']['updated'] == 2
+        assert state['failures'] == []
+
+        # schema_markup is left out: its dateModified follows updated_at
+        columns = ('seo_slug', 'meta_description', 'meta_keywords', 'og_title', 'og_image', 'canonical_url',
+                   'seo_score', 'seo_source_hash')
+        snapshot = lambda: [tuple(getattr(n, c) for c in columns) for n in News.query.order_by(News.id)]
+        db.session.expire_all()
+        parallel = snapshot()
+        assert parallel[0][0] == 'berita-nomor-0' and parallel[0][3] == 'Berita nomor 0 - Lily'
+        assert '"NewsArticle"' in db.session.get(News, 1).schema_markup
+        assert db.session.get(News, 10).meta_description == 'Manual', "Locked rows are left alone"
+        usages = ImageUsage.query.count()
+
+        state = run_seo_injection_job(['news', 'albums', 'chapters'], chunk_size=2, workers=2)
+        assert [state['progress'][t]['updated'] for t in ('news', 'albums', 'chapters')] == [0, 0, 0]
+        assert state['progress']['news']['unchanged'] == 11, "Workers store the same source hashes"
+
+        state = run_seo_injection_job(['news'], force=True)
+        db.session.expire_all()
+        assert state['progress']['news']['updated'] == 11 and snapshot() == parallel, "Serial run agrees"
+        assert ImageUsage.query.count() == usages
+        db.engine.dispose()
+    shutil.rmtree(db_dir)
+    print("✓ Worker pool matches the serial run")
+
+
+def run_all_tests():
+    """Run all SEO injection job tests"""
+    print("=" * 60)
+    print("SEO INJECTION JOB TESTS")
+    print("=" * 60)
+
+    try:
+        test_incremental_runs()
+        test_chunked_commits_and_cancel()
+        test_api_runs_in_background()
+        test_parallel_workers()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
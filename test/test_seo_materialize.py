@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for save-time SEO materialization
+
+Verifies that:
+1. Saving an article, album or chapter stores its SEO fields and JSON-LD
+2. Only changes to SEO inputs regenerate; counters and manual edits do not
+3. Locked rows are left alone and an article's chapters follow its content
+4. Page rendering reads the stored fields for news, album and chapter URLs
+5. Brand settings changes recompute every row in the background
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, User, UserRole, News, Album, AlbumChapter, Category, BrandIdentity
+from routes.utils.seo_materialize import content_seo_for_path
+
+from seo_injector.seo_injection_job import run_seo_injection_job, get_job_state, is_job_active
+from test_seo_injection_job import create_test_app
+
+
+def make_app():
+    """App on a file database: the recompute thread must not share one in-memory connection"""
+    db_dir = tempfile.mkdtemp()
+    return create_test_app(db_path=os.path.join(db_dir, 'seo.db')), db_dir
+
+
+def close_app(app, db_dir):
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(db_dir)
+
+
+def seed(app):
+    with app.app_context():
+        user = User(username='seoadmin', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        category = Category(name='Berita')
+        db.session.add_all([user, category, BrandIdentity(brand_name='Lily')])
+        db.session.flush()
+        db.session.add(News(title='Berita pertama', content='Isi berita pertama',
+                            category_id=category.id, user_id=user.id))
+        db.session.add(News(title='Terkunci', content='Isi', category_id=category.id, user_id=user.id,
+                            is_seo_lock=True, meta_description='Manual'))
+        album = Album(title='Novel Satu', description='Sinopsis', category_id=category.id, user_id=user.id)
+        db.session.add(album)
+        db.session.flush()
+        news = News(title='Bab 1', content='Isi bab', category_id=category.id, user_id=user.id)
+        db.session.add(news)
+        db.session.flush()
+        db.session.add(AlbumChapter(album_id=album.id, news_id=news.id, chapter_number=1, chapter_title='Bab 1'))
+        db.session.commit()
+    wait_for_job(app)  # the new brand row queues a (no-op) recompute
+
+
+def wait_for_job(app):
+    with app.app_context():
+        for _ in range(100):
+            state = get_job_state()
+            if not is_job_active(state):
+                return state
+            time.sleep(0.05)
+    raise AssertionError("SEO recompute did not finish")
+
+
+def test_generated_on_save():
+    """Test that saves store SEO and only input changes regenerate it"""
+    print("Testing save-time SEO generation...")
+
+    app, db_dir = make_app()
+    seed(app)
+    with app.app_context():
+        story = db.session.get(News, 1)
+        assert story.seo_slug == 'berita-pertama' and story.og_title == 'Berita pertama - Lily'
+        assert json.loads(story.schema_markup)['@type'] and story.seo_source_hash
+        assert db.session.get(News, 2).meta_description == 'Manual' and not db.session.get(News, 2).seo_slug
+        assert db.session.get(Album, 1).seo_slug and db.session.get(AlbumChapter, 1).schema_markup
+
+        state = run_seo_injection_job(['news', 'albums', 'chapters'])
+        assert [state['progress'][t]['updated'] for t in ('news', 'albums', 'chapters')] == [0, 0, 0], \
+            "Save-time output matches the injection job"
+
+        audited = story.last_seo_audit
+        story.read_count = 99
+        db.session.commit()
+        assert db.session.get(News, 1).last_seo_audit == audited, "Counter updates do not regenerate"
+
+        story = db.session.get(News, 1)
+        story.title = 'Berita kedua'
+        db.session.commit()
+        assert db.session.get(News, 1).og_title == 'Berita kedua - Lily'
+
+        story = db.session.get(News, 1)
+        story.content = 'Isi yang diubah'
+        story.og_title = 'Judul pilihan editor'
+        db.session.commit()
+        assert db.session.get(News, 1).og_title == 'Judul pilihan editor', "Manual SEO edits are kept"
+
+        chapter_hash = db.session.get(AlbumChapter, 1).seo_source_hash
+        db.session.get(News, 3).content = 'Isi bab yang direvisi'
+        db.session.commit()
+        assert db.session.get(AlbumChapter, 1).seo_source_hash != chapter_hash, "Chapters follow their article"
+    close_app(app, db_dir)
+    print("✓ SEO stored on save, regenerated only when inputs change")
+
+
+def test_rendering_reads_stored_fields():
+    """Test the per-URL lookup used by inject_seo_data"""
+    print("Testing stored SEO lookup by URL...")
+
+    app, db_dir = make_app()
+    seed(app)
+    with app.test_request_context():
+        fields, og_type = content_seo_for_path('/news/1/berita-pertama')
+        assert og_type == 'article' and fields['og_title'] == 'Berita pertama - Lily'
+        assert fields['schema_markup'] and fields['canonical_url']
+        assert content_seo_for_path('/stories/1/berita-pertama')[0] == fields
+
+        album, og_type = content_seo_for_path('/album/1/novel-satu')
+        assert og_type == 'book' and album['og_title'].startswith('Novel Satu')
+        assert content_seo_for_path('/novel/1/novel-satu') == (album, 'book')
+
+        chapter, og_type = content_seo_for_path('/album/1/chapter/1/bab-1')
+        assert og_type == 'article' and chapter['schema_markup'] != album['schema_markup']
+        assert content_seo_for_path('/novel/1/chapter/1/bab-1')[0] == chapter
+        assert content_seo_for_path('/album/2/chapter/1/bab-1') == (None, None)
+
+        db.session.get(Album, 1).is_visible = False
+        db.session.commit()
+        assert content_seo_for_path('/album/1/novel-satu') == (None, None)
+        assert content_seo_for_path('/news/abc/x') == (None, None)
+        assert content_seo_for_path('/about') == (None, None)
+    close_app(app, db_dir)
+    print("✓ Rendering reads the precomputed columns")
+
+
+def test_brand_change_recomputes():
+    """Test that a brand settings change recomputes stored SEO in the background"""
+    print("Testing background recompute on settings change...")
+
+    app, db_dir = make_app()
+    seed(app)
+
+    with app.app_context():
+        brand = BrandIdentity.query.first()
+        brand.brand_name = 'Lily Baru'
+        db.session.commit()
+    state = wait_for_job(app)
+    assert state['status'] == 'completed' and state['types'] == ['news', 'albums', 'chapters'], state
+    assert state['progress']['news']['updated'] == 2 and state['progress']['news']['locked'] == 1
+
+    with app.app_context():
+        assert db.session.get(News, 1).og_title == 'Berita pertama - Lily Baru'
+    close_app(app, db_dir)
+    print("✓ Settings changes recompute in the background")
+
+
+def run_all_tests():
+    """Run all save-time SEO tests"""
+    print("=" * 60)
+    print("SAVE-TIME SEO TESTS")
+    print("=" * 60)
+
+    try:
+        test_generated_on_save()
+        test_rendering_reads_stored_fields()
+        test_brand_change_recomputes()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
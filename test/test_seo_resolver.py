@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-process root SEO resolver
+
+Verifies that:
+1. Paths resolve to the most specific active RootSEO entry
+2. Resolving reads the in-memory map, not the database
+3. Saving through the SEO admin endpoints refreshes the map
+4. API and JSON requests skip SEO resolution
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import request
+from sqlalchemy import event
+from models import db, User, UserRole, RootSEO
+from routes.utils.seo_resolver import resolve_root_seo, root_seo_version, wants_seo
+from test_seo_injection_job import create_test_app
+
+
+def seed(app):
+    with app.app_context():
+        user = User(username='seoadmin', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        db.session.add_all([
+            user,
+            RootSEO(page_identifier='home', page_name='Beranda', meta_title='Beranda'),
+            RootSEO(page_identifier='news', page_name='Berita', meta_title='Berita'),
+            RootSEO(page_identifier='settings/seo', page_name='SEO', meta_title='Pengaturan SEO'),
+            RootSEO(page_identifier='about', page_name='Tentang', meta_title='Tentang', is_active=False),
+        ])
+        db.session.commit()
+        return user.id
+
+
+def test_resolves_without_queries():
+    """Test path matching and that lookups stay in memory"""
+    print("Testing root SEO resolution...")
+
+    app = create_test_app()
+    seed(app)
+    with app.app_context():
+        assert resolve_root_seo('/')['meta_title'] == 'Beranda'
+        assert resolve_root_seo('/news/12/judul')['page_identifier'] == 'news'
+        assert resolve_root_seo('/settings/seo/root')['meta_title'] == 'Pengaturan SEO'
+        assert resolve_root_seo('/settings/brand') is None
+        assert resolve_root_seo('/about') is None, "Inactive entries are not served"
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        for path in ('/', '/news', '/news/1/x', '/missing'):
+            resolve_root_seo(path)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert statements == [], statements
+
+        entry = resolve_root_seo('/news')
+        try:
+            entry['meta_title'] = 'Changed'
+            assert False, "Entries are read-only"
+        except TypeError:
+            pass
+    print("✓ Paths resolved from the in-memory map")
+
+
+def test_admin_save_refreshes():
+    """Test that the SEO admin endpoints bump the version"""
+    print("Testing refresh on admin save...")
+
+    app = create_test_app()
+    user_id = seed(app)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+
+    with app.app_context():
+        assert resolve_root_seo('/news')['meta_title'] == 'Berita'
+        version = root_seo_version()
+        news_id = RootSEO.query.filter_by(page_identifier='news').first().id
+
+    response = client.put(f'/api/seo/root/{news_id}', json={'meta_title': 'Berita Terkini'})
+    assert response.status_code == 200, response.data
+    response = client.post('/api/seo/root', json={'page_identifier': 'albums', 'page_name': 'Album',
+                                                  'meta_title': 'Album'})
+    assert response.status_code == 201, response.data
+
+    with app.app_context():
+        assert root_seo_version() != version
+        assert resolve_root_seo('/news')['meta_title'] == 'Berita Terkini'
+        assert resolve_root_seo('/albums/3')['meta_title'] == 'Album'
+    print("✓ Admin saves refresh every worker's map")
+
+
+def test_json_requests_skipped():
+    """Test which requests resolve SEO at all"""
+    print("Testing JSON request detection...")
+
+    app = create_test_app()
+    with app.test_request_context('/api/seo/stats'):
+        assert not wants_seo(request)
+    with app.test_request_context('/news', headers={'Accept': 'application/json'}):
+        assert not wants_seo(request)
+    with app.test_request_context('/news', method='POST', json={'q': 1}):
+        assert not wants_seo(request)
+    with app.test_request_context('/news', headers={'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8'}):
+        assert wants_seo(request)
+    print("✓ API and JSON requests skip SEO")
+
+
+def run_all_tests():
+    """Run all root SEO resolver tests"""
+    print("=" * 60)
+    print("ROOT SEO RESOLVER TESTS")
+    print("=" * 60)
+
+    try:
+        test_resolves_without_queries()
+        test_admin_save_refreshes()
+        test_json_requests_skipped()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
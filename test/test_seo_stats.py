@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script for the SEO coverage statistics
+
+Verifies that:
+1. Each content type is summarized by one aggregate query
+2. The counts match checking every row in Python
+3. Results are cached until an SEO field of a row changes
+4. The dashboard endpoints report the aggregated numbers
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from models import db, User, UserRole, News, Album, Category, RootSEO
+from routes.utils.seo_stats import compute_seo_stats, get_seo_stats
+from test_seo_injection_job import create_test_app
+
+
+def seed(app):
+    with app.app_context():
+        user = User(username='seostats', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        category = Category(name='Berita')
+        db.session.add_all([user, category])
+        db.session.flush()
+        # Locked rows keep exactly the SEO fields given here
+        for i, score in enumerate([95, 85, 70, 45, 30, None, 0]):
+            db.session.add(News(
+                title=f'Berita {i}', content='Isi', category_id=category.id, user_id=user.id,
+                is_seo_lock=True, seo_score=score,
+                meta_description='Deskripsi' if i % 2 == 0 else ('' if i == 1 else None),
+                meta_keywords='kata, kunci' if i < 3 else None,
+                og_title=f'Berita {i}' if i != 4 else None,
+            ))
+        for score in (88, 50):
+            db.session.add(Album(title=f'Album {score}', category_id=category.id, user_id=user.id,
+                                 is_seo_lock=True, seo_score=score, meta_keywords=None))
+        db.session.add_all([
+            RootSEO(page_identifier='home', page_name='Beranda', meta_title='Beranda', meta_description='D',
+                    meta_keywords='k', og_title='o', og_description='d', og_image='/i.png',
+                    canonical_url='/', schema_markup='{}'),
+            RootSEO(page_identifier='about', page_name='Tentang', meta_title='Tentang', meta_description='D'),
+        ])
+        db.session.commit()
+        return user.id
+
+
+def count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, statements
+
+
+def test_aggregates_match_rows():
+    """Test one query per type and parity with a row-by-row count"""
+    print("Testing aggregate coverage counts...")
+
+    app = create_test_app()
+    seed(app)
+    with app.app_context():
+        stats, statements = count_statements(compute_seo_stats)
+        assert len(statements) == 4, statements
+        assert all('sum(CASE WHEN' in sql for sql in statements)
+
+        rows = News.query.all()
+        scored = [n.seo_score for n in rows if n.seo_score is not None]
+        expected = {
+            'total': len(rows),
+            'scored': len(scored),
+            'score_sum': sum(scored),
+            'excellent': len([s for s in scored if s >= 90]),
+            'good': len([s for s in scored if 80 <= s < 90]),
+            'fair': len([s for s in scored if 60 <= s < 80]),
+            'poor': len([s for s in scored if s < 60]),
+            'incomplete': len([n for n in rows if n.seo_score and 40 <= n.seo_score < 80]),
+            'missing': len([n for n in rows if not n.seo_score or n.seo_score < 40]),
+            'locked': len(rows),
+        }
+        for field in ('meta_description', 'meta_keywords', 'og_title', 'og_description', 'schema_markup', 'seo_slug'):
+            expected[f'with_{field}'] = len([n for n in rows if getattr(n, field)])
+        assert stats['articles'] == expected, (stats['articles'], expected)
+        assert stats['albums']['total'] == 2 and stats['albums']['good'] == 1 and stats['albums']['poor'] == 1
+        assert stats['chapters']['total'] == 0
+
+        root_scores = sorted(r.calculate_seo_score() for r in RootSEO.query.all())
+        assert root_scores == [25, 100]
+        root = stats['root_pages']
+        assert root['score_sum'] == sum(root_scores) and root['excellent'] == 1 and root['missing'] == 1
+    print("✓ One aggregate query per content type")
+
+
+def test_cached_until_seo_change():
+    """Test caching and invalidation on save"""
+    print("Testing stats cache invalidation...")
+
+    app = create_test_app()
+    seed(app)
+    with app.app_context():
+        first = get_seo_stats()
+        again, statements = count_statements(get_seo_stats)
+        assert again == first and statements == []
+
+        db.session.get(News, 1).read_count = 10
+        db.session.commit()
+        _, statements = count_statements(get_seo_stats)
+        assert statements == [], "Counter updates keep the cached stats"
+
+        db.session.get(News, 2).meta_description = 'Deskripsi baru'
+        db.session.commit()
+        stats, statements = count_statements(get_seo_stats)
+        assert len(statements) == 4
+        assert stats['articles']['with_meta_description'] == first['articles']['with_meta_description'] + 1
+
+        RootSEO.query.filter_by(page_identifier='about').first().og_image = '/about.png'
+        db.session.commit()
+        assert get_seo_stats()['root_pages']['score_sum'] == 100 + 37
+    print("✓ Cached until an SEO field changes")
+
+
+def test_dashboard_endpoints():
+    """Test the overview, distribution, breakdown and recommendation endpoints"""
+    print("Testing SEO dashboard endpoints...")
+
+    app = create_test_app()
+    user_id = seed(app)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+
+    overview = client.get('/api/seo/stats/overview').get_json()['data']
+    assert overview['total_content'] == {'articles': 7, 'albums': 2, 'chapters': 0, 'root_pages': 2}
+    assert overview['average_scores']['articles'] == round((95 + 85 + 70 + 45 + 30 + 0) / 6, 1)
+    assert overview['completion_rates']['articles'] == round(2 / 7 * 100, 1)
+    assert overview['average_scores']['root_pages'] == 62.5
+
+    distribution = client.get('/api/seo/stats/score-distribution').get_json()['data']
+    assert distribution['articles'] == [1, 1, 1, 3] and distribution['root_pages'] == [1, 0, 0, 1]
+
+    breakdown = client.get('/api/seo/stats/status-breakdown').get_json()['data']
+    assert breakdown['articles'] == [2, 2, 3] and breakdown['albums'] == [1, 1, 0]
+
+    titles = [r['title'] for r in client.get('/api/seo/recommendations').get_json()['data']]
+    assert '1 articles need SEO optimization' in titles and '3 articles have low SEO scores' in titles
+
+    status = client.get('/api/seo/inject/status').get_json()
+    assert status['total_items'] == 11 and status['items_with_seo'] == 4 + 2
+    print("✓ Dashboard endpoints serve the aggregated stats")
+
+
+def run_all_tests():
+    """Run all SEO stats tests"""
+    print("=" * 60)
+    print("SEO COVERAGE STATS TESTS")
+    print("=" * 60)
+
+    try:
+        test_aggregates_match_rows()
+        test_cached_until_seo_change()
+        test_dashboard_endpoints()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk sitemap shard cache
+
+Verifies that:
+1. Shards are written to disk once and served from there until content changes
+2. Publishing, unpublishing and edits rebuild only the affected shards
+3. Counter-only updates do not invalidate anything
+4. Shards and indexes answer If-None-Match / If-Modified-Since with 304
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Album, News
+from routes.utils.sitemap_cache import get_sitemap_cache
+from test_sitemap_stream import create_test_app, seed
+
+
+def refresh(app):
+    with app.test_request_context():
+        return set(get_sitemap_cache().refresh())
+
+
+def test_incremental_rebuilds():
+    """Test that only shards whose rows changed are rewritten"""
+    print("Testing incremental shard rebuilds...")
+
+    app = create_test_app(max_urls=5)
+    try:
+        seed(app)
+        assert refresh(app) == {'pages-1', 'news-1', 'news-2', 'news-3', 'albums-1', 'chapters-1'}
+        assert refresh(app) == set(), "Nothing changed, nothing rebuilt"
+        cache_dir = app.config['SITEMAP_CACHE_DIR']
+        assert os.path.exists(os.path.join(cache_dir, 'sitemap-news-2.xml'))
+
+        with app.app_context():
+            news = db.session.get(News, 7)
+            news.read_count = 500
+            db.session.commit()
+        assert refresh(app) == set(), "Counter updates leave the sitemap alone"
+
+        with app.app_context():
+            news = db.session.get(News, 7)
+            news.title = 'Story 6 (updated)'
+            db.session.commit()
+        assert refresh(app) == {'news-2', 'pages-1'}
+
+        with app.app_context():
+            db.session.get(Album, 1).is_premium = True
+            db.session.commit()
+        assert 'chapters-1' in refresh(app), "Chapter entries repeat the album's premium flag"
+        with open(os.path.join(cache_dir, 'sitemap-chapters-1.xml')) as f:
+            assert '<priority>0.8</priority>' in f.read()
+
+        with app.app_context():
+            db.session.get(News, 13).is_visible = True  # publish the hidden article
+            db.session.commit()
+        assert refresh(app) == {'news-3', 'pages-1'}
+
+        with app.app_context():
+            for news_id in (11, 12, 13):
+                db.session.get(News, news_id).is_visible = False
+            db.session.commit()
+        assert refresh(app) == {'pages-1'}, "Emptied shards are dropped, not rebuilt"
+        assert not os.path.exists(os.path.join(cache_dir, 'sitemap-news-3.xml'))
+        assert app.test_client().get('/sitemap-news-3.xml').status_code == 404
+    finally:
+        shutil.rmtree(app.config['SITEMAP_CACHE_DIR'])
+    print("✓ Only changed shards rebuilt")
+
+
+def test_conditional_get():
+    """Test ETag and Last-Modified revalidation"""
+    print("Testing conditional GET...")
+
+    app = create_test_app(max_urls=5)
+    try:
+        seed(app)
+        client = app.test_client()
+
+        shard = client.get('/sitemap-news-1.xml')
+        assert shard.status_code == 200 and shard.headers['ETag'] and shard.headers['Last-Modified']
+        assert client.get('/sitemap-news-1.xml', headers={'If-None-Match': shard.headers['ETag']}).status_code == 304
+        assert client.get('/sitemap-news-1.xml',
+                          headers={'If-Modified-Since': shard.headers['Last-Modified']}).status_code == 304
+
+        index = client.get('/sitemap.xml')
+        assert index.status_code == 200 and index.headers['ETag']
+        assert client.get('/sitemap.xml', headers={'If-None-Match': index.headers['ETag']}).status_code == 304
+
+        with app.app_context():
+            db.session.get(News, 2).seo_slug = 'story-1-renamed'
+            db.session.commit()
+        changed = client.get('/sitemap-news-1.xml', headers={'If-None-Match': shard.headers['ETag']})
+        assert changed.status_code == 200 and b'story-1-renamed' in changed.data
+        assert changed.headers['ETag'] != shard.headers['ETag']
+        assert client.get('/sitemap.xml', headers={'If-None-Match': index.headers['ETag']}).status_code == 200
+    finally:
+        shutil.rmtree(app.config['SITEMAP_CACHE_DIR'])
+    print("✓ Unchanged shards revalidate with 304")
+
+
+def run_all_tests():
+    """Run all sitemap cache tests"""
+    print("=" * 60)
+    print("SITEMAP CACHE TESTS")
+    print("=" * 60)
+
+    try:
+        test_incremental_rebuilds()
+        test_conditional_get()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
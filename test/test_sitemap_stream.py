@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming, sharded sitemaps
+
+Verifies that:
+1. /sitemap.xml is a sitemap index listing numbered shards per section
+2. Shards hold at most SITEMAP_MAX_URLS URLs and together cover every row
+3. Hidden and noindex content is left out
+4. Unknown sections and out-of-range shard numbers are 404
+"""
+
+import sys
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+from models import db, User, UserRole, News, Album, AlbumChapter, Category
+
+NS = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+
+
+def create_test_app(max_urls=5):
+    """Create a test Flask app with the public routes and a small shard size"""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['SITEMAP_MAX_URLS'] = max_urls
+    app.config['SITEMAP_CACHE_DIR'] = tempfile.mkdtemp()
+
+    db.init_app(app)
+
+    from optimizations.cache_config import cache
+    cache.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+
+    from routes import main_blueprint
+    app.register_blueprint(main_blueprint)
+    app.register_error_handler(404, lambda e: ('Not Found', 404))
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed(app, news_count=12):
+    with app.app_context():
+        user = User(username='sitemap', role=UserRole.ADMIN, is_active=True, verified=True)
+        user.set_password('password123')
+        category = Category(name='Berita')
+        db.session.add_all([user, category])
+        db.session.flush()
+        for i in range(news_count):
+            db.session.add(News(title=f'Story {i}', content='Body', category_id=category.id,
+                                user_id=user.id, seo_slug=f'story-{i}', tagar='politik, ekonomi'))
+        db.session.add(News(title='Hidden', content='Body', category_id=category.id, user_id=user.id,
+                            is_visible=False))
+        db.session.add(News(title='Private', content='Body', category_id=category.id, user_id=user.id,
+                            meta_robots='NOINDEX, follow'))
+        album = Album(title='Novel Satu', category_id=category.id, user_id=user.id)
+        db.session.add(album)
+        db.session.flush()
+        for n in range(1, 4):
+            news = News(title=f'Chapter body {n}', content='Body', category_id=category.id,
+                        user_id=user.id, is_visible=False)
+            db.session.add(news)
+            db.session.flush()
+            db.session.add(AlbumChapter(album_id=album.id, news_id=news.id, chapter_number=n,
+                                        chapter_title=f'Bab {n}'))
+        db.session.commit()
+
+
+def locs(xml_bytes, tag):
+    root = ET.fromstring(xml_bytes)
+    return [el.text for el in root.findall(f'sm:{tag}/sm:loc', NS)]
+
+
+def test_index_and_shards():
+    """Test the index lists every shard and shards cover all rows"""
+    print("Testing sitemap index and shards...")
+
+    app = create_test_app(max_urls=5)
+    seed(app)
+    client = app.test_client()
+
+    response = client.get('/sitemap.xml')
+    assert response.status_code == 200 and response.mimetype == 'application/xml'
+    shards = [loc.split('/')[-1] for loc in locs(response.data, 'sitemap')]
+    assert shards == [
+        'sitemap-pages-1.xml',
+        'sitemap-news-1.xml', 'sitemap-news-2.xml', 'sitemap-news-3.xml',
+        'sitemap-albums-1.xml',
+        'sitemap-chapters-1.xml',
+    ], shards
+    assert locs(client.get('/sitemap-index.xml').data, 'sitemap') == locs(response.data, 'sitemap')
+
+    news_urls = []
+    for number in (1, 2, 3):
+        shard = client.get(f'/sitemap-news-{number}.xml')
+        assert shard.status_code == 200
+        urls = locs(shard.data, 'url')
+        assert len(urls) <= 5
+        news_urls.extend(urls)
+    assert len(news_urls) == len(set(news_urls)) == 12, news_urls
+    assert all(url.endswith(tuple(f'/story-{i}' for i in range(12))) for url in news_urls)
+
+    chapters = locs(client.get('/sitemap-chapters-1.xml').data, 'url')
+    assert [url.split('/')[-1] for url in chapters] == ['bab-1', 'bab-2', 'bab-3']
+
+    assert len(locs(client.get('/sitemap-pages-1.xml').data, 'url')) == 5, "Listing pages are capped too"
+    print("✓ Index lists numbered shards covering every visible row")
+
+
+def test_section_indexes_and_404s():
+    """Test the per-section indexes and invalid shard numbers"""
+    print("Testing section indexes...")
+
+    app = create_test_app(max_urls=5)
+    seed(app)
+    client = app.test_client()
+
+    news_index = [loc.split('/')[-1] for loc in locs(client.get('/sitemap-news.xml').data, 'sitemap')]
+    assert news_index == ['sitemap-news-1.xml', 'sitemap-news-2.xml', 'sitemap-news-3.xml']
+    albums_index = [loc.split('/')[-1] for loc in locs(client.get('/sitemap-albums.xml').data, 'sitemap')]
+    assert albums_index == ['sitemap-albums-1.xml', 'sitemap-chapters-1.xml']
+
+    assert client.get('/sitemap-news-4.xml').status_code == 404
+    assert client.get('/sitemap-news-0.xml').status_code == 404
+    assert client.get('/sitemap-videos-1.xml').status_code == 404, "Empty sections have no shards"
+    assert client.get('/sitemap-secret-1.xml').status_code == 404
+    print("✓ Section indexes listed and invalid shards rejected")
+
+
+def test_shard_size_capped():
+    """Test the protocol limit cap and the listing pages shard"""
+    print("Testing shard size cap...")
+
+    from routes.utils.sitemap_stream import MAX_URLS_PER_SHARD, shard_size
+    app = create_test_app(max_urls=10 ** 6)
+    seed(app, news_count=1)
+    with app.app_context():
+        assert shard_size() == MAX_URLS_PER_SHARD == 50000
+
+    pages = app.test_client().get('/sitemap-pages-1.xml').data.decode()
+    assert 'category=Berita' in pages and 'tag=politik' in pages and 'tag=ekonomi' in pages
+    print("✓ Shards never exceed 50,000 URLs")
+
+
+def run_all_tests():
+    """Run all sitemap tests"""
+    print("=" * 60)
+    print("STREAMING SITEMAP TESTS")
+    print("=" * 60)
+
+    try:
+        test_index_and_shards()
+        test_section_indexes_and_404s()
+        test_shard_size_capped()
+
+        print("\n" + "=" * 60)
+        print("ALL TESTS PASSED! ✓")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)